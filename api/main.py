@@ -4,16 +4,30 @@ FastAPI application for the Polymarket Bot API.
 
 import os
 import asyncio
+import json
+from dataclasses import asdict
 from typing import List, Optional
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from py_clob_client.client import ClobClient
-from py_clob_client.clob_types import ApiCreds
 import logging
+import redis.asyncio as redis
 
+from llm.embeddings import EmbeddingService
+from services.analysis.arbitrage import ArbitrageScanner
+from services.analysis.candles import RESOLUTIONS, candle_key
+from services.analysis.engine import AnalyticsEngine
+from services.api.cache import MarketStore
+from services.auth.pool import get_pool
 from services.ingest.market_data import MarketState, MarketDataService
+from services.ingest.catalogue import MarketCatalogue
+from services.ingest.feed import MarketFeed
+from services.ingest.search import MarketSearchIndex, SemanticIndex
+from services.ingest.snapshot import MarketSnapshotStore
+from shared.config.settings import get_settings
+from shared.interfaces import Message, create_bus, topic
 
 # Load environment variables
 load_dotenv()
@@ -35,6 +49,15 @@ app.add_middleware(
 
 # Global service instance
 market_data_service = None
+market_search_index = None
+embedding_service = None
+arbitrage_scanner = None
+analytics_engine = None
+analytics_task = None
+# Candles are built from trades and persisted by the analysis service
+redis_client = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"))
+bus = create_bus(group="api")
+market_feed = MarketFeed(rate=float(os.getenv("FEED_RATE", "4")))
 
 # Pydantic models for API responses
 class MarketStateResponse(BaseModel):
@@ -58,6 +81,9 @@ class MarketStateResponse(BaseModel):
 async def get_market_service():
     global market_data_service
     if market_data_service is None:
+        # py_clob_client pulls in the web3 stack, so it is only imported once the service is needed
+        from py_clob_client.clob_types import ApiCreds
+        
         # Initialize the service if it doesn't exist
         host = os.getenv("POLYMARKET_API_HOST")
         api_key = os.getenv("POLYMARKET_API_KEY")
@@ -73,47 +99,149 @@ async def get_market_service():
         logger.info(f"POLYMARKET_API_PASSPHRASE: {'*' * len(api_passphrase) if api_passphrase else 'None'}")
         logger.info(f"POLY_PRIVATE_KEY: {'*' * len(private_key) if private_key else 'None'}")
         
-        if not all([host, api_key, api_secret, api_passphrase, private_key]):
+        if not all([host, private_key]):
             logger.error("Missing required environment variables for Polymarket API")
             raise ValueError("Missing required environment variables for Polymarket API")
         
-        # Add 0x prefix to private key if missing
-        if not private_key.startswith("0x"):
-            private_key = "0x" + private_key
+        # Sin credenciales en el entorno se derivan una vez y quedan cifradas en la caché del pool
+        creds = None
+        if all([api_key, api_secret, api_passphrase]):
+            creds = ApiCreds(api_key=api_key, api_secret=api_secret, api_passphrase=api_passphrase)
         
         logger.info("Initializing Polymarket client...")
-        client = ClobClient(
-            host=host,
-            key=private_key,
-            chain_id=137,  # Polygon mainnet
-            creds=ApiCreds(
-                api_key=api_key,
-                api_secret=api_secret,
-                api_passphrase=api_passphrase
-            )
-        )
+        account = await get_pool().account(private_key, host=host, chain_id=137, creds=creds)
+        client = account.async_client()
         
         logger.info("Initializing market data service...")
-        market_data_service = MarketDataService(client)
+        catalogue = MarketCatalogue(os.getenv("MARKET_CATALOGUE_PATH", "./data/catalogue/markets.json"))
+        snapshot_store = MarketSnapshotStore(os.getenv("MARKET_SNAPSHOT_PATH", "./data/snapshots/markets.bin"))
+        # Prices follow the ingest stream on the bus; STREAM_PRICES=0 polls the REST books instead
+        market_data_service = MarketDataService(
+            client,
+            catalogue=catalogue,
+            snapshot_store=snapshot_store,
+            stream_prices=os.getenv("STREAM_PRICES", "1") == "1",
+            # Los mercados activos del catálogo se publican en las claves que sirve la API de Redis
+            market_store=MarketStore(redis_client)
+        )
+        
+        # Keep the search index in sync with discovered markets
+        global market_search_index, embedding_service
+        semantic = None
+        if os.getenv("SEMANTIC_SEARCH", "1") == "1":
+            # One embedding model for the whole process, vectors cached on disk
+            embedding_service = EmbeddingService(get_settings().CHROMA_DB_PATH)
+            semantic = SemanticIndex(embedding_service)
+        market_search_index = MarketSearchIndex(semantic=semantic)
+        market_data_service.add_callback(market_search_index.on_market_update)
+        
+        # Scan both outcome books of every market for arbitrage as they update
+        global arbitrage_scanner
+        arbitrage_scanner = ArbitrageScanner(market_data_service.books)
+        market_data_service.add_callback(arbitrage_scanner.on_market_update)
         
-        # Start the service
+        # Rolling market features, recomputed for all markets at once
+        global analytics_engine, analytics_task
+        analytics_engine = AnalyticsEngine(books=market_data_service.books)
+        market_data_service.add_callback(analytics_engine.on_market_update)
+        analytics_task = asyncio.create_task(compute_features())
+        
+        # Live delta feed for the frontend
+        market_data_service.add_callback(market_feed.on_market_update)
+        
+        # Start the service, serving the last snapshot while it catches up
         await market_data_service.start()
+        for market in market_data_service.get_all_markets():
+            market_search_index.update_market(market)
+            market_feed.on_market_update(market)
+        arbitrage_scanner.track_catalogue(catalogue)
     
     return market_data_service
 
+async def on_market_message(message: Message):
+    """Apply the ingest stream to the market state and the books the arbitrage scanner reads."""
+    if market_data_service is None:
+        return
+    await market_data_service.handle_event(message.payload)
+    arbitrage_scanner.scan()
+
+async def compute_features(interval: float = 1.0):
+    """Periodically recompute market features so requests only read them."""
+    while True:
+        await asyncio.sleep(interval)
+        analytics_engine.compute()
+
 @app.on_event("startup")
 async def startup_event():
     """Start the market data service when the API server starts."""
     logger.info("Starting market data service...")
     await get_market_service()
+    # Raw (unconflated) stream: market state and the scanner keep up with every book change
+    await bus.start()
+    await bus.subscribe([topic("market")], on_market_message, durable=False)
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Stop the market data service when the API server stops."""
     logger.info("Stopping market data service...")
     global market_data_service
+    if analytics_task is not None:
+        analytics_task.cancel()
+    await bus.close()
     if market_data_service is not None:
         await market_data_service.stop()
+        await market_data_service.client.aclose()
+    await redis_client.aclose()
+    await get_pool().aclose()
+
+@app.websocket("/ws/markets")
+async def market_feed_ws(websocket: WebSocket, markets: Optional[str] = None, rate: Optional[float] = None):
+    """Live market feed: a snapshot of the subscribed markets, then changed fields only.
+
+    Clients change their markets by sending ``{"op": "subscribe" | "unsubscribe" | "set",
+    "markets": [...]}``; invalid requests are answered with an error message.
+    """
+    await websocket.accept()
+    client = market_feed.connect(websocket.send_text, rate)
+    flush_task = asyncio.create_task(client.run())
+    try:
+        if markets:
+            await client.subscribe(markets.split(","))
+        while True:
+            await client.handle_text(await websocket.receive_text())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        flush_task.cancel()
+        market_feed.disconnect(client)
+
+@app.get("/markets/stream")
+async def market_feed_sse(markets: str, rate: Optional[float] = None):
+    """Server-sent events version of the live market feed for a fixed set of markets."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=64)
+
+    async def send(text: str):
+        if queue.full():
+            queue.get_nowait()  # the client is not keeping up; drop the oldest message
+        queue.put_nowait(text)
+
+    async def events():
+        client = market_feed.connect(send, rate)
+        flush_task = asyncio.create_task(client.run())
+        try:
+            await client.subscribe(markets.split(","))
+            while True:
+                yield f"data: {await queue.get()}\n\n"
+        finally:
+            flush_task.cancel()
+            market_feed.disconnect(client)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.get("/feed/stats")
+async def get_feed_stats():
+    """Live feed clients and the messages and bytes sent to them."""
+    return market_feed.stats()
 
 @app.get("/health")
 async def health_check():
@@ -127,6 +255,70 @@ async def get_markets(service: MarketDataService = Depends(get_market_service)):
     logger.info(f"Returning {len(markets)} markets")
     return markets
 
+@app.get("/markets/search", response_model=List[MarketStateResponse])
+async def search_markets(
+    q: str,
+    limit: int = 20,
+    service: MarketDataService = Depends(get_market_service)
+):
+    """Search markets by keywords in their question and description."""
+    markets = market_search_index.search(q, limit=limit)
+    logger.info(f"Search '{q}' matched {len(markets)} markets")
+    return markets
+
+@app.get("/arbitrage")
+async def get_arbitrage(service: MarketDataService = Depends(get_market_service)):
+    """Get open arbitrage opportunities, most profitable first."""
+    return [
+        {**asdict(opportunity), "profit": opportunity.profit}
+        for opportunity in arbitrage_scanner.opportunities()
+    ]
+
+@app.get("/markets/{condition_id}/related", response_model=List[MarketStateResponse])
+async def get_related_markets(
+    condition_id: str,
+    limit: int = 10,
+    service: MarketDataService = Depends(get_market_service)
+):
+    """Get markets semantically related to a specific market."""
+    if condition_id not in market_search_index:
+        logger.warning(f"Market not found: {condition_id}")
+        raise HTTPException(status_code=404, detail="Market not found")
+    return await market_search_index.related(condition_id, limit=limit)
+
+@app.get("/markets/{condition_id}/features")
+async def get_market_features(
+    condition_id: str,
+    service: MarketDataService = Depends(get_market_service)
+):
+    """Get the last computed analytics features of a market."""
+    features = analytics_engine.get(condition_id)
+    if features is None:
+        logger.warning(f"No features for market: {condition_id}")
+        raise HTTPException(status_code=404, detail="Market not found")
+    return features
+
+@app.get("/markets/{condition_id}/candles")
+async def get_market_candles(
+    condition_id: str,
+    resolution: str = "1m",
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    limit: int = 500,
+    service: MarketDataService = Depends(get_market_service)
+):
+    """Get the closed OHLCV bars of a market starting in [start, end] (unix seconds), oldest first."""
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"Resolution must be one of {list(RESOLUTIONS)}")
+    bars = await redis_client.zrevrangebyscore(
+        candle_key(condition_id, resolution),
+        "+inf" if end is None else end,
+        "-inf" if start is None else start,
+        start=0,
+        num=limit
+    )
+    return [json.loads(bar) for bar in reversed(bars)]
+
 @app.get("/markets/{condition_id}", response_model=MarketStateResponse)
 async def get_market(
     condition_id: str,
@@ -144,7 +336,6 @@ async def get_market(
 async def refresh_markets(service: MarketDataService = Depends(get_market_service)):
     """Force a refresh of market data."""
     logger.info("Refreshing market data...")
-    await service.stop()
-    await service.start()
-    logger.info("Market data service restarted")
-    return {"status": "ok", "message": "Market data service restarted"} 
\ No newline at end of file
+    await service.resync()
+    logger.info("Market data resynced")
+    return {"status": "ok", "message": "Market data resynced"} 
\ No newline at end of file
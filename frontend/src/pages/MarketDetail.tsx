@@ -20,7 +20,7 @@ import {
   Tooltip,
   Legend,
 } from 'chart.js';
-import { getMarketDetails, getMarketEvents } from '../services/api';
+import { Candle, MarketFeed, getCandles, getMarketDetails, getMarketEvents } from '../services/api';
 import '../styles/MarketDetail.css';
 
 // Register ChartJS components
@@ -58,6 +58,7 @@ const MarketDetail: React.FC = () => {
   const { marketId } = useParams<{ marketId: string }>();
   const [market, setMarket] = useState<MarketDetails | null>(null);
   const [events, setEvents] = useState<MarketEvent[]>([]);
+  const [candles, setCandles] = useState<Candle[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
 
@@ -70,12 +71,14 @@ const MarketDetail: React.FC = () => {
       }
 
       try {
-        const [marketData, eventsData] = await Promise.all([
+        const [marketData, eventsData, candleData] = await Promise.all([
           getMarketDetails(marketId),
           getMarketEvents(marketId),
+          getCandles(marketId, '1h', { limit: 168 }),
         ]);
         setMarket(marketData);
         setEvents(eventsData);
+        setCandles(candleData);
       } catch (err) {
         setError('Failed to load market data');
         console.error('Error fetching market data:', err);
@@ -90,19 +93,42 @@ const MarketDetail: React.FC = () => {
     return () => clearInterval(interval);
   }, [marketId]);
 
-  // Sample data for the price chart
+  // Live price and volume between refreshes
+  useEffect(() => {
+    if (!marketId) {
+      return;
+    }
+    const feed = new MarketFeed((markets) => {
+      const fields = markets[marketId];
+      if (!fields) {
+        return;
+      }
+      const mid = fields.b != null && fields.a != null ? (fields.b + fields.a) / 2 : null;
+      const price = fields.l ?? mid;
+      setMarket((current) => current && {
+        ...current,
+        currentPrice: price ?? current.currentPrice,
+        volume24h: fields.v ?? current.volume24h,
+      });
+    });
+    feed.setMarkets([marketId]);
+    feed.connect();
+    return () => feed.close();
+  }, [marketId]);
+
+  // Hourly closes of the YES token; NO trades at the complement
   const chartData = {
-    labels: ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun'],
+    labels: candles.map((candle) => new Date(candle.start * 1000).toLocaleString()),
     datasets: [
       {
         label: 'Yes Price',
-        data: [0.6, 0.65, 0.7, 0.75, 0.8, 0.85],
+        data: candles.map((candle) => candle.close),
         borderColor: 'rgb(75, 192, 192)',
         tension: 0.1,
       },
       {
         label: 'No Price',
-        data: [0.4, 0.35, 0.3, 0.25, 0.2, 0.15],
+        data: candles.map((candle) => 1 - candle.close),
         borderColor: 'rgb(255, 99, 132)',
         tension: 0.1,
       },
@@ -53,6 +53,35 @@ export const getMarketEvents = async (marketId: string) => {
   return response.data;
 };
 
+export const searchMarkets = async (query: string, limit = 20) => {
+  const response = await api.get('/markets/search', { params: { q: query, limit } });
+  return response.data;
+};
+
+export const getRelatedMarkets = async (conditionId: string, limit = 10) => {
+  const response = await api.get(`/markets/${conditionId}/related`, { params: { limit } });
+  return response.data;
+};
+
+export interface Candle {
+  start: number;
+  open: number;
+  high: number;
+  low: number;
+  close: number;
+  volume: number;
+  trades: number;
+}
+
+export const getCandles = async (
+  conditionId: string,
+  resolution: '1s' | '1m' | '5m' | '1h' | '1d' = '1h',
+  params: { start?: number; end?: number; limit?: number } = {}
+): Promise<Candle[]> => {
+  const response = await api.get(`/markets/${conditionId}/candles`, { params: { resolution, ...params } });
+  return response.data;
+};
+
 export const getStats = async () => {
   const response = await api.get('/api/stats');
   return response.data;
@@ -68,4 +97,77 @@ export const saveSettings = async (settings: any) => {
   return response.data;
 };
 
+// Live market feed: a snapshot of the subscribed markets, then only the fields that changed
+export interface FeedFields {
+  q?: string;
+  b?: number | null;
+  bs?: number | null;
+  a?: number | null;
+  as?: number | null;
+  l?: number | null;
+  v?: number | null;
+}
+
+export type FeedListener = (markets: Record<string, FeedFields>) => void;
+// Called with the server's message when it rejects a request
+export type FeedErrorListener = (error: string) => void;
+
+export class MarketFeed {
+  private socket: WebSocket | null = null;
+  private markets = new Set<string>();
+  private state: Record<string, FeedFields> = {};
+  private closed = false;
+
+  constructor(
+    private listener: FeedListener,
+    private rate = 4,
+    private onError: FeedErrorListener = (error) => console.warn(`Market feed error: ${error}`)
+  ) {}
+
+  connect() {
+    this.closed = false;
+    const url = `${API_BASE_URL.replace(/^http/, 'ws')}/ws/markets?rate=${this.rate}`;
+    this.socket = new WebSocket(url);
+    this.socket.onopen = () => this.send('set', Array.from(this.markets));
+    this.socket.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      if (message.type === 'error' || !message.markets) {
+        this.onError(message.error ?? 'unexpected message');
+        return;
+      }
+      for (const [market, fields] of Object.entries<FeedFields>(message.markets)) {
+        this.state[market] = { ...this.state[market], ...fields };
+      }
+      this.listener(this.state);
+    };
+    this.socket.onclose = () => {
+      if (!this.closed) {
+        setTimeout(() => this.connect(), 2000);
+      }
+    };
+  }
+
+  close() {
+    this.closed = true;
+    this.socket?.close();
+  }
+
+  // Replace the markets being followed, e.g. the ones visible on screen
+  setMarkets(markets: string[]) {
+    this.markets = new Set(markets);
+    for (const market of Object.keys(this.state)) {
+      if (!this.markets.has(market)) {
+        delete this.state[market];
+      }
+    }
+    this.send('set', markets);
+  }
+
+  private send(op: string, markets: string[]) {
+    if (this.socket?.readyState === WebSocket.OPEN) {
+      this.socket.send(JSON.stringify({ op, markets }));
+    }
+  }
+}
+
 export default api; 
\ No newline at end of file
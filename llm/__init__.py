@@ -0,0 +1,18 @@
+from .cache import ResponseCache, content_hash
+from .embeddings import EmbeddingService, VectorCache
+from .pipeline import ChatClient, LLMPipeline
+from .prompts import PromptTemplate
+from .prompts.market_analysis import MARKET_ANALYSIS
+from .prompts.news_analysis import NEWS_ANALYSIS
+
+__all__ = [
+    "ChatClient",
+    "EmbeddingService",
+    "LLMPipeline",
+    "MARKET_ANALYSIS",
+    "NEWS_ANALYSIS",
+    "PromptTemplate",
+    "ResponseCache",
+    "VectorCache",
+    "content_hash",
+]
@@ -0,0 +1,87 @@
+"""
+LLM Response Cache
+
+On-disk cache of parsed LLM results:
+1. Entries are keyed by (prompt template version, item ID, content hash), so
+   a new prompt version or changed inputs never hit a stale answer
+2. Each entry is a small JSON file written atomically (temp file + rename)
+3. Entries older than the TTL are dropped when read and by ``evict()``
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text: str) -> str:
+    """Hash of the inputs of an analysis."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """TTL-evicted on-disk cache of LLM results."""
+
+    def __init__(self, directory: Union[str, Path], ttl: float = 86400.0):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, template: str, item_id: str, digest: str) -> Path:
+        key = hashlib.sha256(f"{template}\0{item_id}\0{digest}".encode("utf-8")).hexdigest()
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, template: str, item_id: str, digest: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Get a cached result, or None when missing or expired."""
+        path = self._path(template, item_id, digest)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        now = time.time() if now is None else now
+        if now - entry["created"] > self.ttl:
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["value"]
+
+    def set(self, template: str, item_id: str, digest: str, value: Dict[str, Any], now: Optional[float] = None) -> None:
+        """Store a result."""
+        path = self._path(template, item_id, digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {"created": time.time() if now is None else now, "value": value}
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)
+            # evict() sweeps by mtime without opening every file
+            os.utime(path, (entry["created"], entry["created"]))
+        except OSError as e:
+            logger.warning(f"Failed to cache LLM result for {item_id}: {e}")
+            tmp.unlink(missing_ok=True)
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """Delete expired entries; returns how many were removed."""
+        if not self.directory.exists():
+            return 0
+        cutoff = (time.time() if now is None else now) - self.ttl
+        removed = 0
+        for path in self.directory.glob("*/*.json"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                continue
+        return removed
@@ -0,0 +1,318 @@
+"""
+Embedding Service
+
+One shared embedding model for market questions and news items:
+1. The sentence-transformers model is loaded once, on first use, and reused
+   by every caller
+2. Concurrent ``embed`` calls are coalesced into dynamic micro-batches: texts
+   queued within ``max_wait`` seconds are encoded together, up to
+   ``max_batch`` at a time, in a worker thread
+3. Vectors are cached by content hash in an append-only memory-mapped float32
+   matrix, so unchanged text is never re-embedded, even across restarts
+4. Named collections (e.g. markets) map document IDs to cached vectors and
+   answer nearest-neighbour queries with one matrix product
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .cache import content_hash
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+Encoder = Callable[[List[str]], np.ndarray]
+
+
+class VectorCache:
+    """Append-only memory-mapped matrix of vectors keyed by content hash.
+
+    ``vectors.f32`` holds the rows and ``hashes.txt`` one hash per row; rows
+    are written before their hash so a crash never leaves a hash pointing
+    at garbage.
+    """
+
+    def __init__(self, directory: Union[str, Path], initial_capacity: int = 1024):
+        self.directory = Path(directory)
+        self.initial_capacity = initial_capacity
+        self.dim: Optional[int] = None
+        self._rows: Dict[str, int] = {}  # content hash -> row
+        self._matrix: Optional[np.memmap] = None
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._rows
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.directory / "vectors.f32"
+
+    @property
+    def _hashes_path(self) -> Path:
+        return self.directory / "hashes.txt"
+
+    def _load(self) -> None:
+        meta_path = self.directory / "meta.json"
+        if not meta_path.exists():
+            return
+        self.dim = json.loads(meta_path.read_text())["dim"]
+        with open(self._hashes_path, "r", encoding="ascii") as f:
+            hashes = [line.strip() for line in f if line.strip()]
+        capacity = self._vectors_path.stat().st_size // (4 * self.dim)
+        hashes = hashes[:capacity]  # ignore hashes of rows that never made it to disk
+        self._rows = {digest: row for row, digest in enumerate(hashes)}
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        logger.info(f"Loaded {len(self._rows)} cached embeddings from {self.directory}")
+
+    def _reserve(self, rows: int) -> None:
+        """Grow the backing file (doubling) to hold ``rows`` rows."""
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        if rows <= capacity:
+            return
+        capacity = max(capacity * 2, rows, self.initial_capacity)
+        if self._matrix is not None:
+            self._matrix.flush()
+            del self._matrix
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(capacity * self.dim * 4)
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def add(self, digests: Sequence[str], vectors: np.ndarray) -> None:
+        """Store vectors under their content hashes."""
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            self.directory.mkdir(parents=True, exist_ok=True)
+            (self.directory / "meta.json").write_text(json.dumps({"dim": self.dim}))
+        new = [(digest, vector) for digest, vector in zip(digests, vectors) if digest not in self._rows]
+        if not new:
+            return
+        start = len(self._rows)
+        self._reserve(start + len(new))
+        self._matrix[start:start + len(new)] = np.stack([vector for _, vector in new])
+        self._matrix.flush()
+        with open(self._hashes_path, "a", encoding="ascii") as f:
+            f.writelines(f"{digest}\n" for digest, _ in new)
+        for offset, (digest, _) in enumerate(new):
+            self._rows[digest] = start + offset
+
+    def row(self, digest: str) -> Optional[int]:
+        return self._rows.get(digest)
+
+    def get(self, digest: str) -> Optional[np.ndarray]:
+        row = self._rows.get(digest)
+        return None if row is None else np.asarray(self._matrix[row])
+
+    def take(self, rows: Sequence[int]) -> np.ndarray:
+        """Get the vectors of several rows as one (n, dim) array."""
+        return np.asarray(self._matrix[np.asarray(rows, dtype=np.int64)])
+
+
+class _Collection:
+    """Document ID -> cache row mapping with a lazily rebuilt row index."""
+
+    __slots__ = ("rows", "_ids", "_index")
+
+    def __init__(self):
+        self.rows: Dict[str, int] = {}
+        self._ids: Optional[List[str]] = None
+        self._index: Optional[np.ndarray] = None
+
+    def set(self, doc_id: str, row: int) -> None:
+        if self.rows.get(doc_id) != row:
+            self.rows[doc_id] = row
+            self._ids = None
+
+    def remove(self, doc_id: str) -> None:
+        if self.rows.pop(doc_id, None) is not None:
+            self._ids = None
+
+    def index(self) -> Tuple[List[str], np.ndarray]:
+        if self._ids is None:
+            self._ids = list(self.rows)
+            self._index = np.fromiter(self.rows.values(), dtype=np.int64, count=len(self.rows))
+        return self._ids, self._index
+
+
+class EmbeddingService:
+    """Shared, cached and micro-batched text embeddings with similarity search."""
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path],
+        model_name: str = DEFAULT_MODEL,
+        encoder: Optional[Encoder] = None,
+        max_batch: int = 64,
+        max_wait: float = 0.005
+    ):
+        """Initialize the embedding service.
+
+        Args:
+            cache_dir: Directory of the vector cache; one subdirectory per model
+            model_name: Local sentence-transformers model to embed with
+            encoder: Optional replacement for the model, mapping texts to vectors
+            max_batch: Maximum texts encoded at once
+            max_wait: Seconds to wait for more texts before encoding a batch
+        """
+        self.model_name = model_name
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.cache = VectorCache(Path(cache_dir) / model_name.replace("/", "__"))
+        self._encoder = encoder
+        self._model = None
+        self._model_lock = threading.Lock()
+
+        self._collections: Dict[str, _Collection] = {}
+        self._queue: Dict[str, str] = {}  # content hash -> text awaiting encoding
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._batcher: Optional[asyncio.Task] = None
+        self.stats = {"cache_hits": 0, "encoded": 0, "batches": 0}
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts into unit-norm float32 vectors (blocking)."""
+        if self._encoder is not None:
+            vectors = np.asarray(self._encoder(texts), dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            return vectors / np.where(norms == 0, 1, norms)
+
+        with self._model_lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+
+                self._model = SentenceTransformer(self.model_name, device="cpu")
+                logger.info(f"Loaded embedding model {self.model_name}")
+        vectors = self._model.encode(texts, batch_size=len(texts), normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+    async def _run_batches(self) -> None:
+        while self._queue:
+            await asyncio.sleep(self.max_wait)
+            digests = list(self._queue)[:self.max_batch]
+            texts = [self._queue.pop(digest) for digest in digests]
+            try:
+                vectors = await asyncio.to_thread(self._encode, texts)
+                self.cache.add(digests, vectors)
+            except Exception as e:
+                for digest in digests:
+                    future = self._futures.pop(digest)
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.stats["batches"] += 1
+            self.stats["encoded"] += len(texts)
+            for digest in digests:
+                future = self._futures.pop(digest)
+                if not future.done():
+                    future.set_result(None)
+
+    async def _ensure_cached(self, texts: Iterable[str]) -> List[str]:
+        """Embed every uncached text; returns the content hashes of ``texts``."""
+        digests = []
+        waiting = []
+        loop = asyncio.get_running_loop()
+        for text in texts:
+            digest = content_hash(text)
+            digests.append(digest)
+            if digest in self.cache:
+                self.stats["cache_hits"] += 1
+                continue
+            future = self._futures.get(digest)
+            if future is None:
+                future = loop.create_future()
+                self._futures[digest] = future
+                self._queue[digest] = text
+            waiting.append(future)
+
+        if waiting:
+            if self._batcher is None or self._batcher.done():
+                self._batcher = asyncio.create_task(self._run_batches())
+            await asyncio.gather(*waiting)
+        return digests
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Get the unit-norm embeddings of texts as an (n, dim) array."""
+        digests = await self._ensure_cached(texts)
+        if not digests:
+            return np.empty((0, self.cache.dim or 0), dtype=np.float32)
+        return self.cache.take([self.cache.row(digest) for digest in digests])
+
+    async def index(self, collection: str, documents: Dict[str, str]) -> None:
+        """Embed and add documents (ID -> text) to a collection."""
+        digests = await self._ensure_cached(documents.values())
+        target = self._collections.setdefault(collection, _Collection())
+        for doc_id, digest in zip(documents, digests):
+            target.set(doc_id, self.cache.row(digest))
+
+    def remove(self, collection: str, doc_id: str) -> None:
+        target = self._collections.get(collection)
+        if target is not None:
+            target.remove(doc_id)
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        collection, doc_id = key
+        target = self._collections.get(collection)
+        return target is not None and doc_id in target.rows
+
+    def nearest(
+        self,
+        collection: str,
+        vectors: np.ndarray,
+        limit: int = 10,
+        min_score: float = -1.0,
+        exclude: Optional[Sequence[Optional[str]]] = None
+    ) -> List[List[Tuple[str, float]]]:
+        """Find the documents most similar to each query vector.
+
+        Args:
+            collection: Collection to search
+            vectors: (n, dim) unit-norm query vectors
+            limit: Maximum matches per query
+            min_score: Minimum cosine similarity of a match
+            exclude: Optional document ID to skip per query (e.g. itself)
+
+        Returns:
+            Per query, a list of (doc_id, cosine similarity) pairs, best first
+        """
+        target = self._collections.get(collection)
+        queries = np.atleast_2d(vectors)
+        if target is None or not target.rows:
+            return [[] for _ in range(len(queries))]
+
+        ids, rows = target.index()
+        scores = queries @ self.cache.take(rows).T
+        k = min(limit + 1, len(ids))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+        results = []
+        for i, candidates in enumerate(top):
+            skip = exclude[i] if exclude is not None else None
+            ranked = sorted(candidates, key=lambda j: -scores[i, j])
+            matches = [
+                (ids[j], float(scores[i, j]))
+                for j in ranked
+                if ids[j] != skip and scores[i, j] >= min_score
+            ]
+            results.append(matches[:limit])
+        return results
+
+    async def query(self, collection: str, text: str, limit: int = 10, min_score: float = -1.0) -> List[Tuple[str, float]]:
+        """Find the documents most similar to a text."""
+        return self.nearest(collection, await self.embed([text]), limit, min_score)[0]
+
+    def similar(self, collection: str, doc_id: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """Find the documents most similar to an indexed document."""
+        target = self._collections.get(collection)
+        if target is None or doc_id not in target.rows:
+            return []
+        vector = self.cache.take([target.rows[doc_id]])
+        return self.nearest(collection, vector, limit, exclude=[doc_id])[0]
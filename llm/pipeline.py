@@ -0,0 +1,162 @@
+"""
+LLM Analysis Pipeline
+
+Runs prompt templates over many items (markets, news articles):
+1. Each item's inputs are hashed; items whose hash did not change since the
+   last run reuse their previous result without touching the cache or the LLM
+2. Changed items are looked up in the on-disk cache keyed by
+   (template version, item ID, content hash)
+3. The remaining items are packed several per request and the requests run
+   concurrently under a semaphore capping in-flight LLM calls
+4. Failed requests are retried with exponential backoff on 429 and 5xx
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .cache import ResponseCache, content_hash
+from .prompts import PromptTemplate
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+DEFAULT_MODEL = "gpt-4o-mini"
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class ChatClient:
+    """Minimal async client for OpenAI-compatible chat completion endpoints.
+
+    Any server implementing ``POST {base_url}/chat/completions`` works, which
+    includes local model servers and the stub server used in tests.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        timeout: float = 60.0,
+        max_retries: int = 3
+    ):
+        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.model = model or os.getenv("LLM_MODEL") or DEFAULT_MODEL
+        self.max_retries = max_retries
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._http = httpx.AsyncClient(headers=headers, timeout=timeout)
+
+    async def complete(self, messages: List[Dict[str, str]], temperature: float = 0.0) -> str:
+        """Get the reply text of a chat completion."""
+        body = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "response_format": {"type": "json_object"},
+        }
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self._http.post(f"{self.base_url}/chat/completions", json=body)
+                if response.status_code not in _RETRY_STATUS or attempt == self.max_retries:
+                    response.raise_for_status()
+                    return response.json()["choices"][0]["message"]["content"]
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+            await asyncio.sleep(0.5 * 2 ** attempt)
+        raise RuntimeError("unreachable")
+
+    async def close(self) -> None:
+        await self._http.aclose()
+
+
+class LLMPipeline:
+    """Batched, cached and change-aware analysis of items with one template."""
+
+    def __init__(
+        self,
+        client: ChatClient,
+        template: PromptTemplate,
+        cache: Optional[ResponseCache] = None,
+        max_concurrency: int = 4,
+        batch_size: int = 8
+    ):
+        self.client = client
+        self.template = template
+        self.cache = cache
+        self.batch_size = batch_size
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._hashes: Dict[str, str] = {}  # item ID -> content hash of the last result
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"unchanged": 0, "cached": 0, "analyzed": 0, "requests": 0, "failed": 0}
+
+    def result(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Latest result of an item."""
+        return self._results.get(item_id)
+
+    def results(self) -> Dict[str, Dict[str, Any]]:
+        return dict(self._results)
+
+    async def _request(self, batch: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        async with self._semaphore:
+            self.stats["requests"] += 1
+            try:
+                text = await self.client.complete(self.template.messages(batch))
+                return self.template.parse(text)
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"{self.template.name} request for {len(batch)} items failed: {e}")
+                return {}
+
+    async def analyze(self, items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Analyze items (dicts with an ``id``), calling the LLM only for changed inputs.
+
+        Returns the results of the given items; items the LLM failed to
+        answer are left out and retried on the next call.
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        pending: List[Dict[str, Any]] = []
+        digests: Dict[str, str] = {}
+
+        for item in items:
+            item_id = str(item["id"])
+            digest = content_hash(self.template.content(item))
+            if self._hashes.get(item_id) == digest:
+                self.stats["unchanged"] += 1
+                results[item_id] = self._results[item_id]
+                continue
+            digests[item_id] = digest
+            cached = self.cache.get(self.template.key, item_id, digest) if self.cache else None
+            if cached is not None:
+                self.stats["cached"] += 1
+                self._store(item_id, digest, cached)
+                results[item_id] = cached
+            else:
+                pending.append(item)
+
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        for answers in await asyncio.gather(*(self._request(batch) for batch in batches)):
+            for item_id, result in answers.items():
+                digest = digests.get(item_id)
+                if digest is None:
+                    continue  # an ID the batch did not ask about
+                self.stats["analyzed"] += 1
+                self._store(item_id, digest, result)
+                if self.cache:
+                    self.cache.set(self.template.key, item_id, digest, result)
+                results[item_id] = result
+        return results
+
+    def _store(self, item_id: str, digest: str, result: Dict[str, Any]) -> None:
+        self._hashes[item_id] = digest
+        self._results[item_id] = result
+
+    def forget(self, item_id: str) -> None:
+        """Drop an item, e.g. a closed market."""
+        self._hashes.pop(item_id, None)
+        self._results.pop(item_id, None)
@@ -0,0 +1,45 @@
+"""
+Versioned Prompt Templates
+
+A template turns a batch of items (markets, news articles) into one chat
+request and parses the answer back into per-item results. The version is
+part of every cache key, so changing a prompt must bump its version.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+_JSON_BLOCK = re.compile(r"\{.*\}", re.DOTALL)
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """A versioned prompt answering for several items at once."""
+    name: str
+    version: str
+    system: str
+    render_item: Callable[[Dict[str, Any]], str]  # item -> prompt section
+    content: Callable[[Dict[str, Any]], str]  # item -> text whose changes require re-analysis
+    instructions: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}:{self.version}"
+
+    def messages(self, items: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """Build the chat messages of a batch of items."""
+        sections = "\n\n".join(f"[{item['id']}]\n{self.render_item(item)}" for item in items)
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": f"{self.instructions}\n\n{sections}"},
+        ]
+
+    def parse(self, text: str) -> Dict[str, Dict[str, Any]]:
+        """Parse a ``{"results": [{"id": ..., ...}]}`` answer into results by item ID."""
+        match = _JSON_BLOCK.search(text)
+        if match is None:
+            raise ValueError("No JSON object in LLM response")
+        data = json.loads(match.group(0))
+        return {str(result.pop("id")): result for result in data.get("results", []) if "id" in result}
@@ -0,0 +1,43 @@
+"""
+Market analysis prompt: estimates the probability that a market resolves
+YES from its question, description and related news.
+"""
+
+from typing import Any, Dict
+
+from . import PromptTemplate
+
+
+def _render(market: Dict[str, Any]) -> str:
+    lines = [f"Question: {market.get('question', '')}"]
+    if market.get("description"):
+        lines.append(f"Resolution criteria: {market['description']}")
+    if market.get("price") is not None:
+        lines.append(f"Current YES price: {market['price']:.3f}")
+    for headline in market.get("news", []):
+        lines.append(f"News: {headline}")
+    return "\n".join(lines)
+
+
+def _content(market: Dict[str, Any]) -> str:
+    # The price moves every tick and is context only; it does not trigger re-analysis
+    return "\n".join([market.get("question", ""), market.get("description", ""), *market.get("news", [])])
+
+
+MARKET_ANALYSIS = PromptTemplate(
+    name="market_analysis",
+    version="1",
+    system=(
+        "You are a careful forecaster of prediction markets. You estimate "
+        "probabilities from the resolution criteria and the evidence given, "
+        "and you say when the evidence is thin."
+    ),
+    instructions=(
+        "For each market below, estimate the probability that it resolves YES. "
+        "Answer with a JSON object {\"results\": [{\"id\": <market id>, "
+        "\"probability\": <0..1>, \"confidence\": \"low\"|\"medium\"|\"high\", "
+        "\"summary\": <one sentence>}]} with one entry per market."
+    ),
+    render_item=_render,
+    content=_content,
+)
@@ -0,0 +1,40 @@
+"""
+News analysis prompt: rates how a news article bears on the markets it was
+matched with.
+"""
+
+from typing import Any, Dict
+
+from . import PromptTemplate
+
+
+def _render(article: Dict[str, Any]) -> str:
+    lines = [f"Title: {article.get('title', '')}"]
+    if article.get("summary"):
+        lines.append(f"Summary: {article['summary']}")
+    for market in article.get("markets", []):
+        lines.append(f"Market {market['id']}: {market.get('question', '')}")
+    return "\n".join(lines)
+
+
+def _content(article: Dict[str, Any]) -> str:
+    markets = sorted(market["id"] for market in article.get("markets", []))
+    return "\n".join([article.get("title", ""), article.get("summary", ""), *markets])
+
+
+NEWS_ANALYSIS = PromptTemplate(
+    name="news_analysis",
+    version="1",
+    system=(
+        "You are an analyst judging how news affects prediction markets. "
+        "You only rate an impact when the article is clearly relevant."
+    ),
+    instructions=(
+        "For each article below, rate its impact on each listed market. "
+        "Answer with a JSON object {\"results\": [{\"id\": <article id>, "
+        "\"impacts\": [{\"market\": <market id>, \"relevance\": <0..1>, "
+        "\"direction\": \"yes\"|\"no\"|\"neutral\"}]}]} with one entry per article."
+    ),
+    render_item=_render,
+    content=_content,
+)
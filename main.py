@@ -0,0 +1,101 @@
+"""
+All-in-one runtime.
+
+Runs ingest, market state (the API), analysis, decision and, when order
+credentials are configured, execution in a single event loop:
+1. Services talk over the in-process message bus (BUS_URL=memory://), so
+   market events are handed over by reference instead of being serialized
+   through Redis
+2. Market state updates from the API's MarketDataService are fed straight
+   into the strategy runtime
+3. Strategy order intents go straight to the execution service's account
+   router instead of being POSTed to the execution service
+4. Every service's HTTP routes are served by one server: the market API at
+   the root and the others under /ingest, /analysis, /decision, /execution
+
+Redis is still used for persistence (features, candles, ledger) but is no
+longer on the hot path.
+
+Usage:
+    python main.py            # or: make run-all
+"""
+
+import os
+
+# Must be set before the services create their bus and config objects
+os.environ.setdefault("BUS_URL", "memory://")
+os.environ.setdefault("INGEST_STORE_EVENTS", "false")
+
+import logging
+from typing import List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from api import main as api_main
+from services.analysis import main as analysis_main
+from services.decision import main as decision_main
+from services.execution import main as execution_main
+from services.execution.executor import OrderIntent
+from services.ingest import main as ingest_main
+
+logger = logging.getLogger(__name__)
+
+# Services started with the market API, in order; ALLINONE_SERVICES selects a subset
+SERVICES = os.getenv("ALLINONE_SERVICES", "ingest,analysis,execution,decision").split(",")
+
+app = api_main.app
+app.mount("/ingest", ingest_main.app)
+app.mount("/analysis", analysis_main.app)
+app.mount("/decision", decision_main.app)
+app.mount("/execution", execution_main.app)
+
+started: List = []
+
+
+async def submit_intent(intent: OrderIntent) -> None:
+    """Strategy sink sending order intents straight to the execution service."""
+    if execution_main.router is None:
+        logger.warning(f"Dropping order intent from {intent.strategy}: execution is not running")
+        return
+    report = await execution_main.router.submit(intent)
+    if not report.success:
+        logger.warning(f"Order intent from {intent.strategy} failed: {report.error}")
+
+
+@app.on_event("startup")
+async def start_services():
+    """Start every service in one loop (mounted apps get no startup events of their own)."""
+    if "ingest" in SERVICES:
+        await ingest_main.startup_event()
+        started.append(ingest_main)
+    if "analysis" in SERVICES:
+        await analysis_main.startup_event()
+        started.append(analysis_main)
+    if "execution" in SERVICES:
+        try:
+            await execution_main.startup_event()
+            started.append(execution_main)
+            decision_main.runtime.sink = submit_intent
+        except ValueError as e:
+            logger.warning(f"Execution disabled: {e}")
+    if "decision" in SERVICES:
+        await decision_main.startup_event()
+        started.append(decision_main)
+        if api_main.market_data_service is not None:
+            api_main.market_data_service.add_callback(decision_main.runtime.on_market_update)
+
+
+@app.on_event("shutdown")
+async def stop_services():
+    """Stop the services in reverse start order."""
+    while started:
+        await started.pop().shutdown_event()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", "8000")), log_config=None)
@@ -0,0 +1,100 @@
+"""
+Startup time benchmark.
+
+Measures how long a fresh interpreter takes to import each entry point of
+the bot, so slow or side-effecting imports are caught before they reach the
+services, CLI tools or the test suite:
+1. Every module is imported in a new ``python -c`` process, several times,
+   and the median and best wall-clock times are reported next to the time
+   of an empty interpreter
+2. ``--top`` lists the slowest imports of each module from ``-X importtime``
+3. ``--max`` makes the script exit non-zero if any median exceeds a budget
+
+Usage:
+    python scripts/startup_benchmark.py
+    python scripts/startup_benchmark.py api.main --runs 10 --top 5 --max 1.0
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MODULES = [
+    "shared.config.settings",
+    "services.execution",
+    "services.api.main",
+    "services.decision.main",
+    "services.analysis.main",
+    "services.ingest.main",
+    "api.main",
+    "main",
+]
+
+
+def run(code: str, *options: str) -> Tuple[float, str]:
+    """Run ``code`` in a fresh interpreter; returns (seconds, stderr)."""
+    env = dict(os.environ, PYTHONPATH=str(ROOT), BUS_URL=os.environ.get("BUS_URL", "memory://"))
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, *options, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{code!r} failed:\n{result.stderr.strip()}")
+    return elapsed, result.stderr
+
+
+def measure(code: str, runs: int) -> List[float]:
+    return [run(code)[0] for _ in range(runs)]
+
+
+def slowest_imports(module: str, top: int) -> List[Tuple[int, str]]:
+    """Get the ``top`` imports with the largest cumulative time (microseconds)."""
+    _, stderr = run(f"import {module}", "-X", "importtime")
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    # Nested imports are counted in their parents; keep the largest entries
+    return sorted(rows, reverse=True)[1:top + 1]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure import time of the bot's entry points")
+    parser.add_argument("modules", nargs="*", default=MODULES, help="Modules to import")
+    parser.add_argument("--runs", type=int, default=5, help="Imports per module")
+    parser.add_argument("--top", type=int, default=0, help="Show the N slowest imports of each module")
+    parser.add_argument("--max", type=float, default=None, help="Fail if a median exceeds this (seconds)")
+    args = parser.parse_args()
+
+    baseline = statistics.median(measure("pass", args.runs))
+    print(f"{'module':<28} {'median':>8} {'best':>8} {'over python':>12}")
+    print(f"{'(empty interpreter)':<28} {baseline:>7.3f}s")
+
+    over_budget = []
+    for module in args.modules:
+        times = measure(f"import {module}", args.runs)
+        median = statistics.median(times)
+        print(f"{module:<28} {median:>7.3f}s {min(times):>7.3f}s {median - baseline:>11.3f}s")
+        if args.max is not None and median > args.max:
+            over_budget.append(module)
+        for cumulative, name in slowest_imports(module, args.top) if args.top else []:
+            print(f"    {cumulative / 1e6:>7.3f}s {name}")
+
+    if over_budget:
+        print(f"Over the {args.max:.2f}s budget: {', '.join(over_budget)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,11 @@
+"""
+Market Analysis Package
+"""
+
+from .arbitrage import ArbitrageOpportunity, ArbitrageScanner
+from .candles import Candle, CandleBuilder, CandleStore
+from .engine import AnalyticsEngine
+
+__all__ = [
+    'AnalyticsEngine', 'ArbitrageOpportunity', 'ArbitrageScanner', 'Candle', 'CandleBuilder', 'CandleStore'
+]
@@ -0,0 +1,225 @@
+"""
+Arbitrage Scanner
+
+Finds pricing inconsistencies across the outcome tokens of a market and
+across the markets of a negative-risk event:
+1. Binary markets: buying YES and NO for less than 1 (or selling both for
+   more than 1, after minting a pair) locks in the difference
+2. Negative-risk events: exactly one outcome resolves YES, so buying the
+   YES token of every outcome for less than 1 (or selling all of them for
+   more than 1) does the same
+3. Only markets and events with a token whose top of book changed are
+   recomputed, using the dirty set of the book engine, so the scanner keeps
+   up with the full book stream
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from services.ingest.book import BookEngine
+from services.ingest.catalogue import market_condition_id, market_token_ids
+
+logger = logging.getLogger(__name__)
+
+# Opportunity kinds
+BINARY_BUY = "binary_buy"  # buy YES and NO
+BINARY_SELL = "binary_sell"  # mint a pair, sell YES and NO
+NEG_RISK_BUY = "neg_risk_buy"  # buy YES of every outcome
+NEG_RISK_SELL = "neg_risk_sell"  # sell YES of every outcome
+
+
+@dataclass
+class ArbitrageLeg:
+    """One order of an arbitrage."""
+    token_id: str
+    side: str  # BUY or SELL
+    price: float
+    size: float  # available at this price
+
+
+@dataclass
+class ArbitrageOpportunity:
+    """A set of orders locking in a profit if all are filled."""
+    kind: str
+    key: str  # condition_id, or neg_risk_market_id for events
+    legs: List[ArbitrageLeg]
+    edge: float  # profit per share set
+    size: float  # share sets available at the top of book
+    timestamp: float = field(default_factory=time.time)
+
+    @property
+    def profit(self) -> float:
+        return self.edge * self.size
+
+
+def _yes_token(market: Dict[str, Any]) -> Optional[str]:
+    """Get the YES token of a market."""
+    for token in market.get("tokens", []):
+        if str(token.get("outcome", "")).lower() == "yes":
+            return token.get("token_id")
+    token_ids = market_token_ids(market)
+    return token_ids[0] if token_ids else None
+
+
+class ArbitrageScanner:
+    """Incremental scanner over binary markets and negative-risk events."""
+
+    def __init__(self, books: BookEngine, min_edge: float = 0.005, min_size: float = 5.0):
+        """Initialize the scanner.
+
+        Args:
+            books: Book engine holding the books of all outcome tokens
+            min_edge: Smallest profit per share set worth reporting
+            min_size: Smallest number of share sets worth reporting
+        """
+        self.books = books
+        self.min_edge = min_edge
+        self.min_size = min_size
+
+        self._pairs: Dict[str, Tuple[str, str]] = {}  # condition_id -> (token, token)
+        self._groups: Dict[str, Dict[str, str]] = {}  # neg_risk_market_id -> {condition_id: yes token}
+        # token_id -> keys of the pairs and groups it belongs to
+        self._token_keys: Dict[str, Set[Tuple[str, str]]] = {}
+        self.active: Dict[Tuple[str, str], ArbitrageOpportunity] = {}  # (kind, key) -> opportunity
+        self._listeners: List[Callable[[ArbitrageOpportunity], Any]] = []
+
+    def add_listener(self, listener: Callable[[ArbitrageOpportunity], Any]) -> None:
+        """Call ``listener`` with every new or changed opportunity."""
+        self._listeners.append(listener)
+
+    def track(self, market: Dict[str, Any]) -> None:
+        """Register a raw CLOB market (its outcome tokens and neg-risk event)."""
+        condition_id = market_condition_id(market)
+        token_ids = market_token_ids(market)
+        if not condition_id or len(token_ids) != 2:
+            return
+
+        if condition_id not in self._pairs:
+            self._pairs[condition_id] = (token_ids[0], token_ids[1])
+            for token_id in token_ids:
+                self._token_keys.setdefault(token_id, set()).add(("pair", condition_id))
+
+        group_id = market.get("neg_risk_market_id")
+        yes_token = _yes_token(market)
+        if market.get("neg_risk") and group_id and yes_token:
+            group = self._groups.setdefault(group_id, {})
+            if condition_id not in group:
+                group[condition_id] = yes_token
+                self._token_keys.setdefault(yes_token, set()).add(("group", group_id))
+
+    def track_catalogue(self, catalogue: Any) -> None:
+        """Register every open market of a ``MarketCatalogue``.
+
+        Negative-risk events must be tracked from the full catalogue: buying
+        YES of only some outcomes is not an arbitrage.
+        """
+        for entry in catalogue.entries():
+            if entry.data.get("active", True) and not entry.data.get("closed", False):
+                self.track(entry.data)
+
+    def on_market_update(self, market_state: Any) -> List[ArbitrageOpportunity]:
+        """Track a ``MarketState`` and scan; usable as a market data callback."""
+        self.track(market_state.raw_data)
+        return self.scan()
+
+    def scan(self) -> List[ArbitrageOpportunity]:
+        """Recompute pairs and groups with a changed token.
+
+        Returns:
+            Opportunities that are new or changed since the last scan
+        """
+        keys: Set[Tuple[str, str]] = set()
+        for token_id in self.books.drain_dirty():
+            keys.update(self._token_keys.get(token_id, ()))
+
+        changed = []
+        for kind, key in keys:
+            if kind == "pair":
+                found = self._scan_pair(key)
+                kinds = (BINARY_BUY, BINARY_SELL)
+            else:
+                found = self._scan_group(key)
+                kinds = (NEG_RISK_BUY, NEG_RISK_SELL)
+
+            found_kinds = {opportunity.kind for opportunity in found}
+            for stale in kinds:
+                if stale not in found_kinds:
+                    self.active.pop((stale, key), None)
+
+            for opportunity in found:
+                previous = self.active.get((opportunity.kind, key))
+                self.active[(opportunity.kind, key)] = opportunity
+                if (
+                    previous is None
+                    or previous.edge != opportunity.edge
+                    or previous.size != opportunity.size
+                ):
+                    changed.append(opportunity)
+
+        for opportunity in changed:
+            for listener in self._listeners:
+                try:
+                    listener(opportunity)
+                except Exception as e:
+                    logger.error(f"Error in arbitrage listener: {e}")
+        return changed
+
+    def _opportunity(
+        self,
+        kind: str,
+        key: str,
+        side: str,
+        quotes: List[Tuple[str, float, float]]
+    ) -> Optional[ArbitrageOpportunity]:
+        """Build an opportunity from (token, price, size) quotes of one side."""
+        total = sum(price for _, price, _ in quotes)
+        edge = 1.0 - total if side == "BUY" else total - 1.0
+        size = min(size for _, _, size in quotes)
+        if edge < self.min_edge or size < self.min_size:
+            return None
+        legs = [ArbitrageLeg(token_id, side, price, quote_size) for token_id, price, quote_size in quotes]
+        return ArbitrageOpportunity(kind, key, legs, round(edge, 8), size)
+
+    def _quotes(self, token_ids: List[str]) -> Tuple[Optional[list], Optional[list]]:
+        """Get the best (token, price, size) asks and bids of tokens; a side is None if any book lacks it."""
+        asks = []
+        bids = []
+        for token_id in token_ids:
+            book = self.books.book(token_id)
+            if book is None:
+                return None, None
+            asks.append((token_id, book.best_ask, book.best_ask_size))
+            bids.append((token_id, book.best_bid, book.best_bid_size))
+        if any(price is None for _, price, _ in asks):
+            asks = None
+        if any(price is None for _, price, _ in bids):
+            bids = None
+        return asks, bids
+
+    def _scan(self, key: str, token_ids: List[str], buy_kind: str, sell_kind: str) -> List[ArbitrageOpportunity]:
+        asks, bids = self._quotes(token_ids)
+        found = []
+        if asks:
+            opportunity = self._opportunity(buy_kind, key, "BUY", asks)
+            if opportunity is not None:
+                found.append(opportunity)
+        if bids:
+            opportunity = self._opportunity(sell_kind, key, "SELL", bids)
+            if opportunity is not None:
+                found.append(opportunity)
+        return found
+
+    def _scan_pair(self, condition_id: str) -> List[ArbitrageOpportunity]:
+        return self._scan(condition_id, list(self._pairs[condition_id]), BINARY_BUY, BINARY_SELL)
+
+    def _scan_group(self, group_id: str) -> List[ArbitrageOpportunity]:
+        group = self._groups[group_id]
+        if len(group) < 2:
+            return []
+        return self._scan(group_id, list(group.values()), NEG_RISK_BUY, NEG_RISK_SELL)
+
+    def opportunities(self) -> List[ArbitrageOpportunity]:
+        """Get all currently open opportunities, most profitable first."""
+        return sorted(self.active.values(), key=lambda opportunity: opportunity.profit, reverse=True)
@@ -0,0 +1,268 @@
+"""
+OHLCV Candles
+
+Streaming candle aggregation at 1s, 1m, 5m, 1h and 1d resolutions:
+1. Trades (and volume-less price ticks) only update the current 1s bar
+2. When a bar closes it is stored and merged into the current bar of the
+   next resolution, so every higher resolution is derived from the one
+   below it instead of being recomputed from ticks
+3. Closed bars are kept in a bounded per-resolution store with range
+   queries; the in-progress bar of a resolution is the merge of the open
+   bars below it
+4. Late trades go into the bars of their own timestamp: the closed bars
+   of the resolutions whose period has ended, which are amended (or
+   inserted) and reported as closed again, and the open bar of the first
+   resolution whose period has not
+"""
+
+import bisect
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Resolution name -> bar length (seconds), from finest to coarsest
+RESOLUTIONS: Dict[str, int] = {"1s": 1, "1m": 60, "5m": 300, "1h": 3600, "1d": 86400}
+
+# Closed bars kept per market and resolution
+DEFAULT_RETENTION: Dict[str, int] = {"1s": 3600, "1m": 1440, "5m": 2016, "1h": 2160, "1d": 730}
+
+
+def candle_key(market: str, resolution: str) -> str:
+    """Redis sorted set of a market's closed bars of one resolution, scored by start."""
+    return f"candles:{market}:{resolution}"
+
+
+@dataclass
+class Candle:
+    """One OHLCV bar."""
+    start: int  # unix seconds
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float = 0.0
+    trades: int = 0
+
+    def add(self, price: float, size: float) -> None:
+        """Add a trade or price tick to the bar."""
+        if price > self.high:
+            self.high = price
+        if price < self.low:
+            self.low = price
+        self.close = price
+        if size:
+            self.volume += size
+            self.trades += 1
+
+    def add_late(self, price: float, size: float) -> None:
+        """Add a trade that happened before the bar's last one; open and close are kept."""
+        if price > self.high:
+            self.high = price
+        if price < self.low:
+            self.low = price
+        if size:
+            self.volume += size
+            self.trades += 1
+
+    def merge(self, other: "Candle") -> None:
+        """Merge a later bar of a lower resolution into this bar."""
+        if other.high > self.high:
+            self.high = other.high
+        if other.low < self.low:
+            self.low = other.low
+        self.close = other.close
+        self.volume += other.volume
+        self.trades += other.trades
+
+    def copy(self, start: Optional[int] = None) -> "Candle":
+        return Candle(
+            self.start if start is None else start,
+            self.open, self.high, self.low, self.close, self.volume, self.trades
+        )
+
+
+class CandleStore:
+    """Bounded in-memory series of closed bars with range queries."""
+
+    def __init__(self, retention: Optional[Dict[str, int]] = None):
+        self.retention = retention or DEFAULT_RETENTION
+        self._bars: Dict[Tuple[str, str], List[Candle]] = {}  # (market, resolution) -> bars
+        self._starts: Dict[Tuple[str, str], List[int]] = {}
+
+    def append(self, market: str, resolution: str, candle: Candle) -> None:
+        """Store a closed bar; bars of a series arrive in time order."""
+        key = (market, resolution)
+        bars = self._bars.setdefault(key, [])
+        starts = self._starts.setdefault(key, [])
+        bars.append(candle)
+        starts.append(candle.start)
+        # Trim in chunks so appends stay amortized O(1)
+        limit = self.retention.get(resolution, 1000)
+        if len(bars) > limit * 1.25:
+            del bars[:-limit]
+            del starts[:-limit]
+
+    def amend(self, market: str, resolution: str, start: int, price: float, size: float) -> Candle:
+        """Add a late trade to the closed bar starting at ``start``, inserting it if missing."""
+        key = (market, resolution)
+        bars = self._bars.setdefault(key, [])
+        starts = self._starts.setdefault(key, [])
+        index = bisect.bisect_left(starts, start)
+        if index < len(starts) and starts[index] == start:
+            candle = bars[index]
+            candle.add_late(price, size)
+        else:
+            candle = Candle(start, price, price, price, price)
+            candle.add(price, size)
+            bars.insert(index, candle)
+            starts.insert(index, start)
+        return candle
+
+    def range(
+        self,
+        market: str,
+        resolution: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[Candle]:
+        """Get closed bars starting in [start, end], the most recent ``limit`` of them."""
+        key = (market, resolution)
+        bars = self._bars.get(key, [])
+        starts = self._starts.get(key, [])
+        lo = bisect.bisect_left(starts, start) if start is not None else 0
+        hi = bisect.bisect_right(starts, end) if end is not None else len(bars)
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return bars[lo:hi]
+
+    def markets(self) -> List[str]:
+        return sorted({market for market, _ in self._bars})
+
+
+class CandleBuilder:
+    """Builds candles of all resolutions from a stream of trades."""
+
+    def __init__(self, store: Optional[CandleStore] = None):
+        self.store = store if store is not None else CandleStore()
+        self._levels: List[Tuple[str, int]] = list(RESOLUTIONS.items())
+        self._open: Dict[str, List[Optional[Candle]]] = {}  # market -> open bar per resolution
+        self.closed: List[Tuple[str, str, Candle]] = []  # bars closed since the last drain
+
+    def _close(self, market: str, level: int, bars: List[Optional[Candle]]) -> None:
+        """Close the open bar of a level and roll it into the level above."""
+        candle = bars[level]
+        bars[level] = None
+        resolution = self._levels[level][0]
+        self.store.append(market, resolution, candle)
+        self.closed.append((market, resolution, candle))
+
+        if level + 1 < len(self._levels):
+            seconds = self._levels[level + 1][1]
+            start = candle.start - candle.start % seconds
+            parent = bars[level + 1]
+            if parent is not None and parent.start != start:
+                self._close(market, level + 1, bars)
+                parent = None
+            if parent is None:
+                bars[level + 1] = candle.copy(start)
+            else:
+                parent.merge(candle)
+
+    def _roll(self, market: str, bars: List[Optional[Candle]], timestamp: int) -> None:
+        """Close every open bar whose period ended before ``timestamp``."""
+        for level, (_, seconds) in enumerate(self._levels):
+            candle = bars[level]
+            if candle is not None and timestamp >= candle.start + seconds:
+                self._close(market, level, bars)
+
+    def on_trade(self, market: str, price: float, size: float, timestamp: Optional[float] = None) -> None:
+        """Add a trade; ``size`` 0 records a price tick without volume."""
+        second = int(timestamp if timestamp is not None else time.time())
+        bars = self._open.get(market)
+        if bars is None:
+            bars = [None] * len(self._levels)
+            self._open[market] = bars
+        else:
+            current = bars[0]
+            if current is not None and second < current.start:
+                self._add_late(market, bars, price, size, second)
+                return
+            self._roll(market, bars, second)
+
+        current = bars[0]
+        if current is None:
+            bars[0] = Candle(second, price, price, price, price)
+            current = bars[0]
+        current.add(price, size)
+
+    def _add_late(self, market: str, bars: List[Optional[Candle]], price: float, size: float, second: int) -> None:
+        """Add a trade older than the open 1s bar to the bars of its own timestamp."""
+        current = bars[0].start
+        for level, (resolution, seconds) in enumerate(self._levels):
+            start = second - second % seconds
+            if start == current - current % seconds:
+                # Still open: the levels above receive it when this bar closes
+                candle = bars[level]
+                if candle is None:
+                    bars[level] = Candle(start, price, price, price, price)
+                    bars[level].add(price, size)
+                else:
+                    candle.add_late(price, size)
+                return
+            self.closed.append((market, resolution, self.store.amend(market, resolution, start, price, size)))
+
+    def flush(self, now: Optional[float] = None) -> None:
+        """Close bars of all markets whose period has ended, e.g. for quiet markets."""
+        second = int(now if now is not None else time.time())
+        for market, bars in self._open.items():
+            self._roll(market, bars, second)
+
+    def live(self, market: str, resolution: str) -> Optional[Candle]:
+        """Get the in-progress bar of a resolution, merging the open bars below it."""
+        bars = self._open.get(market)
+        if bars is None:
+            return None
+        level = next(i for i, (name, _) in enumerate(self._levels) if name == resolution)
+        seconds = self._levels[level][1]
+
+        result: Optional[Candle] = None
+        for lower in range(level, -1, -1):
+            candle = bars[lower]
+            if candle is None:
+                continue
+            if result is None:
+                result = candle.copy(candle.start - candle.start % seconds)
+            elif candle.start - candle.start % seconds == result.start:
+                result.merge(candle)
+        return result
+
+    def candles(
+        self,
+        market: str,
+        resolution: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[Candle]:
+        """Get bars starting in [start, end], including the in-progress bar."""
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution {resolution}")
+        bars = list(self.store.range(market, resolution, start, end, limit))
+        live = self.live(market, resolution)
+        if live is not None and (start is None or live.start >= start) and (end is None or live.start <= end):
+            if bars and bars[-1].start == live.start:
+                bars[-1] = live
+            else:
+                bars.append(live)
+            if limit is not None and len(bars) > limit:
+                bars = bars[-limit:]
+        return bars
+
+    def drain_closed(self) -> List[Tuple[str, str, Candle]]:
+        """Take the (market, resolution, candle) bars closed since the last call."""
+        closed, self.closed = self.closed, []
+        return closed
@@ -0,0 +1,272 @@
+"""
+Market Analytics Engine
+
+Rolling per-market features held in NumPy ring buffers:
+1. Every market owns one row of a set of 2-D arrays; trades and book
+   updates are written in place at the row's ring head, so updates are O(1)
+2. ``compute`` derives the features of all markets in one vectorized pass:
+   - VWAP of the trade window
+   - Realized volatility of mid-price log returns
+   - Order-flow imbalance (Cont, Kukanov and Stoikov) summed over the window
+   - Volume z-score of the current interval against the previous ones
+3. Book depth slopes are computed when a book changes, since they only
+   depend on the latest book
+4. The last computed features are kept, so readers never recompute
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from services.ingest.book import ASK, BID, BookEngine, OrderBook
+
+logger = logging.getLogger(__name__)
+
+FEATURES = (
+    "last_price",
+    "mid",
+    "vwap",
+    "volatility",
+    "ofi",
+    "volume",
+    "volume_z",
+    "bid_slope",
+    "ask_slope",
+)
+
+
+def depth_slope(levels: List[tuple], mid: float) -> float:
+    """Slope of cumulative depth against distance from the mid (fit through the origin).
+
+    Steep slopes mean liquidity close to the mid; flat slopes a thin book.
+    """
+    cumulative = 0.0
+    sxy = 0.0
+    sxx = 0.0
+    for price, size in levels:
+        cumulative += size
+        distance = abs(price - mid)
+        sxy += distance * cumulative
+        sxx += distance * distance
+    return sxy / sxx if sxx > 0 else float("nan")
+
+
+class AnalyticsEngine:
+    """Incrementally updated, batch computed market features."""
+
+    _ARRAYS = (
+        "_trade_price", "_trade_size", "_trade_head", "_trade_count",
+        "_mid", "_ofi", "_book_head", "_book_count", "_volume",
+        "_last_price", "_bid_slope", "_ask_slope", "_top",
+    )
+
+    def __init__(
+        self,
+        window: int = 512,
+        max_markets: int = 256,
+        depth_levels: int = 10,
+        bucket_seconds: float = 60.0,
+        volume_buckets: int = 60,
+        books: Optional[BookEngine] = None
+    ):
+        """Initialize the engine.
+
+        Args:
+            window: Trades and book updates kept per market
+            max_markets: Initial number of market rows; grows as needed
+            depth_levels: Book levels used for depth slopes
+            bucket_seconds: Length of a volume interval (seconds)
+            volume_buckets: Volume intervals kept for z-scores
+            books: Book engine looked up by ``on_market_update``
+        """
+        self.window = window
+        self.depth_levels = depth_levels
+        self.bucket_seconds = bucket_seconds
+        self.volume_buckets = volume_buckets
+        self.books = books
+
+        self._rows: Dict[str, int] = {}  # condition_id -> row
+        self._allocate(max_markets)
+        self._bucket: Optional[int] = None  # current volume interval, set by the first trade
+
+        self.features: Dict[str, np.ndarray] = {name: self._nan() for name in FEATURES}
+        self.computed_at = 0.0
+
+    def _nan(self) -> np.ndarray:
+        return np.full(self._capacity, np.nan)
+
+    def _allocate(self, rows: int) -> None:
+        self._capacity = rows
+        window = self.window
+        self._trade_price = np.zeros((rows, window))
+        self._trade_size = np.zeros((rows, window))
+        self._trade_head = np.zeros(rows, dtype=np.int64)
+        self._trade_count = np.zeros(rows, dtype=np.int64)
+        self._mid = np.zeros((rows, window))
+        self._ofi = np.zeros((rows, window))
+        self._book_head = np.zeros(rows, dtype=np.int64)
+        self._book_count = np.zeros(rows, dtype=np.int64)
+        self._volume = np.zeros((rows, self.volume_buckets))
+        self._last_price = np.full(rows, np.nan)
+        self._bid_slope = np.full(rows, np.nan)
+        self._ask_slope = np.full(rows, np.nan)
+        # Previous top of book (bid, bid size, ask, ask size) for order-flow imbalance
+        self._top = np.full((rows, 4), np.nan)
+
+    def _grow(self) -> None:
+        rows = self._capacity
+        arrays = {name: getattr(self, name) for name in self._ARRAYS}
+        self._allocate(rows * 2)
+        for name, values in arrays.items():
+            getattr(self, name)[:rows] = values
+        self.features = {name: np.concatenate([values, np.full(rows, np.nan)]) for name, values in self.features.items()}
+
+    def _row(self, market: str) -> int:
+        row = self._rows.get(market)
+        if row is None:
+            row = len(self._rows)
+            if row >= self._capacity:
+                self._grow()
+            self._rows[market] = row
+        return row
+
+    def _advance(self, timestamp: float) -> int:
+        """Move the current volume interval forward, clearing reused buckets."""
+        bucket = int(timestamp // self.bucket_seconds)
+        if self._bucket is None:
+            self._bucket = bucket
+        steps = bucket - self._bucket
+        if steps > 0:
+            cleared = [(self._bucket + step) % self.volume_buckets for step in range(1, min(steps, self.volume_buckets) + 1)]
+            self._volume[:, cleared] = 0.0
+            self._bucket = bucket
+        return bucket
+
+    def on_trade(self, market: str, price: float, size: float, timestamp: Optional[float] = None) -> None:
+        """Record a trade."""
+        row = self._row(market)
+        head = self._trade_head[row]
+        self._trade_price[row, head] = price
+        self._trade_size[row, head] = size
+        self._trade_head[row] = (head + 1) % self.window
+        if self._trade_count[row] < self.window:
+            self._trade_count[row] += 1
+        self._last_price[row] = price
+
+        bucket = self._advance(timestamp if timestamp is not None else time.time())
+        if self._bucket - bucket < self.volume_buckets:
+            self._volume[row, bucket % self.volume_buckets] += size
+
+    def on_book(self, market: str, book: OrderBook) -> None:
+        """Record a book update of the market's quoted token."""
+        bid, bid_size, ask, ask_size = book.top()
+        if bid is None or ask is None:
+            return
+        row = self._row(market)
+        mid = (bid + ask) / 2
+
+        # Order-flow imbalance of the top of book change
+        prev_bid, prev_bid_size, prev_ask, prev_ask_size = self._top[row]
+        if np.isnan(prev_bid):
+            ofi = 0.0
+        else:
+            ofi = (
+                (bid_size if bid >= prev_bid else 0.0)
+                - (prev_bid_size if bid <= prev_bid else 0.0)
+                - (ask_size if ask <= prev_ask else 0.0)
+                + (prev_ask_size if ask >= prev_ask else 0.0)
+            )
+        self._top[row] = (bid, bid_size, ask, ask_size)
+
+        head = self._book_head[row]
+        self._mid[row, head] = mid
+        self._ofi[row, head] = ofi
+        self._book_head[row] = (head + 1) % self.window
+        if self._book_count[row] < self.window:
+            self._book_count[row] += 1
+
+        self._bid_slope[row] = depth_slope(book.levels(BID, self.depth_levels), mid)
+        self._ask_slope[row] = depth_slope(book.levels(ASK, self.depth_levels), mid)
+
+    def on_market_update(self, market_state: Any) -> None:
+        """Record the book of a ``MarketState``; usable as a market data callback."""
+        if self.books is None or not market_state.token_ids:
+            return
+        book = self.books.book(market_state.token_ids[0])
+        if book is not None:
+            self.on_book(market_state.condition_id, book)
+
+    def compute(self, now: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Recompute the features of all markets in one vectorized pass."""
+        self._advance(now if now is not None else time.time())
+        rows = len(self._rows)
+        window = self.window
+        positions = np.arange(window)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # VWAP: rows fill from position 0, so the first ``count`` slots are valid
+            trade_valid = positions < self._trade_count[:rows, None]
+            sizes = np.where(trade_valid, self._trade_size[:rows], 0.0)
+            volume = sizes.sum(axis=1)
+            vwap = np.where(volume > 0, (sizes * self._trade_price[:rows]).sum(axis=1) / volume, np.nan)
+
+            # Realized volatility needs the mids in chronological order
+            counts = self._book_count[:rows, None]
+            order = (self._book_head[:rows, None] - counts + positions) % window
+            mids = np.take_along_axis(self._mid[:rows], order, axis=1)
+            log_mids = np.log(np.where(positions < counts, mids, np.nan))
+            returns = np.diff(log_mids, axis=1)
+            has_returns = np.isfinite(returns).any(axis=1)
+            volatility = np.where(has_returns, np.sqrt(np.nansum(returns ** 2, axis=1)), np.nan)
+
+            book_valid = positions < counts
+            ofi = np.where(book_valid, self._ofi[:rows], 0.0).sum(axis=1)
+
+            # Volume of the current interval against the previous intervals
+            current = self._bucket % self.volume_buckets
+            buckets = self._volume[:rows]
+            history = np.delete(buckets, current, axis=1)
+            spread = history.std(axis=1)
+            volume_z = np.where(spread > 0, (buckets[:, current] - history.mean(axis=1)) / spread, np.nan)
+            midpoints = np.where(self._book_count[:rows] > 0, (self._top[:rows, 0] + self._top[:rows, 2]) / 2, np.nan)
+
+        computed = {
+            "last_price": self._last_price[:rows],
+            "mid": midpoints,
+            "vwap": vwap,
+            "volatility": volatility,
+            "ofi": ofi,
+            "volume": buckets[:, current],
+            "volume_z": volume_z,
+            "bid_slope": self._bid_slope[:rows],
+            "ask_slope": self._ask_slope[:rows],
+        }
+        features = {name: self._nan() for name in FEATURES}
+        for name, values in computed.items():
+            features[name][:rows] = values
+        self.features = features
+        self.computed_at = time.time()
+        return features
+
+    def get(self, market: str) -> Optional[Dict[str, Optional[float]]]:
+        """Get the last computed features of a market (None for undefined values)."""
+        row = self._rows.get(market)
+        if row is None:
+            return None
+        result: Dict[str, Optional[float]] = {}
+        for name in FEATURES:
+            value = float(self.features[name][row])
+            result[name] = value if np.isfinite(value) else None
+        return result
+
+    def all(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Get the last computed features of every market."""
+        return {market: self.get(market) for market in self._rows}
+
+    def __contains__(self, market: str) -> bool:
+        return market in self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
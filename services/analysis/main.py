@@ -0,0 +1,215 @@
+import asyncio
+import json
+import os
+from collections import deque
+from dataclasses import asdict
+from typing import Any, Deque, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException
+from loguru import logger
+
+from llm import NEWS_ANALYSIS, ChatClient, LLMPipeline, ResponseCache
+from shared.interfaces import Message, create_bus, topic
+from services.ingest.book import BookEngine
+from services.ingest.config import get_config
+from services.ingest.storage import EventStorage
+from .candles import RESOLUTIONS, CandleBuilder, candle_key
+from .engine import AnalyticsEngine
+
+app = FastAPI(title="Polybot Analysis Service")
+
+# Intervalo de recálculo de features (segundos)
+COMPUTE_INTERVAL = float(os.getenv("ANALYSIS_COMPUTE_INTERVAL", "1.0"))
+FEATURES_KEY = "analysis:features"
+# Noticias recientes guardadas por mercado
+NEWS_PER_MARKET = int(os.getenv("ANALYSIS_NEWS_PER_MARKET", "20"))
+NEWS_ANALYSIS_INTERVAL = float(os.getenv("ANALYSIS_NEWS_INTERVAL", "30"))
+
+# Instancias globales
+event_storage = EventStorage(get_config())
+bus = create_bus(group="analysis")
+books = BookEngine()
+engine = AnalyticsEngine(books=books)
+candles = CandleBuilder()
+market_news: Dict[str, Deque[Dict[str, Any]]] = {}
+pending_news: Dict[str, Dict[str, Any]] = {}  # noticias pendientes de análisis LLM
+news_pipeline: Optional[LLMPipeline] = None  # se crea al arrancar si hay OPENAI_API_KEY
+tasks: list = []
+
+
+def event_time(event: Dict[str, Any]) -> Optional[float]:
+    """Marca de tiempo del evento en segundos (acepta milisegundos)."""
+    timestamp = event.get("timestamp")
+    if timestamp is None:
+        return None
+    timestamp = float(timestamp)
+    return timestamp / 1000 if timestamp > 1e11 else timestamp
+
+
+def handle_market_event(event: Dict[str, Any]) -> None:
+    """Actualiza los buffers del motor con un evento de mercado."""
+    market = event.get("market")
+    if not market:
+        return
+    event_type = event.get("type")
+    if event_type == "trades":
+        price, size = float(event["price"]), float(event["size"])
+        timestamp = event_time(event)
+        engine.on_trade(market, price, size, timestamp)
+        candles.on_trade(market, price, size, timestamp)
+    elif event_type == "l2_book":
+        token_id = event.get("asset_id") or market
+        engine.on_book(market, books.apply_snapshot(token_id, event, market))
+    elif event_type == "price_change":
+        # La conflación entrega un evento por asset con sus cambios de nivel acumulados
+        books.handle(event)
+        book = books.book(event.get("asset_id") or market)
+        if book is not None:
+            engine.on_book(market, book)
+
+
+def handle_news_event(market: str, item: Dict[str, Any]) -> None:
+    """Guarda una noticia vinculada en el historial de su mercado."""
+    news = market_news.get(market)
+    if news is None:
+        news = market_news[market] = deque(maxlen=NEWS_PER_MARKET)
+    news.appendleft(item)
+    if news_pipeline is not None:
+        pending_news[item["id"]] = item
+
+
+def on_bus_message(message: Message) -> None:
+    """Despacha los mensajes del bus de mercados y noticias."""
+    if message.kind == "news":
+        handle_news_event(message.market, message.payload)
+    else:
+        handle_market_event(message.payload)
+
+
+async def news_analysis_loop() -> None:
+    """Analiza con el LLM las noticias nuevas en lotes."""
+    while True:
+        await asyncio.sleep(NEWS_ANALYSIS_INTERVAL)
+        if not pending_news:
+            continue
+        batch: List[Dict[str, Any]] = list(pending_news.values())
+        pending_news.clear()
+        try:
+            results = await news_pipeline.analyze(batch)
+            for article_id, result in results.items():
+                await event_storage.store_event(f"analysis:news:{article_id}", result, ttl=86400)
+        except Exception as e:
+            logger.error(f"Failed to analyze news: {e}")
+
+
+async def save_candles() -> None:
+    """Guarda las velas cerradas en series temporales de Redis (sorted sets por inicio).
+
+    Una vela corregida por una operación tardía sustituye a la guardada con su inicio.
+    """
+    closed = candles.drain_closed()
+    if not closed:
+        return
+    pipe = event_storage.redis.pipeline()
+    for market, resolution, candle in closed:
+        key = candle_key(market, resolution)
+        pipe.zremrangebyscore(key, candle.start, candle.start)
+        pipe.zadd(key, {json.dumps(asdict(candle)): candle.start})
+        pipe.zremrangebyrank(key, 0, -candles.store.retention[resolution] - 1)
+    await pipe.execute()
+
+
+async def compute_loop() -> None:
+    """Recalcula las features de todos los mercados y las publica en Redis."""
+    while True:
+        await asyncio.sleep(COMPUTE_INTERVAL)
+        engine.compute()
+        candles.flush()
+        try:
+            await event_storage.store_event(FEATURES_KEY, engine.all())
+            await save_candles()
+        except Exception as e:
+            logger.error(f"Failed to store analytics: {e}")
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Inicia la escucha de eventos y el cálculo periódico."""
+    global news_pipeline
+    try:
+        if os.getenv("OPENAI_API_KEY"):
+            news_pipeline = LLMPipeline(
+                ChatClient(),
+                NEWS_ANALYSIS,
+                ResponseCache(os.getenv("LLM_CACHE_PATH", "./data/llm_cache"), ttl=7 * 86400)
+            )
+        await event_storage.connect()
+        await bus.start()
+        await bus.subscribe([topic("conflated"), topic("news")], on_bus_message)
+        tasks.append(asyncio.create_task(compute_loop()))
+        if news_pipeline is not None:
+            tasks.append(asyncio.create_task(news_analysis_loop()))
+    except Exception as e:
+        logger.error(f"Failed to start service: {e}")
+        raise
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Detiene las tareas y cierra las conexiones."""
+    try:
+        for task in tasks:
+            task.cancel()
+        if news_pipeline is not None:
+            await news_pipeline.client.close()
+        await bus.close()
+        await event_storage.close()
+    except Exception as e:
+        logger.error(f"Error during shutdown: {e}")
+
+
+@app.get("/health")
+async def health_check():
+    """Endpoint de healthcheck."""
+    return {"status": "healthy", "markets": len(engine), "computed_at": engine.computed_at}
+
+
+@app.get("/features")
+async def get_all_features():
+    """Devuelve las últimas features calculadas de todos los mercados."""
+    return engine.all()
+
+
+@app.get("/features/{market_id}")
+async def get_features(market_id: str):
+    """Devuelve las últimas features calculadas de un mercado."""
+    features: Optional[Dict[str, Any]] = engine.get(market_id)
+    if features is None:
+        raise HTTPException(status_code=404, detail="Market not found")
+    return features
+
+
+@app.get("/candles/{market_id}")
+async def get_candles(
+    market_id: str,
+    resolution: str = "1m",
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    limit: int = 500
+):
+    """Devuelve velas precalculadas de un mercado en [start, end]."""
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"Resolution must be one of {list(RESOLUTIONS)}")
+    return [asdict(candle) for candle in candles.candles(market_id, resolution, start, end, limit)]
+
+
+
+@app.get("/news/{market_id}")
+async def get_market_news(market_id: str, limit: int = NEWS_PER_MARKET):
+    """Devuelve las noticias recientes vinculadas a un mercado."""
+    return list(market_news.get(market_id, ()))[:limit]
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8002)
@@ -0,0 +1,267 @@
+"""
+API Read Cache
+
+Process-local read-through cache over the Redis keys served by the API:
+1. Reads are cached decoded, per key, for a short TTL; concurrent misses on
+   the same key share one Redis round trip
+2. Entries are dropped early when Redis keyspace notifications report the
+   key changed (if the server has them enabled); otherwise the TTL bounds
+   staleness
+3. Active markets live in the ``markets:active`` hash (id -> JSON). Every
+   change increments ``markets:active:version`` and records the market in
+   the ``markets:active:changes`` sorted set scored by that version, so the
+   cache and clients only fetch what changed since a version they hold.
+   Removed markets stay in the sorted set as tombstones
+4. Event lists are newest first and capped on write, and reads are bounded
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_KEY = "markets:active"
+VERSION_KEY = "markets:active:version"
+CHANGES_KEY = "markets:active:changes"
+
+# Applies a market change and records it under a new version atomically.
+# KEYS: active hash, version counter, changes set; ARGV: market id, JSON ("" removes)
+_CHANGE_SCRIPT = """
+local version = redis.call('INCR', KEYS[2])
+if ARGV[2] == '' then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+else
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+end
+redis.call('ZADD', KEYS[3], version, ARGV[1])
+return version
+"""
+
+
+def market_key(market_id: str) -> str:
+    return f"market:{market_id}"
+
+
+def events_key(market_id: str) -> str:
+    return f"market:{market_id}:events"
+
+
+def _decode(value: Optional[bytes]) -> Any:
+    return json.loads(value) if value is not None else None
+
+
+class ReadThroughCache:
+    """Decoded values per key (and variant, e.g. a read limit) with a TTL."""
+
+    def __init__(self, ttl: float = 1.0, max_keys: int = 10000):
+        """Initialize the cache.
+
+        Args:
+            ttl: Seconds a value is served without asking Redis
+            max_keys: Keys kept before the oldest are evicted
+        """
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._entries: Dict[str, Dict[Hashable, Tuple[float, Any]]] = {}
+        self._loading: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    async def get(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[Any]],
+        variant: Hashable = None,
+        now: Optional[float] = None,
+    ) -> Any:
+        """Get a cached value, calling ``load`` on a miss or after the TTL."""
+        now = time.monotonic() if now is None else now
+        entry = self._entries.get(key, {}).get(variant)
+        if entry is not None and entry[0] > now:
+            self.stats["hits"] += 1
+            return entry[1]
+        self.stats["misses"] += 1
+
+        loading = self._loading.get((key, variant))
+        if loading is not None:
+            return await asyncio.shield(loading)
+        future = asyncio.get_running_loop().create_future()
+        self._loading[(key, variant)] = future
+        try:
+            value = await load()
+            self.set(key, value, variant, now)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # retrieved here so waiters are optional
+            raise
+        finally:
+            del self._loading[(key, variant)]
+
+    def set(self, key: str, value: Any, variant: Hashable = None, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        variants = self._entries.pop(key, None) or {}
+        variants[variant] = (now + self.ttl, value)
+        self._entries[key] = variants  # re-inserted last, so dict order is age order
+        while len(self._entries) > self.max_keys:
+            del self._entries[next(iter(self._entries))]
+
+    def invalidate(self, key: str) -> None:
+        if self._entries.pop(key, None) is not None:
+            self.stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class MarketStore:
+    """Cached reads and versioned writes of the API's Redis keys."""
+
+    def __init__(self, client: redis.Redis, ttl: float = 1.0, max_events: int = 1000):
+        """Initialize the store.
+
+        Args:
+            client: Redis client
+            ttl: Seconds reads are served from the process-local cache
+            max_events: Length event lists are capped at, and the read limit
+        """
+        self.redis = client
+        self.cache = ReadThroughCache(ttl)
+        self.max_events = max_events
+        self._change = client.register_script(_CHANGE_SCRIPT)
+        # Active markets: market id -> (version of its last change, data or None for removed)
+        self._version = 0
+        self._markets: Dict[str, Tuple[int, Optional[Dict[str, Any]]]] = {}
+        self._active: Optional[List[Dict[str, Any]]] = None  # built once per version
+        self._markets_expire = 0.0
+        self._markets_lock = asyncio.Lock()
+
+    # Writes
+
+    async def put_market(self, market_id: str, market: Dict[str, Any]) -> int:
+        """Add or update an active market; returns the new version."""
+        return int(await self._change(keys=[ACTIVE_KEY, VERSION_KEY, CHANGES_KEY], args=[market_id, json.dumps(market)]))
+
+    async def remove_market(self, market_id: str) -> int:
+        """Remove an active market; returns the new version."""
+        return int(await self._change(keys=[ACTIVE_KEY, VERSION_KEY, CHANGES_KEY], args=[market_id, ""]))
+
+    async def push_event(self, market_id: str, event: Dict[str, Any]) -> None:
+        """Prepend an event to a market's list, keeping the newest ``max_events``."""
+        key = events_key(market_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.lpush(key, json.dumps(event))
+            pipe.ltrim(key, 0, self.max_events - 1)
+            await pipe.execute()
+
+    # Reads
+
+    async def active_markets(self, since: Optional[int] = None) -> Dict[str, Any]:
+        """Get the active markets, or only the changes after version ``since``."""
+        await self._refresh_markets()
+        if since is None:
+            if self._active is None:
+                self._active = [data for _, data in self._markets.values() if data is not None]
+            return {"version": self._version, "markets": self._active}
+        changed, removed = [], []
+        for market_id, (version, data) in self._markets.items():
+            if version > since:
+                if data is None:
+                    removed.append(market_id)
+                else:
+                    changed.append(data)
+        return {"version": self._version, "markets": changed, "removed": removed}
+
+    async def _refresh_markets(self) -> None:
+        if self._markets_expire > time.monotonic():
+            self.cache.stats["hits"] += 1
+            return
+        async with self._markets_lock:
+            if self._markets_expire > time.monotonic():
+                self.cache.stats["hits"] += 1
+                return
+            self.cache.stats["misses"] += 1
+            version = int(await self.redis.get(VERSION_KEY) or 0)
+            if version < self._version or not self._version:
+                await self._load_markets()
+            elif version > self._version:
+                await self._load_changes()
+            self._markets_expire = time.monotonic() + self.cache.ttl
+
+    async def _load_markets(self) -> None:
+        """Load every active market and the version of its last change."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.get(VERSION_KEY)
+            pipe.hgetall(ACTIVE_KEY)
+            pipe.zrange(CHANGES_KEY, 0, -1, withscores=True)
+            version, active, changes = await pipe.execute()
+        self._version = int(version or 0)
+        self._markets = {}
+        self._active = None
+        for member, score in changes:
+            market_id = member.decode()
+            self._markets[market_id] = (int(score), _decode(active.get(member)))
+
+    async def _load_changes(self) -> None:
+        """Fetch only the markets changed after the cached version."""
+        changes = await self.redis.zrangebyscore(CHANGES_KEY, f"({self._version}", "+inf", withscores=True)
+        if not changes:
+            return
+        values = await self.redis.hmget(ACTIVE_KEY, [member for member, _ in changes])
+        for (member, score), value in zip(changes, values):
+            self._markets[member.decode()] = (int(score), _decode(value))
+        self._version = max(self._version, int(changes[-1][1]))
+        self._active = None
+
+    async def market(self, market_id: str) -> Optional[Dict[str, Any]]:
+        return await self.get_json(market_key(market_id))
+
+    async def events(self, market_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get a market's newest events, at most ``limit`` (capped at ``max_events``)."""
+        limit = max(1, min(limit, self.max_events))
+        key = events_key(market_id)
+
+        async def load() -> List[Dict[str, Any]]:
+            return [json.loads(event) for event in await self.redis.lrange(key, 0, limit - 1)]
+
+        return await self.cache.get(key, load, variant=limit)
+
+    async def get_json(self, key: str) -> Any:
+        """Get any JSON value through the cache."""
+        return await self.cache.get(key, lambda: self._get_json(key))
+
+    async def _get_json(self, key: str) -> Any:
+        return _decode(await self.redis.get(key))
+
+    # Invalidation
+
+    async def listen(self) -> None:
+        """Drop cache entries as keyspace notifications report their keys changed.
+
+        Requires ``notify-keyspace-events`` to include ``K`` and the command
+        classes in use (e.g. ``K$lgh``); without it entries expire by TTL.
+        """
+        pubsub = self.redis.pubsub()
+        await pubsub.psubscribe("__keyspace@*__:market:*", "__keyspace@*__:markets:*", "__keyspace@*__:stats")
+        try:
+            async for message in pubsub.listen():
+                if message["type"] != "pmessage":
+                    continue
+                key = message["channel"].decode().split(":", 1)[1]
+                if key.startswith("markets:"):
+                    self._markets_expire = 0.0
+                else:
+                    self.cache.invalidate(key)
+        finally:
+            await pubsub.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"keys": len(self.cache), "version": self._version, "markets": len(self._markets), **self.cache.stats}
@@ -1,10 +1,11 @@
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import asyncio
 import redis.asyncio as redis
 from loguru import logger
-from ingest.config import IngestConfig
-import json
+import os
+from .cache import MarketStore
 
 app = FastAPI(title="Polybot API")
 
@@ -23,31 +24,70 @@ app.add_middleware(
 )
 
 # Configuración
-config = IngestConfig()
-redis_client = redis.from_url(config.REDIS_URL)
+redis_client = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"))
+# Caché local de lecturas: TTL corto, invalidada por versión y notificaciones de Redis
+market_store = MarketStore(
+    redis_client,
+    ttl=float(os.getenv("API_CACHE_TTL", "1.0")),
+    max_events=int(os.getenv("API_MAX_EVENTS", "1000")),
+)
+invalidation_task: Optional[asyncio.Task] = None
 
 async def get_redis():
     """Dependency para obtener el cliente Redis."""
     return redis_client
 
+async def get_store():
+    """Dependency para obtener el almacén de mercados con caché."""
+    return market_store
+
+@app.on_event("startup")
+async def startup_event():
+    """Escucha las notificaciones de Redis para invalidar la caché."""
+    global invalidation_task
+    invalidation_task = asyncio.create_task(listen_invalidations())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Detiene la invalidación y cierra Redis."""
+    if invalidation_task is not None:
+        invalidation_task.cancel()
+    await redis_client.aclose()
+
+async def listen_invalidations():
+    """Invalida la caché con las notificaciones de Redis, reintentando si se cae la conexión."""
+    while True:
+        try:
+            await market_store.listen()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Cache invalidation listener failed, relying on TTL: {e}")
+            await asyncio.sleep(5)
+
 @app.get("/api/markets")
-async def get_markets(redis: redis.Redis = Depends(get_redis)):
-    """Obtiene la lista de mercados activos."""
+async def get_markets(since: Optional[int] = None, store: MarketStore = Depends(get_store)):
+    """Obtiene la lista de mercados activos.
+    
+    Con ``?since=<version>`` solo devuelve los mercados cambiados y eliminados
+    desde esa versión.
+    """
     try:
-        markets = await redis.smembers("markets:active")
-        return {"markets": [json.loads(market) for market in markets]}
+        return await store.active_markets(since)
     except Exception as e:
         logger.error(f"Failed to get markets: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/markets/{market_id}")
-async def get_market_details(market_id: str, redis: redis.Redis = Depends(get_redis)):
+async def get_market_details(market_id: str, store: MarketStore = Depends(get_store)):
     """Obtiene detalles de un mercado específico."""
     try:
-        market = await redis.get(f"market:{market_id}")
+        market = await store.market(market_id)
         if not market:
             raise HTTPException(status_code=404, detail="Market not found")
-        return json.loads(market)
+        return market
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to get market details: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -55,21 +95,21 @@ async def get_market_details(market_id: str, redis: redis.Redis = Depends(get_re
 @app.get("/api/markets/{market_id}/events")
 async def get_market_events(
     market_id: str,
-    redis: redis.Redis = Depends(get_redis)
+    limit: int = 100,
+    store: MarketStore = Depends(get_store)
 ):
-    """Obtiene eventos recientes de un mercado."""
+    """Obtiene los eventos más recientes de un mercado (como máximo ``limit``)."""
     try:
-        events = await redis.lrange(f"market:{market_id}:events", 0, -1)
-        return {"events": [json.loads(event) for event in events]}
+        return {"events": await store.events(market_id, limit)}
     except Exception as e:
         logger.error(f"Failed to get market events: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/stats")
-async def get_stats(redis: redis.Redis = Depends(get_redis)):
+async def get_stats(store: MarketStore = Depends(get_store)):
     """Obtiene estadísticas generales del bot."""
     try:
-        stats = await redis.get("stats")
+        stats = await store.get_json("stats")
         if not stats:
             return {
                 "totalMarkets": 0,
@@ -77,11 +117,16 @@ async def get_stats(redis: redis.Redis = Depends(get_redis)):
                 "totalVolume": 0,
                 "totalTrades": 0
             }
-        return json.loads(stats)
+        return stats
     except Exception as e:
         logger.error(f"Failed to get stats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/cache/stats")
+async def get_cache_stats(store: MarketStore = Depends(get_store)):
+    """Obtiene los aciertos y fallos de la caché de lecturas."""
+    return store.stats()
+
 @app.get("/api/health")
 async def health_check(redis: redis.Redis = Depends(get_redis)):
     """Verifica la salud del sistema."""
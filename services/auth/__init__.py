@@ -2,10 +2,15 @@
 Polymarket Authentication Module
 
 This module handles all authentication-related functionality for interacting with
-Polymarket's API, including API key generation and management.
+Polymarket's API, including API key generation and management, and the
+process-wide pool of authenticated clients.
 """
 
 from .poly_auth import PolyAuth, PolyAuthConfig
+from .pool import ClientPool, CredentialCache, PooledAccount, get_pool
 from .exceptions import PolyAuthError
 
-__all__ = ['PolyAuth', 'PolyAuthConfig', 'PolyAuthError'] 
\ No newline at end of file
+__all__ = [
+    'PolyAuth', 'PolyAuthConfig', 'PolyAuthError',
+    'ClientPool', 'CredentialCache', 'PooledAccount', 'get_pool'
+]
\ No newline at end of file
@@ -2,14 +2,16 @@
 Polymarket Authentication Manager
 
 This module provides a class for managing Polymarket API authentication,
-including generating and managing API keys.
+including generating and managing API keys. Clients and credentials come
+from the process-wide client pool, so they are derived once per wallet and
+shared with the rest of the process.
 """
 
 import os
 import logging
 from dataclasses import dataclass
-from typing import Optional, Dict, Tuple
-from py_clob_client.client import ClobClient
+from typing import TYPE_CHECKING, Optional, Dict, Tuple
+from .pool import ClientPool, PooledAccount, get_pool
 from .exceptions import (
     PolyAuthError,
     PolyAuthConfigError,
@@ -17,8 +19,9 @@ from .exceptions import (
     PolyAuthConnectionError
 )
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+if TYPE_CHECKING:
+    from py_clob_client.client import ClobClient
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -68,62 +71,48 @@ class PolyAuthConfig:
 class PolyAuth:
     """Manager for Polymarket authentication and API keys."""
     
-    def __init__(self, config: PolyAuthConfig):
-        """Initialize the auth manager with configuration."""
+    def __init__(self, config: PolyAuthConfig, pool: Optional[ClientPool] = None):
+        """Initialize the auth manager with configuration and the client pool to use."""
         self.config = config
         self.config.validate()
-        self._client: Optional[ClobClient] = None
-        
+        self.pool = pool or get_pool()
+        self._account: Optional[PooledAccount] = None
+
     @property
-    def client(self) -> ClobClient:
-        """Get or create the CLOB client."""
-        if not self._client:
-            try:
-                kwargs = {
-                    "host": self.config.host,
-                    "key": self.config.private_key,
-                    "chain_id": self.config.chain_id,
-                }
-                
-                if self.config.signature_type > 0:
-                    kwargs.update({
-                        "signature_type": self.config.signature_type,
-                        "funder": self.config.proxy_address
-                    })
-                
-                logger.info(f"Initializing CLOB client with address: {kwargs.get('key')}")
-                self._client = ClobClient(**kwargs)
-                logger.info(f"CLOB client initialized successfully")
-            except Exception as e:
-                raise PolyAuthConnectionError(f"Failed to create CLOB client: {str(e)}")
+    def account(self) -> PooledAccount:
+        """Get the pooled account, deriving (or loading cached) API credentials on first use."""
+        if not self._account:
+            self._account = self.pool.get(
+                self.config.private_key,
+                host=self.config.host,
+                chain_id=self.config.chain_id,
+                signature_type=self.config.signature_type,
+                funder=self.config.proxy_address
+            )
+        return self._account
         
-        return self._client
+    @property
+    def client(self) -> "ClobClient":
+        """Get the shared CLOB client of this wallet."""
+        try:
+            return self.account.clob_client()
+        except PolyAuthError:
+            raise
+        except Exception as e:
+            raise PolyAuthConnectionError(f"Failed to create CLOB client: {str(e)}")
 
     def generate_api_key(self, nonce: int = 0) -> Dict[str, str]:
-        """Generate new API credentials or derive existing ones."""
+        """Get the API credentials of the wallet, derived once and then cached."""
         try:
-            logger.info(f"Getting address from client...")
-            address = self.client.get_address()
-            logger.info(f"Using address: {address}")
-            
-            logger.info(f"Attempting to generate API credentials...")
-            creds = self.client.create_or_derive_api_creds()
-            logger.info("API credentials received")
-            
-            # Extract credentials from the response
-            api_key = getattr(creds, 'api_key', None) or creds.get('api_key')
-            secret = getattr(creds, 'api_secret', None) or creds.get('api_secret')
-            passphrase = getattr(creds, 'api_passphrase', None) or creds.get('api_passphrase')
-            
-            if not all([api_key, secret, passphrase]):
-                raise PolyAuthKeyGenerationError("Incomplete credentials received from API")
-            
-            logger.info("Successfully generated API credentials")
+            creds = self.account.creds
+            logger.info(f"Using API credentials of {self.account.address}")
             return {
-                "POLY_API_KEY": api_key,
-                "POLY_API_SECRET": secret,
-                "POLY_PASSPHRASE": passphrase
+                "POLY_API_KEY": creds.api_key,
+                "POLY_API_SECRET": creds.api_secret,
+                "POLY_PASSPHRASE": creds.api_passphrase
             }
+        except PolyAuthKeyGenerationError:
+            raise
         except Exception as e:
             logger.error(f"Failed to generate API key: {str(e)}")
             raise PolyAuthKeyGenerationError(f"Failed to generate API key: {str(e)}")
@@ -197,7 +186,7 @@ class PolyAuth:
     def get_address(self) -> str:
         """Get the address associated with this authentication."""
         try:
-            return self.client.get_address()
+            return self.account.address
         except Exception as e:
             raise PolyAuthError(f"Failed to get address: {str(e)}")
 
@@ -0,0 +1,396 @@
+"""
+Client Pool
+
+Process-wide pool of authenticated CLOB clients, shared by every component
+that reads private endpoints or trades:
+1. Accounts are keyed by (host, address, signature type); asking twice for
+   the same wallet returns the same credentials and clients
+2. API credentials are derived from the wallet once and cached on disk,
+   encrypted with AES-GCM under a key derived from the wallet's private
+   key, so restarts and the other services of a deploy that share the cache
+   directory reuse them instead of calling the L1 endpoints again
+3. One ``httpx.AsyncClient`` per host is shared by the async clients of all
+   accounts, so connections and TLS sessions are reused across wallets
+4. Any number of wallets can be held at once for multi-account trading;
+   credentials of different wallets are derived concurrently, those of the
+   same wallet only once
+
+The cache needs the ``cryptography`` package; without it credentials are
+derived on every start and never written to disk in the clear.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from services.clob.client import AsyncClobClient, new_http_client
+
+from .exceptions import PolyAuthConfigError, PolyAuthKeyGenerationError
+
+if TYPE_CHECKING:
+    from py_clob_client.client import ClobClient
+    from py_clob_client.clob_types import ApiCreds
+
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+except ImportError:  # pragma: no cover - optional dependency
+    AESGCM = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "https://clob.polymarket.com"
+DEFAULT_CACHE_DIR = "./data/credentials"
+
+AccountKey = Tuple[str, str, int]  # (host, address, signature type)
+
+_FORMAT = b"\x01"
+_NONCE_SIZE = 12
+_KDF_INFO = b"polybot api credential cache v1"
+
+
+def normalize_key(private_key: str) -> str:
+    """Return the private key as lowercase hex with a 0x prefix."""
+    private_key = private_key.strip().lower()
+    if not private_key.startswith("0x"):
+        private_key = "0x" + private_key
+    if len(private_key) != 66:
+        raise PolyAuthConfigError("Invalid private key length")
+    try:
+        int(private_key[2:], 16)
+    except ValueError:
+        raise PolyAuthConfigError("Invalid private key format - must be hexadecimal")
+    return private_key
+
+
+def wallet_address(private_key: str) -> str:
+    """Checksummed address of a private key."""
+    from eth_keys import keys
+
+    return keys.PrivateKey(bytes.fromhex(private_key[2:])).public_key.to_checksum_address()
+
+
+def derive_api_creds(
+    host: str,
+    private_key: str,
+    chain_id: int,
+    signature_type: int,
+    funder: Optional[str]
+) -> "ApiCreds":
+    """Create or derive the API credentials of a wallet through the L1 endpoints."""
+    from py_clob_client.client import ClobClient
+
+    client = ClobClient(host, key=private_key, chain_id=chain_id, signature_type=signature_type, funder=funder)
+    return client.create_or_derive_api_creds()
+
+
+def _api_creds(api_key: str, api_secret: str, api_passphrase: str) -> "ApiCreds":
+    from py_clob_client.clob_types import ApiCreds
+
+    return ApiCreds(api_key=api_key, api_secret=api_secret, api_passphrase=api_passphrase)
+
+
+class CredentialCache:
+    """Encrypted on-disk cache of API credentials, one file per account.
+
+    Files are ``version || nonce || AES-GCM ciphertext``; the key is derived
+    from the wallet's private key with HKDF-SHA256 and the account key is
+    bound as associated data, so a file only decrypts for its own account.
+    """
+
+    def __init__(self, directory: Any):
+        """Initialize the cache.
+
+        Args:
+            directory: Directory of the credential files, created on first write
+        """
+        self.directory = Path(directory)
+        if AESGCM is None:
+            logger.warning("cryptography is not installed, API credentials will not be cached")
+
+    @property
+    def enabled(self) -> bool:
+        return AESGCM is not None
+
+    def path(self, key: AccountKey) -> Path:
+        return self.directory / f"{hashlib.sha256(_associated_data(key)).hexdigest()[:32]}.cred"
+
+    def load(self, key: AccountKey, private_key: str) -> Optional[Dict[str, str]]:
+        """Get the cached credentials of an account, or None if missing or unreadable."""
+        if not self.enabled:
+            return None
+        try:
+            data = self.path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+        if data[:1] != _FORMAT:
+            logger.warning(f"Ignoring credential cache file in unknown format: {self.path(key)}")
+            return None
+        nonce = data[1:1 + _NONCE_SIZE]
+        try:
+            plaintext = AESGCM(_cache_key(private_key)).decrypt(nonce, data[1 + _NONCE_SIZE:], _associated_data(key))
+            return json.loads(plaintext)
+        except (InvalidTag, ValueError) as e:
+            logger.warning(f"Ignoring unreadable credential cache file {self.path(key)}: {e!r}")
+            return None
+
+    def store(self, key: AccountKey, private_key: str, creds: Dict[str, str]) -> None:
+        """Encrypt and write the credentials of an account, replacing the file atomically."""
+        if not self.enabled:
+            return
+        nonce = os.urandom(_NONCE_SIZE)
+        ciphertext = AESGCM(_cache_key(private_key)).encrypt(
+            nonce, json.dumps(creds).encode("utf-8"), _associated_data(key)
+        )
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(_FORMAT + nonce + ciphertext)
+        os.replace(tmp, path)
+
+    def remove(self, key: AccountKey) -> None:
+        self.path(key).unlink(missing_ok=True)
+
+
+def _associated_data(key: AccountKey) -> bytes:
+    host, address, signature_type = key
+    return f"{host}|{address.lower()}|{signature_type}".encode("utf-8")
+
+
+def _cache_key(private_key: str) -> bytes:
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=_KDF_INFO).derive(
+        bytes.fromhex(private_key[2:])
+    )
+
+
+class PooledAccount:
+    """One wallet of the pool: its address, API credentials and clients."""
+
+    def __init__(
+        self,
+        pool: "ClientPool",
+        key: AccountKey,
+        private_key: str,
+        creds: "ApiCreds",
+        chain_id: int,
+        funder: Optional[str]
+    ):
+        self.pool = pool
+        self.key = key
+        self.private_key = private_key
+        self.creds = creds
+        self.chain_id = chain_id
+        self.funder = funder
+        self._clob_client: Optional["ClobClient"] = None
+        self._async_client: Optional[AsyncClobClient] = None
+
+    @property
+    def host(self) -> str:
+        return self.key[0]
+
+    @property
+    def address(self) -> str:
+        return self.key[1]
+
+    @property
+    def signature_type(self) -> int:
+        return self.key[2]
+
+    def clob_client(self) -> "ClobClient":
+        """Get the account's ``py_clob_client.ClobClient``, with its credentials set."""
+        if self._clob_client is None:
+            from py_clob_client.client import ClobClient
+
+            self._clob_client = ClobClient(
+                self.host,
+                key=self.private_key,
+                chain_id=self.chain_id,
+                creds=self.creds,
+                signature_type=self.signature_type,
+                funder=self.funder
+            )
+        return self._clob_client
+
+    def async_client(self) -> AsyncClobClient:
+        """Get the account's ``AsyncClobClient``, on the pool's connections to its host."""
+        if self._async_client is None:
+            self._async_client = AsyncClobClient(
+                host=self.host,
+                chain_id=self.chain_id,
+                creds=self.creds,
+                address=self.address,
+                http_client=self.pool.http_client(self.host)
+            )
+        return self._async_client
+
+    def set_creds(self, creds: "ApiCreds") -> None:
+        """Replace the account's credentials; its clients are rebuilt on next use."""
+        if creds == self.creds:
+            return
+        self.creds = creds
+        self._clob_client = None
+        self._async_client = None
+        logger.info(f"Replaced the API credentials of account {self.address}")
+
+
+class ClientPool:
+    """Authenticated clients shared across the process, one account per wallet."""
+
+    def __init__(
+        self,
+        cache: Optional[CredentialCache] = None,
+        derive: Callable[..., "ApiCreds"] = derive_api_creds,
+        timeout: float = 10.0,
+        max_connections: int = 20
+    ):
+        """Initialize the pool.
+
+        Args:
+            cache: Encrypted credential cache; credentials are derived on every
+                start if None
+            derive: Function deriving the credentials of a wallet, called as
+                ``derive(host, private_key, chain_id, signature_type, funder)``
+            timeout: Request timeout of the shared HTTP clients (seconds)
+            max_connections: Connection pool size of each shared HTTP client
+        """
+        self.cache = cache
+        self.derive = derive
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._accounts: Dict[AccountKey, PooledAccount] = {}
+        self._locks: Dict[AccountKey, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._http: Dict[str, httpx.AsyncClient] = {}
+        self.stats = {"hits": 0, "cache_loads": 0, "derivations": 0}
+
+    def get(
+        self,
+        private_key: str,
+        host: str = DEFAULT_HOST,
+        chain_id: int = 137,
+        signature_type: int = 0,
+        funder: Optional[str] = None,
+        creds: Optional["ApiCreds"] = None
+    ) -> PooledAccount:
+        """Get the account of a wallet, loading or deriving its credentials on first use.
+
+        Blocks while credentials are derived; use ``account`` from async code.
+
+        Args:
+            private_key: Hex private key of the wallet
+            host: CLOB REST host
+            chain_id: Chain ID (137 for Polygon mainnet)
+            signature_type: 0 for EOA, 1 for Magic Link proxy, 2 for Gnosis Safe
+            funder: Proxy address holding the funds (signature types 1 and 2)
+            creds: Known API credentials, used instead of the cache or derivation;
+                they replace those of an account already in the pool
+
+        Returns:
+            The pooled account
+
+        Raises:
+            PolyAuthConfigError: If the private key is invalid
+            PolyAuthKeyGenerationError: If the credentials cannot be derived
+        """
+        private_key = normalize_key(private_key)
+        key = (host.rstrip("/"), wallet_address(private_key), signature_type)
+        with self._lock:
+            account = self._accounts.get(key)
+            if account is not None:
+                self.stats["hits"] += 1
+                if creds is not None:
+                    account.set_creds(creds)
+                return account
+            lock = self._locks.setdefault(key, threading.Lock())
+
+        # Only one thread derives a given wallet; other wallets proceed in parallel
+        with lock:
+            account = self._accounts.get(key)
+            if account is not None:
+                if creds is not None:
+                    account.set_creds(creds)
+                return account
+            if creds is None:
+                creds = self._load_or_derive(key, private_key, chain_id, funder)
+            account = PooledAccount(self, key, private_key, creds, chain_id, funder)
+            with self._lock:
+                self._accounts[key] = account
+            logger.info(f"Added account {key[1]} on {key[0]} to the client pool")
+            return account
+
+    async def account(self, private_key: str, **kwargs: Any) -> PooledAccount:
+        """Async ``get``; credentials are loaded or derived in a worker thread."""
+        return await asyncio.to_thread(self.get, private_key, **kwargs)
+
+    def _load_or_derive(self, key: AccountKey, private_key: str, chain_id: int, funder: Optional[str]) -> "ApiCreds":
+        host, address, signature_type = key
+        cached = self.cache.load(key, private_key) if self.cache is not None else None
+        if cached is not None:
+            self.stats["cache_loads"] += 1
+            return _api_creds(**cached)
+
+        logger.info(f"Deriving API credentials for {address}")
+        try:
+            creds = self.derive(host, private_key, chain_id, signature_type, funder)
+        except Exception as e:
+            raise PolyAuthKeyGenerationError(f"Failed to derive API credentials for {address}: {e}")
+        if not all([creds.api_key, creds.api_secret, creds.api_passphrase]):
+            raise PolyAuthKeyGenerationError("Incomplete credentials received from API")
+        self.stats["derivations"] += 1
+        if self.cache is not None:
+            try:
+                self.cache.store(key, private_key, {
+                    "api_key": creds.api_key,
+                    "api_secret": creds.api_secret,
+                    "api_passphrase": creds.api_passphrase,
+                })
+            except OSError as e:
+                logger.warning(f"Failed to cache API credentials for {address}: {e}")
+        return creds
+
+    def forget(self, key: AccountKey) -> None:
+        """Drop an account and its cached credentials, e.g. after they were revoked."""
+        with self._lock:
+            self._accounts.pop(key, None)
+        if self.cache is not None:
+            self.cache.remove(key)
+
+    def http_client(self, host: str) -> httpx.AsyncClient:
+        """Get the HTTP client shared by all accounts on a host."""
+        with self._lock:
+            client = self._http.get(host)
+            if client is None:
+                client = self._http[host] = new_http_client(self.timeout, self.max_connections)
+            return client
+
+    @property
+    def accounts(self) -> Dict[AccountKey, PooledAccount]:
+        return dict(self._accounts)
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP clients; accounts and credentials are kept."""
+        with self._lock:
+            clients, self._http = list(self._http.values()), {}
+        for account in self._accounts.values():
+            account._async_client = None
+        for client in clients:
+            await client.aclose()
+
+
+@lru_cache(maxsize=None)
+def get_pool() -> ClientPool:
+    """Get the process-wide pool; ``POLY_CREDENTIAL_CACHE`` sets the cache directory ("" disables it)."""
+    directory = os.getenv("POLY_CREDENTIAL_CACHE", DEFAULT_CACHE_DIR)
+    return ClientPool(CredentialCache(directory) if directory else None)
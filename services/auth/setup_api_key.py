@@ -7,6 +7,7 @@ Usage:
 """
 
 import argparse
+import logging
 import os
 import sys
 from typing import Optional
@@ -58,6 +59,7 @@ def main(args: Optional[list] = None) -> int:
     """Main entry point for the script."""
     parser = setup_argparse()
     args = parser.parse_args(args)
+    logging.basicConfig(level=logging.INFO)
     
     try:
         # Create config
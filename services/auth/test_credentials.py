@@ -6,10 +6,11 @@ Test script to verify Polymarket API credentials and fetch basic market data.
 import os
 import logging
 from dotenv import load_dotenv
-from py_clob_client.client import ClobClient
 from py_clob_client.clob_types import ApiCreds
 from py_clob_client.exceptions import PolyApiException
 
+from services.auth.pool import get_pool
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -33,28 +34,23 @@ def test_credentials():
         logger.info(f"POLY_PASSPHRASE: {'*' * len(passphrase) if passphrase else 'None'}")
         logger.info(f"POLY_PRIVATE_KEY: {'*' * len(private_key) if private_key else 'None'}")
         
-        if not all([api_key, api_secret, passphrase, private_key]):
+        if not private_key:
             raise ValueError("Missing required environment variables")
             
-        # Add 0x prefix to private key if missing
-        if not private_key.startswith("0x"):
-            private_key = "0x" + private_key
-        
-        # Initialize API credentials
-        creds = ApiCreds(
-            api_key=api_key,
-            api_secret=api_secret,
-            api_passphrase=passphrase
-        )
+        # Without API credentials in the environment the pool loads or derives them
+        creds = None
+        if all([api_key, api_secret, passphrase]):
+            creds = ApiCreds(
+                api_key=api_key,
+                api_secret=api_secret,
+                api_passphrase=passphrase
+            )
         
-        # Initialize CLOB client
+        # Get the CLOB client of the account from the shared client pool
         logger.info("Initializing CLOB client...")
-        client = ClobClient(
-            host="https://clob.polymarket.com",
-            key=private_key,
-            chain_id=137,
-            creds=creds
-        )
+        account = get_pool().get(private_key, host="https://clob.polymarket.com", chain_id=137, creds=creds)
+        client = account.clob_client()
+        api_key = account.creds.api_key
         
         # Test 1: Get wallet address
         address = client.get_address()
@@ -0,0 +1,10 @@
+"""
+Polymarket CLOB Client Layer
+
+Request scheduling and transport for the Polymarket CLOB REST API.
+"""
+
+from .client import AsyncClobClient, L2Signer
+from .scheduler import Priority, RateLimit, RequestScheduler
+
+__all__ = ['AsyncClobClient', 'L2Signer', 'Priority', 'RateLimit', 'RequestScheduler']
@@ -0,0 +1,406 @@
+"""
+Async CLOB Client
+
+Native asyncio client for the Polymarket CLOB REST endpoints used by the
+bot (markets, order books, prices and orders). It mirrors the method names
+and return values of ``py_clob_client.ClobClient`` so the two are
+interchangeable behind the RequestScheduler, but runs on a single pooled
+``httpx.AsyncClient`` with HTTP keep-alive and HTTP/2 (when ``h2`` is
+installed) instead of blocking the event loop.
+"""
+
+import base64
+import hashlib
+import hmac
+import importlib.util
+import json
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+if TYPE_CHECKING:
+    from py_clob_client.clob_types import ApiCreds
+
+logger = logging.getLogger(__name__)
+
+# Endpoints and header names of the CLOB API, as in py_clob_client (which is
+# only imported when needed since importing it pulls in the whole web3 stack)
+TIME = "/time"
+GET_MARKETS = "/markets"
+GET_MARKET = "/markets/"
+GET_ORDER_BOOK = "/book"
+GET_ORDER_BOOKS = "/books"
+GET_PRICES = "/prices"
+PRICE = "/price"
+MID_POINT = "/midpoint"
+MID_POINTS = "/midpoints"
+GET_LAST_TRADE_PRICE = "/last-trade-price"
+GET_TICK_SIZE = "/tick-size"
+GET_NEG_RISK = "/neg-risk"
+GET_FEE_RATE = "/fee-rate"
+ORDERS = "/data/orders"
+GET_ORDER = "/data/order/"
+TRADES = "/data/trades"
+POST_ORDER = "/order"
+POST_ORDERS = "/orders"
+CANCEL = "/order"
+CANCEL_ORDERS = "/orders"
+CANCEL_ALL = "/cancel-all"
+
+POLY_ADDRESS = "POLY_ADDRESS"
+POLY_API_KEY = "POLY_API_KEY"
+POLY_PASSPHRASE = "POLY_PASSPHRASE"
+POLY_SIGNATURE = "POLY_SIGNATURE"
+POLY_TIMESTAMP = "POLY_TIMESTAMP"
+
+START_CURSOR = "MA=="
+END_CURSOR = "LTE="
+
+_BASE_HEADERS = {
+    "User-Agent": "polymarketbot",
+    "Accept": "*/*",
+    "Connection": "keep-alive",
+    "Content-Type": "application/json",
+}
+
+
+def api_error(*args: Any, **kwargs: Any) -> Exception:
+    """Build the ``PolyApiException`` raised by ``py_clob_client``, importing it on first use."""
+    from py_clob_client.exceptions import PolyApiException
+
+    return PolyApiException(*args, **kwargs)
+
+
+def new_http_client(timeout: float = 10.0, max_connections: int = 20) -> httpx.AsyncClient:
+    """Create a pooled keep-alive ``httpx.AsyncClient`` for the CLOB API."""
+    return httpx.AsyncClient(
+        http2=importlib.util.find_spec("h2") is not None,
+        timeout=timeout,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=60.0
+        ),
+        headers=_BASE_HEADERS
+    )
+
+
+def dumps(body: Any) -> str:
+    """Serialize a request body exactly as the CLOB expects it to be signed."""
+    return json.dumps(body, separators=(",", ":"), ensure_ascii=False)
+
+
+class L2Signer:
+    """Level 2 (API key) header signer with per-path caching.
+
+    Mirrors ``create_level_2_headers``: the decoded secret, static headers and
+    the encoded ``method + path`` prefix are computed once per request path,
+    and headers of body-less requests are reused within the same second
+    since their signature only changes with the timestamp.
+    """
+
+    def __init__(self, address: str, creds: "ApiCreds"):
+        """Initialize the signer.
+
+        Args:
+            address: Wallet address the API key belongs to
+            creds: API key credentials
+        """
+        self.address = address
+        self.creds = creds
+        self._secret = base64.urlsafe_b64decode(creds.api_secret)
+        self._static = {
+            POLY_ADDRESS: address,
+            POLY_API_KEY: creds.api_key,
+            POLY_PASSPHRASE: creds.api_passphrase,
+        }
+        self._prefixes: Dict[Tuple[str, str], bytes] = {}
+        self._cached: Dict[Tuple[str, str], Tuple[int, Dict[str, str]]] = {}
+
+    def headers(self, method: str, path: str, body: Optional[str] = None) -> Dict[str, str]:
+        """Build the L2 headers for a request.
+
+        Args:
+            method: HTTP method
+            path: Request path without query string
+            body: Serialized request body, if any
+
+        Returns:
+            Header dict including the HMAC signature
+        """
+        key = (method, path)
+        timestamp = int(time.time())
+
+        if body is None:
+            cached = self._cached.get(key)
+            if cached is not None and cached[0] == timestamp:
+                return cached[1]
+
+        prefix = self._prefixes.get(key)
+        if prefix is None:
+            prefix = f"{method}{path}".encode("utf-8")
+            self._prefixes[key] = prefix
+
+        message = str(timestamp).encode("utf-8") + prefix
+        if body:
+            # Same quote normalization as py_clob_client's build_hmac_signature
+            message += body.replace("'", '"').encode("utf-8")
+        digest = hmac.new(self._secret, message, hashlib.sha256).digest()
+
+        headers = dict(self._static)
+        headers[POLY_SIGNATURE] = base64.urlsafe_b64encode(digest).decode("utf-8")
+        headers[POLY_TIMESTAMP] = str(timestamp)
+
+        if body is None:
+            self._cached[key] = (timestamp, headers)
+        return headers
+
+
+class AsyncClobClient:
+    """Asyncio client for the Polymarket CLOB REST API."""
+
+    def __init__(
+        self,
+        host: str = "https://clob.polymarket.com",
+        chain_id: int = 137,
+        key: Optional[str] = None,
+        creds: Optional["ApiCreds"] = None,
+        address: Optional[str] = None,
+        timeout: float = 10.0,
+        max_connections: int = 20,
+        http_client: Optional[httpx.AsyncClient] = None
+    ):
+        """Initialize the client.
+
+        Args:
+            host: CLOB REST host
+            chain_id: Chain ID (137 for Polygon mainnet)
+            key: Private key, used to derive the address for L2 headers
+            creds: API credentials; required for order endpoints
+            address: Wallet address; derived from ``key`` if None
+            timeout: Request timeout (seconds)
+            max_connections: Size of the connection pool
+            http_client: Shared ``httpx.AsyncClient`` to reuse instead of
+                creating one
+        """
+        self.host = host.rstrip("/")
+        self.chain_id = chain_id
+        self.key = key
+        self.creds = creds
+
+        if address is None and key is not None:
+            from py_clob_client.signer import Signer
+            address = Signer(key, chain_id).address()
+        self.address = address
+
+        self._l2 = L2Signer(address, creds) if creds is not None and address else None
+        self._owns_http = http_client is None
+        self._http = http_client or new_http_client(timeout, max_connections)
+
+    async def aclose(self) -> None:
+        """Close the underlying connection pool if owned by this client."""
+        if self._owns_http:
+            await self._http.aclose()
+
+    async def __aenter__(self) -> "AsyncClobClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    def get_address(self) -> Optional[str]:
+        """Get the wallet address used for authenticated requests."""
+        return self.address
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        body: Any = None,
+        auth: bool = False
+    ) -> Any:
+        content = dumps(body) if body is not None else None
+
+        headers = None
+        if auth:
+            if self._l2 is None:
+                raise api_error(error_msg="API credentials are required for this endpoint")
+            headers = self._l2.headers(method, path, content)
+
+        try:
+            resp = await self._http.request(
+                method,
+                self.host + path,
+                params=params,
+                content=content.encode("utf-8") if content is not None else None,
+                headers=headers
+            )
+        except httpx.RequestError as e:
+            raise api_error(error_msg=f"Request exception: {e}")
+
+        if resp.status_code != 200:
+            raise api_error(resp)
+
+        try:
+            return resp.json()
+        except ValueError:
+            return resp.text
+
+    # Public endpoints
+
+    async def get_ok(self) -> Any:
+        """Health check of the CLOB server."""
+        return await self._request("GET", "/")
+
+    async def get_server_time(self) -> Any:
+        """Get the current server timestamp."""
+        return await self._request("GET", TIME)
+
+    async def get_markets(self, next_cursor: str = START_CURSOR) -> Dict[str, Any]:
+        """Get a page of markets."""
+        return await self._request("GET", GET_MARKETS, params={"next_cursor": next_cursor})
+
+    async def get_market(self, condition_id: str) -> Dict[str, Any]:
+        """Get a single market by condition ID."""
+        return await self._request("GET", GET_MARKET + condition_id)
+
+    async def get_order_book(self, token_id: str) -> Dict[str, Any]:
+        """Get the order book of a token."""
+        return await self._request("GET", GET_ORDER_BOOK, params={"token_id": token_id})
+
+    async def get_order_books(self, token_ids: Sequence[str]) -> List[Dict[str, Any]]:
+        """Get the order books of several tokens in one request."""
+        return await self._request(
+            "POST", GET_ORDER_BOOKS, body=[{"token_id": token_id} for token_id in token_ids]
+        )
+
+    async def get_price(self, token_id: str, side: str) -> Dict[str, Any]:
+        """Get the best price of a token on one side."""
+        return await self._request("GET", PRICE, params={"token_id": token_id, "side": side})
+
+    async def get_prices(self, params: Sequence[Tuple[str, str]]) -> Dict[str, Any]:
+        """Get best prices for several (token_id, side) pairs in one request."""
+        return await self._request(
+            "POST", GET_PRICES, body=[{"token_id": token_id, "side": side} for token_id, side in params]
+        )
+
+    async def get_midpoint(self, token_id: str) -> Dict[str, Any]:
+        """Get the midpoint price of a token."""
+        return await self._request("GET", MID_POINT, params={"token_id": token_id})
+
+    async def get_midpoints(self, token_ids: Sequence[str]) -> Dict[str, Any]:
+        """Get midpoint prices of several tokens in one request."""
+        return await self._request(
+            "POST", MID_POINTS, body=[{"token_id": token_id} for token_id in token_ids]
+        )
+
+    async def get_last_trade_price(self, token_id: str) -> Dict[str, Any]:
+        """Get the last traded price of a token."""
+        return await self._request("GET", GET_LAST_TRADE_PRICE, params={"token_id": token_id})
+
+    async def get_tick_size(self, token_id: str) -> str:
+        """Get the minimum tick size of a token, e.g. "0.01"."""
+        result = await self._request("GET", GET_TICK_SIZE, params={"token_id": token_id})
+        return str(result["minimum_tick_size"])
+
+    async def get_neg_risk(self, token_id: str) -> bool:
+        """Check whether a token trades on the neg-risk exchange."""
+        result = await self._request("GET", GET_NEG_RISK, params={"token_id": token_id})
+        return result["neg_risk"]
+
+    async def get_fee_rate_bps(self, token_id: str) -> int:
+        """Get the base fee rate of a token in basis points."""
+        result = await self._request("GET", GET_FEE_RATE, params={"token_id": token_id})
+        return int(result.get("base_fee") or 0)
+
+    # Authenticated (L2) endpoints
+
+    async def get_orders(
+        self,
+        market: Optional[str] = None,
+        asset_id: Optional[str] = None,
+        next_cursor: str = START_CURSOR
+    ) -> List[Dict[str, Any]]:
+        """Get all open orders of the API key, following pagination."""
+        results: List[Dict[str, Any]] = []
+        params = {k: v for k, v in (("market", market), ("asset_id", asset_id)) if v}
+        while next_cursor != END_CURSOR:
+            response = await self._request(
+                "GET", ORDERS, params={**params, "next_cursor": next_cursor}, auth=True
+            )
+            results.extend(response["data"])
+            next_cursor = response["next_cursor"]
+        return results
+
+    async def get_order(self, order_id: str) -> Dict[str, Any]:
+        """Get a single order by ID."""
+        return await self._request("GET", GET_ORDER + order_id, auth=True)
+
+    async def get_trades(
+        self,
+        market: Optional[str] = None,
+        after: Optional[int] = None,
+        next_cursor: str = START_CURSOR
+    ) -> List[Dict[str, Any]]:
+        """Get trades of the API key, following pagination.
+
+        Args:
+            market: Only trades of this condition ID
+            after: Only trades matched after this unix timestamp
+            next_cursor: Pagination cursor to start from
+        """
+        results: List[Dict[str, Any]] = []
+        params = {k: v for k, v in (("market", market), ("after", after)) if v}
+        while next_cursor != END_CURSOR:
+            response = await self._request(
+                "GET", TRADES, params={**params, "next_cursor": next_cursor}, auth=True
+            )
+            results.extend(response["data"])
+            next_cursor = response["next_cursor"]
+        return results
+
+    def _order_body(self, order: Any, order_type: str, post_only: bool) -> Dict[str, Any]:
+        order_dict = order if isinstance(order, dict) else order.dict()
+        return {
+            "order": order_dict,
+            "owner": self.creds.api_key,
+            "orderType": order_type,
+            "postOnly": post_only,
+        }
+
+    async def post_order(self, order: Any, order_type: str = "GTC", post_only: bool = False) -> Dict[str, Any]:
+        """Submit a signed order.
+
+        Args:
+            order: ``SignedOrder`` or its dict form
+            order_type: GTC, GTD, FOK or FAK
+            post_only: Reject the order if it would cross the book
+        """
+        return await self._request(
+            "POST", POST_ORDER, body=self._order_body(order, order_type, post_only), auth=True
+        )
+
+    async def post_orders(self, orders: Sequence[Tuple[Any, str]], post_only: bool = False) -> List[Dict[str, Any]]:
+        """Submit a batch of signed orders in one request.
+
+        Args:
+            orders: Sequence of (signed order, order type) pairs
+            post_only: Reject orders that would cross the book
+        """
+        body = [self._order_body(order, order_type, post_only) for order, order_type in orders]
+        return await self._request("POST", POST_ORDERS, body=body, auth=True)
+
+    async def cancel(self, order_id: str) -> Dict[str, Any]:
+        """Cancel an order."""
+        return await self._request("DELETE", CANCEL, body={"orderID": order_id}, auth=True)
+
+    async def cancel_orders(self, order_ids: Sequence[str]) -> Dict[str, Any]:
+        """Cancel several orders in one request."""
+        return await self._request("DELETE", CANCEL_ORDERS, body=list(order_ids), auth=True)
+
+    async def cancel_all(self) -> Dict[str, Any]:
+        """Cancel all open orders of the API key."""
+        return await self._request("DELETE", CANCEL_ALL, auth=True)
@@ -0,0 +1,356 @@
+"""
+CLOB Request Scheduler
+
+Central scheduler for REST calls to the Polymarket CLOB. It wraps a client
+(``ClobClient`` or an async equivalent) and provides:
+1. Token-bucket rate limits per endpoint group plus a global limit
+2. Priority classes so order placement is served before book refreshes,
+   and book refreshes before catalogue syncs
+3. Coalescing of identical in-flight read requests
+4. Adaptive (AIMD) backoff when the exchange answers 429 Too Many Requests
+"""
+
+import asyncio
+import heapq
+import inspect
+import itertools
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Request priority classes, lower values are served first."""
+    ORDER = 0
+    BOOK = 1
+    CATALOGUE = 2
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Token-bucket limit: sustained requests per second and burst size."""
+    rate: float
+    burst: float
+
+
+# Defaults follow the published CLOB limits (requests per 10s window, with
+# sustained 10 minute limits for trading endpoints), kept slightly below them.
+DEFAULT_LIMITS: Dict[str, RateLimit] = {
+    "global": RateLimit(rate=450.0, burst=4500.0),
+    "markets": RateLimit(rate=22.0, burst=220.0),
+    "book": RateLimit(rate=140.0, burst=1400.0),
+    "price": RateLimit(rate=140.0, burst=1400.0),
+    "data": RateLimit(rate=45.0, burst=450.0),
+    "order": RateLimit(rate=55.0, burst=3200.0),
+    "cancel": RateLimit(rate=45.0, burst=2700.0),
+    "default": RateLimit(rate=45.0, burst=450.0),
+}
+
+# Client method -> endpoint group
+METHOD_GROUPS: Dict[str, str] = {
+    "get_markets": "markets",
+    "get_market": "markets",
+    "get_simplified_markets": "markets",
+    "get_sampling_markets": "markets",
+    "get_order_book": "book",
+    "get_order_books": "book",
+    "get_price": "price",
+    "get_prices": "price",
+    "get_midpoint": "price",
+    "get_midpoints": "price",
+    "get_spread": "price",
+    "get_last_trade_price": "price",
+    "get_tick_size": "price",
+    "get_neg_risk": "price",
+    "get_fee_rate_bps": "price",
+    "get_orders": "data",
+    "get_order": "data",
+    "get_trades": "data",
+    "post_order": "order",
+    "post_orders": "order",
+    "cancel": "cancel",
+    "cancel_orders": "cancel",
+    "cancel_all": "cancel",
+    "cancel_market_orders": "cancel",
+}
+
+GROUP_PRIORITIES: Dict[str, Priority] = {
+    "order": Priority.ORDER,
+    "cancel": Priority.ORDER,
+    "markets": Priority.CATALOGUE,
+}
+
+# Writes must never be merged with other requests
+NON_COALESCING_GROUPS = frozenset({"order", "cancel"})
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Check whether an exception reports HTTP 429 Too Many Requests."""
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    if status is None:
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+    return status == 429
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate * scale`` tokens per second."""
+
+    def __init__(self, limit: RateLimit):
+        self.limit = limit
+        self.tokens = limit.burst
+        self.scale = 1.0  # adaptive multiplier applied to the refill rate
+        self.cooldown_until = 0.0
+        self.strikes = 0  # consecutive 429 responses
+        self._updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self.tokens = min(self.limit.burst, self.tokens + elapsed * self.limit.rate * self.scale)
+            self._updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available, 0 if one is available now."""
+        if now < self.cooldown_until:
+            return self.cooldown_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / (self.limit.rate * self.scale)
+
+
+class RequestScheduler:
+    """Rate-limit aware scheduler for CLOB client calls."""
+
+    def __init__(
+        self,
+        client: Any,
+        limits: Optional[Dict[str, RateLimit]] = None,
+        max_retries: int = 3,
+        base_backoff: float = 1.0,  # seconds
+        max_backoff: float = 60.0,  # seconds
+        min_scale: float = 0.1
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            client: CLOB client whose methods are scheduled (sync or async)
+            limits: Rate limits per endpoint group, merged over DEFAULT_LIMITS
+            max_retries: Maximum retries of a request answered with 429
+            base_backoff: Initial cooldown of a group after a 429 (seconds)
+            max_backoff: Maximum cooldown of a group (seconds)
+            min_scale: Lowest fraction of the nominal rate backoff may reach
+        """
+        self.client = client
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.min_scale = min_scale
+
+        self._global = TokenBucket(self.limits["global"])
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._waiters: List[Tuple[int, int, str, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_at = float("inf")
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.stats: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def _bucket(self, group: str) -> TokenBucket:
+        bucket = self._buckets.get(group)
+        if bucket is None:
+            bucket = TokenBucket(self.limits.get(group, self.limits["default"]))
+            self._buckets[group] = bucket
+        return bucket
+
+    def headroom(self, group: str) -> float:
+        """Requests of a group that could be sent right now, less those already waiting.
+
+        Negative when the group is backlogged or cooling down after a 429, so
+        callers with several schedulers (one per account) can pick the least
+        loaded one.
+        """
+        now = time.monotonic()
+        bucket = self._bucket(group)
+        bucket.refill(now)
+        self._global.refill(now)
+        tokens = min(bucket.tokens, self._global.tokens)
+        if now < bucket.cooldown_until:
+            tokens -= (bucket.cooldown_until - now) * bucket.limit.rate * bucket.scale
+        waiting = sum(1 for entry in self._waiters if entry[2] == group and not entry[3].done())
+        return tokens - waiting
+
+    async def call(
+        self,
+        method: str,
+        *args: Any,
+        priority: Optional[Priority] = None,
+        group: Optional[str] = None,
+        coalesce: Optional[bool] = None,
+        **kwargs: Any
+    ) -> Any:
+        """Schedule a client method call.
+
+        Args:
+            method: Name of the client method, e.g. ``get_order_book``
+            *args: Positional arguments for the method
+            priority: Priority class; derived from the endpoint group if None
+            group: Endpoint group; derived from the method name if None
+            coalesce: Share the result of an identical in-flight call; by
+                default enabled for everything but order placement/cancels
+            **kwargs: Keyword arguments for the method
+
+        Returns:
+            The method's result
+        """
+        group = group or METHOD_GROUPS.get(method, "default")
+        if priority is None:
+            priority = GROUP_PRIORITIES.get(group, Priority.BOOK)
+        if coalesce is None:
+            coalesce = group not in NON_COALESCING_GROUPS
+
+        key = None
+        if coalesce:
+            try:
+                key = (method, args, tuple(sorted(kwargs.items())))
+                hash(key)
+            except TypeError:
+                key = None
+
+        if key is not None:
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                self.stats[group]["coalesced"] += 1
+                return await asyncio.shield(inflight)
+
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            try:
+                result = await self._execute(method, args, kwargs, priority, group)
+                future.set_result(result)
+                return result
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                # Mark retrieved so unshared failures are not reported as unhandled
+                future.exception()
+                raise
+            finally:
+                del self._inflight[key]
+
+        return await self._execute(method, args, kwargs, priority, group)
+
+    async def _execute(
+        self,
+        method: str,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        priority: Priority,
+        group: str
+    ) -> Any:
+        fn = getattr(self.client, method)
+        bucket = self._bucket(group)
+        attempt = 0
+
+        while True:
+            await self._acquire(group, priority)
+            self.stats[group]["calls"] += 1
+            try:
+                if inspect.iscoroutinefunction(fn):
+                    result = await fn(*args, **kwargs)
+                else:
+                    # Synchronous clients must not block the event loop
+                    result = await asyncio.to_thread(fn, *args, **kwargs)
+                    if inspect.isawaitable(result):
+                        result = await result
+            except Exception as e:
+                if not is_rate_limited(e):
+                    raise
+                self._throttle(group, bucket)
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                continue
+
+            # Additive increase back towards the nominal rate
+            bucket.strikes = 0
+            if bucket.scale < 1.0:
+                bucket.scale = min(1.0, bucket.scale + 0.05)
+            return result
+
+    def _throttle(self, group: str, bucket: TokenBucket) -> None:
+        """Multiplicative decrease of a group's rate after a 429."""
+        self.stats[group]["throttled"] += 1
+        backoff = min(self.max_backoff, self.base_backoff * 2 ** bucket.strikes)
+        bucket.strikes += 1
+        bucket.scale = max(self.min_scale, bucket.scale / 2)
+        bucket.cooldown_until = time.monotonic() + backoff
+        logger.warning(f"Rate limited on '{group}', backing off {backoff:.1f}s at {bucket.scale:.0%} rate")
+
+    async def _acquire(self, group: str, priority: Priority) -> None:
+        """Wait for a request slot in the given group."""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._seq), group, future))
+        self._dispatch()
+        await future
+
+    def _dispatch(self) -> None:
+        """Grant slots to waiters in priority order while tokens allow."""
+        now = time.monotonic()
+        self._global.refill(now)
+        deferred = []
+        next_wake = float("inf")
+
+        while self._waiters:
+            entry = heapq.heappop(self._waiters)
+            future = entry[3]
+            if future.done():
+                continue
+
+            # Global tokens are handed out strictly by priority
+            global_wait = self._global.wait_time(now)
+            if global_wait > 0:
+                heapq.heappush(self._waiters, entry)
+                next_wake = min(next_wake, global_wait)
+                break
+
+            bucket = self._bucket(entry[2])
+            bucket.refill(now)
+            wait = bucket.wait_time(now)
+            if wait > 0:
+                deferred.append(entry)
+                next_wake = min(next_wake, wait)
+                continue
+
+            bucket.tokens -= 1
+            self._global.tokens -= 1
+            future.set_result(None)
+
+        for entry in deferred:
+            heapq.heappush(self._waiters, entry)
+
+        if self._waiters and next_wake < float("inf"):
+            self._schedule(now + next_wake)
+
+    def _schedule(self, when: float) -> None:
+        if self._timer is not None and self._timer_at <= when:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+
+        loop = asyncio.get_running_loop()
+        self._timer_at = when
+        self._timer = loop.call_later(max(0.0, when - time.monotonic()), self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._timer_at = float("inf")
+        self._dispatch()
@@ -0,0 +1,7 @@
+"""
+Decision Package
+"""
+
+from .runtime import Strategy, StrategyEvent, StrategyRuntime
+
+__all__ = ['Strategy', 'StrategyEvent', 'StrategyRuntime']
@@ -0,0 +1,182 @@
+import asyncio
+import importlib
+import os
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from loguru import logger
+
+from services.execution.executor import OrderIntent
+from services.ingest.book import ASK, BID, PRICE_CHANGE, BookEngine, OrderBook
+from shared.interfaces import Message, Subscription, create_bus, topic
+from .runtime import BOOK_UPDATE, MARKET_UPDATE, TRADE, StrategyEvent, StrategyRuntime
+
+app = FastAPI(title="Polybot Decision Service")
+
+# Tipos de evento del servicio de ingesta -> tipos de evento de estrategia
+# (los price_change se aplican al libro y se entregan como l2_book del libro resultante)
+EVENT_TYPES = {
+    "l2_book": BOOK_UPDATE,
+    PRICE_CHANGE: BOOK_UPDATE,
+    "trades": TRADE,
+    "ticker": MARKET_UPDATE,
+    "markets": MARKET_UPDATE,
+}
+
+EXECUTION_URL = os.getenv("EXECUTION_URL", "http://localhost:8003")
+# Cada cuánto se revisan los mercados que siguen las estrategias (segundos)
+SUBSCRIBE_INTERVAL = float(os.getenv("DECISION_SUBSCRIBE_INTERVAL", "5"))
+
+# Instancias globales
+bus = create_bus(group="decision")
+books = BookEngine()
+execution_http: Optional[httpx.AsyncClient] = None
+subscription: Optional[Subscription] = None
+subscribe_task: Optional[asyncio.Task] = None
+
+
+async def send_intent(intent: OrderIntent) -> None:
+    """Envía una intención de orden al servicio de ejecución."""
+    try:
+        payload = asdict(intent)
+        del payload["strategy"], payload["created_at"]
+        response = await execution_http.post("/orders", json=[payload])
+        response.raise_for_status()
+    except Exception as e:
+        logger.error(f"Failed to send order intent from {intent.strategy}: {e}")
+
+
+runtime = StrategyRuntime(send_intent)
+
+
+def load_strategies(spec: str) -> None:
+    """Carga estrategias a partir de una lista 'modulo:Clase' separada por comas."""
+    for path in filter(None, (item.strip() for item in spec.split(","))):
+        module_name, class_name = path.split(":")
+        strategy_class = getattr(importlib.import_module(module_name), class_name)
+        runtime.register(strategy_class())
+        logger.info(f"Loaded strategy {path}")
+
+
+def book_event(book: OrderBook, market: Optional[str]) -> Dict[str, Any]:
+    """Snapshot ``l2_book`` de un libro, con el formato de los de la ingesta."""
+    def levels(side: str) -> List[Dict[str, str]]:
+        return [{"price": str(price), "size": str(size)} for price, size in book.levels(side)]
+
+    return {
+        "type": "l2_book",
+        "market": market or book.market,
+        "asset_id": book.token_id,
+        "bids": levels(BID),
+        "asks": levels(ASK),
+        "timestamp": book.timestamp,
+    }
+
+
+def to_strategy_events(event: Dict[str, Any]) -> List[StrategyEvent]:
+    """Convierte un evento de mercado publicado por la ingesta.
+
+    Los libros se siguen con un ``BookEngine``, así que un ``price_change``
+    llega a las estrategias como el libro completo de cada asset que cambia.
+    """
+    event_type = EVENT_TYPES.get(event.get("type"))
+    if event_type is None:
+        return []
+    market = event.get("market")
+    if event_type == BOOK_UPDATE:
+        books.handle(event)
+    if event.get("type") == PRICE_CHANGE:
+        changes = event.get("price_changes") or event.get("changes") or []
+        asset_ids = dict.fromkeys(change.get("asset_id") or event.get("asset_id") for change in changes)
+        return [
+            StrategyEvent(event_type, market, book_event(books.book(asset_id), market))
+            for asset_id in asset_ids
+            if books.book(asset_id) is not None
+        ]
+    return [StrategyEvent(event_type, market, event)]
+
+
+def on_market_message(message: Message) -> None:
+    """Reenvía los eventos de mercado del bus a las estrategias."""
+    for event in to_strategy_events(message.payload):
+        runtime.publish(event)
+
+
+def market_topics() -> List[str]:
+    """Topics de los mercados que siguen las estrategias."""
+    markets = runtime.markets()
+    return [topic("market")] if markets is None else [topic("market", market) for market in sorted(markets)]
+
+
+async def subscribe_markets() -> Subscription:
+    """Se suscribe solo a los mercados que siguen las estrategias."""
+    return await bus.subscribe(market_topics(), on_market_message)
+
+
+async def refresh_subscription() -> None:
+    """Sigue los mercados que las estrategias añaden o quitan después del arranque."""
+    global subscription
+    while True:
+        await asyncio.sleep(SUBSCRIBE_INTERVAL)
+        try:
+            topics = market_topics()
+            if subscription is not None and frozenset(topics) == subscription.topics:
+                continue
+            # La nueva suscripción se abre antes de cerrar la anterior para no perder eventos
+            previous, subscription = subscription, await subscribe_markets()
+            if previous is not None:
+                await bus.unsubscribe(previous)
+            logger.info(f"Subscribed to {len(topics)} market topics")
+        except Exception as e:
+            logger.error(f"Failed to refresh market subscription: {e}")
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Inicia las estrategias y la escucha de eventos."""
+    global execution_http, subscription, subscribe_task
+    try:
+        execution_http = httpx.AsyncClient(base_url=EXECUTION_URL, timeout=5.0)
+        load_strategies(os.getenv("STRATEGIES", ""))
+        await bus.start()
+        await runtime.start()
+        subscription = await subscribe_markets()
+        subscribe_task = asyncio.create_task(refresh_subscription())
+    except Exception as e:
+        logger.error(f"Failed to start service: {e}")
+        raise
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Detiene las estrategias y cierra las conexiones."""
+    try:
+        if subscribe_task is not None:
+            subscribe_task.cancel()
+        await bus.close()
+        await runtime.stop()
+        if execution_http is not None:
+            await execution_http.aclose()
+    except Exception as e:
+        logger.error(f"Error during shutdown: {e}")
+
+
+@app.get("/health")
+async def health_check():
+    """Endpoint de healthcheck."""
+    if subscription is None or subscription.task is None or subscription.task.done():
+        raise HTTPException(status_code=503, detail="Market event subscription not running")
+    return {"status": "healthy", "topics": len(subscription.topics), "dropped": subscription.dropped}
+
+
+@app.get("/strategies")
+async def get_strategies():
+    """Devuelve los contadores de cada estrategia."""
+    return runtime.stats()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8004)
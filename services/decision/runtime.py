@@ -0,0 +1,244 @@
+"""
+Strategy Runtime
+
+Runs trading strategies side by side on live market events:
+1. Strategies declare the event types and markets they want; events are
+   routed through an index keyed by (event_type, market) so each event only
+   reaches its subscribers
+2. Every strategy runs in its own task with a bounded inbox; when a strategy
+   falls behind, its oldest events are dropped, and other strategies are not
+   delayed
+3. Order intents returned by strategies are forwarded to an execution sink
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from services.execution.executor import OrderIntent
+
+logger = logging.getLogger(__name__)
+
+# Event types
+MARKET_UPDATE = "market"
+BOOK_UPDATE = "book"
+TRADE = "trade"
+ORDER_UPDATE = "order"
+
+
+@dataclass
+class StrategyEvent:
+    """An event delivered to strategies."""
+    type: str
+    market: Optional[str]  # condition_id
+    data: Any
+    timestamp: float = field(default_factory=time.time)
+
+
+class Strategy:
+    """Base class of trading strategies.
+
+    Subclasses set ``event_types`` and ``markets`` (None for every market)
+    and implement ``on_event``, returning order intents to send, if any.
+    Strategies doing CPU-heavy work should set ``blocking`` so ``on_event``
+    runs in a worker thread instead of on the event loop.
+    """
+    name: str = "strategy"
+    event_types: FrozenSet[str] = frozenset({MARKET_UPDATE})
+    markets: Optional[FrozenSet[str]] = None
+    inbox_size: int = 1000
+    blocking: bool = False
+
+    async def on_start(self) -> None:
+        """Called once before the first event."""
+
+    async def on_stop(self) -> None:
+        """Called once when the runtime stops."""
+
+    def on_event(self, event: StrategyEvent) -> Optional[Iterable[OrderIntent]]:
+        """Handle an event; may be a coroutine function unless ``blocking``."""
+        raise NotImplementedError
+
+
+class StrategyWorker:
+    """Task and bounded inbox of one strategy."""
+
+    def __init__(self, strategy: Strategy, sink: Callable[[OrderIntent], Any]):
+        self.strategy = strategy
+        self.sink = sink
+        self.inbox: Deque[StrategyEvent] = deque(maxlen=strategy.inbox_size)
+        self.received = 0
+        self.dropped = 0
+        self.errors = 0
+        self.intents = 0
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def put(self, event: StrategyEvent) -> None:
+        """Enqueue an event, dropping the oldest one if the inbox is full."""
+        if len(self.inbox) == self.inbox.maxlen:
+            self.dropped += 1
+        self.inbox.append(event)
+        self.received += 1
+        self._ready.set()
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name=f"strategy:{self.strategy.name}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.strategy.on_stop()
+        except Exception as e:
+            logger.error(f"Error stopping strategy {self.strategy.name}: {e}")
+
+    async def _handle(self, event: StrategyEvent) -> None:
+        strategy = self.strategy
+        if strategy.blocking:
+            intents = await asyncio.to_thread(strategy.on_event, event)
+        else:
+            intents = strategy.on_event(event)
+            if inspect.isawaitable(intents):
+                intents = await intents
+        if not intents:
+            return
+
+        for intent in intents:
+            intent.strategy = strategy.name
+            if intent.market is None:
+                # Risk limits are per market; default to the market that triggered the intent
+                intent.market = event.market
+            self.intents += 1
+            result = self.sink(intent)
+            if inspect.isawaitable(result):
+                await result
+
+    async def _run(self) -> None:
+        try:
+            await self.strategy.on_start()
+        except Exception as e:
+            logger.error(f"Error starting strategy {self.strategy.name}: {e}")
+            return
+
+        while True:
+            await self._ready.wait()
+            while self.inbox:
+                event = self.inbox.popleft()
+                try:
+                    await self._handle(event)
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"Error in strategy {self.strategy.name} on {event.type}: {e}")
+            self._ready.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "received": self.received,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "intents": self.intents,
+            "backlog": len(self.inbox)
+        }
+
+
+class StrategyRuntime:
+    """Routes events to strategies and their order intents to execution."""
+
+    def __init__(self, sink: Callable[[OrderIntent], Any]):
+        """Initialize the runtime.
+
+        Args:
+            sink: Called with every order intent, e.g. ``ExecutionService.submit``
+        """
+        self.sink = sink
+        self._workers: Dict[str, StrategyWorker] = {}
+        # (event_type, condition_id or None for all markets) -> workers
+        self._routes: Dict[Tuple[str, Optional[str]], List[StrategyWorker]] = {}
+        self._running = False
+
+    def register(self, strategy: Strategy) -> None:
+        """Add a strategy; it starts immediately if the runtime is running."""
+        if strategy.name in self._workers:
+            raise ValueError(f"Strategy {strategy.name} is already registered")
+        worker = StrategyWorker(strategy, self.sink)
+        self._workers[strategy.name] = worker
+        self._index(worker)
+        if self._running:
+            worker.start()
+
+    async def unregister(self, name: str) -> None:
+        """Stop and remove a strategy."""
+        worker = self._workers.pop(name, None)
+        if worker is None:
+            return
+        self._unindex(worker)
+        await worker.stop()
+
+    def subscribe(self, name: str, markets: Optional[Iterable[str]]) -> None:
+        """Change the markets a strategy receives events of (None for all)."""
+        worker = self._workers[name]
+        self._unindex(worker)
+        worker.strategy.markets = frozenset(markets) if markets is not None else None
+        self._index(worker)
+
+    def markets(self) -> Optional[Set[str]]:
+        """Markets any strategy wants events of, or None if one wants all markets."""
+        markets = {market for _, market in self._routes}
+        return None if None in markets else markets
+
+    def _keys(self, strategy: Strategy) -> Set[Tuple[str, Optional[str]]]:
+        markets = strategy.markets if strategy.markets is not None else (None,)
+        return {(event_type, market) for event_type in strategy.event_types for market in markets}
+
+    def _index(self, worker: StrategyWorker) -> None:
+        for key in self._keys(worker.strategy):
+            self._routes.setdefault(key, []).append(worker)
+
+    def _unindex(self, worker: StrategyWorker) -> None:
+        for key in self._keys(worker.strategy):
+            workers = self._routes.get(key, [])
+            if worker in workers:
+                workers.remove(worker)
+            if not workers:
+                self._routes.pop(key, None)
+
+    async def start(self) -> None:
+        """Start every registered strategy."""
+        self._running = True
+        for worker in self._workers.values():
+            worker.start()
+        logger.info(f"Strategy runtime started with {len(self._workers)} strategies")
+
+    async def stop(self) -> None:
+        """Stop every strategy."""
+        self._running = False
+        await asyncio.gather(*[worker.stop() for worker in self._workers.values()])
+        logger.info("Strategy runtime stopped")
+
+    def publish(self, event: StrategyEvent) -> int:
+        """Deliver an event to its subscribers without waiting for them.
+
+        Returns:
+            Number of strategies the event was delivered to
+        """
+        delivered = 0
+        for key in ((event.type, event.market), (event.type, None)):
+            for worker in self._routes.get(key, ()):
+                worker.put(event)
+                delivered += 1
+        return delivered
+
+    def on_market_update(self, market_state: Any) -> None:
+        """Publish a ``MarketState``; usable as a market data callback."""
+        self.publish(StrategyEvent(MARKET_UPDATE, market_state.condition_id, market_state))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Get per-strategy event counters."""
+        return {name: worker.stats() for name, worker in self._workers.items()}
@@ -0,0 +1,15 @@
+"""
+Order Execution Package
+"""
+
+from .executor import ExecutionReport, ExecutionService, OrderIntent
+from .ledger import LedgerSync, OrderLedger
+from .risk import RiskEngine, RiskLimits
+from .router import AccountRouter
+from .signing import OrderSigner, OrderTemplate, SigningPool
+from .user_stream import UserStream
+
+__all__ = [
+    'AccountRouter', 'ExecutionReport', 'ExecutionService', 'LedgerSync', 'OrderIntent', 'OrderLedger',
+    'OrderSigner', 'OrderTemplate', 'RiskEngine', 'RiskLimits', 'SigningPool', 'UserStream'
+]
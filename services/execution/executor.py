@@ -0,0 +1,362 @@
+"""
+Order Execution
+
+Low-latency path from an order intent to the wire:
+1. Per-token order templates (tick size, neg-risk exchange, fee rate) are
+   prepared ahead of time so no REST lookups happen when an order is placed
+2. Orders are signed with pre-encoded templates (see ``signing``)
+3. Requests go out over the warm, pooled async CLOB connection, kept alive
+   by a periodic ping, and batches use the multi-order endpoint
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterable, List, Optional, Sequence
+
+from services.clob.client import AsyncClobClient
+from services.clob.scheduler import Priority, RequestScheduler
+from shared.utils.fixed import to_ticks, to_units
+
+from .signing import OrderSigner, OrderTemplate, SigningPool
+
+if TYPE_CHECKING:
+    from .ledger import OrderLedger
+    from .risk import RiskEngine
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of orders accepted by the batch order endpoint
+MAX_BATCH_SIZE = 15
+
+
+@dataclass
+class OrderIntent:
+    """A decision to place a limit order."""
+    token_id: str
+    side: str  # BUY or SELL
+    price: float
+    size: float
+    order_type: str = "GTC"  # GTC, GTD, FOK or FAK
+    post_only: bool = False
+    market: Optional[str] = None  # condition_id
+    strategy: Optional[str] = None
+    account: Optional[str] = None  # account to trade with; chosen by the AccountRouter if None
+    created_at: float = field(default_factory=time.perf_counter)
+
+    @property
+    def price_ticks(self) -> int:
+        """Price in integer ticks of 1e-4."""
+        return to_ticks(self.price)
+
+    @property
+    def size_units(self) -> int:
+        """Size in integer micro-units."""
+        return to_units(self.size)
+
+
+@dataclass
+class ExecutionReport:
+    """Outcome of submitting an order intent."""
+    intent: OrderIntent
+    success: bool
+    order_id: Optional[str] = None
+    status: Optional[str] = None
+    error: Optional[str] = None
+    internal_latency_ms: float = 0.0  # intent creation -> request handed to the wire
+    raw: Dict[str, Any] = field(default_factory=dict)
+
+
+class ExecutionService:
+    """Signs and submits orders with minimal internal latency."""
+
+    def __init__(
+        self,
+        client: AsyncClobClient,
+        signer: OrderSigner,
+        scheduler: Optional[RequestScheduler] = None,
+        keepalive_interval: float = 15.0,  # seconds
+        ledger: Optional["OrderLedger"] = None,
+        risk: Optional["RiskEngine"] = None,
+        name: str = "default",
+        signing_pool: Optional[SigningPool] = None
+    ):
+        """Initialize the execution service.
+
+        Args:
+            client: Authenticated async CLOB client
+            signer: Order signer of the trading wallet
+            scheduler: Rate-limit aware scheduler; one wrapping ``client`` is
+                created if None
+            keepalive_interval: How often to ping the CLOB to keep the
+                connection warm (seconds)
+            ledger: Ledger to register acknowledged orders with
+            risk: Pre-trade risk checks every order must pass
+            name: Account name, used by the AccountRouter and the signing pool
+            signing_pool: Worker processes batches are signed in; batches
+                are signed in process if None
+        """
+        self.client = client
+        self.signer = signer
+        self.rest = scheduler if scheduler is not None else RequestScheduler(client)
+        self.keepalive_interval = keepalive_interval
+        self.ledger = ledger
+        self.risk = risk
+        self.name = name
+        self.signing_pool = signing_pool
+
+        self._templates: Dict[str, OrderTemplate] = {}  # token_id -> OrderTemplate
+        self._latencies: Deque[float] = deque(maxlen=1000)
+        self._keepalive_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Open the connection and keep it warm."""
+        await self._ping()
+        self._keepalive_task = asyncio.create_task(self._keepalive_loop())
+        logger.info("Execution service started")
+
+    async def stop(self) -> None:
+        """Stop the keep-alive loop."""
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            await asyncio.gather(self._keepalive_task, return_exceptions=True)
+            self._keepalive_task = None
+        logger.info("Execution service stopped")
+
+    async def _ping(self) -> None:
+        try:
+            await self.client.get_server_time()
+        except Exception as e:
+            logger.warning(f"Keep-alive ping failed: {e}")
+
+    async def _keepalive_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            await self._ping()
+
+    def add_template(self, template: OrderTemplate) -> None:
+        """Register a prebuilt order template."""
+        self._templates[template.token_id] = template
+
+    async def prepare(self, token_ids: Iterable[str]) -> int:
+        """Build order templates for tokens ahead of trading.
+
+        Args:
+            token_ids: Tokens that may be traded
+
+        Returns:
+            Number of templates built
+        """
+        missing = [token_id for token_id in dict.fromkeys(token_ids) if token_id not in self._templates]
+        results = await asyncio.gather(
+            *[self._build_template(token_id) for token_id in missing],
+            return_exceptions=True
+        )
+
+        built = 0
+        for token_id, result in zip(missing, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to prepare order template for {token_id}: {result}")
+                continue
+            built += 1
+        return built
+
+    async def _build_template(self, token_id: str) -> OrderTemplate:
+        tick_size, neg_risk, fee_rate_bps = await asyncio.gather(
+            self.rest.call("get_tick_size", token_id),
+            self.rest.call("get_neg_risk", token_id),
+            self.rest.call("get_fee_rate_bps", token_id)
+        )
+        template = self.signer.template(
+            token_id,
+            tick_size=tick_size,
+            neg_risk=neg_risk,
+            fee_rate_bps=fee_rate_bps
+        )
+        self._templates[token_id] = template
+        return template
+
+    async def template(self, token_id: str) -> OrderTemplate:
+        """Get the order template of a token, building it on a cache miss."""
+        template = self._templates.get(token_id)
+        if template is None:
+            logger.warning(f"No order template for {token_id}, building one on the hot path")
+            template = await self._build_template(token_id)
+        return template
+
+    def _record_latency(self, intents: Sequence[OrderIntent]) -> List[float]:
+        now = time.perf_counter()
+        latencies = [(now - intent.created_at) * 1000 for intent in intents]
+        self._latencies.extend(latencies)
+        return latencies
+
+    def _report(self, intent: OrderIntent, response: Any, latency_ms: float) -> ExecutionReport:
+        if not isinstance(response, dict):
+            return ExecutionReport(intent, success=False, error=str(response), internal_latency_ms=latency_ms)
+        report = ExecutionReport(
+            intent,
+            success=bool(response.get("success", False)),
+            order_id=response.get("orderID") or None,
+            status=response.get("status"),
+            error=response.get("errorMsg") or None,
+            internal_latency_ms=latency_ms,
+            raw=response
+        )
+        if self.ledger is not None:
+            self.ledger.record_report(report)
+        return report
+
+    def _rejected(self, intent: OrderIntent) -> Optional[ExecutionReport]:
+        if self.risk is None:
+            return None
+        reason = self.risk.check(intent)
+        if reason is None:
+            return None
+        logger.warning(f"Order rejected by risk: {reason}")
+        return ExecutionReport(intent, success=False, error=reason)
+
+    def _release(self, intents: Sequence[OrderIntent]) -> None:
+        if self.risk is not None:
+            for intent in intents:
+                self.risk.release(intent)
+
+    async def submit(self, intent: OrderIntent) -> ExecutionReport:
+        """Check, sign and submit a single order."""
+        rejected = self._rejected(intent)
+        if rejected is not None:
+            return rejected
+
+        try:
+            try:
+                template = await self.template(intent.token_id)
+                order = template.sign(intent.side, intent.price, intent.size)
+            except Exception as e:
+                logger.error(f"Order signing failed for {intent.token_id}: {e}")
+                return ExecutionReport(intent, success=False, error=str(e))
+
+            latency_ms = self._record_latency([intent])[0]
+            try:
+                response = await self.rest.call(
+                    "post_order", order, intent.order_type, intent.post_only, priority=Priority.ORDER
+                )
+            except Exception as e:
+                logger.error(f"Order submission failed: {e}")
+                return ExecutionReport(intent, success=False, error=str(e), internal_latency_ms=latency_ms)
+            return self._report(intent, response, latency_ms)
+        finally:
+            self._release([intent])
+
+    async def submit_batch(self, intents: Sequence[OrderIntent]) -> List[ExecutionReport]:
+        """Sign and submit orders, using one request per batch of up to 15.
+
+        Post-only intents are sent in separate batches since the flag applies
+        to a whole request. Orders that cannot be signed get failed reports
+        and the rest of their batch is still sent.
+        """
+        reports: List[ExecutionReport] = []
+        accepted = []
+        for intent in intents:
+            rejected = self._rejected(intent)
+            if rejected is None:
+                accepted.append(intent)
+            else:
+                reports.append(rejected)
+
+        for post_only in (False, True):
+            group = [intent for intent in accepted if intent.post_only == post_only]
+            for start in range(0, len(group), MAX_BATCH_SIZE):
+                chunk = group[start:start + MAX_BATCH_SIZE]
+                try:
+                    reports.extend(await self._submit_chunk(chunk, post_only))
+                except Exception as e:
+                    logger.error(f"Batch order submission failed: {e}")
+                    reports.extend(ExecutionReport(intent, success=False, error=str(e)) for intent in chunk)
+        return reports
+
+    async def _sign_chunk(self, intents: Sequence[OrderIntent]) -> List[Any]:
+        """Sign orders; an order that cannot be signed gets its exception instead."""
+        signed: List[Any] = []
+        templates: Dict[int, OrderTemplate] = {}
+        for i, intent in enumerate(intents):
+            try:
+                templates[i] = await self.template(intent.token_id)
+                signed.append(None)
+            except Exception as e:
+                signed.append(e)
+
+        if self.signing_pool is not None and len(templates) > 1:
+            try:
+                orders = await self.signing_pool.sign(self.name, [
+                    (template, intents[i].side, intents[i].price, intents[i].size)
+                    for i, template in templates.items()
+                ])
+            except Exception as e:
+                orders = [e] * len(templates)
+            for i, order in zip(templates, orders):
+                signed[i] = order
+            return signed
+
+        for i, template in templates.items():
+            intent = intents[i]
+            try:
+                signed[i] = template.sign(intent.side, intent.price, intent.size)
+            except Exception as e:
+                signed[i] = e
+        return signed
+
+    async def _submit_chunk(self, intents: Sequence[OrderIntent], post_only: bool) -> List[ExecutionReport]:
+        if not intents:
+            return []
+
+        try:
+            reports: List[ExecutionReport] = []
+            ready: List[OrderIntent] = []
+            orders = []
+            for intent, order in zip(intents, await self._sign_chunk(intents)):
+                if isinstance(order, Exception):
+                    logger.error(f"Order signing failed for {intent.token_id}: {order}")
+                    reports.append(ExecutionReport(intent, success=False, error=str(order)))
+                else:
+                    ready.append(intent)
+                    orders.append((order, intent.order_type))
+            if not ready:
+                return reports
+
+            latencies = self._record_latency(ready)
+            try:
+                responses = await self.rest.call("post_orders", orders, post_only, priority=Priority.ORDER)
+            except Exception as e:
+                logger.error(f"Batch order submission failed: {e}")
+                return reports + [
+                    ExecutionReport(intent, success=False, error=str(e), internal_latency_ms=latency)
+                    for intent, latency in zip(ready, latencies)
+                ]
+
+            if not isinstance(responses, list):
+                responses = [responses] * len(ready)
+            return reports + [
+                self._report(intent, response, latency)
+                for intent, response, latency in zip(ready, responses, latencies)
+            ]
+        finally:
+            self._release(intents)
+
+    async def cancel(self, order_id: str) -> Any:
+        """Cancel an order."""
+        return await self.rest.call("cancel", order_id, priority=Priority.ORDER)
+
+    async def cancel_orders(self, order_ids: Sequence[str]) -> Any:
+        """Cancel several orders in one request."""
+        return await self.rest.call("cancel_orders", list(order_ids), priority=Priority.ORDER)
+
+    def latency_stats(self) -> Dict[str, float]:
+        """Get percentiles of recent internal decision-to-wire latencies (ms)."""
+        if not self._latencies:
+            return {"count": 0}
+
+        ordered = sorted(self._latencies)
+        def pct(p: float) -> float:
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+        return {"count": len(ordered), "p50": pct(0.50), "p99": pct(0.99), "max": ordered[-1]}
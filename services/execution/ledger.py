@@ -0,0 +1,508 @@
+"""
+Order and Position Ledger
+
+Local record of our own orders and positions, so strategies and risk checks
+can read exposure without a network round trip:
+1. Order and trade events from the user WebSocket channel update the ledger
+   as they arrive; order acks from the execution service register orders
+   before the channel confirms them
+2. Orders are indexed by id and open orders by market; positions by token
+   and market; per-market exposure is kept up to date on every change
+3. A periodic reconciliation against REST open orders and recent trades
+   repairs anything missed during disconnects, and the ledger is persisted
+   to the storage layer
+4. Trade IDs (for deduplication and reversal of failed trades) are kept for
+   a bounded window of recent trades; fills of confirmed trades, which can
+   no longer fail, are dropped
+5. Filled and cancelled orders are likewise kept for a bounded window of
+   the most recently closed ones
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from services.clob.scheduler import Priority, RequestScheduler
+
+from .executor import ExecutionReport
+from .signing import BUY, SELL
+
+logger = logging.getLogger(__name__)
+
+# Order statuses
+LIVE = "LIVE"
+MATCHED = "MATCHED"
+CANCELED = "CANCELED"
+
+# Trade statuses of the user channel
+TRADE_CONFIRMED = "CONFIRMED"
+TRADE_FAILED = "FAILED"
+
+# Sizes below this are treated as zero
+EPSILON = 1e-9
+
+LEDGER_KEY = "execution:ledger"
+
+
+@dataclass
+class OrderRecord:
+    """State of one of our orders."""
+    order_id: str
+    market: str  # condition_id
+    asset_id: str  # token_id
+    side: str
+    price: float
+    original_size: float
+    size_matched: float = 0.0
+    status: str = LIVE
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    @property
+    def remaining(self) -> float:
+        """Unfilled size of the order."""
+        return max(self.original_size - self.size_matched, 0.0)
+
+    @property
+    def is_open(self) -> bool:
+        return self.status == LIVE and self.remaining > EPSILON
+
+
+@dataclass
+class Position:
+    """Holdings of one outcome token."""
+    asset_id: str
+    market: str
+    size: float = 0.0
+    avg_price: float = 0.0
+    realized_pnl: float = 0.0
+
+    @property
+    def notional(self) -> float:
+        """Cost basis of the position."""
+        return self.size * self.avg_price
+
+    def apply_fill(self, side: str, size: float, price: float) -> None:
+        """Apply a fill to the position."""
+        if side == BUY:
+            total = self.size + size
+            self.avg_price = (self.notional + size * price) / total if total > EPSILON else 0.0
+            self.size = total
+        else:
+            self.realized_pnl += size * (price - self.avg_price)
+            self.size -= size
+            if self.size <= EPSILON:
+                self.size = 0.0
+                self.avg_price = 0.0
+
+
+@dataclass
+class MarketExposure:
+    """Exposure of one market."""
+    position_notional: float = 0.0  # cost basis of held tokens
+    open_buy_notional: float = 0.0  # capital committed to resting buys
+    open_orders: int = 0
+
+    @property
+    def total(self) -> float:
+        return self.position_notional + self.open_buy_notional
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class OrderLedger:
+    """In-memory order and position state machine."""
+
+    def __init__(self, owner: Optional[str] = None, max_trades: int = 10_000, max_closed_orders: int = 10_000):
+        """Initialize the ledger.
+
+        Args:
+            owner: API key of the account, used to pick our side of trades
+                in which we were the maker
+            max_trades: Recent trade IDs remembered (and persisted) to skip
+                repeated trade events
+            max_closed_orders: Recently filled or cancelled orders kept
+        """
+        self.owner = owner
+        self.max_trades = max_trades
+        self.max_closed_orders = max_closed_orders
+        self._orders: Dict[str, OrderRecord] = {}
+        self._closed: "OrderedDict[str, None]" = OrderedDict()  # closed order IDs, oldest first
+        self._open_by_market: Dict[str, Set[str]] = {}
+        self._positions: Dict[str, Position] = {}
+        self._positions_by_market: Dict[str, Dict[str, Position]] = {}
+        self._exposure: Dict[str, MarketExposure] = {}
+        self._total_exposure = 0.0
+        # trade_id -> fills applied for it, so failed trades can be reversed
+        self._fills: "OrderedDict[str, List[Tuple[str, str, str, float, float]]]" = OrderedDict()
+        self.last_trade_time = 0
+
+    # Lookups
+
+    def get_order(self, order_id: str) -> Optional[OrderRecord]:
+        """Get an order by ID."""
+        return self._orders.get(order_id)
+
+    def open_orders(self, market: Optional[str] = None) -> List[OrderRecord]:
+        """Get open orders, optionally of one market."""
+        if market is not None:
+            return [self._orders[order_id] for order_id in self._open_by_market.get(market, ())]
+        return [order for order in self._orders.values() if order.is_open]
+
+    def position(self, asset_id: str) -> Optional[Position]:
+        """Get the position in a token."""
+        return self._positions.get(asset_id)
+
+    def positions(self, market: Optional[str] = None) -> List[Position]:
+        """Get non-empty positions, optionally of one market."""
+        if market is not None:
+            return list(self._positions_by_market.get(market, {}).values())
+        return list(self._positions.values())
+
+    def exposure(self, market: str) -> MarketExposure:
+        """Get the exposure of a market."""
+        return self._exposure.get(market) or MarketExposure()
+
+    @property
+    def total_exposure(self) -> float:
+        """Exposure summed over all markets."""
+        return self._total_exposure
+
+    # State transitions
+
+    def _refresh_market(self, market: str) -> None:
+        exposure = MarketExposure()
+        for order_id in self._open_by_market.get(market, ()):
+            order = self._orders[order_id]
+            exposure.open_orders += 1
+            if order.side == BUY:
+                exposure.open_buy_notional += order.remaining * order.price
+        for position in self._positions_by_market.get(market, {}).values():
+            exposure.position_notional += position.notional
+
+        previous = self._exposure.get(market)
+        self._total_exposure += exposure.total - (previous.total if previous else 0.0)
+        if exposure.open_orders or exposure.position_notional:
+            self._exposure[market] = exposure
+        else:
+            self._exposure.pop(market, None)
+
+    def _index_order(self, order: OrderRecord) -> None:
+        open_ids = self._open_by_market.setdefault(order.market, set())
+        if order.is_open:
+            open_ids.add(order.order_id)
+            self._closed.pop(order.order_id, None)
+        else:
+            open_ids.discard(order.order_id)
+            if not open_ids:
+                del self._open_by_market[order.market]
+            self._closed[order.order_id] = None
+            self._closed.move_to_end(order.order_id)
+            while len(self._closed) > self.max_closed_orders:
+                order_id, _ = self._closed.popitem(last=False)
+                self._orders.pop(order_id, None)
+        self._refresh_market(order.market)
+
+    def upsert_order(
+        self,
+        order_id: str,
+        market: str,
+        asset_id: str,
+        side: str,
+        price: float,
+        original_size: float,
+        size_matched: float = 0.0,
+        status: str = LIVE
+    ) -> OrderRecord:
+        """Insert or update an order."""
+        order = self._orders.get(order_id)
+        if order is None:
+            order = OrderRecord(order_id, market, asset_id, side, price, original_size)
+            self._orders[order_id] = order
+        elif market and market != order.market:
+            # Acks without a market are filed under "" until the channel confirms them
+            old_ids = self._open_by_market.get(order.market)
+            if old_ids is not None:
+                old_ids.discard(order_id)
+                if not old_ids:
+                    del self._open_by_market[order.market]
+            self._refresh_market(order.market)
+            order.market = market
+        # Matched size only grows; events may arrive out of order
+        order.size_matched = max(order.size_matched, size_matched)
+        order.original_size = original_size or order.original_size
+        order.status = status
+        order.updated_at = time.time()
+        if order.remaining <= EPSILON:
+            order.status = MATCHED
+        self._index_order(order)
+        return order
+
+    def close_order(self, order_id: str, status: str = CANCELED) -> None:
+        """Mark an order as no longer resting."""
+        order = self._orders.get(order_id)
+        if order is None or not order.is_open:
+            return
+        order.status = status
+        order.updated_at = time.time()
+        self._index_order(order)
+
+    def record_report(self, report: ExecutionReport) -> None:
+        """Register an order acknowledged by the execution service."""
+        if not report.success or not report.order_id:
+            return
+        intent = report.intent
+        self.upsert_order(
+            report.order_id,
+            intent.market or "",
+            intent.token_id,
+            intent.side,
+            intent.price,
+            intent.size
+        )
+
+    def on_order(self, event: Dict[str, Any]) -> None:
+        """Apply an ``order`` event (PLACEMENT, UPDATE or CANCELLATION)."""
+        order_id = event["id"]
+        if event.get("type") == "CANCELLATION":
+            if order_id not in self._orders:
+                return
+            self.close_order(order_id)
+            return
+        self.upsert_order(
+            order_id,
+            event.get("market", ""),
+            event.get("asset_id", ""),
+            event.get("side", BUY),
+            _float(event.get("price")),
+            _float(event.get("original_size")),
+            _float(event.get("size_matched"))
+        )
+
+    def _trade_fills(self, event: Dict[str, Any]) -> List[Tuple[str, str, str, float, float]]:
+        """Extract our (asset_id, market, side, size, price) fills from a trade."""
+        market = event.get("market", "")
+        if event.get("trader_side", "TAKER") == "TAKER":
+            return [(event["asset_id"], market, event["side"], _float(event["size"]), _float(event["price"]))]
+
+        fills = []
+        for maker in event.get("maker_orders", []):
+            order = self._orders.get(maker.get("order_id"))
+            if order is None and maker.get("owner") != self.owner:
+                continue
+            if order is not None:
+                side = order.side
+            else:
+                side = maker.get("side") or (SELL if event.get("side") == BUY else BUY)
+            fills.append((
+                maker.get("asset_id", event.get("asset_id")),
+                market,
+                side,
+                _float(maker.get("matched_amount")),
+                _float(maker.get("price"))
+            ))
+        return fills
+
+    def _apply_fill(self, asset_id: str, market: str, side: str, size: float, price: float) -> None:
+        position = self._positions.get(asset_id)
+        if position is None:
+            position = Position(asset_id, market)
+            self._positions[asset_id] = position
+            self._positions_by_market.setdefault(market, {})[asset_id] = position
+        position.apply_fill(side, size, price)
+        if position.size <= EPSILON and not position.realized_pnl:
+            del self._positions[asset_id]
+            market_positions = self._positions_by_market[market]
+            del market_positions[asset_id]
+            if not market_positions:
+                del self._positions_by_market[market]
+        self._refresh_market(market)
+
+    def on_trade(self, event: Dict[str, Any]) -> bool:
+        """Apply a ``trade`` event once per trade; reverse it if it fails.
+
+        Returns:
+            True if the ledger changed
+        """
+        trade_id = event["id"]
+        failed = event.get("status") == TRADE_FAILED
+        trade_time = int(_float(event.get("match_time") or event.get("matchtime") or event.get("timestamp")))
+        if trade_time > 10 ** 11:  # milliseconds
+            trade_time //= 1000
+        self.last_trade_time = max(self.last_trade_time, trade_time)
+
+        confirmed = event.get("status") == TRADE_CONFIRMED
+        if trade_id in self._fills:
+            if confirmed:
+                self._fills[trade_id] = []
+            if not failed:
+                return False
+            for asset_id, market, side, size, price in self._fills.pop(trade_id):
+                self._apply_fill(asset_id, market, BUY if side == SELL else SELL, size, price)
+            return True
+        if failed:
+            return False
+
+        fills = self._trade_fills(event)
+        for fill in fills:
+            self._apply_fill(*fill)
+        self._fills[trade_id] = [] if confirmed else fills
+        self._trim_trades()
+        return True
+
+    def _trim_trades(self) -> None:
+        while len(self._fills) > self.max_trades:
+            self._fills.popitem(last=False)
+
+    def handle(self, event: Dict[str, Any]) -> None:
+        """Apply a user channel event."""
+        event_type = event.get("event_type")
+        if event_type == "order":
+            self.on_order(event)
+        elif event_type == "trade":
+            self.on_trade(event)
+
+    def reconcile_orders(self, open_orders: Iterable[Dict[str, Any]]) -> int:
+        """Reconcile local open orders against the REST open order list.
+
+        Returns:
+            Number of orders added or closed
+        """
+        changes = 0
+        remote_ids = set()
+        for data in open_orders:
+            order_id = data["id"]
+            remote_ids.add(order_id)
+            local = self._orders.get(order_id)
+            if local is None or not local.is_open:
+                changes += 1
+            self.upsert_order(
+                order_id,
+                data.get("market", ""),
+                data.get("asset_id", ""),
+                data.get("side", BUY),
+                _float(data.get("price")),
+                _float(data.get("original_size")),
+                _float(data.get("size_matched"))
+            )
+
+        for order in self.open_orders():
+            if order.order_id not in remote_ids:
+                self.close_order(order.order_id)
+                changes += 1
+        return changes
+
+    # Persistence
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the ledger."""
+        return {
+            "orders": [asdict(order) for order in self._orders.values() if order.is_open],
+            "positions": [asdict(position) for position in self._positions.values()],
+            "trade_ids": list(self._fills),
+            "last_trade_time": self.last_trade_time
+        }
+
+    def load_dict(self, data: Dict[str, Any]) -> None:
+        """Restore the ledger from ``to_dict`` output."""
+        for order in data.get("orders", []):
+            record = OrderRecord(**order)
+            self._orders[record.order_id] = record
+            self._index_order(record)
+        for position in data.get("positions", []):
+            record = Position(**position)
+            self._positions[record.asset_id] = record
+            self._positions_by_market.setdefault(record.market, {})[record.asset_id] = record
+            self._refresh_market(record.market)
+        # Fills of restored trades are already in the positions
+        self._fills.update((trade_id, []) for trade_id in data.get("trade_ids", []))
+        self._trim_trades()
+        self.last_trade_time = data.get("last_trade_time", 0)
+
+
+class LedgerSync:
+    """Reconciles the ledger against REST and persists it."""
+
+    def __init__(
+        self,
+        ledger: OrderLedger,
+        scheduler: RequestScheduler,
+        storage: Optional[Any] = None,
+        interval: float = 30.0,  # seconds
+        key: str = LEDGER_KEY
+    ):
+        """Initialize the reconciler.
+
+        Args:
+            ledger: Ledger to keep in sync
+            scheduler: Scheduler wrapping an authenticated CLOB client
+            storage: Storage with ``store_event``/``get_event`` (e.g. EventStorage)
+            interval: Time between reconciliations (seconds)
+            key: Storage key of the ledger, one per account
+        """
+        self.ledger = ledger
+        self.rest = scheduler
+        self.storage = storage
+        self.interval = interval
+        self.key = key
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Restore the persisted ledger and start reconciling."""
+        if self.storage is not None:
+            try:
+                data = await self.storage.get_event(self.key)
+                if data:
+                    self.ledger.load_dict(data)
+            except Exception as e:
+                logger.error(f"Failed to restore ledger: {e}")
+        await self.reconcile()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """Stop reconciling and persist the ledger."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.save()
+
+    async def reconcile(self) -> bool:
+        """Reconcile open orders and apply trades missed by the user channel."""
+        try:
+            open_orders, trades = await asyncio.gather(
+                self.rest.call("get_orders", priority=Priority.BOOK),
+                self.rest.call("get_trades", after=self.ledger.last_trade_time or None, priority=Priority.BOOK)
+            )
+        except Exception as e:
+            logger.error(f"Ledger reconciliation failed: {e}")
+            return False
+
+        missed = sum(self.ledger.on_trade(trade) for trade in trades)
+        changes = self.ledger.reconcile_orders(open_orders)
+        if missed or changes:
+            logger.warning(f"Ledger reconciliation: {missed} missed trades, {changes} order changes")
+        await self.save()
+        return True
+
+    async def save(self) -> None:
+        """Persist the ledger to storage."""
+        if self.storage is None:
+            return
+        try:
+            await self.storage.store_event(self.key, self.ledger.to_dict())
+        except Exception as e:
+            logger.error(f"Failed to persist ledger: {e}")
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.reconcile()
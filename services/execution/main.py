@@ -0,0 +1,349 @@
+import asyncio
+import json
+import os
+from dataclasses import asdict
+from typing import Dict, List, Optional, Set
+
+from fastapi import FastAPI, HTTPException
+from loguru import logger
+from pydantic import BaseModel
+
+from services.auth import PolyAuthConfig
+from services.auth.pool import get_pool
+from services.ingest.book import BookEngine
+from services.ingest.catalogue import MarketCatalogue, market_token_ids
+from services.ingest.config import get_config
+from services.ingest.storage import EventStorage
+from shared.config.settings import get_settings
+from shared.interfaces import Message, create_bus, topic
+from .executor import ExecutionService, OrderIntent
+from .ledger import LEDGER_KEY, LedgerSync, OrderLedger
+from .risk import RiskEngine, RiskLimits
+from .router import AccountRouter
+from .signing import OrderSigner, SigningPool
+from .user_stream import UserStream
+
+app = FastAPI(title="Polybot Execution Service")
+
+# Plantillas de órdenes preparadas al arrancar (mercados activos del catálogo) y al descubrir tokens nuevos
+PREPARE_MAX_TOKENS = int(os.getenv("EXECUTION_PREPARE_MAX_TOKENS", "2000"))
+PREPARE_INTERVAL = float(os.getenv("EXECUTION_PREPARE_INTERVAL", "1"))
+
+# Instancias globales
+router: Optional[AccountRouter] = None
+ledger_syncs: Dict[str, LedgerSync] = {}
+user_streams: Dict[str, UserStream] = {}
+event_storage = EventStorage(get_config())
+# Libros del flujo de mercado en crudo: dan al control de riesgo el mercado y el mejor precio de cada token
+bus = create_bus(group="execution")
+books = BookEngine()
+prepared_tokens: Set[str] = set()
+pending_tokens: Set[str] = set()
+prepare_task: Optional[asyncio.Task] = None
+
+
+class OrderRequest(BaseModel):
+    token_id: str
+    side: str
+    price: float
+    size: float
+    order_type: str = "GTC"
+    post_only: bool = False
+    market: Optional[str] = None
+    account: Optional[str] = None
+
+
+def load_accounts() -> Dict[str, PolyAuthConfig]:
+    """Lee las cuentas de trading.
+
+    ``POLY_ACCOUNTS`` es una lista JSON de cuentas
+    ``{"name", "private_key_env", "signature_type", "proxy_address"}``, donde
+    ``private_key_env`` es la variable de entorno con la clave privada. Sin
+    ella se usa una única cuenta ``default`` con ``POLY_PRIVATE_KEY``.
+    """
+    settings = get_settings()
+    raw = os.getenv("POLY_ACCOUNTS")
+    if raw:
+        entries = json.loads(raw)
+    else:
+        entries = [{
+            "name": "default",
+            "private_key_env": "POLY_PRIVATE_KEY",
+            "signature_type": int(os.getenv("POLY_SIGNATURE_TYPE", "0")),
+            "proxy_address": os.getenv("POLY_FUNDER") or None
+        }]
+
+    accounts = {}
+    for i, entry in enumerate(entries):
+        name = entry.get("name") or f"account{i}"
+        private_key = os.getenv(entry.get("private_key_env", ""))
+        if not private_key:
+            raise ValueError(f"Missing private key for account {name}")
+        accounts[name] = PolyAuthConfig(
+            private_key=private_key,
+            host=settings.POLY_REST_URL,
+            signature_type=int(entry.get("signature_type", 0)),
+            proxy_address=entry.get("proxy_address")
+        )
+        accounts[name].validate()
+    return accounts
+
+
+def build_router() -> AccountRouter:
+    """Crea un servicio de ejecución por cuenta y el router que reparte las órdenes.
+
+    Cada cuenta tiene su firmante, credenciales, plantillas, libro, límites de
+    riesgo y de peticiones propios. Los límites de exposición por mercado y
+    total (``RISK_MAX_MARKET_NOTIONAL``, ``RISK_MAX_TOTAL_NOTIONAL``) son del
+    conjunto de cuentas y se reparten a partes iguales entre ellas. Las
+    credenciales de la API se toman del entorno (solo la cuenta ``default``) o
+    del pool de clientes, que las deriva una sola vez y las guarda cifradas en
+    disco.
+    """
+    from py_clob_client.clob_types import ApiCreds
+
+    settings = get_settings()
+    accounts = load_accounts()
+    env_creds = None
+    if all([settings.POLY_API_KEY, settings.POLY_API_SECRET, settings.POLY_PASSPHRASE]):
+        env_creds = ApiCreds(
+            api_key=settings.POLY_API_KEY,
+            api_secret=settings.POLY_API_SECRET,
+            api_passphrase=settings.POLY_PASSPHRASE
+        )
+
+    pool = get_pool()
+    pooled = {
+        name: pool.get(
+            config.private_key,
+            host=config.host,
+            chain_id=config.chain_id,
+            signature_type=config.signature_type,
+            funder=config.proxy_address,
+            creds=env_creds if name == "default" else None
+        )
+        for name, config in accounts.items()
+    }
+    signers = {
+        name: OrderSigner(account.private_key, account.chain_id, account.signature_type, account.funder)
+        for name, account in pooled.items()
+    }
+
+    # Con varias cuentas los lotes se firman en procesos aparte (SIGNING_WORKERS=0 lo desactiva)
+    workers = int(os.getenv("SIGNING_WORKERS", str(min(len(signers), os.cpu_count() or 1))))
+    signing_pool = SigningPool(signers, workers) if len(signers) > 1 and workers > 0 else None
+
+    # Cada cuenta solo puede usar su parte de la exposición agregada
+    shares = len(pooled)
+    max_market_notional = float(os.getenv("RISK_MAX_MARKET_NOTIONAL", "2000")) / shares
+    max_total_notional = float(os.getenv("RISK_MAX_TOTAL_NOTIONAL", "10000")) / shares
+
+    services = {}
+    for name, account in pooled.items():
+        ledger = OrderLedger(owner=account.creds.api_key)
+        risk = RiskEngine(
+            ledger,
+            RiskLimits(
+                max_order_notional=float(os.getenv("RISK_MAX_ORDER_NOTIONAL", "500")),
+                max_market_notional=max_market_notional
+            ),
+            max_total_notional=max_total_notional
+        )
+        services[name] = ExecutionService(
+            account.async_client(),
+            signers[name],
+            ledger=ledger,
+            risk=risk,
+            name=name,
+            signing_pool=signing_pool
+        )
+    return AccountRouter(services, signing_pool)
+
+
+def on_market_message(message: Message) -> None:
+    """Aplica un evento de libro y pasa los topes que cambian al riesgo de cada cuenta."""
+    if router is None:
+        return
+    books.handle(message.payload)
+    for token_id in books.drain_dirty():
+        book = books.book(token_id)
+        router.update_top(token_id, book.market, book.best_bid, book.best_ask)
+        if token_id not in prepared_tokens:
+            pending_tokens.add(token_id)
+
+
+def catalogue_tokens() -> List[str]:
+    """Tokens de los mercados activos del catálogo compartido, los vistos más recientemente primero."""
+    catalogue = MarketCatalogue(os.getenv("MARKET_CATALOGUE_PATH", "./data/catalogue/markets.json"))
+    catalogue.load()
+    entries = sorted(catalogue.entries(), key=lambda entry: entry.last_seen, reverse=True)
+    tokens: List[str] = []
+    for entry in entries:
+        if entry.data.get("active", True) and not entry.data.get("closed", False):
+            tokens.extend(market_token_ids(entry.data))
+    return tokens[:PREPARE_MAX_TOKENS]
+
+
+async def prepare_templates() -> None:
+    """Prepara las plantillas de los mercados activos y después las de cada token nuevo del flujo."""
+    pending_tokens.update(await asyncio.to_thread(catalogue_tokens))
+    for service in router.services.values():
+        if service.ledger is not None:
+            pending_tokens.update(position.asset_id for position in service.ledger.positions())
+    while True:
+        if pending_tokens:
+            tokens = list(pending_tokens)
+            pending_tokens.clear()
+            prepared_tokens.update(tokens)
+            built = await router.prepare(tokens)
+            logger.info(f"Prepared order templates for {len(tokens)} token(s): {built}")
+        await asyncio.sleep(PREPARE_INTERVAL)
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Abre las conexiones con el CLOB y las mantiene calientes."""
+    global router, prepare_task
+    try:
+        router = await asyncio.to_thread(build_router)
+        await router.start()
+
+        # Libro de órdenes y posiciones propio de cada cuenta, alimentado por su canal de usuario
+        try:
+            await event_storage.connect()
+            storage = event_storage
+        except Exception:
+            logger.warning("Redis unavailable, ledger will not be persisted")
+            storage = None
+        for name, service in router.services.items():
+            key = LEDGER_KEY if name == "default" else f"{LEDGER_KEY}:{name}"
+            ledger_sync = LedgerSync(service.ledger, service.rest, storage, key=key)
+            user_stream = UserStream(service.client.creds, service.ledger.handle, on_reconnect=ledger_sync.reconcile)
+            ledger_syncs[name] = ledger_sync
+            user_streams[name] = user_stream
+            await ledger_sync.start()
+            await user_stream.start()
+
+        # Topes de libro para la banda de precios y mercado de cada token para los límites por mercado
+        await bus.start()
+        await bus.subscribe([topic("market")], on_market_message, durable=False)
+        prepare_task = asyncio.create_task(prepare_templates())
+        logger.info(f"Execution started with {len(router.services)} account(s): {', '.join(router.services)}")
+    except Exception as e:
+        logger.error(f"Failed to start service: {e}")
+        raise
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Cierra las conexiones al detener el servicio."""
+    try:
+        if prepare_task is not None:
+            prepare_task.cancel()
+        for user_stream in user_streams.values():
+            await user_stream.stop()
+        for ledger_sync in ledger_syncs.values():
+            await ledger_sync.stop()
+        if router is not None:
+            await router.stop()
+            for service in router.services.values():
+                await service.client.aclose()
+        await bus.close()
+        await get_pool().aclose()
+        await event_storage.close()
+    except Exception as e:
+        logger.error(f"Error during shutdown: {e}")
+
+
+def get_router() -> AccountRouter:
+    if router is None:
+        raise HTTPException(status_code=503, detail="Execution service not started")
+    return router
+
+
+def get_service(account: str) -> ExecutionService:
+    service = get_router().services.get(account)
+    if service is None:
+        raise HTTPException(status_code=404, detail=f"Unknown account: {account}")
+    return service
+
+
+@app.get("/health")
+async def health_check():
+    """Endpoint de healthcheck."""
+    router = get_router()
+    return {
+        "status": "healthy",
+        "user_stream_connected": {name: stream.connected for name, stream in user_streams.items()},
+        "latency_ms": router.latency_stats(),
+        "routed_orders": router.stats
+    }
+
+
+@app.get("/positions")
+async def get_positions(market: Optional[str] = None, account: Optional[str] = None):
+    """Devuelve posiciones, órdenes abiertas y exposición del libro local, por cuenta."""
+    names = [account] if account is not None else list(get_router().services)
+    positions, open_orders, exposure = [], [], {}
+    for name in names:
+        ledger = get_service(name).ledger
+        positions.extend({"account": name, **asdict(position)} for position in ledger.positions(market))
+        open_orders.extend({"account": name, **asdict(order)} for order in ledger.open_orders(market))
+        exposure[name] = asdict(ledger.exposure(market)) if market else ledger.total_exposure
+    return {"positions": positions, "open_orders": open_orders, "exposure": exposure}
+
+
+@app.post("/risk/halt")
+async def halt_trading():
+    """Detiene el envío de órdenes en todas las cuentas."""
+    get_router().halt()
+    return {"halted": True}
+
+
+@app.post("/risk/resume")
+async def resume_trading():
+    """Reanuda el envío de órdenes en todas las cuentas."""
+    get_router().resume()
+    return {"halted": False}
+
+
+@app.post("/orders")
+async def submit_orders(orders: List[OrderRequest]):
+    """Firma y envía órdenes repartidas entre las cuentas, en lotes cuando hay más de una."""
+    router = get_router()
+    intents = [OrderIntent(**order.model_dump()) for order in orders]
+    if len(intents) == 1:
+        reports = [await router.submit(intents[0])]
+    else:
+        reports = await router.submit_batch(intents)
+
+    return [
+        {
+            "token_id": report.intent.token_id,
+            "account": report.intent.account,
+            "success": report.success,
+            "order_id": report.order_id,
+            "status": report.status,
+            "error": report.error,
+            "internal_latency_ms": report.internal_latency_ms
+        }
+        for report in reports
+    ]
+
+
+@app.delete("/orders/{order_id}")
+async def cancel_order(order_id: str):
+    """Cancela una orden desde la cuenta que la envió."""
+    router = get_router()
+    try:
+        return await router.cancel(order_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except Exception as e:
+        logger.error(f"Failed to cancel order {order_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8003)
@@ -0,0 +1,224 @@
+"""
+Pre-trade Risk Engine
+
+Gate in front of order submission. Every check is a handful of dictionary
+lookups and integer comparisons so it adds no measurable latency:
+1. Limits are resolved per market once, when configured, into flat tuples
+   of fixed-point integers (price ticks, size micro-units, micro-USDC; see
+   ``shared.utils.fixed``); a check never merges defaults with overrides
+2. Exposure is read from the local order ledger, kept current by the user
+   channel, plus the notional of orders approved but not yet acknowledged
+3. The order rate is limited by an inline token bucket
+4. Prices must lie within a band around the live top of book
+5. Intents without a market are resolved to one from the token (learned
+   from market updates or the ledger) and rejected if it is unknown, so
+   per-market limits cannot be bypassed
+"""
+
+import logging
+import time
+from dataclasses import astuple, dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from shared.utils.fixed import ONE, notional, opt_ticks, to_notional, to_ticks, to_units
+
+from .executor import OrderIntent
+from .signing import BUY
+
+logger = logging.getLogger(__name__)
+
+# Reject reasons
+ORDER_SIZE = "order size limit"
+ORDER_NOTIONAL = "order notional limit"
+POSITION_LIMIT = "position limit"
+MARKET_NOTIONAL = "market notional limit"
+TOTAL_NOTIONAL = "total notional limit"
+ORDER_RATE = "order rate limit"
+PRICE_BAND = "price outside band"
+INVALID_PRICE = "invalid price"
+UNKNOWN_MARKET = "unknown market"
+KILL_SWITCH = "trading halted"
+
+
+@dataclass(frozen=True)
+class RiskLimits:
+    """Limits applied to a market."""
+    max_order_size: float = 1000.0  # shares
+    max_order_notional: float = 500.0  # USDC
+    max_position: float = 5000.0  # shares held of one token
+    max_market_notional: float = 2000.0  # USDC held or committed in one market
+    price_band: float = 0.05  # max distance through the opposite best price
+
+
+def _fixed_limits(limits: RiskLimits) -> Tuple[int, ...]:
+    """Convert limits to (size units, notional, position units, market notional, band ticks)."""
+    return (
+        to_units(limits.max_order_size),
+        to_notional(limits.max_order_notional),
+        to_units(limits.max_position),
+        to_notional(limits.max_market_notional),
+        to_ticks(limits.price_band),
+    )
+
+
+class RiskEngine:
+    """Constant-time pre-trade checks."""
+
+    def __init__(
+        self,
+        ledger: Any,
+        limits: Optional[RiskLimits] = None,
+        max_total_notional: float = 10000.0,  # USDC
+        max_orders_per_second: float = 20.0,
+        order_burst: float = 40.0
+    ):
+        """Initialize the risk engine.
+
+        Args:
+            ledger: Order ledger (``OrderLedger``) providing positions and exposure
+            limits: Default limits of every market
+            max_total_notional: Limit on exposure summed over all markets
+            max_orders_per_second: Sustained order rate
+            order_burst: Orders that may be sent at once
+        """
+        self.ledger = ledger
+        self.default_limits = limits or RiskLimits()
+        self.max_total_notional = max_total_notional
+        self._max_total_notional = to_notional(max_total_notional)
+        self.max_orders_per_second = max_orders_per_second
+        self.order_burst = order_burst
+        self.halted = False
+
+        self._default = _fixed_limits(self.default_limits)
+        self._limits: Dict[str, Tuple[int, ...]] = {}  # condition_id -> fixed-point limits tuple
+        self._tops: Dict[str, Tuple[Optional[int], Optional[int]]] = {}  # token_id -> (bid, ask) ticks
+        self._markets: Dict[str, str] = {}  # token_id -> condition_id
+        self._pending: Dict[str, int] = {}  # condition_id -> micro-USDC approved but not acknowledged
+        self._pending_total = 0
+        self._tokens = order_burst
+        self._last_refill = time.monotonic()
+
+    def set_market_limits(self, market: str, **overrides: float) -> None:
+        """Override limits of one market; unspecified limits keep the defaults."""
+        values = dict(zip(RiskLimits.__dataclass_fields__, astuple(self.default_limits)))
+        values.update(overrides)
+        self._limits[market] = _fixed_limits(RiskLimits(**values))
+
+    def set_token_market(self, token_id: str, market: str) -> None:
+        """Register the market (condition ID) of a token."""
+        self._markets[token_id] = market
+
+    def market_of(self, token_id: str) -> Optional[str]:
+        """Get the market of a token, from market updates or a position in the ledger."""
+        market = self._markets.get(token_id)
+        if market is None:
+            position = self.ledger.position(token_id)
+            if position is not None and position.market:
+                market = position.market
+        return market
+
+    def update_top(self, token_id: str, best_bid: Optional[float], best_ask: Optional[float]) -> None:
+        """Update the top of book of a token."""
+        self._tops[token_id] = (opt_ticks(best_bid), opt_ticks(best_ask))
+
+    def on_market_update(self, market_state: Any) -> None:
+        """Update tops from a ``MarketState``; usable as a market data callback.
+
+        The state holds the book of the first token; the second token of a
+        binary market trades at the complement.
+        """
+        bid, ask = opt_ticks(market_state.best_bid_price), opt_ticks(market_state.best_ask_price)
+        token_ids = market_state.token_ids
+        for token_id in token_ids:
+            self._markets[token_id] = market_state.condition_id
+        if token_ids:
+            self._tops[token_ids[0]] = (bid, ask)
+        if len(token_ids) == 2:
+            self._tops[token_ids[1]] = (
+                ONE - ask if ask is not None else None,
+                ONE - bid if bid is not None else None
+            )
+
+    def check(self, intent: OrderIntent) -> Optional[str]:
+        """Check an order; if it passes, its notional is reserved until released.
+
+        An intent without a market gets the market of its token, or is
+        rejected if that is unknown.
+
+        Returns:
+            Reject reason, or None if the order may be sent
+        """
+        if self.halted:
+            return KILL_SWITCH
+        if intent.market is None:
+            intent.market = self.market_of(intent.token_id)
+            if intent.market is None:
+                return UNKNOWN_MARKET
+
+        price = intent.price_ticks
+        size = intent.size_units
+        if not 0 < price < ONE or size <= 0:
+            return INVALID_PRICE
+
+        max_size, max_order_notional, max_position, max_market_notional, band = \
+            self._limits.get(intent.market, self._default)
+        order_notional = notional(price, size)
+        if size > max_size:
+            return ORDER_SIZE
+        if order_notional > max_order_notional:
+            return ORDER_NOTIONAL
+
+        is_buy = intent.side == BUY
+        top = self._tops.get(intent.token_id)
+        if top is not None:
+            if is_buy:
+                ask = top[1]
+                if ask is not None and price > ask + band:
+                    return PRICE_BAND
+            else:
+                bid = top[0]
+                if bid is not None and price < bid - band:
+                    return PRICE_BAND
+
+        if is_buy:
+            position = self.ledger.position(intent.token_id)
+            if position is not None and to_units(position.size) + size > max_position:
+                return POSITION_LIMIT
+            pending = self._pending.get(intent.market, 0)
+            if to_notional(self.ledger.exposure(intent.market).total) + pending + order_notional > max_market_notional:
+                return MARKET_NOTIONAL
+            if to_notional(self.ledger.total_exposure) + self._pending_total + order_notional > self._max_total_notional:
+                return TOTAL_NOTIONAL
+
+        now = time.monotonic()
+        self._tokens = min(self.order_burst, self._tokens + (now - self._last_refill) * self.max_orders_per_second)
+        self._last_refill = now
+        if self._tokens < 1.0:
+            return ORDER_RATE
+        self._tokens -= 1.0
+
+        if is_buy:
+            self._pending[intent.market] = self._pending.get(intent.market, 0) + order_notional
+            self._pending_total += order_notional
+        return None
+
+    def release(self, intent: OrderIntent) -> None:
+        """Release the reservation of an approved order once it is acknowledged or failed."""
+        if intent.side != BUY:
+            return
+        order_notional = notional(intent.price_ticks, intent.size_units)
+        remaining = self._pending.get(intent.market, 0) - order_notional
+        if remaining > 0:
+            self._pending[intent.market] = remaining
+        else:
+            self._pending.pop(intent.market, None)
+        self._pending_total = max(self._pending_total - order_notional, 0)
+
+    def halt(self) -> None:
+        """Reject all orders until resumed."""
+        self.halted = True
+        logger.warning("Trading halted by risk engine")
+
+    def resume(self) -> None:
+        """Accept orders again."""
+        self.halted = False
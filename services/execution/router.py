@@ -0,0 +1,227 @@
+"""
+Account Router
+
+Fan-out of order intents over several trading accounts. Each account is a
+full ExecutionService with its own signer, API credentials, order templates
+(and so nonces), ledger, risk limits and rate-limit scheduler; the router
+only decides which account sends each order:
+1. Intents naming an account go to that account
+2. Sells go to the account holding the largest position of the token
+3. Everything else goes to the account with the most order rate-limit
+   headroom left, so batches are spread over the accounts and their
+   requests are sent concurrently, each within its own limits
+4. The account of every acknowledged order is remembered so cancels reach
+   the account that placed it
+"""
+
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .executor import MAX_BATCH_SIZE, ExecutionReport, ExecutionService, OrderIntent
+from .signing import SELL, SigningPool
+
+
+class AccountRouter:
+    """Routes order intents across the execution services of several accounts."""
+
+    def __init__(
+        self,
+        services: Dict[str, ExecutionService],
+        signing_pool: Optional[SigningPool] = None,
+        max_tracked_orders: int = 100_000
+    ):
+        """Initialize the router.
+
+        Args:
+            services: Execution service of each account, by account name
+            signing_pool: Worker processes shared by the services to sign
+                batches; started and shut down with the router
+            max_tracked_orders: Order IDs remembered for routing cancels
+        """
+        if not services:
+            raise ValueError("At least one account is required")
+        self.services = services
+        self.signing_pool = signing_pool
+        self.max_tracked_orders = max_tracked_orders
+        self._owners: "OrderedDict[str, str]" = OrderedDict()  # order_id -> account
+        self.stats = {name: 0 for name in services}
+
+    async def start(self) -> None:
+        if self.signing_pool is not None:
+            await self.signing_pool.start()
+        await asyncio.gather(*(service.start() for service in self.services.values()))
+
+    async def stop(self) -> None:
+        await asyncio.gather(*(service.stop() for service in self.services.values()))
+        if self.signing_pool is not None:
+            self.signing_pool.shutdown()
+
+    async def prepare(self, token_ids: Sequence[str]) -> Dict[str, int]:
+        """Build the order templates of tokens on every account.
+
+        Returns:
+            Templates built per account
+        """
+        built = await asyncio.gather(*(service.prepare(token_ids) for service in self.services.values()))
+        return dict(zip(self.services, built))
+
+    def headroom(self) -> Dict[str, float]:
+        """Order requests each account could send right now."""
+        return {name: service.rest.headroom("order") for name, service in self.services.items()}
+
+    def route(self, intent: OrderIntent, budgets: Optional[Dict[str, float]] = None) -> str:
+        """Choose the account of an intent.
+
+        The chosen account is recorded on the intent when it is submitted.
+
+        Args:
+            intent: Order to route
+            budgets: Order headroom per account to choose from; read from the
+                schedulers if None
+
+        Raises:
+            KeyError: If the intent names an unknown account
+        """
+        name = self._bound(intent)
+        if name is not None:
+            return name
+        if budgets is None:
+            budgets = self.headroom()
+        return max(budgets, key=budgets.__getitem__)
+
+    def _bound(self, intent: OrderIntent) -> Optional[str]:
+        """Account an intent must go to (named, or holding the token it sells), if any."""
+        if intent.account is not None:
+            if intent.account not in self.services:
+                raise KeyError(f"Unknown account: {intent.account}")
+            return intent.account
+
+        if intent.side == SELL:
+            holders = []
+            for name, service in self.services.items():
+                position = service.ledger.position(intent.token_id) if service.ledger is not None else None
+                if position is not None and position.size > 0:
+                    holders.append((position.size, name))
+            if holders:
+                return max(holders)[1]
+        return None
+
+    def _track(self, name: str, reports: Sequence[ExecutionReport]) -> None:
+        for report in reports:
+            if report.order_id:
+                self._owners[report.order_id] = name
+                if len(self._owners) > self.max_tracked_orders:
+                    self._owners.popitem(last=False)
+        self.stats[name] += len(reports)
+
+    async def submit(self, intent: OrderIntent) -> ExecutionReport:
+        """Route and submit a single order."""
+        try:
+            name = self.route(intent)
+        except KeyError as e:
+            return ExecutionReport(intent, success=False, error=str(e.args[0]))
+        intent.account = name
+        report = await self.services[name].submit(intent)
+        self._track(name, [report])
+        return report
+
+    async def submit_batch(self, intents: Sequence[OrderIntent]) -> List[ExecutionReport]:
+        """Split orders over the accounts and submit each account's share concurrently.
+
+        Intents bound to an account (named, or sells of a held token) are
+        charged to its headroom first, so the rest are routed around them.
+
+        Returns:
+            Reports in the order of the intents
+        """
+        budgets = self.headroom()
+        groups: Dict[str, List[OrderIntent]] = {}
+        reports: List[ExecutionReport] = []
+        bound: List[Tuple[OrderIntent, Optional[str]]] = []
+        free: List[Tuple[OrderIntent, Optional[str]]] = []
+        for intent in intents:
+            try:
+                name = self._bound(intent)
+            except KeyError as e:
+                reports.append(ExecutionReport(intent, success=False, error=str(e.args[0])))
+                continue
+            (free if name is None else bound).append((intent, name))
+
+        for intent, name in bound + free:
+            if name is None:
+                name = max(budgets, key=budgets.__getitem__)
+            intent.account = name
+            groups.setdefault(name, []).append(intent)
+            # Every MAX_BATCH_SIZE orders of an account cost it one request
+            budgets[name] -= 1 / MAX_BATCH_SIZE
+
+        names = list(groups)
+        results = await asyncio.gather(*(self.services[name].submit_batch(groups[name]) for name in names))
+        for name, group_reports in zip(names, results):
+            self._track(name, group_reports)
+            reports.extend(group_reports)
+
+        position = {id(intent): i for i, intent in enumerate(intents)}
+        return sorted(reports, key=lambda report: position[id(report.intent)])
+
+    def owner(self, order_id: str) -> str:
+        """Get the account that placed an order.
+
+        Raises:
+            KeyError: If no account is known to have placed it
+        """
+        name = self._owners.get(order_id)
+        if name is not None:
+            return name
+        for name, service in self.services.items():
+            if service.ledger is not None and service.ledger.get_order(order_id) is not None:
+                return name
+        if len(self.services) == 1:
+            return next(iter(self.services))
+        raise KeyError(f"Unknown order: {order_id}")
+
+    async def cancel(self, order_id: str) -> Any:
+        """Cancel an order through the account that placed it."""
+        return await self.services[self.owner(order_id)].cancel(order_id)
+
+    async def cancel_orders(self, order_ids: Sequence[str]) -> Dict[str, Any]:
+        """Cancel orders, one request per account, concurrently.
+
+        Returns:
+            Response of each account's cancel request, by account name
+        """
+        groups: Dict[str, List[str]] = {}
+        for order_id in order_ids:
+            groups.setdefault(self.owner(order_id), []).append(order_id)
+        names = list(groups)
+        responses = await asyncio.gather(*(self.services[name].cancel_orders(groups[name]) for name in names))
+        return dict(zip(names, responses))
+
+    def halt(self) -> None:
+        """Stop order submission on every account."""
+        for service in self.services.values():
+            if service.risk is not None:
+                service.risk.halt()
+
+    def resume(self) -> None:
+        for service in self.services.values():
+            if service.risk is not None:
+                service.risk.resume()
+
+    def update_top(
+        self,
+        token_id: str,
+        market: Optional[str],
+        best_bid: Optional[float],
+        best_ask: Optional[float]
+    ) -> None:
+        """Give every account's risk engine the market and top of book of a token."""
+        for service in self.services.values():
+            if service.risk is not None:
+                if market:
+                    service.risk.set_token_market(token_id, market)
+                service.risk.update_top(token_id, best_bid, best_ask)
+
+    def latency_stats(self) -> Dict[str, Dict[str, float]]:
+        return {name: service.latency_stats() for name, service in self.services.items()}
@@ -0,0 +1,136 @@
+"""
+User Channel Stream
+
+Authenticated client of the CLOB user WebSocket channel, which pushes
+``order`` (placement, update, cancellation) and ``trade`` events of our own
+account. Events are dispatched to a handler such as ``OrderLedger.handle``;
+after every reconnect an optional callback runs so missed events can be
+recovered through REST.
+"""
+
+import asyncio
+import json
+import logging
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
+
+import websockets
+
+if TYPE_CHECKING:
+    from py_clob_client.clob_types import ApiCreds
+
+logger = logging.getLogger(__name__)
+
+USER_CHANNEL_URL = "wss://ws-subscriptions-clob.polymarket.com/ws/user"
+
+
+class UserStream:
+    """Listens to the user channel and dispatches order and trade events."""
+
+    def __init__(
+        self,
+        creds: "ApiCreds",
+        handler: Callable[[Dict[str, Any]], Any],
+        on_reconnect: Optional[Callable[[], Awaitable[Any]]] = None,
+        markets: Optional[List[str]] = None,
+        url: str = USER_CHANNEL_URL,
+        ping_interval: float = 10.0,  # seconds
+        reconnect_delay: float = 1.0,  # seconds
+        max_reconnect_delay: float = 30.0  # seconds
+    ):
+        """Initialize the stream.
+
+        Args:
+            creds: API credentials of the account
+            handler: Called with every event dict
+            on_reconnect: Awaited after each reconnect, e.g. a REST reconciliation
+            markets: Condition IDs to filter on; all markets if None
+            url: User channel URL
+            ping_interval: Time between keep-alive pings (seconds)
+            reconnect_delay: Initial delay before reconnecting (seconds)
+            max_reconnect_delay: Maximum delay before reconnecting (seconds)
+        """
+        self.creds = creds
+        self.handler = handler
+        self.on_reconnect = on_reconnect
+        self.markets = markets or []
+        self.url = url
+        self.ping_interval = ping_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self.connected = False
+        self.reconnects = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def _subscription(self) -> str:
+        return json.dumps({
+            "auth": {
+                "apiKey": self.creds.api_key,
+                "secret": self.creds.api_secret,
+                "passphrase": self.creds.api_passphrase
+            },
+            "markets": self.markets,
+            "type": "user"
+        })
+
+    async def start(self) -> None:
+        """Start listening in the background."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop listening."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.connected = False
+
+    def dispatch(self, message: str) -> None:
+        """Decode a message and pass its events to the handler."""
+        if message == "PONG":
+            return
+        try:
+            data = json.loads(message)
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to decode user channel message: {e}")
+            return
+
+        for event in data if isinstance(data, list) else [data]:
+            try:
+                self.handler(event)
+            except Exception as e:
+                logger.error(f"Error handling user event {event.get('event_type')}: {e}")
+
+    async def _ping(self, ws: Any) -> None:
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await ws.send("PING")
+
+    async def _run(self) -> None:
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with websockets.connect(self.url, ping_interval=None) as ws:
+                    await ws.send(self._subscription())
+                    self.connected = True
+                    delay = self.reconnect_delay
+                    logger.info("Connected to user channel")
+
+                    if self.reconnects and self.on_reconnect is not None:
+                        await self.on_reconnect()
+
+                    pinger = asyncio.create_task(self._ping(ws))
+                    try:
+                        async for message in ws:
+                            self.dispatch(message)
+                    finally:
+                        pinger.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"User channel error: {e}")
+
+            self.connected = False
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
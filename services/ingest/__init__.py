@@ -2,6 +2,8 @@
 Market Data Ingestion Package
 """
 
+from .book import BookEngine, OrderBook
 from .market_data import MarketState, MarketDataService
+from .search import MarketSearchIndex
 
-__all__ = ['MarketState', 'MarketDataService']
+__all__ = ['BookEngine', 'OrderBook', 'MarketState', 'MarketDataService', 'MarketSearchIndex']
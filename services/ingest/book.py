@@ -0,0 +1,210 @@
+"""
+Order Book Engine
+
+Maintains the order books of every tracked token from REST snapshots and the
+market WebSocket channel:
+1. ``book`` messages (``l2_book`` events on the ingest bus) and REST
+   ``/book`` responses replace a book
+2. ``price_change`` messages update single levels in place
+3. Levels are kept in fixed point, integer price ticks to integer size
+   micro-units (see ``shared.utils.fixed``), so prices key and compare exactly
+4. The best bid and ask are cached and only recomputed when the best level
+   is removed, so top-of-book reads are O(1)
+5. Tokens whose top of book changed are collected in a dirty set that
+   consumers (e.g. the arbitrage scanner) drain to recompute incrementally
+"""
+
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from shared.utils.fixed import PRICE_SCALE, SIZE_SCALE, opt_price, opt_size, to_ticks, to_units
+
+logger = logging.getLogger(__name__)
+
+BID = "BUY"
+ASK = "SELL"
+
+# Market channel message types; ingest bus events carry theirs under "type"
+BOOK_EVENTS = ("book", "l2_book")
+PRICE_CHANGE = "price_change"
+
+
+def to_levels(levels: Iterable[Dict[str, Any]]) -> Dict[int, int]:
+    """Convert ``{"price", "size"}`` dicts to a ticks -> micro-units map without empty levels."""
+    result = {}
+    for level in levels:
+        size = to_units(level["size"])
+        if size > 0:
+            result[to_ticks(level["price"])] = size
+    return result
+
+
+class OrderBook:
+    """Price levels of one token, in fixed point (price ticks -> size micro-units).
+
+    ``best_bid``, ``best_ask``, their sizes, ``top()`` and ``levels()`` are
+    float views for consumers; the ``*_ticks`` accessors are exact.
+    """
+
+    __slots__ = ("token_id", "market", "bids", "asks", "best_bid_ticks", "best_ask_ticks", "timestamp")
+
+    def __init__(self, token_id: str, market: Optional[str] = None):
+        self.token_id = token_id
+        self.market = market
+        self.bids: Dict[int, int] = {}  # price ticks -> size micro-units
+        self.asks: Dict[int, int] = {}
+        self.best_bid_ticks: Optional[int] = None
+        self.best_ask_ticks: Optional[int] = None
+        self.timestamp = 0.0
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        return opt_price(self.best_bid_ticks)
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        return opt_price(self.best_ask_ticks)
+
+    @property
+    def best_bid_size(self) -> Optional[float]:
+        return opt_size(self.bids[self.best_bid_ticks]) if self.best_bid_ticks is not None else None
+
+    @property
+    def best_ask_size(self) -> Optional[float]:
+        return opt_size(self.asks[self.best_ask_ticks]) if self.best_ask_ticks is not None else None
+
+    def top_ticks(self) -> Tuple[Optional[int], Optional[int], Optional[int], Optional[int]]:
+        """Get (best_bid, best_bid_size, best_ask, best_ask_size) in ticks and micro-units."""
+        bid, ask = self.best_bid_ticks, self.best_ask_ticks
+        return (
+            bid,
+            self.bids[bid] if bid is not None else None,
+            ask,
+            self.asks[ask] if ask is not None else None,
+        )
+
+    def top(self) -> Tuple[Optional[float], Optional[float], Optional[float], Optional[float]]:
+        """Get (best_bid, best_bid_size, best_ask, best_ask_size)."""
+        return self.best_bid, self.best_bid_size, self.best_ask, self.best_ask_size
+
+    def replace(self, bids: Iterable[Dict[str, Any]], asks: Iterable[Dict[str, Any]]) -> None:
+        """Replace all levels from lists of ``{"price", "size"}`` dicts."""
+        self.bids = to_levels(bids)
+        self.asks = to_levels(asks)
+        self.best_bid_ticks = max(self.bids) if self.bids else None
+        self.best_ask_ticks = min(self.asks) if self.asks else None
+
+    def update(self, side: str, price: float, size: float) -> None:
+        """Set the size of one level; a size of 0 removes it."""
+        self.update_ticks(side, to_ticks(price), to_units(size))
+
+    def update_ticks(self, side: str, price: int, size: int) -> None:
+        """Set the size (micro-units) of the level at ``price`` ticks; 0 removes it."""
+        if side == BID:
+            levels = self.bids
+            if size > 0:
+                levels[price] = size
+                if self.best_bid_ticks is None or price > self.best_bid_ticks:
+                    self.best_bid_ticks = price
+            elif levels.pop(price, None) is not None and price == self.best_bid_ticks:
+                self.best_bid_ticks = max(levels) if levels else None
+        else:
+            levels = self.asks
+            if size > 0:
+                levels[price] = size
+                if self.best_ask_ticks is None or price < self.best_ask_ticks:
+                    self.best_ask_ticks = price
+            elif levels.pop(price, None) is not None and price == self.best_ask_ticks:
+                self.best_ask_ticks = min(levels) if levels else None
+
+    def level_arrays(self, side: str, depth: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Get (price ticks, size micro-units) int64 arrays from the best price outwards."""
+        levels = self.bids if side == BID else self.asks
+        prices = np.fromiter(levels.keys(), dtype=np.int64, count=len(levels))
+        sizes = np.fromiter(levels.values(), dtype=np.int64, count=len(levels))
+        order = np.argsort(-prices if side == BID else prices, kind="stable")[:depth]
+        return prices[order], sizes[order]
+
+    def levels(self, side: str, depth: Optional[int] = None) -> List[Tuple[float, float]]:
+        """Get (price, size) levels from the best price outwards."""
+        if side == BID:
+            ordered = sorted(self.bids.items(), reverse=True)
+        else:
+            ordered = sorted(self.asks.items())
+        if depth is not None:
+            ordered = ordered[:depth]
+        return [(price / PRICE_SCALE, size / SIZE_SCALE) for price, size in ordered]
+
+
+class BookEngine:
+    """Order books of all tracked tokens."""
+
+    def __init__(self):
+        self._books: Dict[str, OrderBook] = {}  # token_id -> OrderBook
+        self.dirty: Set[str] = set()  # tokens whose top of book changed
+        self.updates = 0
+
+    def book(self, token_id: str) -> Optional[OrderBook]:
+        """Get the book of a token."""
+        return self._books.get(token_id)
+
+    def _book(self, token_id: str, market: Optional[str]) -> OrderBook:
+        book = self._books.get(token_id)
+        if book is None:
+            book = OrderBook(token_id, market)
+            self._books[token_id] = book
+        elif market and not book.market:
+            book.market = market
+        return book
+
+    def apply_snapshot(self, token_id: str, data: Dict[str, Any], market: Optional[str] = None) -> OrderBook:
+        """Replace a book from a REST ``/book`` response or a ``book`` message."""
+        book = self._book(token_id, market or data.get("market"))
+        before = book.top_ticks()
+        book.replace(data.get("bids") or [], data.get("asks") or [])
+        book.timestamp = time.time()
+        if book.top_ticks() != before:
+            self.dirty.add(token_id)
+        self.updates += 1
+        return book
+
+    def apply_change(self, token_id: str, side: str, price: float, size: float, market: Optional[str] = None) -> None:
+        """Apply a single level change."""
+        book = self._book(token_id, market)
+        before = book.top_ticks()
+        book.update(side, price, size)
+        book.timestamp = time.time()
+        if book.top_ticks() != before:
+            self.dirty.add(token_id)
+        self.updates += 1
+
+    def handle(self, event: Dict[str, Any]) -> None:
+        """Apply a market channel message or ingest bus event (book or ``price_change``)."""
+        event_type = event.get("event_type") or event.get("type")
+        market = event.get("market")
+        if event_type in BOOK_EVENTS:
+            self.apply_snapshot(event.get("asset_id") or market, event, market)
+        elif event_type == PRICE_CHANGE:
+            # Current format lists changes of several assets, the legacy one of a single asset
+            for change in event.get("price_changes") or event.get("changes") or []:
+                self.apply_change(
+                    change.get("asset_id") or event["asset_id"],
+                    change["side"],
+                    float(change["price"]),
+                    float(change["size"]),
+                    market
+                )
+
+    def drain_dirty(self) -> Set[str]:
+        """Take the set of tokens whose top of book changed since the last call."""
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def __contains__(self, token_id: str) -> bool:
+        return token_id in self._books
+
+    def __len__(self) -> int:
+        return len(self._books)
@@ -0,0 +1,238 @@
+"""
+Book Store
+
+Compact order book history in Redis, replacing one JSON document per
+``l2_book`` event:
+1. Prices are stored as integer ticks of 1e-4 and sizes as integer
+   micro-units (see ``shared.utils.fixed``), packed into little-endian (uint16 price, int64 size) records
+2. Each record is a binary frame: a header (timestamp in ms, sequence
+   number, bid and ask counts) followed by the bid and ask records
+3. Per book (market and asset) a full snapshot frame is stored every
+   ``snapshot_every`` updates or ``snapshot_interval`` seconds; in between
+   only the changed levels are stored as delta frames (size 0 removes a
+   level)
+4. Frames go to two sorted sets scored by timestamp,
+   ``book:<market>:<asset>:snapshots`` and ``book:<market>:<asset>:deltas``,
+   written in batches through one pipeline per flush and trimmed to the
+   retention window
+5. A book at any timestamp is rebuilt from the nearest earlier snapshot and
+   the deltas after it (by sequence number) up to that timestamp
+"""
+
+import asyncio
+import logging
+import struct
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from shared.utils.fixed import PRICE_SCALE, SIZE_SCALE
+
+from .book import to_levels
+
+logger = logging.getLogger(__name__)
+
+LEVEL = np.dtype([("price", "<u2"), ("size", "<i8")])
+_HEADER = struct.Struct("<qIHH")  # timestamp ms, sequence, bid count, ask count
+
+Levels = Dict[int, int]  # price ticks -> size micro-units
+
+
+def diff_levels(before: Levels, after: Levels) -> Levels:
+    """Get the levels that changed, with size 0 for removed ones."""
+    changed = {price: size for price, size in after.items() if before.get(price) != size}
+    changed.update({price: 0 for price in before.keys() - after.keys()})
+    return changed
+
+
+def _pack(levels: Levels) -> bytes:
+    records = np.empty(len(levels), dtype=LEVEL)
+    if levels:
+        records["price"] = list(levels.keys())
+        records["size"] = list(levels.values())
+    return records.tobytes()
+
+
+def encode_frame(timestamp_ms: int, sequence: int, bids: Levels, asks: Levels) -> bytes:
+    """Encode a snapshot or delta frame."""
+    return _HEADER.pack(timestamp_ms, sequence, len(bids), len(asks)) + _pack(bids) + _pack(asks)
+
+
+def decode_frame(frame: bytes) -> Tuple[int, int, np.ndarray, np.ndarray]:
+    """Decode a frame into (timestamp ms, sequence, bid records, ask records)."""
+    timestamp_ms, sequence, bid_count, ask_count = _HEADER.unpack_from(frame)
+    records = np.frombuffer(frame, dtype=LEVEL, offset=_HEADER.size, count=bid_count + ask_count)
+    return timestamp_ms, sequence, records[:bid_count], records[bid_count:]
+
+
+def apply_records(levels: Levels, records: np.ndarray) -> None:
+    for price, size in zip(records["price"].tolist(), records["size"].tolist()):
+        if size > 0:
+            levels[price] = size
+        else:
+            levels.pop(price, None)
+
+
+def rebuild(snapshot: bytes, deltas: Iterable[bytes]) -> Dict[str, Any]:
+    """Rebuild a book from a snapshot frame and the delta frames stored after it."""
+    timestamp_ms, sequence, bid_records, ask_records = decode_frame(snapshot)
+    bids: Levels = {}
+    asks: Levels = {}
+    apply_records(bids, bid_records)
+    apply_records(asks, ask_records)
+    for frame in sorted((decode_frame(delta) for delta in deltas), key=lambda d: d[1]):
+        if frame[1] <= sequence:
+            continue  # stored before the snapshot in the same millisecond
+        timestamp_ms, sequence, bid_records, ask_records = frame
+        apply_records(bids, bid_records)
+        apply_records(asks, ask_records)
+    return {
+        "timestamp": timestamp_ms,
+        "sequence": sequence,
+        "bids": [{"price": p / PRICE_SCALE, "size": s / SIZE_SCALE} for p, s in sorted(bids.items(), reverse=True)],
+        "asks": [{"price": p / PRICE_SCALE, "size": s / SIZE_SCALE} for p, s in sorted(asks.items())],
+    }
+
+
+def book_key(market: str, asset_id: Optional[str] = None) -> str:
+    return f"book:{market}:{asset_id or market}"
+
+
+def event_timestamp_ms(event: Dict[str, Any]) -> int:
+    """Event timestamp in milliseconds (accepts seconds), or now."""
+    timestamp = event.get("timestamp")
+    if timestamp is None:
+        return int(time.time() * 1000)
+    timestamp = float(timestamp)
+    return int(timestamp if timestamp > 1e11 else timestamp * 1000)
+
+
+class _BookState:
+    __slots__ = ("bids", "asks", "sequence", "since_snapshot", "snapshot_ms")
+
+    def __init__(self):
+        self.bids: Levels = {}
+        self.asks: Levels = {}
+        self.sequence = 0
+        self.since_snapshot = 0
+        self.snapshot_ms = 0
+
+
+class BookStore:
+    """Records ``l2_book`` events as snapshots plus deltas and rebuilds books."""
+
+    def __init__(
+        self,
+        redis,
+        snapshot_every: int = 100,
+        snapshot_interval: float = 300.0,
+        retention: float = 86400.0,
+        flush_interval: float = 1.0,
+    ):
+        """Initialize the store.
+
+        Args:
+            redis: Async Redis client (may be set after construction)
+            snapshot_every: Deltas stored between full snapshots of a book
+            snapshot_interval: Seconds after which a snapshot is stored anyway
+            retention: Seconds of history kept
+            flush_interval: Seconds between batched writes
+        """
+        self.redis = redis
+        self.snapshot_every = snapshot_every
+        self.snapshot_interval_ms = int(snapshot_interval * 1000)
+        self.retention_ms = int(retention * 1000)
+        self.flush_interval = flush_interval
+        self._books: Dict[str, _BookState] = {}
+        self._pending: List[Tuple[str, int, bytes]] = []  # (sorted set key, timestamp ms, frame)
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"events": 0, "snapshots": 0, "deltas": 0, "unchanged": 0, "bytes": 0}
+
+    def record(self, event: Dict[str, Any]) -> None:
+        """Queue the frame for a full-book event: a snapshot when due, else a delta."""
+        key = book_key(event.get("market", "unknown"), event.get("asset_id"))
+        timestamp_ms = event_timestamp_ms(event)
+        bids = to_levels(event.get("bids") or [])
+        asks = to_levels(event.get("asks") or [])
+        state = self._books.get(key)
+        if state is None:
+            state = self._books[key] = _BookState()
+        self.stats["events"] += 1
+
+        snapshot_due = (
+            state.sequence == 0
+            or state.since_snapshot >= self.snapshot_every
+            or timestamp_ms - state.snapshot_ms >= self.snapshot_interval_ms
+        )
+        if snapshot_due:
+            state.sequence += 1
+            frame = encode_frame(timestamp_ms, state.sequence, bids, asks)
+            self._pending.append((f"{key}:snapshots", timestamp_ms, frame))
+            state.since_snapshot = 0
+            state.snapshot_ms = timestamp_ms
+            self.stats["snapshots"] += 1
+        else:
+            bid_changes = diff_levels(state.bids, bids)
+            ask_changes = diff_levels(state.asks, asks)
+            if not bid_changes and not ask_changes:
+                self.stats["unchanged"] += 1
+                return
+            state.sequence += 1
+            frame = encode_frame(timestamp_ms, state.sequence, bid_changes, ask_changes)
+            self._pending.append((f"{key}:deltas", timestamp_ms, frame))
+            state.since_snapshot += 1
+            self.stats["deltas"] += 1
+        state.bids, state.asks = bids, asks
+        self.stats["bytes"] += len(frame)
+
+    async def flush(self) -> None:
+        """Write the queued frames and trim history past the retention window."""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        cutoff = max(timestamp for _, timestamp, _ in pending) - self.retention_ms
+        pipe = self.redis.pipeline(transaction=False)
+        for key, timestamp_ms, frame in pending:
+            pipe.zadd(key, {frame: timestamp_ms})
+        for key in {key for key, _, _ in pending}:
+            pipe.zremrangebyscore(key, "-inf", f"({cutoff}")
+            pipe.pexpire(key, self.retention_ms)
+        await pipe.execute()
+
+    async def book_at(self, market: str, timestamp_ms: int, asset_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Rebuild a book as it was at ``timestamp_ms``, or None without an earlier snapshot."""
+        key = book_key(market, asset_id)
+        snapshots = await self.redis.zrevrangebyscore(f"{key}:snapshots", timestamp_ms, "-inf", start=0, num=1, withscores=True)
+        if not snapshots:
+            return None
+        snapshot, snapshot_ms = snapshots[0]
+        deltas = await self.redis.zrangebyscore(f"{key}:deltas", int(snapshot_ms), timestamp_ms)
+        return rebuild(snapshot, deltas)
+
+    @property
+    def books(self) -> int:
+        return len(self._books)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to store order books: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write what is still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
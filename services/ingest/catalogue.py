@@ -0,0 +1,209 @@
+"""
+Market Catalogue
+
+Persistent local catalogue of market metadata keyed by condition ID. The
+catalogue remembers when each market was first/last seen and last modified,
+plus the pagination cursor of the last crawl, so that:
+1. Services start from the on-disk catalogue instead of a full API crawl
+2. Metadata syncs resume from the last cursor and only pick up new markets
+3. Full re-crawls (to refresh closed/resolved flags) run on a slow cadence;
+   a crawl longer than one sync resumes from its own persisted cursor until
+   it reaches the last page
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+START_CURSOR = "MA=="
+END_CURSOR = "LTE="
+
+
+def market_condition_id(market: Dict[str, Any]) -> Optional[str]:
+    """Get the condition ID of a raw market, accepting CLOB and Gamma field names."""
+    return market.get('condition_id') or market.get('conditionId')
+
+
+def market_token_ids(market: Dict[str, Any]) -> List[str]:
+    """Get the outcome token IDs of a raw market."""
+    token_ids = []
+    for token in market.get('tokens', []):
+        token_id = token.get('token_id') or token.get('id')
+        if token_id:
+            token_ids.append(token_id)
+    return token_ids
+
+
+def _digest(market: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(market, sort_keys=True, default=str).encode()).hexdigest()
+
+
+@dataclass
+class CatalogueEntry:
+    """Metadata of a single market in the catalogue."""
+    condition_id: str
+    data: Dict[str, Any]
+    digest: str
+    first_seen: float
+    last_seen: float
+    modified: float
+
+
+class MarketCatalogue:
+    """Catalogue of known markets, optionally persisted to a JSON file."""
+
+    def __init__(self, path: Optional[Path] = None):
+        """Initialize the catalogue.
+
+        Args:
+            path: File to persist the catalogue to; kept in memory only if None
+        """
+        self.path = Path(path) if path else None
+        self.cursor: str = START_CURSOR  # cursor of the last page crawled
+        self.full_cursor: Optional[str] = None  # where an unfinished full crawl resumes
+        self.last_sync: float = 0.0
+        self.last_full_sync: float = 0.0
+        self.version: int = 0  # bumped whenever an entry is added or modified
+
+        self._entries: Dict[str, CatalogueEntry] = {}
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, condition_id: str) -> bool:
+        return condition_id in self._entries
+
+    def get(self, condition_id: str) -> Optional[CatalogueEntry]:
+        """Get a catalogue entry by condition ID."""
+        return self._entries.get(condition_id)
+
+    def entries(self) -> List[CatalogueEntry]:
+        """Get all catalogue entries."""
+        return list(self._entries.values())
+
+    def upsert(self, market: Dict[str, Any], seen_at: Optional[float] = None) -> bool:
+        """Add or refresh a raw market.
+
+        Args:
+            market: Raw market as returned by the markets endpoint
+            seen_at: Timestamp the market was seen at (defaults to now)
+
+        Returns:
+            True if the market is new or its metadata changed
+        """
+        condition_id = market_condition_id(market)
+        if not condition_id:
+            logger.warning("Market missing condition_id")
+            return False
+
+        now = seen_at if seen_at is not None else time.time()
+        digest = _digest(market)
+        entry = self._entries.get(condition_id)
+        self._dirty = True
+
+        if entry is None:
+            self._entries[condition_id] = CatalogueEntry(
+                condition_id=condition_id,
+                data=market,
+                digest=digest,
+                first_seen=now,
+                last_seen=now,
+                modified=now
+            )
+        elif entry.digest != digest:
+            entry.data = market
+            entry.digest = digest
+            entry.last_seen = now
+            entry.modified = now
+        else:
+            entry.last_seen = now
+            return False
+
+        self.version += 1
+        return True
+
+    def record_sync(
+        self,
+        cursor: str,
+        full: bool = False,
+        complete: bool = False,
+        synced_at: Optional[float] = None
+    ) -> None:
+        """Remember where a sync stopped so the next one can resume there.
+
+        Args:
+            cursor: Cursor of the last page crawled
+            full: Whether the sync was part of a full crawl
+            complete: Whether the sync reached the last page
+            synced_at: Timestamp of the sync (defaults to now)
+        """
+        now = synced_at if synced_at is not None else time.time()
+        self.last_sync = now
+        if not full:
+            self.cursor = cursor
+        elif complete:
+            # Incremental syncs continue from the last page of the finished crawl
+            self.cursor = cursor
+            self.full_cursor = None
+            self.last_full_sync = now
+        else:
+            self.full_cursor = cursor
+        self._dirty = True
+
+    def load(self) -> int:
+        """Load the catalogue from disk.
+
+        Returns:
+            Number of markets loaded
+        """
+        if self.path is None or not self.path.exists():
+            return 0
+
+        try:
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load market catalogue from {self.path}: {e}")
+            return 0
+
+        self.cursor = state.get('cursor', START_CURSOR)
+        self.full_cursor = state.get('full_cursor')
+        self.last_sync = state.get('last_sync', 0.0)
+        self.last_full_sync = state.get('last_full_sync', 0.0)
+        self._entries = {
+            entry['condition_id']: CatalogueEntry(**entry)
+            for entry in state.get('markets', [])
+        }
+        self.version += 1
+        self._dirty = False
+
+        logger.info(f"Loaded {len(self._entries)} markets from catalogue {self.path}")
+        return len(self._entries)
+
+    def save(self) -> None:
+        """Write the catalogue to disk if it changed since the last save."""
+        if self.path is None or not self._dirty:
+            return
+
+        state = {
+            'cursor': self.cursor,
+            'full_cursor': self.full_cursor,
+            'last_sync': self.last_sync,
+            'last_full_sync': self.last_full_sync,
+            'markets': [asdict(entry) for entry in self._entries.values()]
+        }
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+        self._dirty = False
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import Dict, List
 from pydantic_settings import BaseSettings
 
@@ -20,6 +21,19 @@ class IngestConfig(BaseSettings):
     RECONNECT_DELAY: int = 5  # segundos
     MAX_RECONNECT_ATTEMPTS: int = 10
     
+    # Conflación de actualizaciones de estado para consumidores no críticos en latencia
+    CONFLATION_WINDOW: float = 0.25  # segundos; 0 desactiva la conflación
+    CONFLATION_CHANNELS: List[str] = ["l2_book", "price_change", "ticker", "markets"]
+    
+    # Historial de libros: snapshots completos periódicos y deltas binarios entre ellos
+    BOOK_SNAPSHOT_EVERY: int = 100  # deltas entre snapshots
+    BOOK_SNAPSHOT_INTERVAL: float = 300.0  # segundos máximos entre snapshots
+    BOOK_RETENTION: float = 86400.0  # segundos
+    BOOK_FLUSH_INTERVAL: float = 1.0  # segundos entre escrituras en lote
+    
+    # Guardar los eventos conflacionados en Redis (historial de /events); el modo todo-en-uno lo desactiva
+    STORE_EVENTS: bool = True
+    
     # Configuración de logging
     LOG_LEVEL: str = "INFO"
     LOG_FORMAT: str = "{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}"
@@ -30,11 +44,24 @@ class IngestConfig(BaseSettings):
         "subscribe",
         "unsubscribe",
         "l2_book",
+        "price_change",
         "trades",
         "ticker",
         "markets",
         "error"
     ]
     
+    # Ingesta de noticias: "rss:<url>", "http(s)://<url>" (JSON) o "file:<ruta .jsonl>"
+    NEWS_SOURCES: List[str] = []
+    NEWS_MIN_SCORE: float = 0.45  # puntuación mínima para vincular una noticia a un mercado
+    NEWS_CATALOGUE_PATH: str = "./data/catalogue/markets.json"
+    NEWS_CATALOGUE_REFRESH: int = 300  # segundos
+    EMBEDDING_CACHE_PATH: str = "./data/vector_db"
+    
     class Config:
-        env_prefix = "INGEST_" 
\ No newline at end of file
+        env_prefix = "INGEST_" 
+
+@lru_cache(maxsize=None)
+def get_config() -> IngestConfig:
+    """Configuración de la ingesta, leída del entorno una sola vez."""
+    return IngestConfig()
@@ -0,0 +1,169 @@
+"""
+Conflation
+
+Collapses bursts of state updates for consumers that only need the latest
+state (API, dashboards, analysis, event storage):
+1. Updates on conflated channels (book, price change, ticker, market info)
+   are held per (market, channel, asset):
+   - full ``l2_book`` snapshots replace the pending one outright and
+     supersede the pending price changes of their asset
+   - ``price_change`` events are split per asset and their level changes
+     merged (the latest size of each side and price wins); while a
+     snapshot of the asset is pending they are applied to it instead
+   - partial ticker and market updates are merged field by field, so later
+     fields win and fields missing from an update are kept
+2. Every window the pending updates are emitted in arrival order; a burst of
+   N updates for one book becomes a single message with its final state
+3. Events on other channels (trades) are not state and are emitted at once
+4. Latency-critical consumers keep reading the raw stream, which is
+   published before conflation and is unaffected by it
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from shared.utils.fixed import to_ticks
+
+from .book import BID, PRICE_CHANGE
+
+logger = logging.getLogger(__name__)
+
+BOOK = "l2_book"
+DEFAULT_CHANNELS = (BOOK, PRICE_CHANGE, "ticker", "markets")
+
+Key = Tuple[str, str, str]
+
+
+def _split_changes(event: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Split a ``price_change`` event into one event per asset, each with a ``price_changes`` list."""
+    by_asset: Dict[str, List[Dict[str, Any]]] = {}
+    for change in event.get("price_changes") or event.get("changes") or []:
+        asset = change.get("asset_id") or event.get("asset_id")
+        by_asset.setdefault(asset, []).append({**change, "asset_id": asset})
+    base = {k: v for k, v in event.items() if k not in ("price_changes", "changes")}
+    return [{**base, "asset_id": asset, "price_changes": changes} for asset, changes in by_asset.items()]
+
+
+def _apply_change(book: Dict[str, Any], change: Dict[str, Any]) -> None:
+    """Apply a level change to a pending ``l2_book`` snapshot (size 0 removes the level)."""
+    side = "bids" if change["side"] == BID else "asks"
+    price = to_ticks(change["price"])
+    levels = [level for level in book.get(side) or [] if to_ticks(level["price"]) != price]
+    if float(change["size"]) > 0:
+        levels.append({"price": change["price"], "size": change["size"]})
+        levels.sort(key=lambda level: float(level["price"]), reverse=side == "bids")
+    book[side] = levels
+
+
+class Conflator:
+    """Keeps the latest update per (market, channel, asset) and emits them every window."""
+
+    def __init__(
+        self,
+        emit: Callable[[Dict[str, Any]], Awaitable[None]],
+        window: float = 0.25,
+        channels: Iterable[str] = DEFAULT_CHANNELS,
+    ):
+        """Initialize the conflator.
+
+        Args:
+            emit: Coroutine called with each conflated or passed-through event
+            window: Seconds between flushes of the pending updates
+            channels: Event types to conflate; other types are emitted at once
+        """
+        self.emit = emit
+        self.window = window
+        self.channels = set(channels)
+        self._pending: Dict[Key, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"received": 0, "conflated": 0, "emitted": 0}
+
+    def key(self, event: Dict[str, Any]) -> Optional[Key]:
+        """Get the conflation key of an event, or None if it must not be conflated."""
+        event_type = event.get("type")
+        if event_type not in self.channels:
+            return None
+        return str(event.get("market")), event_type, str(event.get("asset_id", ""))
+
+    async def add(self, event: Dict[str, Any]) -> None:
+        """Hold a state update until the next flush, or emit any other event now."""
+        self.stats["received"] += 1
+        key = self.key(event)
+        if key is None or self.window <= 0:
+            await self._emit(event)
+            return
+        if key[1] == PRICE_CHANGE:
+            for asset_event in _split_changes(event):
+                self._add_changes(asset_event)
+            return
+        pending = self._pending.get(key)
+        if key[1] == BOOK:
+            # A snapshot is the whole book: it replaces the pending one and the changes before it
+            self._pending.pop((key[0], PRICE_CHANGE, key[2]), None)
+            self._pending[key] = dict(event)
+        elif pending is None:
+            self._pending[key] = dict(event)
+        else:
+            pending.update(event)
+        if pending is not None:
+            self.stats["conflated"] += 1
+
+    def _add_changes(self, event: Dict[str, Any]) -> None:
+        """Merge the level changes of one asset into its pending snapshot or changes."""
+        market, asset = str(event.get("market")), str(event.get("asset_id", ""))
+        book = self._pending.get((market, BOOK, asset))
+        if book is not None:
+            for change in event["price_changes"]:
+                _apply_change(book, change)
+            book.pop("hash", None)  # no longer the hash of these levels
+            if "timestamp" in event:
+                book["timestamp"] = event["timestamp"]
+            self.stats["conflated"] += 1
+            return
+        key = (market, PRICE_CHANGE, asset)
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = event
+            return
+        changes = {(change["side"], to_ticks(change["price"])): change for change in pending["price_changes"]}
+        changes.update(((change["side"], to_ticks(change["price"])), change) for change in event["price_changes"])
+        pending.update(event, price_changes=list(changes.values()))
+        self.stats["conflated"] += 1
+
+    async def flush(self) -> None:
+        """Emit the pending updates in the order they first arrived."""
+        pending, self._pending = self._pending, {}
+        for event in pending.values():
+            await self._emit(event)
+
+    async def _emit(self, event: Dict[str, Any]) -> None:
+        self.stats["emitted"] += 1
+        try:
+            await self.emit(event)
+        except Exception as e:
+            logger.error(f"Failed to emit conflated event: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.window)
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None and self.window > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop flushing and emit whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
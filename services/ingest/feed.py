@@ -0,0 +1,198 @@
+"""
+Market Feed
+
+Delta-compressed live market feed for browser clients:
+1. MarketDataService callbacks (fired by the ingest stream, or the REST
+   price loop) update a compact per-market field table (top of book, last
+   price, 24h volume) and bump the market's version
+2. Each client subscribes to the markets it shows and first receives a
+   snapshot of them
+3. A per-client flush loop runs at a fixed rate (4 Hz by default) and sends
+   only the fields that changed since that client's last flush, so bursts
+   of updates between flushes coalesce into one message
+
+Messages are compact JSON:
+    {"type": "snapshot", "markets": {"<id>": {"q": "...", "b": 0.51, ...}}}
+    {"type": "delta", "markets": {"<id>": {"b": 0.52}}}
+    {"type": "error", "error": "..."}  (for an invalid client request)
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+
+from .market_data import MarketState
+
+logger = logging.getLogger(__name__)
+
+# Field key -> MarketState attribute
+FIELDS: Dict[str, str] = {
+    "b": "best_bid_price",
+    "bs": "best_bid_size",
+    "a": "best_ask_price",
+    "as": "best_ask_size",
+    "l": "last_price",
+    "v": "volume_24h",
+}
+
+MAX_RATE = 20.0  # flushes per second
+MAX_MARKETS_PER_CLIENT = 500
+OPS = ("subscribe", "unsubscribe", "set")
+
+
+def _dumps(message: Dict[str, Any]) -> str:
+    return json.dumps(message, separators=(",", ":"))
+
+
+class FeedClient:
+    """One connected client: its markets and the values it was last sent."""
+
+    def __init__(self, feed: "MarketFeed", send: Callable[[str], Awaitable[None]], rate: float):
+        self.feed = feed
+        self.send = send
+        self.interval = 1.0 / min(max(rate, 0.1), MAX_RATE)
+        self.markets: Set[str] = set()
+        self._sent: Dict[str, Dict[str, Any]] = {}  # market -> fields last sent
+        self._versions: Dict[str, int] = {}  # market -> version last sent
+        self.messages = 0
+        self.bytes = 0
+
+    async def _send(self, message: Dict[str, Any]) -> None:
+        text = _dumps(message)
+        self.messages += 1
+        self.bytes += len(text)
+        await self.send(text)
+
+    async def subscribe(self, markets: Iterable[str]) -> None:
+        """Add markets and send their snapshot."""
+        new = [m for m in markets if m not in self.markets][:MAX_MARKETS_PER_CLIENT - len(self.markets)]
+        if not new:
+            return
+        self.markets.update(new)
+        snapshot = {}
+        for market in new:
+            fields = self.feed.fields(market)
+            if fields is None:
+                continue
+            self._sent[market] = dict(fields)
+            self._versions[market] = self.feed.version(market)
+            snapshot[market] = {"q": self.feed.question(market), **fields}
+        await self._send({"type": "snapshot", "markets": snapshot})
+
+    def unsubscribe(self, markets: Iterable[str]) -> None:
+        for market in markets:
+            self.markets.discard(market)
+            self._sent.pop(market, None)
+            self._versions.pop(market, None)
+
+    async def handle_text(self, text: str) -> None:
+        """Apply a raw client request, answering an error message if it is invalid."""
+        try:
+            message = json.loads(text)
+        except ValueError:
+            await self._send({"type": "error", "error": "Invalid JSON"})
+            return
+        if (
+            not isinstance(message, dict)
+            or message.get("op") not in OPS
+            or not isinstance(message.get("markets", []), list)
+        ):
+            await self._send({"type": "error", "error": f"Expected an object with an op in {list(OPS)} and a markets list"})
+            return
+        await self.handle(message)
+
+    async def handle(self, message: Dict[str, Any]) -> None:
+        """Apply a client request: subscribe, unsubscribe or set (replace) markets."""
+        op = message.get("op")
+        markets = [str(m) for m in message.get("markets", [])]
+        if op == "subscribe":
+            await self.subscribe(markets)
+        elif op == "unsubscribe":
+            self.unsubscribe(markets)
+        elif op == "set":
+            self.unsubscribe(self.markets - set(markets))
+            await self.subscribe(markets)
+
+    def delta(self) -> Optional[Dict[str, Any]]:
+        """Build the changes since the last flush, or None if nothing changed."""
+        changes = {}
+        for market in self.markets:
+            version = self.feed.version(market)
+            if version == self._versions.get(market):
+                continue
+            self._versions[market] = version
+            fields = self.feed.fields(market) or {}
+            sent = self._sent.setdefault(market, {})
+            changed = {key: value for key, value in fields.items() if sent.get(key) != value}
+            changed.update({key: None for key in sent.keys() - fields.keys() if sent[key] is not None})
+            if changed:
+                sent.update(changed)
+                changes[market] = changed
+        return {"type": "delta", "markets": changes} if changes else None
+
+    async def run(self) -> None:
+        """Flush deltas at the client's rate until cancelled."""
+        while True:
+            await asyncio.sleep(self.interval)
+            message = self.delta()
+            if message is not None:
+                await self._send(message)
+
+
+class MarketFeed:
+    """Latest compact market fields and the clients subscribed to them."""
+
+    def __init__(self, rate: float = 4.0, precision: int = 4):
+        """Initialize the feed.
+
+        Args:
+            rate: Default flushes per second per client
+            precision: Decimals kept for prices and sizes; smaller moves are not sent
+        """
+        self.rate = rate
+        self.precision = precision
+        self._fields: Dict[str, Dict[str, Any]] = {}
+        self._questions: Dict[str, str] = {}
+        self._versions: Dict[str, int] = {}
+        self.clients: Set[FeedClient] = set()
+
+    def fields(self, market: str) -> Optional[Dict[str, Any]]:
+        return self._fields.get(market)
+
+    def version(self, market: str) -> int:
+        return self._versions.get(market, 0)
+
+    def question(self, market: str) -> str:
+        return self._questions.get(market, "")
+
+    def on_market_update(self, market: MarketState) -> None:
+        """MarketDataService callback recording the latest fields of a market."""
+        fields = {}
+        for key, attribute in FIELDS.items():
+            value = getattr(market, attribute)
+            if value is not None:
+                fields[key] = round(float(value), self.precision)
+        condition_id = market.condition_id
+        if fields != self._fields.get(condition_id):
+            self._fields[condition_id] = fields
+            self._versions[condition_id] = self._versions.get(condition_id, 0) + 1
+        if condition_id not in self._questions:
+            self._questions[condition_id] = market.question
+
+    def connect(self, send: Callable[[str], Awaitable[None]], rate: Optional[float] = None) -> FeedClient:
+        """Register a client sending text messages through ``send``."""
+        client = FeedClient(self, send, rate or self.rate)
+        self.clients.add(client)
+        return client
+
+    def disconnect(self, client: FeedClient) -> None:
+        self.clients.discard(client)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "markets": len(self._fields),
+            "clients": len(self.clients),
+            "messages": sum(client.messages for client in self.clients),
+            "bytes": sum(client.bytes for client in self.clients),
+        }
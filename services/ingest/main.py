@@ -1,48 +1,135 @@
 import asyncio
-from typing import Dict, Any
+import time
+from typing import Dict, Any, List, Optional
 from fastapi import FastAPI, WebSocket, HTTPException
 from loguru import logger
-from .config import IngestConfig
+from llm.embeddings import EmbeddingService
+from services.api.cache import MarketStore
+from shared.interfaces import Message, UnixSocketBroker, UnixSocketBus, create_bus, topic
+from .bookstore import BookStore
+from .catalogue import MarketCatalogue
+from .conflation import Conflator
+from .config import get_config
+from .news import NewsIngestor, NewsMatcher, source_from_spec
 from .websocket import PolymarketWebSocket
 from .storage import EventStorage
 
-# Configurar logger
-logger.add(
-    "data/logs/ingest.log",
-    rotation="1 day",
-    level=IngestConfig().LOG_LEVEL,
-    format=IngestConfig().LOG_FORMAT
-)
-
 app = FastAPI(title="Polybot Ingest Service")
 
 # Instancias globales
-config = IngestConfig()
+config = get_config()
 websocket_client = PolymarketWebSocket(config)
 event_storage = EventStorage(config)
+book_store = BookStore(
+    None,
+    snapshot_every=config.BOOK_SNAPSHOT_EVERY,
+    snapshot_interval=config.BOOK_SNAPSHOT_INTERVAL,
+    retention=config.BOOK_RETENTION,
+    flush_interval=config.BOOK_FLUSH_INTERVAL,
+)
+bus = create_bus(group="ingest")
+# Con BUS_URL=unix://... la ingesta aloja el broker local del bus
+bus_broker = UnixSocketBroker(bus.path) if isinstance(bus, UnixSocketBus) else None
+# Listas de eventos por mercado que sirve la API de Redis; se crea al conectar a Redis
+market_store: Optional[MarketStore] = None
+news_ingestor: Optional[NewsIngestor] = None
+news_tasks: list = []
 
 async def handle_market_event(event: Dict[str, Any]) -> None:
     """Maneja eventos de mercado."""
     try:
-        # Publicar el evento en Redis
-        await event_storage.publish_event("market_events", event)
+        # Publicar cada evento en el topic de su mercado (consumidores críticos en latencia)
+        await bus.publish(topic("market", event.get("market")), event)
         
-        # Almacenar el evento para análisis posterior
-        event_id = f"market:{event.get('market', 'unknown')}:{event.get('timestamp', '')}"
-        await event_storage.store_event(event_id, event, ttl=86400)  # 24 horas TTL
+        # Los libros se guardan como snapshots periódicos más deltas binarios
+        if config.STORE_EVENTS and event.get("type") == "l2_book":
+            book_store.record(event)
+        
+        # El resto de consumidores recibe solo el último estado de cada ventana
+        await conflator.add(event)
         
     except Exception as e:
         logger.error(f"Error handling market event: {e}")
 
+async def publish_conflated(event: Dict[str, Any]) -> None:
+    """Publica un evento conflacionado y lo almacena para análisis posterior."""
+    await bus.publish(topic("conflated", event.get("market")), event)
+    if config.STORE_EVENTS and event.get("type") != "l2_book":
+        event_id = f"market:{event.get('market', 'unknown')}:{event.get('timestamp', '')}"
+        await event_storage.store_event(event_id, event, ttl=86400)  # 24 horas TTL
+        if market_store is not None and event.get("market"):
+            await market_store.push_event(event["market"], event)
+
+conflator = Conflator(publish_conflated, config.CONFLATION_WINDOW, config.CONFLATION_CHANNELS)
+
+async def publish_news(items: List[Dict[str, Any]]) -> None:
+    """Publica las noticias vinculadas a mercados para el servicio de análisis."""
+    for item in items:
+        for market in item["markets"]:
+            await bus.publish(topic("news", market["id"]), item)
+        await event_storage.store_event(f"news:{item['id']}", item, ttl=86400)
+
+async def refresh_news_markets(matcher: NewsMatcher) -> None:
+    """Mantiene el índice de mercados del matcher al día con el catálogo."""
+    catalogue = MarketCatalogue(config.NEWS_CATALOGUE_PATH)
+    indexed: Dict[str, str] = {}
+    while True:
+        try:
+            catalogue.load()
+            markets = {
+                entry.condition_id: f"{entry.data.get('question', '')}\n{entry.data.get('description', '')}".strip()
+                for entry in catalogue.entries()
+                if entry.data.get('active', True) and not entry.data.get('closed', False)
+            }
+            # Solo se reindexan los mercados cuyo texto cambió
+            changed = {cid: text for cid, text in markets.items() if indexed.get(cid) != text}
+            for condition_id in set(indexed) - set(markets):
+                matcher.remove_market(condition_id)
+            await matcher.add_markets(changed)
+            indexed = markets
+        except Exception as e:
+            logger.error(f"Failed to refresh news markets: {e}")
+        await asyncio.sleep(config.NEWS_CATALOGUE_REFRESH)
+
+async def start_news() -> None:
+    """Arranca la ingesta de noticias si hay fuentes configuradas."""
+    global news_ingestor
+    if not config.NEWS_SOURCES:
+        return
+    matcher = NewsMatcher(EmbeddingService(config.EMBEDDING_CACHE_PATH), min_score=config.NEWS_MIN_SCORE)
+    news_ingestor = NewsIngestor([source_from_spec(spec) for spec in config.NEWS_SOURCES], matcher, publish_news)
+    news_tasks.append(asyncio.create_task(refresh_news_markets(matcher)))
+    await news_ingestor.start()
+
+def configure_logging() -> None:
+    """Añade el fichero de log de la ingesta (al arrancar, no al importar)."""
+    logger.add(
+        "data/logs/ingest.log",
+        rotation="1 day",
+        level=config.LOG_LEVEL,
+        format=config.LOG_FORMAT
+    )
+
 @app.on_event("startup")
 async def startup_event():
     """Inicia las conexiones al arrancar el servicio."""
+    configure_logging()
     try:
-        # Conectar a Redis
+        # Conectar a Redis y al bus de mensajes
         await event_storage.connect()
+        book_store.redis = event_storage.redis
+        global market_store
+        market_store = MarketStore(event_storage.redis)
+        if config.STORE_EVENTS:
+            book_store.start()
+        if bus_broker is not None:
+            await bus_broker.start()
+        await bus.start()
+        conflator.start()
         
         # Configurar manejadores de eventos
         websocket_client.register_handler("l2_book", handle_market_event)
+        websocket_client.register_handler("price_change", handle_market_event)
         websocket_client.register_handler("trades", handle_market_event)
         websocket_client.register_handler("ticker", handle_market_event)
         websocket_client.register_handler("markets", handle_market_event)
@@ -51,6 +138,9 @@ async def startup_event():
         await websocket_client.connect()
         asyncio.create_task(websocket_client.listen())
         
+        # Iniciar la ingesta de noticias
+        await start_news()
+        
     except Exception as e:
         logger.error(f"Failed to start service: {e}")
         raise
@@ -59,7 +149,16 @@ async def startup_event():
 async def shutdown_event():
     """Cierra las conexiones al detener el servicio."""
     try:
+        for task in news_tasks:
+            task.cancel()
+        if news_ingestor is not None:
+            await news_ingestor.stop()
         await websocket_client.close()
+        await conflator.stop()
+        await book_store.stop()
+        await bus.close()
+        if bus_broker is not None:
+            await bus_broker.close()
         await event_storage.close()
     except Exception as e:
         logger.error(f"Error during shutdown: {e}")
@@ -84,25 +183,62 @@ async def health_check():
         logger.error(f"Health check failed: {e}")
         raise HTTPException(status_code=503, detail=str(e))
 
+@app.get("/news/stats")
+async def get_news_stats():
+    """Estadísticas de la ingesta de noticias."""
+    if news_ingestor is None:
+        return {"enabled": False}
+    return {"enabled": True, "queued": news_ingestor.queue.qsize(), **news_ingestor.stats}
+
+@app.get("/books/stats")
+async def get_book_stats():
+    """Estadísticas del historial de libros."""
+    return {"books": book_store.books, **book_store.stats}
+
+@app.get("/books/{market_id}")
+async def get_book(market_id: str, at: Optional[float] = None, asset_id: Optional[str] = None):
+    """Reconstruye el libro de un mercado en un instante (``at`` en segundos o ms; por defecto ahora)."""
+    timestamp_ms = int(time.time() * 1000) if at is None else int(at if at > 1e11 else at * 1000)
+    try:
+        book = await book_store.book_at(market_id, timestamp_ms, asset_id)
+    except Exception as e:
+        logger.error(f"Failed to rebuild order book: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if book is None:
+        raise HTTPException(status_code=404, detail="No stored book at that time")
+    return {"market_id": market_id, "asset_id": asset_id or market_id, **book}
+
+@app.get("/conflation/stats")
+async def get_conflation_stats():
+    """Estadísticas de la conflación de eventos de mercado."""
+    return {"window": conflator.window, "pending": conflator.pending, **conflator.stats}
+
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """Endpoint WebSocket para clientes que quieran recibir eventos en tiempo real."""
+async def websocket_endpoint(websocket: WebSocket, markets: Optional[str] = None, raw: bool = False):
+    """Endpoint WebSocket para clientes que quieran recibir eventos en tiempo real.
+    
+    Con ``?markets=a,b`` solo se reciben los eventos de esos mercados. Por defecto se
+    envían los eventos conflacionados; ``?raw=true`` envía todos.
+    """
     await websocket.accept()
     
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
+    
+    def enqueue(message: Message) -> None:
+        if queue.full():
+            queue.get_nowait()  # descartar el más antiguo si el cliente va lento
+        queue.put_nowait(message.payload)
+    
+    kind = "market" if raw else "conflated"
+    topics = [topic(kind, market) for market in markets.split(",")] if markets else [topic(kind)]
+    subscription = await bus.subscribe(topics, enqueue, durable=False)
     try:
-        # Crear un pubsub para este cliente
-        pubsub = event_storage.redis.pubsub()
-        await pubsub.subscribe("market_events")
-        
         while True:
-            message = await pubsub.get_message(ignore_subscribe_messages=True)
-            if message:
-                await websocket.send_text(message["data"].decode())
-                
+            await websocket.send_json(await queue.get())
     except Exception as e:
         logger.error(f"WebSocket client error: {e}")
     finally:
-        await pubsub.unsubscribe()
+        await bus.unsubscribe(subscription)
         await websocket.close()
 
 @app.get("/events/{market_id}")
@@ -6,19 +6,41 @@ This service is responsible for:
 2. Processing real-time market data updates
 3. Managing market state and order book updates
 4. Providing clean interfaces for other services to access market data
+
+Catalogue changes are also written to an optional shared ``MarketStore``
+(the ``markets:active`` keys read by the Redis-backed API).
+
+With ``stream_prices`` the books are fetched over REST once per tracked
+market and then kept current by the events of the ingest stream passed to
+``handle_event``, instead of being re-polled every ``update_interval``.
 """
 
 import logging
 import asyncio
-import json
-from typing import Dict, List, Optional, Callable, Set, Any
+import inspect
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Callable, Set, Any
 from dataclasses import dataclass, field
 from datetime import datetime
-from py_clob_client.client import ClobClient
-from py_clob_client.clob_types import ApiCreds, RequestArgs
-from py_clob_client.endpoints import GET_MARKETS, GET_ORDER_BOOK
-from py_clob_client.http_helpers.helpers import get
-from py_clob_client.headers.headers import create_level_2_headers
+
+from services.clob.scheduler import Priority, RequestScheduler
+from shared.utils.fixed import PRICE_SCALE, from_ticks, to_ticks
+
+from .book import BOOK_EVENTS, PRICE_CHANGE, BookEngine
+from .catalogue import (
+    END_CURSOR,
+    START_CURSOR,
+    MarketCatalogue,
+    market_condition_id,
+    market_token_ids,
+)
+
+if TYPE_CHECKING:
+    from py_clob_client.client import ClobClient
+
+    from services.api.cache import MarketStore
+
+    from .snapshot import MarketSnapshotStore
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +52,8 @@ class MarketState:
     token_ids: List[str]
     best_bid_price: Optional[float] = None
     best_ask_price: Optional[float] = None
+    best_bid_size: Optional[float] = None
+    best_ask_size: Optional[float] = None
     raw_data: Dict[str, Any] = field(default_factory=dict)
     last_update: datetime = field(default_factory=datetime.now)
     
@@ -37,14 +61,14 @@ class MarketState:
     def spread(self) -> Optional[float]:
         """Calculate the current spread."""
         if self.best_bid_price is not None and self.best_ask_price is not None:
-            return round(self.best_ask_price - self.best_bid_price, 8)
+            return from_ticks(to_ticks(self.best_ask_price) - to_ticks(self.best_bid_price))
         return None
     
     @property
     def midpoint(self) -> Optional[float]:
         """Calculate the current midpoint price."""
         if self.best_bid_price is not None and self.best_ask_price is not None:
-            return round((self.best_bid_price + self.best_ask_price) / 2, 8)
+            return (to_ticks(self.best_bid_price) + to_ticks(self.best_ask_price)) / (2 * PRICE_SCALE)
         return None
 
     @property
@@ -52,6 +76,11 @@ class MarketState:
         """Get the market question."""
         return self.raw_data.get('question', '')
 
+    @property
+    def description(self) -> str:
+        """Get the market description."""
+        return self.raw_data.get('description', '')
+
     @property
     def active(self) -> bool:
         """Check if the market is active."""
@@ -78,27 +107,63 @@ class MarketDataService:
     
     def __init__(
         self,
-        client: ClobClient,
+        client: "ClobClient",
         update_interval: float = 1.0,  # seconds
-        max_markets: int = 100
+        max_markets: int = 100,
+        catalogue: Optional[MarketCatalogue] = None,
+        catalogue_interval: float = 300.0,  # seconds
+        full_sync_interval: float = 3600.0,  # seconds
+        pages_per_sync: int = 50,
+        snapshot_store: Optional["MarketSnapshotStore"] = None,
+        snapshot_interval: float = 30.0,  # seconds
+        scheduler: Optional[RequestScheduler] = None,
+        book_engine: Optional[BookEngine] = None,
+        stream_prices: bool = False,
+        market_store: Optional["MarketStore"] = None
     ):
         """Initialize the market data service.
         
         Args:
             client: Authenticated Polymarket CLOB client
-            update_interval: How often to refresh market data (seconds)
+            update_interval: How often to refresh prices (seconds)
             max_markets: Maximum number of markets to track simultaneously
+            catalogue: Market metadata catalogue; an in-memory one is used if None
+            catalogue_interval: How often to sync market metadata (seconds)
+            full_sync_interval: How often to re-crawl the catalogue from the start (seconds)
+            pages_per_sync: Maximum number of market pages fetched per sync
+            snapshot_store: Store for warm-start snapshots of market state
+            snapshot_interval: How often to write snapshots (seconds)
+            scheduler: Rate-limit aware scheduler for REST calls; one wrapping
+                ``client`` is created if None
+            book_engine: Order books of all outcome tokens; a new one is used if None
+            stream_prices: Only seed the books over REST and take price updates
+                from ``handle_event``
+            market_store: Shared store the active markets of the catalogue are
+                written to as they change
         """
         self.client = client
+        self.rest = scheduler if scheduler is not None else RequestScheduler(client)
+        self.books = book_engine if book_engine is not None else BookEngine()
         self.update_interval = update_interval
         self.max_markets = max_markets
+        self.catalogue = catalogue if catalogue is not None else MarketCatalogue()
+        self.catalogue_interval = catalogue_interval
+        self.full_sync_interval = full_sync_interval
+        self.pages_per_sync = pages_per_sync
+        self.snapshot_store = snapshot_store
+        self.snapshot_interval = snapshot_interval
+        self.stream_prices = stream_prices
+        self.market_store = market_store
         
         # Internal state
         self._markets: Dict[str, MarketState] = {}  # condition_id -> MarketState
         self._token_to_market: Dict[str, str] = {}  # token_id -> condition_id
         self._running: bool = False
         self._tasks: Set[asyncio.Task] = set()
-        self._callbacks: List[Callable[[str, MarketState], None]] = []
+        self._callbacks: List[Callable[[MarketState], Any]] = []
+        self._tracked: List[Dict[str, Any]] = []  # raw markets refreshed by the price loop
+        self._tracked_version: int = -1
+        self._seeded: Set[str] = set()  # markets whose books were fetched over REST (streaming)
         
     async def start(self):
         """Start the market data service."""
@@ -109,10 +174,19 @@ class MarketDataService:
         self._running = True
         logger.info("Starting market data service...")
         
-        # Start the main update loop
-        update_task = asyncio.create_task(self._update_loop())
-        self._tasks.add(update_task)
-        update_task.add_done_callback(self._tasks.discard)
+        # Serve the persisted catalogue and last snapshot right away
+        # instead of crawling the API
+        self.catalogue.load()
+        loops = [self._catalogue_loop(), self._update_loop()]
+        if self.snapshot_store is not None:
+            self.restore_snapshot()
+            loops.append(self._snapshot_loop())
+        
+        # Start the slow metadata sync and the fast price loop
+        for loop in loops:
+            task = asyncio.create_task(loop)
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
         
         logger.info("Market data service started")
         
@@ -131,16 +205,39 @@ class MarketDataService:
         await asyncio.gather(*self._tasks, return_exceptions=True)
         self._tasks.clear()
         
+        if self.snapshot_store is not None:
+            self.save_snapshot()
+        
         logger.info("Market data service stopped")
         
-    def add_callback(self, callback: Callable[[str, MarketState], None]):
+    def add_callback(self, callback: Callable[[MarketState], Any]):
         """Add a callback to be called when market state changes.
         
+        Callbacks should return quickly (e.g. enqueue the update); coroutine
+        callbacks of one update are awaited concurrently.
+        
         Args:
-            callback: Function to call with (condition_id, market_state) when updates occur
+            callback: Function or coroutine function called with the market_state
+                when updates occur
         """
         self._callbacks.append(callback)
         
+    async def _notify(self, market_state: MarketState) -> None:
+        """Call the update callbacks with a market state."""
+        pending = []
+        for callback in self._callbacks:
+            try:
+                result = callback(market_state)
+                if inspect.isawaitable(result):
+                    pending.append(result)
+            except Exception as e:
+                logger.error(f"Error in market update callback: {str(e)}")
+                
+        if pending:
+            for result in await asyncio.gather(*pending, return_exceptions=True):
+                if isinstance(result, Exception):
+                    logger.error(f"Error in market update callback: {str(result)}")
+        
     def get_market_state(self, condition_id: str) -> Optional[MarketState]:
         """Get the current state of a market.
         
@@ -152,6 +249,32 @@ class MarketDataService:
         """
         return self._markets.get(condition_id)
         
+    def restore_snapshot(self) -> int:
+        """Load market state from the last snapshot.
+        
+        Returns:
+            Number of markets restored
+        """
+        markets = self.snapshot_store.load(self.catalogue)
+        for condition_id, market_state in markets.items():
+            self._markets.setdefault(condition_id, market_state)
+            for token_id in market_state.token_ids:
+                self._token_to_market.setdefault(token_id, condition_id)
+        return len(markets)
+        
+    def save_snapshot(self) -> None:
+        """Write a snapshot of the current market state."""
+        try:
+            size = self.snapshot_store.save(list(self._markets.values()))
+            logger.debug(f"Wrote market snapshot ({len(self._markets)} markets, {size} bytes)")
+        except OSError as e:
+            logger.error(f"Failed to write market snapshot: {e}")
+            
+    async def resync(self) -> None:
+        """Force a full metadata sync and price refresh without dropping state."""
+        await self.sync_catalogue(full=True)
+        await self._update_markets(self._tracked_markets())
+        
     def get_all_markets(self) -> List[MarketState]:
         """Get states of all tracked markets.
         
@@ -161,14 +284,14 @@ class MarketDataService:
         return list(self._markets.values())
         
     async def _update_loop(self):
-        """Main loop for updating market data."""
+        """Main loop for refreshing prices of tracked markets."""
         try:
             while self._running:
                 try:
-                    # Fetch active markets
-                    markets = await self._fetch_markets()
-                    
-                    # Update internal state
+                    # Update internal state from the catalogue
+                    markets = self._tracked_markets()
+                    if self.stream_prices:
+                        markets = self._unseeded(markets)
                     await self._update_markets(markets)
                     
                     # Wait for next update
@@ -182,96 +305,208 @@ class MarketDataService:
             logger.info("Market update loop cancelled")
             raise
             
-    async def _fetch_markets(self) -> List[Dict]:
-        """Fetch active markets from Polymarket API with pagination."""
-        all_markets = []
-        next_cursor = None
+    async def _catalogue_loop(self):
+        """Loop syncing market metadata on a slow cadence."""
+        try:
+            # The store may be behind the catalogue loaded from disk
+            await self._write_markets([entry.data for entry in self.catalogue.entries()])
+            
+            # A catalogue loaded from disk may still be fresh
+            elapsed = time.time() - self.catalogue.last_sync
+            if elapsed < self.catalogue_interval:
+                await asyncio.sleep(self.catalogue_interval - elapsed)
+            
+            while self._running:
+                synced = await self.sync_catalogue()
+                # Failed syncs are retried on the fast cadence
+                await asyncio.sleep(self.catalogue_interval if synced else self.update_interval)
+                
+        except asyncio.CancelledError:
+            logger.info("Market catalogue loop cancelled")
+            raise
+            
+    async def sync_catalogue(self, full: Optional[bool] = None) -> bool:
+        """Sync market metadata from the Polymarket API into the catalogue.
         
-        while True:
-            try:
-                response = await self.client.get_markets(cursor=next_cursor)
+        Incremental syncs resume from the last crawled page and only pick up
+        markets listed since; full syncs re-crawl from the first page to
+        refresh metadata of known markets, over as many syncs as needed: a
+        full crawl longer than ``pages_per_sync`` pages continues from where
+        the previous sync stopped until it reaches the last page.
+        
+        Args:
+            full: Force (True) or skip (False) a full re-crawl; by default a
+                full crawl runs every ``full_sync_interval`` seconds
                 
-                if not isinstance(response, dict):
-                    logger.error(f"Unexpected response format: {response}")
-                    break
-                    
-                current_markets = response.get('data', [])
-                if not current_markets:
-                    logger.warning("No markets found in response")
-                    break
-                    
-                # Log the first market's data for debugging
-                if current_markets and len(all_markets) == 0:
-                    first_market = current_markets[0]
-                    market_info = {
-                        'id': first_market.get('id'),
-                        'question': first_market.get('question'),
-                        'condition_id': first_market.get('conditionId'),
-                        'tokens': [t.get('id') for t in first_market.get('tokens', [])],
-                        'active': first_market.get('active'),
-                        'closed': first_market.get('closed')
-                    }
-                    logger.info(f"Sample market data: {json.dumps(market_info, indent=2)}")
+        Returns:
+            True if the sync completed without errors
+        """
+        if full is None:
+            full = time.time() - self.catalogue.last_full_sync >= self.full_sync_interval
+        if full:
+            cursor = self.catalogue.full_cursor or START_CURSOR
+        else:
+            cursor = self.catalogue.cursor
+        
+        changed: List[Dict[str, Any]] = []
+        ok = True
+        complete = False
+        for _ in range(self.pages_per_sync):
+            try:
+                response = await self.rest.call(
+                    'get_markets', next_cursor=cursor, priority=Priority.CATALOGUE
+                )
+            except Exception as e:
+                logger.error(f"Error fetching markets: {e}")
+                ok = False
+                break
                 
-                all_markets.extend(current_markets)
+            if not isinstance(response, dict):
+                logger.error(f"Unexpected response format: {response}")
+                ok = False
+                break
                 
-                next_cursor = response.get('next_cursor')
-                if not next_cursor or len(all_markets) >= self.max_markets:
-                    break
+            for market in response.get('data', []):
+                if self.catalogue.upsert(market):
+                    changed.append(market)
                     
-            except Exception as e:
-                logger.error(f"Error fetching markets: {e}")
+            next_cursor = response.get('next_cursor')
+            if not next_cursor or next_cursor == END_CURSOR:
+                complete = True
                 break
+            cursor = next_cursor
+            
+        # Resume from the last page next time, it may gain new markets
+        self.catalogue.record_sync(cursor, full=full, complete=complete)
+        try:
+            self.catalogue.save()
+        except OSError as e:
+            logger.error(f"Failed to save market catalogue: {e}")
+        await self._write_markets(changed)
+            
+        logger.info(f"Synced market catalogue: {len(changed)} new or changed, {len(self.catalogue)} total")
+        return ok
+        
+    async def _write_markets(self, markets: List[Dict[str, Any]]) -> None:
+        """Write markets to the market store: open ones are put, closed or inactive ones removed."""
+        if self.market_store is None:
+            return
+        try:
+            for market in markets:
+                condition_id = market_condition_id(market)
+                if not condition_id:
+                    continue
+                if market.get('active', True) and not market.get('closed', False):
+                    await self.market_store.put_market(condition_id, market)
+                else:
+                    await self.market_store.remove_market(condition_id)
+        except Exception as e:
+            logger.error(f"Failed to write markets to the market store: {e}")
+        
+    async def _snapshot_loop(self):
+        """Loop periodically snapshotting market state to disk."""
+        try:
+            while self._running:
+                await asyncio.sleep(self.snapshot_interval)
+                self.save_snapshot()
                 
-        logger.info(f"Fetched {len(all_markets)} markets")
-        return all_markets[:self.max_markets]
+        except asyncio.CancelledError:
+            logger.info("Market snapshot loop cancelled")
+            raise
+            
+    def _tracked_markets(self) -> List[Dict[str, Any]]:
+        """Get the raw markets whose prices are refreshed, at most ``max_markets``."""
+        if self._tracked_version != self.catalogue.version:
+            self._tracked = [
+                entry.data for entry in self.catalogue.entries()
+                if entry.data.get('active', True) and not entry.data.get('closed', False)
+            ][:self.max_markets]
+            self._tracked_version = self.catalogue.version
+        return self._tracked
         
+    def _unseeded(self, markets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Get the markets whose books were never fetched; refresh the metadata of the others."""
+        unseeded = []
+        for market in markets:
+            state = self._markets.get(market_condition_id(market))
+            if state is None or state.condition_id not in self._seeded:
+                unseeded.append(market)
+            elif state.raw_data is not market:
+                state.raw_data = market
+        return unseeded
+
+    async def handle_event(self, event: Dict[str, Any]) -> List[MarketState]:
+        """Apply an event of the ingest stream (book, ``price_change`` or trade).
+
+        Book events update the shared book engine; market states quote the
+        book of their first token and are notified when its top changes.
+
+        Returns:
+            States of the markets that changed
+        """
+        event_type = event.get("type") or event.get("event_type")
+        changed = []
+        if event_type == "trades":
+            state = self._markets.get(event.get("market"))
+            if state is not None and event.get("price") is not None:
+                state.raw_data = {**state.raw_data, 'lastPrice': float(event["price"])}
+                changed.append(state)
+        elif event_type in BOOK_EVENTS or event_type == PRICE_CHANGE:
+            if event_type == PRICE_CHANGE:
+                changes = event.get("price_changes") or event.get("changes") or []
+                tokens = {change.get("asset_id") or event.get("asset_id") for change in changes}
+            else:
+                tokens = {event.get("asset_id") or event.get("market")}
+            self.books.handle(event)
+            for token_id in tokens:
+                state = self._markets.get(self._token_to_market.get(token_id))
+                book = self.books.book(token_id)
+                if state is None or book is None or state.token_ids[0] != token_id:
+                    continue
+                top = book.top()
+                if top != (state.best_bid_price, state.best_bid_size, state.best_ask_price, state.best_ask_size):
+                    state.best_bid_price, state.best_bid_size, state.best_ask_price, state.best_ask_size = top
+                    changed.append(state)
+
+        for state in changed:
+            state.last_update = datetime.now()
+            await self._notify(state)
+        return changed
+
     async def _update_markets(self, markets: List[Dict[str, Any]]) -> None:
         """Update the internal state of markets."""
         updated_markets = 0
         for market in markets:
             try:
                 # Extract required fields
-                market_id = market.get('id')
-                if not market_id:
-                    logging.warning("Market missing id")
-                    continue
-
-                condition_id = market.get('conditionId')
+                condition_id = market_condition_id(market)
                 if not condition_id:
                     logging.warning("Market missing condition_id")
                     continue
 
-                tokens = market.get('tokens', [])
-                if not tokens:
-                    logging.warning(f"Market {market_id} has no tokens")
-                    continue
-
-                # Extract token IDs
-                token_ids = []
-                for token in tokens:
-                    token_id = token.get('id')
-                    if not token_id:
-                        logging.warning(f"Token in market {market_id} missing id")
-                        continue
-                    token_ids.append(token_id)
-
+                market_id = market.get('id') or condition_id
+                token_ids = market_token_ids(market)
                 if not token_ids:
                     logging.warning(f"Market {market_id} has no valid token IDs")
                     continue
 
-                # Try to get orderbook data for the first token (YES token)
-                # But don't fail if orderbook doesn't exist
-                best_bid_price = None
-                best_ask_price = None
-                try:
-                    orderbook = await self.client.get_orderbook(token_ids[0])
-                    if orderbook and 'bids' in orderbook and orderbook['bids']:
-                        best_bid_price = float(orderbook['bids'][0]['price'])
-                    if orderbook and 'asks' in orderbook and orderbook['asks']:
-                        best_ask_price = float(orderbook['asks'][0]['price'])
-                except Exception as e:
-                    logging.debug(f"No orderbook for market {market_id}: {str(e)}")
+                # Fetch the books of every outcome token (YES and NO)
+                # But don't fail if an orderbook doesn't exist
+                orderbooks = await asyncio.gather(
+                    *[self.rest.call('get_order_book', token_id, priority=Priority.BOOK) for token_id in token_ids],
+                    return_exceptions=True
+                )
+                for token_id, orderbook in zip(token_ids, orderbooks):
+                    if isinstance(orderbook, Exception):
+                        logging.debug(f"No orderbook for token {token_id} of market {market_id}: {str(orderbook)}")
+                    elif orderbook:
+                        self.books.apply_snapshot(token_id, orderbook, condition_id)
+
+                # Market state quotes the first token (YES token)
+                best_bid_price = best_bid_size = best_ask_price = best_ask_size = None
+                book = self.books.book(token_ids[0])
+                if book is not None:
+                    best_bid_price, best_bid_size, best_ask_price, best_ask_size = book.top()
 
                 # Create or update MarketState
                 market_state = MarketState(
@@ -280,22 +515,22 @@ class MarketDataService:
                     token_ids=token_ids,
                     best_bid_price=best_bid_price,
                     best_ask_price=best_ask_price,
+                    best_bid_size=best_bid_size,
+                    best_ask_size=best_ask_size,
                     raw_data=market
                 )
 
                 # Update internal state
-                self._markets[market_id] = market_state
+                self._markets[condition_id] = market_state
                 for token_id in token_ids:
-                    self._token_to_market[token_id] = market_id
+                    self._token_to_market[token_id] = condition_id
+                if self.stream_prices:
+                    self._seeded.add(condition_id)
 
                 updated_markets += 1
 
                 # Notify callbacks
-                for callback in self._callbacks:
-                    try:
-                        await callback(market_state)
-                    except Exception as e:
-                        logging.error(f"Error in market update callback: {str(e)}")
+                await self._notify(market_state)
 
             except Exception as e:
                 logging.error(f"Error updating market {market.get('id', 'unknown')}: {str(e)}")
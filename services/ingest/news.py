@@ -0,0 +1,499 @@
+"""
+News Ingestion
+
+Streams news items from pluggable sources to the markets they concern:
+1. Sources (RSS/Atom feeds, JSON endpoints, JSON-lines files) are polled
+   concurrently into one bounded queue
+2. Exact duplicates are dropped by URL/ID and near-duplicates (syndicated
+   copies, minor rewrites) by 64-bit SimHash Hamming distance. Items are
+   only remembered once matched, so an item seen before its market was
+   indexed is matched when it comes around again
+3. Named entities are extracted with a regex heuristic and matched against
+   an inverted index of entities in market questions
+4. Items are embedded with the shared EmbeddingService and linked to the
+   nearest markets; entity overlap boosts the cosine score
+5. Matched items are handed to a publish callback in batches
+
+All dedup state is bounded (fixed-size FIFO windows), so memory stays
+constant however long the ingestor runs.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+import xml.etree.ElementTree as ET
+from collections import OrderedDict, defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import httpx
+import numpy as np
+
+from llm.embeddings import EmbeddingService
+
+logger = logging.getLogger(__name__)
+
+MARKETS_COLLECTION = "markets"
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_ENTITY_RE = re.compile(r"\b(?:[A-Z][a-zA-Z0-9&'.-]*(?:\s+(?:of|de|the)?\s*[A-Z][a-zA-Z0-9&'.-]*)*|[A-Z]{2,}\d*)\b")
+_TAG_RE = re.compile(r"<[^>]+>")
+
+# Capitalized words that start sentences or questions rather than name things
+_NOT_ENTITIES = frozenset({
+    "a", "an", "and", "after", "as", "at", "before", "by", "for", "from", "how",
+    "if", "in", "is", "it", "new", "no", "of", "on", "or", "the", "this",
+    "what", "when", "who", "why", "will", "with", "yes",
+})
+
+
+@dataclass
+class NewsItem:
+    """A news item moving through the pipeline."""
+    id: str
+    source: str
+    title: str
+    summary: str = ""
+    url: str = ""
+    published: float = field(default_factory=time.time)
+    entities: List[str] = field(default_factory=list)
+    fingerprint: int = 0
+    markets: List[Tuple[str, float]] = field(default_factory=list)  # (condition_id, score)
+
+    @property
+    def text(self) -> str:
+        return f"{self.title}\n{self.summary}".strip()
+
+    def to_dict(self, questions: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        data = asdict(self)
+        data["markets"] = [
+            {"id": market, "score": round(score, 4), "question": (questions or {}).get(market, "")}
+            for market, score in self.markets
+        ]
+        data["fingerprint"] = f"{self.fingerprint:016x}"
+        return data
+
+
+def _item_id(*parts: str) -> str:
+    return hashlib.sha1("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def _clean(text: Optional[str]) -> str:
+    return " ".join(_TAG_RE.sub(" ", text or "").split())
+
+
+def _parse_date(value: Optional[str]) -> float:
+    if not value:
+        return time.time()
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return time.time()
+
+
+class NewsSource:
+    """A pollable news source; subclasses implement :meth:`fetch`."""
+
+    name = "source"
+    interval = 60.0
+
+    async def fetch(self) -> List[NewsItem]:
+        """Get the items currently published by the source."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class RSSSource(NewsSource):
+    """RSS 2.0 or Atom feed."""
+
+    _ATOM = "{http://www.w3.org/2005/Atom}"
+
+    def __init__(self, url: str, interval: float = 60.0, http: Optional[httpx.AsyncClient] = None):
+        self.url = url
+        self.name = f"rss:{url}"
+        self.interval = interval
+        self._http = http or httpx.AsyncClient(timeout=10.0, follow_redirects=True)
+        self._etag: Optional[str] = None
+
+    @classmethod
+    def parse(cls, name: str, payload: bytes) -> List[NewsItem]:
+        """Parse a feed document into news items."""
+        root = ET.fromstring(payload)
+        items = []
+        for node in root.iter("item"):
+            link = node.findtext("link") or ""
+            title = _clean(node.findtext("title"))
+            items.append(NewsItem(
+                id=node.findtext("guid") or link or _item_id(name, title),
+                source=name,
+                title=title,
+                summary=_clean(node.findtext("description")),
+                url=link,
+                published=_parse_date(node.findtext("pubDate")),
+            ))
+        for node in root.iter(f"{cls._ATOM}entry"):
+            link_node = node.find(f"{cls._ATOM}link")
+            link = link_node.get("href", "") if link_node is not None else ""
+            title = _clean(node.findtext(f"{cls._ATOM}title"))
+            items.append(NewsItem(
+                id=node.findtext(f"{cls._ATOM}id") or link or _item_id(name, title),
+                source=name,
+                title=title,
+                summary=_clean(node.findtext(f"{cls._ATOM}summary") or node.findtext(f"{cls._ATOM}content")),
+                url=link,
+                published=_parse_date(node.findtext(f"{cls._ATOM}updated") or node.findtext(f"{cls._ATOM}published")),
+            ))
+        return items
+
+    async def fetch(self) -> List[NewsItem]:
+        headers = {"If-None-Match": self._etag} if self._etag else {}
+        response = await self._http.get(self.url, headers=headers)
+        if response.status_code == 304:
+            return []
+        response.raise_for_status()
+        self._etag = response.headers.get("ETag")
+        return self.parse(self.name, response.content)
+
+    async def close(self) -> None:
+        await self._http.aclose()
+
+
+class JSONSource(NewsSource):
+    """HTTP endpoint returning a JSON list of ``{id, title, summary, url, published}``."""
+
+    def __init__(self, url: str, interval: float = 10.0, http: Optional[httpx.AsyncClient] = None):
+        self.url = url
+        self.name = f"http:{url}"
+        self.interval = interval
+        self._http = http or httpx.AsyncClient(timeout=10.0)
+
+    async def fetch(self) -> List[NewsItem]:
+        response = await self._http.get(self.url)
+        response.raise_for_status()
+        data = response.json()
+        return [parse_json_item(self.name, raw) for raw in (data.get("items", []) if isinstance(data, dict) else data)]
+
+    async def close(self) -> None:
+        await self._http.aclose()
+
+
+class FileSource(NewsSource):
+    """JSON-lines file tailed from the last read offset."""
+
+    def __init__(self, path: Path, interval: float = 1.0):
+        self.path = Path(path)
+        self.name = f"file:{path}"
+        self.interval = interval
+        self._offset = 0
+
+    def _read(self) -> List[NewsItem]:
+        if not self.path.exists():
+            return []
+        with open(self.path, "rb") as f:
+            if self.path.stat().st_size < self._offset:
+                self._offset = 0  # truncated or rotated
+            f.seek(self._offset)
+            data = f.read()
+        # Only consume complete lines; a partial last line is read next time
+        end = data.rfind(b"\n") + 1
+        self._offset += end
+        items = []
+        for line in data[:end].splitlines():
+            if line.strip():
+                try:
+                    items.append(parse_json_item(self.name, json.loads(line)))
+                except ValueError as e:
+                    logger.warning(f"Skipping malformed news line in {self.path}: {e}")
+        return items
+
+    async def fetch(self) -> List[NewsItem]:
+        return await asyncio.to_thread(self._read)
+
+
+def parse_json_item(source: str, raw: Dict[str, Any]) -> NewsItem:
+    """Build a NewsItem from a JSON object."""
+    title = _clean(raw.get("title"))
+    published = raw.get("published")
+    return NewsItem(
+        id=str(raw.get("id") or raw.get("url") or _item_id(source, title)),
+        source=source,
+        title=title,
+        summary=_clean(raw.get("summary") or raw.get("description")),
+        url=raw.get("url", ""),
+        published=float(published) if isinstance(published, (int, float)) else _parse_date(published),
+    )
+
+
+def source_from_spec(spec: str) -> NewsSource:
+    """Build a source from ``rss:<url>``, ``http(s)://<url>`` or ``file:<path>``."""
+    if spec.startswith("rss:"):
+        return RSSSource(spec[4:])
+    if spec.startswith("file:"):
+        return FileSource(Path(spec[5:]))
+    if spec.startswith(("http://", "https://")):
+        return JSONSource(spec)
+    raise ValueError(f"Unknown news source {spec}")
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash of the words of a text."""
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return 0
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(w.encode("utf-8"), digest_size=8).digest(), "little") for w in words],
+        dtype=np.uint64
+    )
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(words)
+    return int.from_bytes(np.packbits(votes > 0, bitorder="little").tobytes(), "little")
+
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class SimHashIndex:
+    """Near-duplicate detector over a sliding window of fingerprints.
+
+    The window is a fixed-size uint64 ring buffer; each lookup XORs the
+    fingerprint against the whole window and counts differing bits with a
+    byte popcount table, which is exact and takes well under a millisecond
+    for tens of thousands of fingerprints.
+    """
+
+    def __init__(self, capacity: int = 20000, max_distance: int = 10):
+        self.capacity = capacity
+        self.max_distance = max_distance
+        self._window = np.zeros(capacity, dtype=np.uint64)
+        self._size = 0
+        self._next = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def distances(self, fingerprint: int) -> np.ndarray:
+        """Hamming distances from a fingerprint to every stored fingerprint."""
+        diff = self._window[:self._size] ^ np.uint64(fingerprint)
+        return _POPCOUNT[diff.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+    def add(self, fingerprint: int) -> None:
+        self._window[self._next] = fingerprint
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def contains(self, fingerprint: int) -> bool:
+        """Check whether a fingerprint is within ``max_distance`` of a stored one."""
+        return bool(self._size) and self.distances(fingerprint).min() <= self.max_distance
+
+    def seen(self, fingerprint: int) -> bool:
+        """Check a fingerprint, remembering it when it is new."""
+        if self.contains(fingerprint):
+            return True
+        self.add(fingerprint)
+        return False
+
+
+def extract_entities(text: str) -> List[str]:
+    """Extract candidate named entities (capitalized phrases, acronyms)."""
+    entities = []
+    for match in _ENTITY_RE.finditer(text):
+        words = match.group(0).split()
+        while words and words[0].lower() in _NOT_ENTITIES:
+            words.pop(0)
+        while words and words[-1].lower() in _NOT_ENTITIES:
+            words.pop()
+        if words:
+            entity = " ".join(words).strip(".'-").lower()
+            if len(entity) > 1 and entity not in entities:
+                entities.append(entity)
+    return entities
+
+
+class NewsMatcher:
+    """Links news items to markets by embedding similarity and shared entities."""
+
+    def __init__(
+        self,
+        embeddings: Optional[EmbeddingService] = None,
+        min_score: float = 0.45,
+        limit: int = 5,
+        entity_weight: float = 0.1
+    ):
+        """Initialize the matcher.
+
+        Args:
+            embeddings: Shared embedding service; entity-only matching if None
+            min_score: Minimum combined score of a match
+            limit: Maximum markets per item
+            entity_weight: Score added per entity shared with the market question
+        """
+        self.embeddings = embeddings
+        self.min_score = min_score
+        self.limit = limit
+        self.entity_weight = entity_weight
+        self._entities: Dict[str, Set[str]] = defaultdict(set)  # entity -> condition IDs
+        self._market_entities: Dict[str, List[str]] = {}
+        self.questions: Dict[str, str] = {}  # condition ID -> indexed text
+
+    def __len__(self) -> int:
+        return len(self._market_entities)
+
+    async def add_markets(self, markets: Dict[str, str]) -> None:
+        """Index markets (condition ID -> question text)."""
+        for condition_id, text in markets.items():
+            self.remove_market(condition_id)
+            self.questions[condition_id] = text
+            entities = extract_entities(text)
+            self._market_entities[condition_id] = entities
+            for entity in entities:
+                self._entities[entity].add(condition_id)
+        if self.embeddings is not None and markets:
+            await self.embeddings.index(MARKETS_COLLECTION, markets)
+
+    def remove_market(self, condition_id: str) -> None:
+        self.questions.pop(condition_id, None)
+        for entity in self._market_entities.pop(condition_id, ()):
+            markets = self._entities.get(entity)
+            if markets is not None:
+                markets.discard(condition_id)
+                if not markets:
+                    del self._entities[entity]
+        if self.embeddings is not None:
+            self.embeddings.remove(MARKETS_COLLECTION, condition_id)
+
+    async def match(self, items: List[NewsItem]) -> None:
+        """Fill in the matched markets of a batch of items."""
+        if not items:
+            return
+        similar: List[List[Tuple[str, float]]] = [[] for _ in items]
+        if self.embeddings is not None:
+            vectors = await self.embeddings.embed([item.text for item in items])
+            similar = self.embeddings.nearest(MARKETS_COLLECTION, vectors, limit=self.limit * 2)
+
+        for item, candidates in zip(items, similar):
+            scores: Dict[str, float] = dict(candidates)
+            for entity in item.entities:
+                for condition_id in self._entities.get(entity, ()):
+                    scores[condition_id] = scores.get(condition_id, 0.0) + self.entity_weight
+            ranked = sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+            item.markets = [(market, score) for market, score in ranked if score >= self.min_score][:self.limit]
+
+
+class NewsIngestor:
+    """Polls news sources and publishes deduplicated items matched to markets."""
+
+    def __init__(
+        self,
+        sources: List[NewsSource],
+        matcher: NewsMatcher,
+        publish: Callable[[List[Dict[str, Any]]], Awaitable[None]],
+        queue_size: int = 5000,
+        batch_size: int = 64,
+        dedup_window: int = 20000
+    ):
+        """Initialize the ingestor.
+
+        Args:
+            sources: News sources to poll
+            matcher: Market matcher
+            publish: Coroutine receiving each batch of matched items as dicts
+            queue_size: Maximum items waiting to be processed
+            batch_size: Maximum items matched per batch
+            dedup_window: Number of recent items remembered for deduplication
+        """
+        self.sources = sources
+        self.matcher = matcher
+        self.publish = publish
+        self.batch_size = batch_size
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.near_duplicates = SimHashIndex(capacity=dedup_window)
+        self._seen_ids: "OrderedDict[str, None]" = OrderedDict()
+        self._dedup_window = dedup_window
+        self._tasks: List[asyncio.Task] = []
+        self.stats = {"received": 0, "duplicates": 0, "near_duplicates": 0, "matched": 0, "unmatched": 0}
+
+    async def start(self) -> None:
+        for source in self.sources:
+            self._tasks.append(asyncio.create_task(self._poll(source)))
+        self._tasks.append(asyncio.create_task(self._process()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        for source in self.sources:
+            await source.close()
+
+    async def _poll(self, source: NewsSource) -> None:
+        while True:
+            try:
+                for item in await source.fetch():
+                    await self.queue.put(item)  # backpressure when processing falls behind
+            except Exception as e:
+                logger.error(f"Error fetching news from {source.name}: {e}")
+            await asyncio.sleep(source.interval)
+
+    def _is_duplicate(self, item: NewsItem, batch: List[NewsItem]) -> bool:
+        """Check an item against the remembered items and the fresh ones of its batch."""
+        key = item.url or item.id
+        if key in self._seen_ids or any(key == (other.url or other.id) for other in batch):
+            self.stats["duplicates"] += 1
+            return True
+        item.fingerprint = simhash(item.text)
+        if self.near_duplicates.contains(item.fingerprint) or any(
+            bin(item.fingerprint ^ other.fingerprint).count("1") <= self.near_duplicates.max_distance
+            for other in batch
+        ):
+            self.stats["near_duplicates"] += 1
+            return True
+        return False
+
+    def _remember(self, item: NewsItem) -> None:
+        """Record the dedup keys of a matched item."""
+        self._seen_ids[item.url or item.id] = None
+        if len(self._seen_ids) > self._dedup_window:
+            self._seen_ids.popitem(last=False)
+        self.near_duplicates.add(item.fingerprint)
+
+    async def process(self, items: List[NewsItem]) -> List[NewsItem]:
+        """Deduplicate, enrich and match a batch; publishes and returns matched items."""
+        self.stats["received"] += len(items)
+        fresh: List[NewsItem] = []
+        for item in items:
+            if not self._is_duplicate(item, fresh):
+                fresh.append(item)
+        for item in fresh:
+            item.entities = extract_entities(item.text)
+        await self.matcher.match(fresh)
+
+        matched = [item for item in fresh if item.markets]
+        for item in matched:
+            self._remember(item)
+        self.stats["matched"] += len(matched)
+        self.stats["unmatched"] += len(fresh) - len(matched)
+        if matched:
+            await self.publish([item.to_dict(self.matcher.questions) for item in matched])
+        return matched
+
+    async def _process(self) -> None:
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self.process(batch)
+            except Exception as e:
+                logger.error(f"Error processing {len(batch)} news items: {e}")
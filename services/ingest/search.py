@@ -0,0 +1,264 @@
+"""
+Market Search Index
+
+Keyword and semantic search over market questions and descriptions:
+1. A BM25 inverted index for keyword queries
+2. An optional embedding index (the shared ``llm.embeddings`` service) for
+   "find related markets" queries
+3. Incremental updates driven by MarketDataService callbacks, re-indexing a
+   market only when its text actually changes
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from llm.embeddings import EmbeddingService
+
+from .market_data import MarketState
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in",
+    "is", "it", "of", "on", "or", "the", "this", "to", "will", "with",
+})
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase index terms, dropping stopwords."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def market_text(market: MarketState) -> str:
+    """Get the searchable text of a market."""
+    return f"{market.question}\n{market.description}".strip()
+
+
+class InvertedIndex:
+    """In-memory inverted index ranked with BM25."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)  # term -> doc_id -> tf
+        self._doc_terms: Dict[str, Dict[str, int]] = {}  # doc_id -> term -> tf
+        self._doc_lengths: Dict[str, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def add(self, doc_id: str, text: str) -> None:
+        """Index a document, replacing any previous version."""
+        self.remove(doc_id)
+
+        terms: Dict[str, int] = defaultdict(int)
+        for term in tokenize(text):
+            terms[term] += 1
+
+        self._doc_terms[doc_id] = dict(terms)
+        self._doc_lengths[doc_id] = sum(terms.values())
+        self._total_length += self._doc_lengths[doc_id]
+        for term, tf in terms.items():
+            self._postings[term][doc_id] = tf
+
+    def remove(self, doc_id: str) -> None:
+        """Remove a document from the index."""
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[str, float]]:
+        """Rank documents against a keyword query.
+
+        Args:
+            query: Free-text query
+            limit: Maximum number of results
+
+        Returns:
+            List of (doc_id, score) pairs, best first
+        """
+        n_docs = len(self._doc_terms)
+        if not n_docs:
+            return []
+
+        avg_length = self._total_length / n_docs
+        scores: Dict[str, float] = defaultdict(float)
+
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:limit]
+
+
+class SemanticIndex:
+    """Embedding index over market text backed by the shared EmbeddingService.
+
+    Vectors are cached by content hash in the service, so re-indexing a
+    market whose text did not change costs no model call.
+    """
+
+    def __init__(self, embeddings: EmbeddingService, collection_name: str = "markets"):
+        """Initialize the semantic index.
+
+        Args:
+            embeddings: Shared embedding service (model loaded once)
+            collection_name: Collection holding market vectors
+        """
+        self.embeddings = embeddings
+        self.collection_name = collection_name
+
+    async def upsert(self, documents: Dict[str, str]) -> None:
+        """Embed and store a batch of documents keyed by id."""
+        if documents:
+            await self.embeddings.index(self.collection_name, documents)
+
+    def remove(self, doc_id: str) -> None:
+        self.embeddings.remove(self.collection_name, doc_id)
+
+    async def related(self, doc_id: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """Find the documents closest to an already indexed document."""
+        return self.embeddings.similar(self.collection_name, doc_id, limit)
+
+
+class MarketSearchIndex:
+    """Search subsystem over tracked markets.
+
+    Register :meth:`on_market_update` with ``MarketDataService.add_callback``
+    to keep the index current. Markets are keyed by condition ID and are only
+    re-indexed when their question/description text changes.
+    """
+
+    def __init__(self, semantic: Optional[SemanticIndex] = None):
+        """Initialize the search index.
+
+        Args:
+            semantic: Optional embedding index for related-market queries
+        """
+        self.keyword = InvertedIndex()
+        self.semantic = semantic
+
+        self._markets: Dict[str, MarketState] = {}  # condition_id -> latest MarketState
+        self._hashes: Dict[str, str] = {}  # condition_id -> text hash
+        self._pending_semantic: Dict[str, str] = {}  # condition_id -> text awaiting embedding
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._markets)
+
+    def __contains__(self, condition_id: str) -> bool:
+        return condition_id in self._markets
+
+    def update_market(self, market: MarketState) -> bool:
+        """Add or refresh a market in the index.
+
+        Args:
+            market: Latest state of the market
+
+        Returns:
+            True if the market text changed and was re-indexed
+        """
+        doc_id = market.condition_id
+        self._markets[doc_id] = market
+
+        text = market_text(market)
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        if self._hashes.get(doc_id) == digest:
+            return False
+
+        self._hashes[doc_id] = digest
+        self.keyword.add(doc_id, text)
+        if self.semantic is not None:
+            self._pending_semantic[doc_id] = text
+        return True
+
+    def remove_market(self, condition_id: str) -> None:
+        """Drop a market from the index."""
+        self._markets.pop(condition_id, None)
+        self._hashes.pop(condition_id, None)
+        self._pending_semantic.pop(condition_id, None)
+        self.keyword.remove(condition_id)
+        if self.semantic is not None:
+            self.semantic.remove(condition_id)
+
+    async def on_market_update(self, market: MarketState) -> None:
+        """MarketDataService callback keeping the index up to date."""
+        self.update_market(market)
+        if self._pending_semantic and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush_semantic())
+
+    async def flush_semantic(self) -> None:
+        """Embed all markets whose text changed since the last flush."""
+        if self.semantic is None:
+            return
+
+        while self._pending_semantic:
+            batch, self._pending_semantic = self._pending_semantic, {}
+            try:
+                await self.semantic.upsert(batch)
+            except ImportError as e:
+                logger.warning(f"Semantic search disabled, missing dependency: {e}")
+                self.semantic = None
+                return
+            except Exception as e:
+                logger.error(f"Error updating semantic index: {e}")
+                return
+
+    def search(self, query: str, limit: int = 20) -> List[MarketState]:
+        """Find markets matching a keyword query, best match first."""
+        return [
+            self._markets[doc_id]
+            for doc_id, _ in self.keyword.search(query, limit)
+            if doc_id in self._markets
+        ]
+
+    async def related(self, condition_id: str, limit: int = 10) -> List[MarketState]:
+        """Find markets semantically related to the given market.
+
+        Falls back to a keyword query on the market's own text when no
+        embedding index is available.
+        """
+        market = self._markets.get(condition_id)
+        if market is None:
+            return []
+
+        if self.semantic is not None:
+            try:
+                matches = await self.semantic.related(condition_id, limit)
+                return [self._markets[doc_id] for doc_id, _ in matches if doc_id in self._markets]
+            except ImportError as e:
+                logger.warning(f"Semantic search disabled, missing dependency: {e}")
+                self.semantic = None
+            except Exception as e:
+                logger.error(f"Error querying semantic index: {e}")
+
+        matches = self.keyword.search(market_text(market), limit + 1)
+        return [
+            self._markets[doc_id]
+            for doc_id, _ in matches
+            if doc_id != condition_id and doc_id in self._markets
+        ][:limit]
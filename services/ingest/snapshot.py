@@ -0,0 +1,180 @@
+"""
+Market State Snapshots
+
+Compact binary snapshots of MarketDataService state used to warm-start the
+service: on restart the last snapshot is loaded so slightly stale prices are
+served immediately while the price loop catches up.
+
+Only identifiers and book tops are stored; market metadata is rejoined from
+the MarketCatalogue on load. Layout (little endian, body zlib-compressed):
+
+    header: magic "PMSS" | u16 version | f64 created_at | u32 count
+    record: str market_id | str condition_id | u8 n_tokens | str token_id * n
+            | f64 bid | f64 bid_size | f64 ask | f64 ask_size | f64 last_update
+
+Strings are u16 length-prefixed UTF-8; missing prices are stored as NaN.
+"""
+
+import logging
+import math
+import os
+import struct
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .catalogue import MarketCatalogue
+from .market_data import MarketState
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PMSS"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sHdI")
+_STR_LEN = struct.Struct("<H")
+_TOKEN_COUNT = struct.Struct("<B")
+_TOPS = struct.Struct("<5d")
+
+_NAN = float("nan")
+
+
+def _pack_str(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return _STR_LEN.pack(len(data)) + data
+
+
+def _unpack_str(buf: memoryview, offset: int) -> Tuple[str, int]:
+    (length,) = _STR_LEN.unpack_from(buf, offset)
+    offset += _STR_LEN.size
+    return bytes(buf[offset:offset + length]).decode("utf-8"), offset + length
+
+
+def _opt(value: Optional[float]) -> float:
+    return _NAN if value is None else value
+
+
+def _from_opt(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+def encode_snapshot(markets: List[MarketState], created_at: Optional[float] = None) -> bytes:
+    """Serialize market states into a compact binary snapshot."""
+    parts = []
+    for market in markets:
+        parts.append(_pack_str(market.market_id))
+        parts.append(_pack_str(market.condition_id))
+        parts.append(_TOKEN_COUNT.pack(len(market.token_ids)))
+        parts.extend(_pack_str(token_id) for token_id in market.token_ids)
+        parts.append(_TOPS.pack(
+            _opt(market.best_bid_price),
+            _opt(market.best_bid_size),
+            _opt(market.best_ask_price),
+            _opt(market.best_ask_size),
+            market.last_update.timestamp()
+        ))
+
+    header = _HEADER.pack(MAGIC, VERSION, created_at or time.time(), len(markets))
+    return header + zlib.compress(b"".join(parts), 1)
+
+
+def decode_snapshot(
+    data: bytes,
+    catalogue: Optional[MarketCatalogue] = None
+) -> Tuple[float, List[MarketState]]:
+    """Deserialize a binary snapshot.
+
+    Args:
+        data: Snapshot bytes produced by :func:`encode_snapshot`
+        catalogue: Catalogue to rejoin market metadata from
+
+    Returns:
+        Tuple of (snapshot creation time, market states)
+
+    Raises:
+        ValueError: If the data is not a supported snapshot
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError("Snapshot too short")
+
+    magic, version, created_at, count = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Unsupported snapshot format {magic!r} v{version}")
+
+    buf = memoryview(zlib.decompress(data[_HEADER.size:]))
+    offset = 0
+    markets = []
+    for _ in range(count):
+        market_id, offset = _unpack_str(buf, offset)
+        condition_id, offset = _unpack_str(buf, offset)
+        (n_tokens,) = _TOKEN_COUNT.unpack_from(buf, offset)
+        offset += _TOKEN_COUNT.size
+        token_ids = []
+        for _ in range(n_tokens):
+            token_id, offset = _unpack_str(buf, offset)
+            token_ids.append(token_id)
+        bid, bid_size, ask, ask_size, last_update = _TOPS.unpack_from(buf, offset)
+        offset += _TOPS.size
+
+        entry = catalogue.get(condition_id) if catalogue is not None else None
+        markets.append(MarketState(
+            market_id=market_id,
+            condition_id=condition_id,
+            token_ids=token_ids,
+            best_bid_price=_from_opt(bid),
+            best_ask_price=_from_opt(ask),
+            best_bid_size=_from_opt(bid_size),
+            best_ask_size=_from_opt(ask_size),
+            raw_data=entry.data if entry is not None else {},
+            last_update=datetime.fromtimestamp(last_update)
+        ))
+
+    return created_at, markets
+
+
+class MarketSnapshotStore:
+    """Reads and atomically writes market state snapshots on disk."""
+
+    def __init__(self, path: Path):
+        """Initialize the snapshot store.
+
+        Args:
+            path: Snapshot file location
+        """
+        self.path = Path(path)
+
+    def save(self, markets: List[MarketState]) -> int:
+        """Write a snapshot of the given markets.
+
+        Returns:
+            Size of the snapshot in bytes
+        """
+        data = encode_snapshot(markets)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+        return len(data)
+
+    def load(self, catalogue: Optional[MarketCatalogue] = None) -> Dict[str, MarketState]:
+        """Load the last snapshot, if any.
+
+        Returns:
+            Mapping of condition_id -> MarketState; empty if no usable snapshot
+        """
+        if not self.path.exists():
+            return {}
+
+        try:
+            with open(self.path, "rb") as f:
+                created_at, markets = decode_snapshot(f.read(), catalogue)
+        except (OSError, ValueError, zlib.error, struct.error) as e:
+            logger.error(f"Failed to load market snapshot {self.path}: {e}")
+            return {}
+
+        age = time.time() - created_at
+        logger.info(f"Loaded snapshot of {len(markets)} markets ({age:.0f}s old)")
+        return {market.condition_id: market for market in markets}
@@ -0,0 +1,23 @@
+from .base import (
+    InProcessBus,
+    Message,
+    MessageBus,
+    RedisStreamBus,
+    Subscription,
+    UnixSocketBroker,
+    UnixSocketBus,
+    create_bus,
+    topic,
+)
+
+__all__ = [
+    'InProcessBus',
+    'Message',
+    'MessageBus',
+    'RedisStreamBus',
+    'Subscription',
+    'UnixSocketBroker',
+    'UnixSocketBus',
+    'create_bus',
+    'topic',
+]
@@ -0,0 +1,619 @@
+"""
+Message Bus
+
+Topic-routed publish/subscribe between services with pluggable transports:
+1. Topics are ``<kind>.<market>`` (e.g. ``market.0xabc``, ``news.0xabc``).
+   A subscription lists exact topics and/or ``<kind>.*`` wildcards, so a
+   consumer of a few markets never receives the rest of the firehose
+2. Across processes messages travel as compact binary frames: a 9-byte
+   header (version, frame type, codec, topic length, payload length), the
+   UTF-8 topic and a msgpack payload (JSON when msgpack is not installed;
+   the codec byte lets both interoperate)
+3. Transports:
+   - InProcessBus: bounded asyncio queues without serialization, for
+     running every service in one process
+   - RedisStreamBus: one Redis Stream per topic plus one per kind, read
+     through consumer groups so a restarted consumer resumes where it
+     stopped
+   - UnixSocketBus: clients of a local UnixSocketBroker, which forwards
+     each frame only to the connections subscribed to its topic; clients
+     reconnect with backoff when the broker is down or restarts
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import os
+import socket
+import struct
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional speedup
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+FRAME_VERSION = 1
+
+# Frame types
+PUBLISH = 0
+SUBSCRIBE = 1
+UNSUBSCRIBE = 2
+
+# Payload codecs
+JSON_CODEC = 0
+MSGPACK_CODEC = 1
+
+_HEADER = struct.Struct("!BBBHI")  # version, frame type, codec, topic length, payload length
+
+WILDCARD = "*"
+
+
+def topic(kind: str, market: Optional[str] = None) -> str:
+    """Build the topic of a market, or the wildcard of a kind when ``market`` is None."""
+    return f"{kind}.{market if market else WILDCARD}"
+
+
+def wildcard(name: str) -> str:
+    """Get the wildcard topic covering a topic's kind."""
+    return f"{name.split('.', 1)[0]}.{WILDCARD}"
+
+
+def encode_payload(payload: Any) -> Tuple[int, bytes]:
+    if msgpack is not None:
+        return MSGPACK_CODEC, msgpack.packb(payload, use_bin_type=True)
+    return JSON_CODEC, json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def decode_payload(codec: int, data: bytes) -> Any:
+    if codec == MSGPACK_CODEC:
+        if msgpack is None:
+            raise ValueError("Received a msgpack frame but msgpack is not installed")
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data) if data else None
+
+
+def encode_frame(name: str, payload: Any = None, frame_type: int = PUBLISH) -> bytes:
+    """Encode a frame carrying a topic and an optional payload."""
+    topic_bytes = name.encode("utf-8")
+    codec, body = encode_payload(payload) if payload is not None else (JSON_CODEC, b"")
+    return _HEADER.pack(FRAME_VERSION, frame_type, codec, len(topic_bytes), len(body)) + topic_bytes + body
+
+
+def decode_frame(frame: bytes) -> Tuple[int, str, Any]:
+    """Decode a frame into (frame type, topic, payload)."""
+    version, frame_type, codec, topic_length, payload_length = _HEADER.unpack_from(frame)
+    if version != FRAME_VERSION:
+        raise ValueError(f"Unsupported frame version {version}")
+    start = _HEADER.size
+    name = frame[start:start + topic_length].decode("utf-8")
+    body = frame[start + topic_length:start + topic_length + payload_length]
+    return frame_type, name, decode_payload(codec, body)
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[int, str, bytes]:
+    """Read one frame from a stream; returns (frame type, topic, raw frame)."""
+    header = await reader.readexactly(_HEADER.size)
+    _, frame_type, _, topic_length, payload_length = _HEADER.unpack(header)
+    rest = await reader.readexactly(topic_length + payload_length)
+    return frame_type, rest[:topic_length].decode("utf-8"), header + rest
+
+
+@dataclass
+class Message:
+    """A message delivered to a subscriber."""
+    topic: str
+    payload: Dict[str, Any]
+
+    @property
+    def kind(self) -> str:
+        return self.topic.split(".", 1)[0]
+
+    @property
+    def market(self) -> Optional[str]:
+        market = self.topic.split(".", 1)[1] if "." in self.topic else None
+        return None if market == WILDCARD else market
+
+
+Handler = Callable[[Message], Any]
+
+
+async def _invoke(handler: Handler, message: Message) -> None:
+    try:
+        result = handler(message)
+        if inspect.isawaitable(result):
+            await result
+    except Exception as e:
+        logger.error(f"Error handling message on {message.topic}: {e}")
+
+
+class Subscription:
+    """A handler subscribed to a set of topics.
+
+    Push-based transports feed it through a bounded queue that drops the
+    oldest messages when the handler falls behind.
+    """
+
+    def __init__(self, topics: Iterable[str], handler: Handler, maxsize: int = 10000):
+        self.topics = frozenset(topics)
+        self.handler = handler
+        self.dropped = 0
+        self.task: Optional[asyncio.Task] = None
+        self._queue: Deque[Message] = deque(maxlen=maxsize)
+        self._ready = asyncio.Event()
+
+    def put(self, message: Message) -> None:
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(message)
+        self._ready.set()
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self._queue:
+                await _invoke(self.handler, self._queue.popleft())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+
+class MessageBus:
+    """Transport-independent bus interface."""
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def publish(self, name: str, payload: Dict[str, Any]) -> None:
+        """Publish a payload on a topic."""
+        raise NotImplementedError
+
+    async def subscribe(self, topics: Iterable[str], handler: Handler, durable: bool = True) -> Subscription:
+        """Call ``handler`` with every message on the given topics or wildcards.
+
+        A durable subscription is the service's share of the topic: on
+        transports that persist messages it resumes after a restart and is
+        load-balanced between instances of the same service. Non-durable
+        subscriptions (e.g. one per connected client) only see messages
+        published while they are subscribed.
+        """
+        raise NotImplementedError
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        raise NotImplementedError
+
+
+class _Router:
+    """Topic -> subscriptions routing table shared by push-based transports."""
+
+    def __init__(self):
+        self.routes: Dict[str, List[Subscription]] = {}
+
+    def add(self, subscription: Subscription) -> List[str]:
+        """Route a subscription; returns the topics that had no subscriber yet."""
+        new = []
+        for name in subscription.topics:
+            subscribers = self.routes.setdefault(name, [])
+            if not subscribers:
+                new.append(name)
+            subscribers.append(subscription)
+        return new
+
+    def remove(self, subscription: Subscription) -> List[str]:
+        """Unroute a subscription; returns the topics left without subscribers."""
+        empty = []
+        for name in subscription.topics:
+            subscribers = self.routes.get(name, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+            if not subscribers:
+                self.routes.pop(name, None)
+                empty.append(name)
+        return empty
+
+    def route(self, message: Message) -> None:
+        for subscription in self.routes.get(message.topic, ()):
+            subscription.put(message)
+        for subscription in self.routes.get(wildcard(message.topic), ()):
+            if message.topic not in subscription.topics:  # already delivered above
+                subscription.put(message)
+
+
+class InProcessBus(MessageBus):
+    """Bus for a single process; payloads are passed by reference."""
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._router = _Router()
+
+    async def publish(self, name: str, payload: Dict[str, Any]) -> None:
+        self._router.route(Message(name, payload))
+
+    async def subscribe(self, topics: Iterable[str], handler: Handler, durable: bool = True) -> Subscription:
+        subscription = Subscription(topics, handler, self.maxsize)
+        self._router.add(subscription)
+        subscription.start()
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        self._router.remove(subscription)
+        await subscription.stop()
+
+    async def close(self) -> None:
+        for subscription in {s for subs in self._router.routes.values() for s in subs}:
+            await self.unsubscribe(subscription)
+
+
+class RedisStreamBus(MessageBus):
+    """Bus over Redis Streams with consumer groups.
+
+    Every message is appended to the stream of its topic and to the stream
+    of its kind's wildcard (one pipelined round trip), each capped at
+    ``maxlen`` entries. Subscribers read only the streams they subscribed
+    to and acknowledge entries after handling them.
+    """
+
+    def __init__(
+        self,
+        redis_url: str = "redis://localhost:6379",
+        group: str = "default",
+        consumer: Optional[str] = None,
+        maxlen: int = 10000,
+        block_ms: int = 1000,
+        batch_size: int = 100,
+        prefix: str = "bus:",
+        client: Any = None
+    ):
+        """Initialize the bus.
+
+        Args:
+            redis_url: Redis server URL
+            group: Consumer group; consumers of the same group share the work
+            consumer: Consumer name, stable across restarts to resume pending entries
+            maxlen: Approximate maximum entries kept per stream
+            block_ms: Longest blocking read
+            batch_size: Maximum entries read per call
+            prefix: Prefix of the stream keys
+            client: Optional existing ``redis.asyncio`` client
+        """
+        self.redis_url = redis_url
+        self.group = group
+        self.consumer = consumer or f"{group}-{socket.gethostname()}"
+        self.maxlen = maxlen
+        self.block_ms = block_ms
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.redis = client
+        self._subscriptions: List[Subscription] = []
+
+    async def start(self) -> None:
+        if self.redis is None:
+            import redis.asyncio as redis
+
+            self.redis = redis.from_url(self.redis_url)
+
+    async def close(self) -> None:
+        for subscription in list(self._subscriptions):
+            await self.unsubscribe(subscription)
+        if self.redis is not None:
+            await self.redis.aclose()
+
+    def _stream(self, name: str) -> str:
+        return f"{self.prefix}{name}"
+
+    async def publish(self, name: str, payload: Dict[str, Any]) -> None:
+        fields = {b"f": encode_frame(name, payload)}
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xadd(self._stream(name), fields, maxlen=self.maxlen, approximate=True)
+        if name != wildcard(name):
+            pipe.xadd(self._stream(wildcard(name)), fields, maxlen=self.maxlen, approximate=True)
+        await pipe.execute()
+
+    async def subscribe(self, topics: Iterable[str], handler: Handler, durable: bool = True) -> Subscription:
+        from redis.exceptions import ResponseError
+
+        subscription = Subscription(topics, handler)
+        if durable:
+            for name in subscription.topics:
+                try:
+                    await self.redis.xgroup_create(self._stream(name), self.group, id="$", mkstream=True)
+                except ResponseError as e:
+                    if "BUSYGROUP" not in str(e):
+                        raise
+            subscription.task = asyncio.create_task(self._consume(subscription))
+        else:
+            # Start from the current last entry of each stream rather than "$",
+            # which would skip entries added between two reads
+            offsets = {}
+            for name in subscription.topics:
+                last = await self.redis.xrevrange(self._stream(name), count=1)
+                offsets[self._stream(name)] = last[0][0] if last else "0-0"
+            subscription.task = asyncio.create_task(self._tail(subscription, offsets))
+        self._subscriptions.append(subscription)
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+        await subscription.stop()
+
+    async def _deliver(self, subscription: Subscription, stream: str, fields: Optional[Dict[bytes, bytes]]) -> None:
+        if not fields:  # trimmed before it was read
+            return
+        _, name, payload = decode_frame(fields[b"f"])
+        if stream.endswith(WILDCARD) and name in subscription.topics:
+            return  # also delivered through its own stream
+        await _invoke(subscription.handler, Message(name, payload))
+
+    async def _tail(self, subscription: Subscription, offsets: Dict[str, Any]) -> None:
+        """Read new entries without a consumer group (non-durable), after the last-seen ID of each stream."""
+        while True:
+            try:
+                response = await self.redis.xread(offsets, count=self.batch_size, block=self.block_ms)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error reading bus streams: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            for stream, entries in response or ():
+                stream = stream.decode() if isinstance(stream, bytes) else stream
+                for entry_id, fields in entries:
+                    offsets[stream] = entry_id
+                    await self._deliver(subscription, stream, fields)
+
+    async def _consume(self, subscription: Subscription) -> None:
+        # Entries delivered to this consumer before a restart come first ("0"), then new ones
+        offsets = {self._stream(name): "0" for name in subscription.topics}
+        while True:
+            try:
+                response = await self.redis.xreadgroup(
+                    self.group, self.consumer, offsets, count=self.batch_size, block=self.block_ms
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error reading bus streams: {e}")
+                await asyncio.sleep(1.0)
+                continue
+
+            drained = {stream for stream, offset in offsets.items() if offset == "0"}
+            for stream, entries in response or ():
+                stream = stream.decode() if isinstance(stream, bytes) else stream
+                if entries:
+                    drained.discard(stream)
+                acked = []
+                for entry_id, fields in entries:
+                    acked.append(entry_id)
+                    await self._deliver(subscription, stream, fields)
+                if acked:
+                    await self.redis.xack(stream, self.group, *acked)
+            for stream in drained:
+                offsets[stream] = ">"
+
+
+class UnixSocketBroker:
+    """Local broker forwarding frames to the connections subscribed to their topic.
+
+    Frames are routed on their topic without decoding the payload. A
+    connection whose send buffer exceeds ``max_buffer`` bytes is skipped
+    until it catches up, so one slow consumer cannot stall the others.
+    """
+
+    def __init__(self, path: str, max_buffer: int = 8 * 1024 * 1024):
+        self.path = path
+        self.max_buffer = max_buffer
+        self.dropped = 0
+        self._routes: Dict[str, Set[asyncio.StreamWriter]] = {}
+        self._connections: Set[asyncio.StreamWriter] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        Path(self.path).unlink(missing_ok=True)  # stale socket of a previous run
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path)
+        logger.info(f"Message bus broker listening on {self.path}")
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._connections):  # clients see the close and reconnect
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        Path(self.path).unlink(missing_ok=True)
+
+    def _forward(self, name: str, frame: bytes) -> None:
+        targets = self._routes.get(name, set()) | self._routes.get(wildcard(name), set())
+        for writer in targets:
+            if writer.transport.get_write_buffer_size() > self.max_buffer:
+                self.dropped += 1
+                continue
+            writer.write(frame)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        topics: Set[str] = set()
+        self._connections.add(writer)
+        try:
+            while True:
+                frame_type, name, frame = await read_frame(reader)
+                if frame_type == PUBLISH:
+                    self._forward(name, frame)
+                elif frame_type == SUBSCRIBE:
+                    self._routes.setdefault(name, set()).add(writer)
+                    topics.add(name)
+                elif frame_type == UNSUBSCRIBE:
+                    self._routes.get(name, set()).discard(writer)
+                    topics.discard(name)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for name in topics:
+                writers = self._routes.get(name)
+                if writers is not None:
+                    writers.discard(writer)
+                    if not writers:
+                        del self._routes[name]
+            self._connections.discard(writer)
+            writer.close()
+
+
+class UnixSocketBus(MessageBus):
+    """Bus client of a :class:`UnixSocketBroker` on the same host.
+
+    The connection is (re)established in the background with exponential
+    backoff, so clients may start before the broker and survive its
+    restarts; subscriptions are sent again on every connection. Messages
+    published while disconnected are dropped and counted.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        maxsize: int = 10000,
+        high_water: int = 1024 * 1024,
+        retry_min: float = 0.1,
+        retry_max: float = 5.0
+    ):
+        self.path = path
+        self.maxsize = maxsize
+        self.high_water = high_water
+        self.retry_min = retry_min
+        self.retry_max = retry_max
+        self.dropped = 0
+        self._router = _Router()
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    async def start(self) -> None:
+        try:
+            await self._connect()
+        except OSError as e:
+            logger.warning(f"Message bus broker at {self.path} unavailable ({e}); retrying in the background")
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for subscription in {s for subs in self._router.routes.values() for s in subs}:
+            await subscription.stop()
+        self._router.routes.clear()
+        self._disconnect()
+
+    async def _connect(self) -> None:
+        """Open the connection and subscribe it to every routed topic."""
+        self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+        for name in self._router.routes:
+            self._writer.write(encode_frame(name, frame_type=SUBSCRIBE))
+        await self._writer.drain()
+        logger.info(f"Connected to message bus broker at {self.path}")
+
+    def _disconnect(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def _run(self) -> None:
+        delay = self.retry_min
+        while True:
+            if self._writer is None:
+                try:
+                    await self._connect()
+                except OSError:
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.retry_max)
+                    continue
+            delay = self.retry_min
+            await self._receive()
+            self._disconnect()
+
+    async def _send(self, frame: bytes) -> None:
+        if self._writer is None:
+            self.dropped += 1
+            return
+        try:
+            self._writer.write(frame)
+            if self._writer.transport.get_write_buffer_size() > self.high_water:
+                await self._writer.drain()
+        except ConnectionError:
+            self.dropped += 1
+
+    async def publish(self, name: str, payload: Dict[str, Any]) -> None:
+        await self._send(encode_frame(name, payload))
+
+    async def subscribe(self, topics: Iterable[str], handler: Handler, durable: bool = True) -> Subscription:
+        subscription = Subscription(topics, handler, self.maxsize)
+        new = self._router.add(subscription)
+        writer = self._writer
+        if writer is not None:  # otherwise subscribed on connection
+            for name in new:
+                await self._send(encode_frame(name, frame_type=SUBSCRIBE))
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+        subscription.start()
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        for name in self._router.remove(subscription):
+            if self._writer is not None:
+                await self._send(encode_frame(name, frame_type=UNSUBSCRIBE))
+        await subscription.stop()
+
+    async def _receive(self) -> None:
+        """Route incoming frames until the connection closes."""
+        try:
+            while True:
+                _, _, frame = await read_frame(self._reader)
+                _, name, payload = decode_frame(frame)
+                self._router.route(Message(name, payload))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logger.warning(f"Message bus connection to {self.path} closed; reconnecting")
+
+
+_local_bus: Optional[InProcessBus] = None
+
+
+def create_bus(url: Optional[str] = None, group: str = "default") -> MessageBus:
+    """Build a bus from a URL: ``memory://``, ``redis://...`` or ``unix:///path``.
+
+    ``group`` names the Redis consumer group, usually the service name.
+
+    Defaults to the ``BUS_URL`` environment variable, then to Redis Streams
+    on ``REDIS_URL``.
+    """
+    url = url or os.getenv("BUS_URL") or os.getenv("REDIS_URL", "redis://localhost:6379")
+    if url.startswith("memory://"):
+        # Every service of the process shares one in-process bus
+        global _local_bus
+        if _local_bus is None:
+            _local_bus = InProcessBus()
+        return _local_bus
+    if url.startswith("unix://"):
+        return UnixSocketBus(url[len("unix://"):])
+    if url.startswith(("redis://", "rediss://")):
+        return RedisStreamBus(url, group=group)
+    raise ValueError(f"Unsupported bus URL {url}")
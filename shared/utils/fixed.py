@@ -0,0 +1,82 @@
+"""
+Fixed-Point Prices and Sizes
+
+Integer representation of prices, sizes and notionals shared by books,
+stored events, risk and execution:
+1. Prices are integer ticks of 1e-4, the finest Polymarket tick size, so
+   every valid price of every market is exact (0.55 -> 5500)
+2. Sizes are integer micro-units of a share, matching the 6 decimals of the
+   outcome and collateral tokens (12.5 -> 12_500_000)
+3. Notionals are integer micro-USDC; price ticks times size micro-units is
+   divided by the tick scale, rounding down
+4. Conversions of whole columns return NumPy int64 arrays for bulk storage
+   and vectorized arithmetic; NumPy is only imported by those helpers
+
+Integers compare and hash exactly, so book levels can be keyed by price and
+top-of-book changes detected without tolerances.
+"""
+
+from typing import TYPE_CHECKING, Any, Iterable, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
+
+PRICE_SCALE = 10_000  # ticks per unit of price
+SIZE_SCALE = 1_000_000  # micro-units per share
+NOTIONAL_SCALE = 1_000_000  # micro-USDC per USDC
+
+ONE = PRICE_SCALE  # the price of a winning outcome, in ticks
+
+
+def to_ticks(price: Any) -> int:
+    """Convert a price (float, int or numeric string) to ticks, rounding to the nearest."""
+    return round(float(price) * PRICE_SCALE)
+
+
+def to_units(size: Any) -> int:
+    """Convert a size (float, int or numeric string) to micro-units, rounding to the nearest."""
+    return round(float(size) * SIZE_SCALE)
+
+
+def from_ticks(ticks: int) -> float:
+    return ticks / PRICE_SCALE
+
+
+def from_units(units: int) -> float:
+    return units / SIZE_SCALE
+
+
+def opt_ticks(price: Any) -> Optional[int]:
+    return to_ticks(price) if price is not None else None
+
+
+def opt_price(ticks: Optional[int]) -> Optional[float]:
+    return ticks / PRICE_SCALE if ticks is not None else None
+
+
+def opt_size(units: Optional[int]) -> Optional[float]:
+    return units / SIZE_SCALE if units is not None else None
+
+
+def notional(ticks: int, units: int) -> int:
+    """Notional of a size at a price, in micro-USDC (rounded down)."""
+    return ticks * units // PRICE_SCALE
+
+
+def to_notional(value: Any) -> int:
+    """Convert an amount of USDC to micro-USDC."""
+    return round(float(value) * NOTIONAL_SCALE)
+
+
+def ticks_array(prices: Iterable[Any]) -> "np.ndarray":
+    """Convert a column of prices to an int64 array of ticks."""
+    import numpy as np
+
+    return np.rint(np.asarray(prices, dtype=np.float64) * PRICE_SCALE).astype(np.int64)
+
+
+def units_array(sizes: Iterable[Any]) -> "np.ndarray":
+    """Convert a column of sizes to an int64 array of micro-units."""
+    import numpy as np
+
+    return np.rint(np.asarray(sizes, dtype=np.float64) * SIZE_SCALE).astype(np.int64)
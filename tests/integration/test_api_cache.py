@@ -0,0 +1,38 @@
+"""
+Integration tests for the API's Redis market store.
+"""
+
+import os
+import uuid
+
+import pytest
+import redis.asyncio as redis
+
+from services.api.cache import MarketStore
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not os.getenv('RUN_INTEGRATION_TESTS'), reason="Integration tests not enabled")
+async def test_market_store_versioned_changes():
+    """Test clients can fetch only the markets changed since a version (needs Redis)."""
+    client = redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379'))
+    await client.delete('markets:active', 'markets:active:version', 'markets:active:changes')
+    store = MarketStore(client, ttl=0.0, max_events=3)
+    try:
+        await store.put_market('a', {'id': 'a'})
+        version = await store.put_market('b', {'id': 'b'})
+        assert (await store.active_markets())['markets'] == [{'id': 'a'}, {'id': 'b'}]
+
+        await store.put_market('a', {'id': 'a', 'closed': True})
+        await store.remove_market('b')
+        changes = await store.active_markets(since=version)
+        assert changes == {'version': version + 2, 'markets': [{'id': 'a', 'closed': True}], 'removed': ['b']}
+
+        market = uuid.uuid4().hex
+        for i in range(5):
+            await store.push_event(market, {'n': i})
+        assert await store.events(market, limit=100) == [{'n': 4}, {'n': 3}, {'n': 2}]
+    finally:
+        await client.aclose()
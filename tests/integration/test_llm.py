@@ -0,0 +1,128 @@
+"""
+Integration tests for the LLM analysis pipeline against a local stub server.
+"""
+
+import asyncio
+import json
+import re
+
+import pytest
+from aiohttp import web
+
+from llm import MARKET_ANALYSIS, ChatClient, LLMPipeline, ResponseCache
+
+pytestmark = pytest.mark.integration
+
+_MARKET_ID = re.compile(r"^\[(.+)\]$", re.MULTILINE)
+
+
+class StubLLM:
+    """OpenAI-compatible chat completion server answering 0.5 for every market."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def chat(self, request):
+        body = await request.json()
+        self.requests.append(body)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        ids = _MARKET_ID.findall(body["messages"][-1]["content"])
+        content = json.dumps({"results": [
+            {"id": market_id, "probability": 0.5, "confidence": "low", "summary": "stub"}
+            for market_id in ids
+        ]})
+        return web.json_response({"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+
+@pytest.fixture
+async def stub():
+    server = StubLLM()
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", server.chat)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    server.base_url = f"http://127.0.0.1:{port}/v1"
+    yield server
+    await runner.cleanup()
+
+
+def make_markets(count, news=()):
+    return [
+        {"id": f"m{i}", "question": f"Will event {i} happen?", "description": "Resolves YES if it does.",
+         "news": list(news)}
+        for i in range(count)
+    ]
+
+
+async def test_batches_with_concurrency_cap(stub, tmp_path):
+    client = ChatClient(base_url=stub.base_url, api_key="test")
+    pipeline = LLMPipeline(client, MARKET_ANALYSIS, ResponseCache(tmp_path), max_concurrency=2, batch_size=3)
+    try:
+        results = await pipeline.analyze(make_markets(10))
+    finally:
+        await client.close()
+
+    assert len(results) == 10
+    assert results["m7"]["probability"] == 0.5
+    assert len(stub.requests) == 4  # ceil(10 / 3)
+    assert stub.max_in_flight == 2
+
+
+async def test_only_changed_markets_are_reanalyzed(stub, tmp_path):
+    client = ChatClient(base_url=stub.base_url, api_key="test")
+    pipeline = LLMPipeline(client, MARKET_ANALYSIS, ResponseCache(tmp_path), batch_size=10)
+    try:
+        markets = make_markets(5)
+        await pipeline.analyze(markets)
+        # Price changes alone do not trigger re-analysis
+        for market in markets:
+            market["price"] = 0.42
+        await pipeline.analyze(markets)
+        assert len(stub.requests) == 1
+        assert pipeline.stats["unchanged"] == 5
+
+        markets[2]["news"] = ["Breaking: event 2 confirmed"]
+        await pipeline.analyze(markets)
+        assert len(stub.requests) == 2
+        assert "[m2]" in stub.requests[-1]["messages"][-1]["content"]
+        assert "[m1]" not in stub.requests[-1]["messages"][-1]["content"]
+    finally:
+        await client.close()
+
+
+async def test_disk_cache_survives_restart(stub, tmp_path):
+    client = ChatClient(base_url=stub.base_url, api_key="test")
+    try:
+        await LLMPipeline(client, MARKET_ANALYSIS, ResponseCache(tmp_path)).analyze(make_markets(3))
+        restarted = LLMPipeline(client, MARKET_ANALYSIS, ResponseCache(tmp_path))
+        results = await restarted.analyze(make_markets(3))
+    finally:
+        await client.close()
+
+    assert len(stub.requests) == 1
+    assert restarted.stats["cached"] == 3
+    assert results["m0"]["summary"] == "stub"
+
+
+def test_cache_ttl_eviction(tmp_path):
+    cache = ResponseCache(tmp_path, ttl=60)
+    cache.set("market_analysis:1", "m0", "abc", {"probability": 0.3}, now=1000.0)
+    cache.set("market_analysis:1", "m1", "abc", {"probability": 0.4}, now=1100.0)
+
+    assert cache.get("market_analysis:1", "m0", "abc", now=1050.0) == {"probability": 0.3}
+    # A new prompt version never reuses old answers
+    assert cache.get("market_analysis:2", "m0", "abc", now=1050.0) is None
+    assert cache.evict(now=1120.0) == 1
+    assert cache.get("market_analysis:1", "m0", "abc", now=1120.0) is None
+    assert cache.get("market_analysis:1", "m1", "abc", now=1120.0) == {"probability": 0.4}
@@ -11,7 +11,9 @@ from dotenv import load_dotenv
 from py_clob_client.client import ClobClient
 from py_clob_client.clob_types import ApiCreds
 
+from services.ingest.catalogue import MarketCatalogue
 from services.ingest.market_data import MarketState, MarketDataService
+from services.ingest.snapshot import MarketSnapshotStore
 
 # Load test environment
 load_dotenv()
@@ -93,7 +95,7 @@ async def test_service_start_stop(mock_client):
     # Start service
     await service.start()
     assert service._running
-    assert len(service._tasks) == 1
+    assert len(service._tasks) == 2  # catalogue sync + price refresh
     
     # Stop service
     await service.stop()
@@ -110,6 +112,14 @@ async def test_callback_registration(mock_client):
     service.add_callback(callback)
     assert len(service._callbacks) == 1
     assert service._callbacks[0] == callback
+    
+    # Sync and async callbacks both receive the market state
+    async_callback = AsyncMock()
+    service.add_callback(async_callback)
+    state = MarketState(market_id='1', condition_id='market1', token_ids=['yes1'])
+    await service._notify(state)
+    callback.assert_called_once_with(state)
+    async_callback.assert_awaited_once_with(state)
 
 @pytest.mark.asyncio
 async def test_market_updates(mock_client, market_data, order_book_data):
@@ -172,6 +182,124 @@ async def test_market_state_retrieval(mock_client, market_data):
     assert service.get_market_state('nonexistent') is None
     assert len(service.get_all_markets()) == 1
 
+@pytest.mark.asyncio
+async def test_catalogue_incremental_sync(mock_client, market_data, tmp_path):
+    """Test catalogue syncs resume from the last cursor and persist to disk."""
+    path = tmp_path / 'catalogue.json'
+    service = MarketDataService(mock_client, catalogue=MarketCatalogue(path))
+    mock_client.get_markets.return_value = {**market_data, 'next_cursor': 'LTE='}
+
+    assert await service.sync_catalogue(full=True)
+    mock_client.get_markets.assert_called_with(next_cursor='MA==')
+    assert len(service.catalogue) == 2
+    assert path.exists()
+
+    # Incremental sync picks up a market appended to the last page
+    new_market = {**market_data['data'][0], 'condition_id': 'market3'}
+    mock_client.get_markets.return_value = {
+        'data': market_data['data'] + [new_market],
+        'next_cursor': 'LTE='
+    }
+    assert await service.sync_catalogue()
+    assert len(service.catalogue) == 3
+
+    # A restarted service loads the catalogue without crawling
+    restarted = MarketCatalogue(path)
+    assert restarted.load() == 3
+    assert restarted.get('market3').data['question'] == 'Will X happen?'
+
+@pytest.mark.asyncio
+async def test_catalogue_sync_writes_the_market_store(mock_client, market_data, tmp_path):
+    """Test changed markets are put in the market store and closed ones removed."""
+    store = AsyncMock()
+    service = MarketDataService(mock_client, catalogue=MarketCatalogue(tmp_path / 'catalogue.json'), market_store=store)
+    mock_client.get_markets.return_value = {**market_data, 'next_cursor': 'LTE='}
+
+    assert await service.sync_catalogue(full=True)
+    assert [call.args[0] for call in store.put_market.await_args_list] == ['market1', 'market2']
+
+    # Unchanged markets are not written again
+    closed = {**market_data['data'][1], 'closed': True}
+    mock_client.get_markets.return_value = {'data': [market_data['data'][0], closed], 'next_cursor': 'LTE='}
+    assert await service.sync_catalogue(full=True)
+    assert store.put_market.await_count == 2
+    store.remove_market.assert_awaited_once_with('market2')
+
+@pytest.mark.asyncio
+async def test_full_sync_resumes_across_syncs(mock_client, tmp_path):
+    """Test a full crawl longer than one sync continues from its persisted cursor."""
+    pages = {'MA==': 'p1', 'p1': 'p2', 'p2': 'p3', 'p3': 'LTE='}
+
+    def get_markets(next_cursor):
+        market = {'condition_id': next_cursor, 'question': next_cursor, 'tokens': []}
+        return {'data': [market], 'next_cursor': pages[next_cursor]}
+
+    mock_client.get_markets.side_effect = get_markets
+    path = tmp_path / 'catalogue.json'
+    service = MarketDataService(mock_client, catalogue=MarketCatalogue(path), pages_per_sync=2)
+
+    assert await service.sync_catalogue(full=True)
+    assert len(service.catalogue) == 2 and service.catalogue.full_cursor == 'p2'
+    assert service.catalogue.last_full_sync == 0.0
+
+    # A restarted service picks the crawl up where it stopped
+    restarted = MarketDataService(mock_client, catalogue=MarketCatalogue(path), pages_per_sync=2)
+    restarted.catalogue.load()
+    assert await restarted.sync_catalogue()
+    mock_client.get_markets.assert_called_with(next_cursor='p3')
+    assert len(restarted.catalogue) == 4
+    assert restarted.catalogue.full_cursor is None and restarted.catalogue.last_full_sync > 0
+    assert restarted.catalogue.cursor == 'p3'
+
+
+@pytest.mark.asyncio
+async def test_price_loop_uses_catalogue(mock_client, market_data, order_book_data):
+    """Test the price loop refreshes books of catalogued markets only."""
+    service = MarketDataService(mock_client)
+    for market in market_data['data']:
+        service.catalogue.upsert(market)
+    mock_client.get_order_book.return_value = order_book_data
+
+    await service._update_markets(service._tracked_markets())
+
+    mock_client.get_markets.assert_not_called()
+    state = service.get_market_state('market1')
+    assert state.token_ids == ['yes1', 'no1']
+    assert state.best_bid_price == 0.60
+    assert state.best_ask_price == 0.65
+
+
+@pytest.mark.asyncio
+async def test_streamed_prices_follow_ingest_events(mock_client, market_data, order_book_data):
+    """Test books are seeded once over REST, then market state follows the ingest stream."""
+    service = MarketDataService(mock_client, stream_prices=True)
+    for market in market_data['data']:
+        service.catalogue.upsert(market)
+    mock_client.get_order_book.return_value = order_book_data
+    updates = []
+    service.add_callback(updates.append)
+
+    for _ in range(2):
+        await service._update_markets(service._unseeded(service._tracked_markets()))
+    assert mock_client.get_order_book.call_count == 4
+
+    changed = await service.handle_event({
+        'type': 'price_change', 'market': 'market1',
+        'price_changes': [{'asset_id': 'yes1', 'side': 'BUY', 'price': '0.62', 'size': '50'}]
+    })
+    assert changed == [service.get_market_state('market1')]
+    assert (changed[0].best_bid_price, changed[0].best_bid_size) == (0.62, 50.0)
+    assert updates[-1] is changed[0]
+
+    # The NO book and levels behind the top do not change the quote
+    assert await service.handle_event({
+        'type': 'l2_book', 'market': 'market1', 'asset_id': 'no1',
+        'bids': [{'price': '0.30', 'size': '10'}], 'asks': [{'price': '0.40', 'size': '10'}]
+    }) == []
+    assert service.books.book('no1').best_ask == 0.40
+    await service.handle_event({'type': 'trades', 'market': 'market2', 'price': '0.63', 'size': '5'})
+    assert service.get_market_state('market2').last_price == 0.63
+
 @pytest.mark.integration
 @pytest.mark.skipif(not os.getenv('RUN_INTEGRATION_TESTS'), reason="Integration tests not enabled")
 async def test_integration_with_real_client():
@@ -222,4 +350,35 @@ async def test_integration_with_real_client():
     
     # Verify we got some market data
     markets = service.get_all_markets()
-    assert len(markets) > 0  # Should have found some markets 
\ No newline at end of file
+    assert len(markets) > 0  # Should have found some markets 
+
+
+@pytest.mark.asyncio
+async def test_warm_start_from_snapshot(mock_client, market_data, order_book_data, tmp_path):
+    """Test a restarted service serves market state from the last snapshot."""
+    catalogue_path = tmp_path / 'catalogue.json'
+    snapshot_store = MarketSnapshotStore(tmp_path / 'markets.bin')
+
+    service = MarketDataService(
+        mock_client,
+        catalogue=MarketCatalogue(catalogue_path),
+        snapshot_store=snapshot_store
+    )
+    mock_client.get_markets.return_value = {**market_data, 'next_cursor': 'LTE='}
+    mock_client.get_order_book.return_value = order_book_data
+    await service.resync()
+    service.save_snapshot()
+
+    restarted = MarketDataService(
+        Mock(spec=ClobClient),
+        catalogue=MarketCatalogue(catalogue_path),
+        snapshot_store=snapshot_store
+    )
+    restarted.catalogue.load()
+    assert restarted.restore_snapshot() == 2
+
+    state = restarted.get_market_state('market1')
+    assert state.question == 'Will X happen?'
+    assert state.best_bid_price == 0.60
+    assert state.best_ask_size == 100.0
+    assert restarted._token_to_market['no2'] == 'market2'
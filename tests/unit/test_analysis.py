@@ -0,0 +1,200 @@
+"""
+Unit tests for the analysis service components.
+"""
+
+import numpy as np
+import pytest
+
+from services.analysis.arbitrage import (
+    BINARY_BUY,
+    BINARY_SELL,
+    NEG_RISK_BUY,
+    ArbitrageScanner,
+)
+from services.analysis.candles import CandleBuilder
+from services.analysis.engine import AnalyticsEngine
+from services.ingest.book import BookEngine
+
+
+def market(condition_id, neg_risk_market_id=None):
+    return {
+        'condition_id': condition_id,
+        'neg_risk': neg_risk_market_id is not None,
+        'neg_risk_market_id': neg_risk_market_id,
+        'tokens': [
+            {'token_id': f'{condition_id}-yes', 'outcome': 'Yes'},
+            {'token_id': f'{condition_id}-no', 'outcome': 'No'},
+        ]
+    }
+
+
+def quote(books, token_id, bid, ask, size=100):
+    books.apply_snapshot(token_id, {
+        'bids': [{'price': bid, 'size': size}],
+        'asks': [{'price': ask, 'size': size}]
+    })
+
+
+def test_binary_arbitrage_is_recomputed_incrementally():
+    """Test YES+NO mispricings are found and only changed markets are rescanned."""
+    books = BookEngine()
+    scanner = ArbitrageScanner(books)
+    scanner.track(market('m1'))
+    scanner.track(market('m2'))
+    found = []
+    scanner.add_listener(found.append)
+
+    quote(books, 'm1-yes', 0.40, 0.45, size=30)
+    quote(books, 'm1-no', 0.50, 0.52)
+    quote(books, 'm2-yes', 0.60, 0.61)
+    quote(books, 'm2-no', 0.45, 0.47)
+
+    changed = scanner.scan()
+    assert {(o.kind, o.key) for o in changed} == {(BINARY_BUY, 'm1'), (BINARY_SELL, 'm2')}
+    buy = scanner.active[(BINARY_BUY, 'm1')]
+    assert buy.edge == pytest.approx(0.03)
+    assert buy.size == 30
+    assert [leg.token_id for leg in buy.legs] == ['m1-yes', 'm1-no']
+    assert found == changed
+
+    # Nothing changed: nothing recomputed or emitted
+    assert scanner.scan() == []
+
+    # The m1 edge closes
+    quote(books, 'm1-no', 0.50, 0.56)
+    assert scanner.scan() == []
+    assert (BINARY_BUY, 'm1') not in scanner.active
+    assert [o.key for o in scanner.opportunities()] == ['m2']
+
+
+def test_neg_risk_group_arbitrage():
+    """Test YES tokens of all outcomes of a neg-risk event are summed."""
+    books = BookEngine()
+    scanner = ArbitrageScanner(books, min_size=1)
+    for condition_id in ('a', 'b', 'c'):
+        scanner.track(market(condition_id, neg_risk_market_id='event'))
+    for condition_id, ask in (('a', 0.30), ('b', 0.30), ('c', 0.35)):
+        quote(books, f'{condition_id}-yes', ask - 0.02, ask, size=20)
+
+    scanner.scan()
+    opportunity = scanner.active[(NEG_RISK_BUY, 'event')]
+    assert opportunity.edge == pytest.approx(0.05)
+    assert opportunity.profit == pytest.approx(1.0)
+    assert len(opportunity.legs) == 3
+
+
+def test_scanner_follows_the_ingest_book_stream():
+    """Test l2_book and price_change bus events reach the books and open an opportunity."""
+    books = BookEngine()
+    scanner = ArbitrageScanner(books)
+    scanner.track(market('m1'))
+    for token_id, bid, ask in (('m1-yes', '0.40', '0.49'), ('m1-no', '0.48', '0.52')):
+        books.handle({
+            'type': 'l2_book', 'market': 'm1', 'asset_id': token_id,
+            'bids': [{'price': bid, 'size': '100'}], 'asks': [{'price': ask, 'size': '100'}]
+        })
+    assert scanner.scan() == []
+
+    books.handle({
+        'type': 'price_change', 'market': 'm1',
+        'price_changes': [{'asset_id': 'm1-yes', 'side': 'SELL', 'price': '0.45', 'size': '40'}]
+    })
+    changed = scanner.scan()
+    assert [(o.kind, o.key) for o in changed] == [(BINARY_BUY, 'm1')]
+    assert changed[0].edge == pytest.approx(0.03)
+    assert changed[0].size == 40
+    assert books.book('m1-yes').best_ask == pytest.approx(0.45)
+
+
+def test_analytics_features_match_direct_computation():
+    """Test vectorized features over wrapped ring buffers."""
+    books = BookEngine()
+    engine = AnalyticsEngine(window=4, max_markets=1, bucket_seconds=60, volume_buckets=4)
+    now = 6000.0
+
+    # Six trades wrap the four-slot ring; only the last four count
+    trades = [(0.50, 1), (0.52, 2), (0.48, 3), (0.50, 4), (0.55, 5), (0.60, 6)]
+    for price, size in trades:
+        engine.on_trade('m1', price, size, timestamp=now)
+    for volume in (10, 20, 30):
+        engine.on_trade('m2', 0.5, volume, timestamp=now - 60 * (4 - volume // 10))
+    engine.on_trade('m2', 0.5, 60, timestamp=now)
+
+    mids = []
+    for bid, ask in ((0.40, 0.50), (0.42, 0.50), (0.44, 0.52)):
+        book = books.apply_snapshot('yes', {
+            'bids': [{'price': bid, 'size': 10}, {'price': bid - 0.1, 'size': 10}],
+            'asks': [{'price': ask, 'size': 10}]
+        })
+        engine.on_book('m1', book)
+        mids.append((bid + ask) / 2)
+
+    engine.compute(now=now)
+    features = engine.get('m1')
+
+    last = trades[-4:]
+    assert features['vwap'] == pytest.approx(sum(p * s for p, s in last) / sum(s for _, s in last))
+    returns = np.diff(np.log(mids))
+    assert features['volatility'] == pytest.approx(np.sqrt((returns ** 2).sum()))
+    # Bid rose twice (+10 each) and the ask rose once (+10)
+    assert features['ofi'] == pytest.approx(30.0)
+    assert features['bid_slope'] > 0
+    assert len(engine) == 2
+
+    history = np.array([10.0, 20.0, 30.0])
+    assert engine.get('m2')['volume_z'] == pytest.approx((60 - history.mean()) / history.std())
+
+
+def test_candles_roll_up_from_lower_resolutions():
+    """Test higher resolution bars are merged from closed lower ones."""
+    builder = CandleBuilder()
+    t0 = 1_700_000_100  # on a 5m boundary
+    trades = [(t0, 0.50, 10), (t0, 0.55, 5), (t0 + 1, 0.45, 1), (t0 + 61, 0.60, 2), (t0 + 62, 0.58, 3)]
+    for timestamp, price, size in trades:
+        builder.on_trade('m1', price, size, timestamp)
+
+    seconds = builder.store.range('m1', '1s')
+    assert [(c.start, c.open, c.high, c.low, c.close, c.volume) for c in seconds] == [
+        (t0, 0.50, 0.55, 0.50, 0.55, 15), (t0 + 1, 0.45, 0.45, 0.45, 0.45, 1), (t0 + 61, 0.60, 0.60, 0.60, 0.60, 2)
+    ]
+    minute = builder.store.range('m1', '1m')[0]
+    assert (minute.open, minute.high, minute.low, minute.close, minute.volume, minute.trades) == \
+        (0.50, 0.55, 0.45, 0.45, 16, 3)
+
+    # The in-progress 5m bar merges the open 1m and 1s bars
+    live = builder.candles('m1', '5m')[-1]
+    assert (live.start, live.open, live.high, live.low, live.close, live.volume) == (t0, 0.50, 0.60, 0.45, 0.58, 21)
+
+    # Flushing closes quiet bars; range queries see them
+    builder.flush(now=t0 + 3600)
+    assert [c.start for c in builder.candles('m1', '1m', start=t0 + 60)] == [t0 + 60]
+    assert builder.store.range('m1', '5m')[0].volume == 21
+    assert len(builder.drain_closed()) == 8  # 4 x 1s, 2 x 1m, 5m and 1h
+
+
+def test_late_trades_go_into_the_bars_of_their_timestamp():
+    """Test a late trade amends its closed bars and the open bar of its period, not the latest one."""
+    builder = CandleBuilder()
+    t0 = 1_700_000_100  # on a 5m boundary
+    for timestamp, price, size in [(t0, 0.50, 10), (t0 + 2, 0.52, 1), (t0 + 61, 0.60, 2), (t0 + 62, 0.61, 1)]:
+        builder.on_trade('m1', price, size, timestamp)
+    builder.drain_closed()
+
+    builder.on_trade('m1', 0.40, 4, t0 + 1)
+    amended = [(resolution, c.start) for _, resolution, c in builder.drain_closed()]
+    assert amended == [('1s', t0 + 1), ('1m', t0)]
+
+    seconds = builder.store.range('m1', '1s')
+    assert [c.start for c in seconds] == [t0, t0 + 1, t0 + 2, t0 + 61]
+    minute = builder.store.range('m1', '1m')[0]
+    assert (minute.open, minute.low, minute.close, minute.volume, minute.trades) == (0.50, 0.40, 0.52, 15, 3)
+    # The open 1s bar keeps only its own trades
+    live = builder.live('m1', '1s')
+    assert (live.start, live.low, live.volume) == (t0 + 62, 0.61, 1)
+
+    # Within the open minute, the late trade joins the open 1m bar
+    builder.on_trade('m1', 0.70, 5, t0 + 61)
+    assert [(r, c.start) for _, r, c in builder.drain_closed()] == [('1s', t0 + 61)]
+    assert builder.live('m1', '1m').high == 0.70
+    builder.flush(now=t0 + 3600)
+    assert builder.store.range('m1', '5m')[0].volume == 23
@@ -0,0 +1,53 @@
+"""
+Unit tests for the API services: read cache and startup.
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from services.api.cache import ReadThroughCache
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+@pytest.mark.asyncio
+async def test_read_through_cache_ttl_and_coalescing():
+    """Test hits within the TTL, one load for concurrent misses, and invalidation."""
+    cache = ReadThroughCache(ttl=1.0)
+    loads = []
+
+    async def load():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return {'n': len(loads)}
+
+    results = await asyncio.gather(*(cache.get('k', load, now=0.0) for _ in range(10)))
+    assert results == [{'n': 1}] * 10
+    assert len(loads) == 1
+
+    assert await cache.get('k', load, now=0.5) == {'n': 1}
+    assert await cache.get('k', load, now=1.5) == {'n': 2}
+    assert await cache.get('k', load, variant=10, now=1.5) == {'n': 3}
+
+    cache.invalidate('k')
+    assert await cache.get('k', load, now=1.6) == {'n': 4}
+    assert cache.stats['invalidations'] == 1
+
+
+def test_service_imports_are_light_and_side_effect_free(tmp_path):
+    """Test importing the services neither loads the web3 stack nor touches the disk."""
+    code = (
+        "import sys, api.main, services.ingest.main, services.analysis.main, services.execution.main;"
+        "print(sorted(m for m in ('py_clob_client', 'eth_keys', 'web3') if m in sys.modules))"
+    )
+    env = dict(os.environ, PYTHONPATH=str(ROOT), BUS_URL='memory://')
+    result = subprocess.run([sys.executable, '-c', code], cwd=tmp_path, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == '[]'
+    assert list(tmp_path.iterdir()) == []
+
@@ -0,0 +1,79 @@
+"""
+Unit tests for the authentication service: client pool and credential cache.
+"""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services.auth.pool import ClientPool, CredentialCache
+
+KEY_A = '0x' + '11' * 32
+KEY_B = '0x' + '22' * 32
+
+
+def fake_derive(calls):
+    lock = threading.Lock()
+
+    def derive(host, private_key, chain_id, signature_type, funder):
+        time.sleep(0.05)
+        with lock:
+            calls.append(private_key)
+        return SimpleNamespace(api_key=f'key-{private_key[-4:]}', api_secret='c2VjcmV0', api_passphrase='pass')
+
+    return derive
+
+
+@pytest.mark.asyncio
+async def test_client_pool_shares_accounts_and_connections():
+    """Test one derivation per wallet, concurrent wallets, and one HTTP client per host."""
+    calls = []
+    pool = ClientPool(derive=fake_derive(calls))
+    try:
+        accounts = await asyncio.gather(
+            *(pool.account(KEY_A) for _ in range(5)),
+            pool.account(KEY_B.upper().replace('0X', '')),
+        )
+        assert all(account is accounts[0] for account in accounts[:5])
+        assert sorted(calls) == [KEY_A, KEY_B]
+
+        a, b = accounts[0], accounts[5]
+        assert a.address != b.address
+        assert pool.get(KEY_A) is a
+        assert pool.get(KEY_A, signature_type=1, funder='0x' + '33' * 20) is not a
+        assert a.async_client() is a.async_client()
+        assert a.async_client()._http is b.async_client()._http
+        assert b.async_client().creds.api_key == f'key-{KEY_B[-4:]}'
+
+        # Known credentials replace those of a pooled account and its clients
+        client = a.async_client()
+        creds = SimpleNamespace(api_key='rotated', api_secret='c2VjcmV0', api_passphrase='pass')
+        assert pool.get(KEY_A, creds=creds) is a
+        assert a.creds is creds and a.async_client() is not client
+        assert a.async_client().creds.api_key == 'rotated'
+    finally:
+        await pool.aclose()
+
+
+def test_credential_cache_encrypts_per_account(tmp_path):
+    """Test credentials survive a restart, are encrypted, and only decrypt for their account."""
+    pytest.importorskip('cryptography')
+    calls = []
+    pool = ClientPool(CredentialCache(tmp_path), derive=fake_derive(calls))
+    account = pool.get(KEY_A)
+    assert len(calls) == 1
+
+    path = pool.cache.path(account.key)
+    assert b'key-' not in path.read_bytes()
+    assert path.stat().st_mode & 0o777 == 0o600
+
+    restarted = ClientPool(CredentialCache(tmp_path), derive=fake_derive(calls))
+    assert restarted.get(KEY_A).creds.api_key == account.creds.api_key
+    assert len(calls) == 1 and restarted.stats['cache_loads'] == 1
+
+    assert restarted.cache.load(account.key, KEY_B) is None
+    path.write_bytes(path.read_bytes()[:-1] + b'\x00')
+    assert restarted.cache.load(account.key, KEY_A) is None
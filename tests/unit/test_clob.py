@@ -0,0 +1,151 @@
+"""
+Unit tests for the CLOB client layer.
+"""
+
+import asyncio
+import base64
+import json
+
+import httpx
+import pytest
+from py_clob_client.clob_types import ApiCreds
+from py_clob_client.signing.hmac import build_hmac_signature
+
+from services.clob.client import AsyncClobClient, L2Signer
+from services.clob.scheduler import Priority, RateLimit, RequestScheduler
+
+CREDS = ApiCreds(
+    api_key='key',
+    api_secret=base64.urlsafe_b64encode(b'secret-bytes').decode(),
+    api_passphrase='pass'
+)
+ADDRESS = '0x0000000000000000000000000000000000000001'
+
+
+class RateLimitedError(Exception):
+    """Error carrying an HTTP status like PolyApiException."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FakeClient:
+    """Async client recording the order of calls."""
+
+    def __init__(self):
+        self.calls = []
+        self.failures = 0
+
+    async def get_order_book(self, token_id):
+        self.calls.append(('get_order_book', token_id))
+        await asyncio.sleep(0.01)
+        return {'token_id': token_id}
+
+    async def get_markets(self, next_cursor='MA=='):
+        self.calls.append(('get_markets', next_cursor))
+        return {'data': []}
+
+    async def post_order(self, order):
+        self.calls.append(('post_order', order))
+        if self.failures:
+            self.failures -= 1
+            raise RateLimitedError(429)
+        return {'success': True}
+
+
+@pytest.mark.asyncio
+async def test_identical_reads_are_coalesced():
+    """Test duplicate in-flight reads share a single request."""
+    client = FakeClient()
+    scheduler = RequestScheduler(client)
+
+    results = await asyncio.gather(*[scheduler.call('get_order_book', 'tok') for _ in range(5)])
+
+    assert all(result == {'token_id': 'tok'} for result in results)
+    assert client.calls == [('get_order_book', 'tok')]
+    assert scheduler.stats['book']['coalesced'] == 4
+
+
+@pytest.mark.asyncio
+async def test_priority_order_when_throttled():
+    """Test queued orders are served before catalogue syncs."""
+    client = FakeClient()
+    scheduler = RequestScheduler(client, limits={'global': RateLimit(rate=20.0, burst=1.0)})
+
+    # Drain the only global token, then queue low priority before high priority
+    await scheduler.call('get_order_book', 'warmup')
+    low = asyncio.create_task(scheduler.call('get_markets', next_cursor='MA=='))
+    await asyncio.sleep(0)
+    high = asyncio.create_task(scheduler.call('post_order', 'o1'))
+    await asyncio.gather(low, high)
+
+    assert [name for name, _ in client.calls[1:]] == ['post_order', 'get_markets']
+
+
+@pytest.mark.asyncio
+async def test_backoff_and_retry_on_429():
+    """Test 429 responses cut the group rate and are retried."""
+    client = FakeClient()
+    client.failures = 1
+    scheduler = RequestScheduler(client, base_backoff=0.01)
+
+    result = await scheduler.call('post_order', 'o1', priority=Priority.ORDER)
+
+    assert result == {'success': True}
+    assert len(client.calls) == 2
+    assert scheduler.stats['order']['throttled'] == 1
+    assert scheduler._bucket('order').scale < 1.0
+
+
+def test_l2_signer_matches_reference_signature(monkeypatch):
+    """Test cached L2 headers sign exactly like py_clob_client."""
+    monkeypatch.setattr('services.clob.client.time.time', lambda: 1700000000.5)
+    signer = L2Signer(ADDRESS, CREDS)
+    body = json.dumps({'orderID': 'abc'}, separators=(',', ':'))
+
+    headers = signer.headers('DELETE', '/order', body)
+    expected = build_hmac_signature(
+        CREDS.api_secret, headers['POLY_TIMESTAMP'], 'DELETE', '/order', body
+    )
+    assert headers['POLY_SIGNATURE'] == expected
+    assert headers['POLY_API_KEY'] == 'key'
+
+    # Body-less requests reuse headers within the same second
+    first = signer.headers('GET', '/data/orders')
+    assert signer.headers('GET', '/data/orders') is first
+
+
+@pytest.mark.asyncio
+async def test_async_client_requests():
+    """Test the async client speaks the CLOB REST protocol."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path == '/book':
+            return httpx.Response(200, json={'bids': [{'price': '0.4', 'size': '10'}], 'asks': []})
+        if request.url.path == '/order':
+            return httpx.Response(200, json={'success': True, 'orderID': '0x1'})
+        return httpx.Response(429, json={'error': 'Too Many Requests'})
+
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client = AsyncClobClient(host='https://clob.test', creds=CREDS, address=ADDRESS, http_client=http)
+
+    book = await client.get_order_book('123')
+    assert book['bids'][0]['price'] == '0.4'
+    assert requests[0].url.params['token_id'] == '123'
+    assert 'POLY_SIGNATURE' not in requests[0].headers
+
+    response = await client.post_order({'salt': 1, 'side': 'BUY'}, order_type='FOK')
+    assert response['orderID'] == '0x1'
+    sent = json.loads(requests[1].content)
+    assert sent == {'order': {'salt': 1, 'side': 'BUY'}, 'owner': 'key', 'orderType': 'FOK', 'postOnly': False}
+    assert requests[1].headers['POLY_ADDRESS'] == ADDRESS
+
+    scheduler = RequestScheduler(client, max_retries=0)
+    with pytest.raises(Exception) as excinfo:
+        await scheduler.call('get_markets')
+    assert excinfo.value.status_code == 429
+
+    await http.aclose()
@@ -0,0 +1,134 @@
+"""
+Unit tests for the strategy runtime.
+"""
+
+import asyncio
+
+import pytest
+
+from services.decision.runtime import (
+    BOOK_UPDATE,
+    MARKET_UPDATE,
+    Strategy,
+    StrategyEvent,
+    StrategyRuntime,
+)
+from services.decision import main as decision
+from services.execution.executor import OrderIntent
+from shared.interfaces import InProcessBus, topic
+
+
+class RecordingStrategy(Strategy):
+    """Strategy recording events and buying on every book update."""
+
+    def __init__(self, name, markets=None, delay=0.0, inbox_size=1000):
+        self.name = name
+        self.event_types = frozenset({BOOK_UPDATE})
+        self.markets = frozenset(markets) if markets is not None else None
+        self.inbox_size = inbox_size
+        self.delay = delay
+        self.events = []
+
+    async def on_event(self, event):
+        self.events.append(event.data)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return [OrderIntent('tok', 'BUY', 0.5, 1, market=event.market)]
+
+
+async def wait_for(condition, timeout=1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.001)
+
+
+@pytest.mark.asyncio
+async def test_events_are_routed_to_subscribers():
+    """Test events reach only strategies subscribed to their type and market."""
+    intents = []
+    runtime = StrategyRuntime(intents.append)
+    only_m1 = RecordingStrategy('m1', markets=['m1'])
+    every_market = RecordingStrategy('all')
+    runtime.register(only_m1)
+    runtime.register(every_market)
+    await runtime.start()
+
+    assert runtime.publish(StrategyEvent(BOOK_UPDATE, 'm1', 1)) == 2
+    assert runtime.publish(StrategyEvent(BOOK_UPDATE, 'm2', 2)) == 1
+    assert runtime.publish(StrategyEvent(MARKET_UPDATE, 'm1', 3)) == 0
+    await wait_for(lambda: len(intents) == 3)
+
+    assert only_m1.events == [1]
+    assert every_market.events == [1, 2]
+    assert {intent.strategy for intent in intents} == {'m1', 'all'}
+
+    runtime.subscribe('m1', ['m2'])
+    assert runtime.publish(StrategyEvent(BOOK_UPDATE, 'm1', 4)) == 1
+    await runtime.stop()
+
+
+@pytest.mark.asyncio
+async def test_slow_strategy_drops_oldest_without_delaying_others():
+    """Test a slow strategy's bounded inbox does not hold back fast strategies."""
+    runtime = StrategyRuntime(lambda intent: None)
+    slow = RecordingStrategy('slow', delay=0.05, inbox_size=2)
+    fast = RecordingStrategy('fast')
+    runtime.register(slow)
+    runtime.register(fast)
+    await runtime.start()
+
+    for i in range(10):
+        runtime.publish(StrategyEvent(BOOK_UPDATE, 'm1', i))
+    await wait_for(lambda: len(fast.events) == 10, timeout=0.04)
+    await wait_for(lambda: not runtime.stats()['slow']['backlog'])
+
+    assert slow.events[-2:] == [8, 9]
+    assert runtime.stats()['slow']['dropped'] == 10 - len(slow.events)
+    await runtime.stop()
+
+
+@pytest.mark.asyncio
+async def test_decision_service_follows_markets_added_later(monkeypatch):
+    """Test the bus subscription picks up markets strategies subscribe to after startup."""
+    runtime = StrategyRuntime(lambda intent: None)
+    strategy = RecordingStrategy('s', markets=['m1'])
+    runtime.register(strategy)
+    bus = InProcessBus()
+    monkeypatch.setattr(decision, 'runtime', runtime)
+    monkeypatch.setattr(decision, 'bus', bus)
+    monkeypatch.setattr(decision, 'SUBSCRIBE_INTERVAL', 0.01)
+    monkeypatch.setattr(decision, 'subscription', await decision.subscribe_markets())
+    await runtime.start()
+    task = asyncio.create_task(decision.refresh_subscription())
+    try:
+        runtime.subscribe('s', ['m1', 'm2'])
+        await wait_for(lambda: decision.subscription.topics == {topic('market', 'm1'), topic('market', 'm2')})
+        await bus.publish(topic('market', 'm2'), {'type': 'l2_book', 'market': 'm2'})
+        await wait_for(lambda: len(strategy.events) == 1)
+        assert len(bus._router.routes[topic('market', 'm1')]) == 1
+    finally:
+        task.cancel()
+        await bus.close()
+        await runtime.stop()
+
+
+def test_price_changes_reach_strategies_as_books(monkeypatch):
+    """Test book deltas are applied and strategies get the resulting book."""
+    monkeypatch.setattr(decision, 'books', decision.BookEngine())
+    snapshot = {'type': 'l2_book', 'market': 'm1', 'asset_id': 'yes',
+                'bids': [{'price': '0.48', 'size': '10'}], 'asks': [{'price': '0.52', 'size': '10'}]}
+    assert [event.data for event in decision.to_strategy_events(snapshot)] == [snapshot]
+
+    events = decision.to_strategy_events({
+        'type': 'price_change', 'market': 'm1',
+        'price_changes': [
+            {'asset_id': 'yes', 'side': 'BUY', 'price': '0.49', 'size': '5'},
+            {'asset_id': 'yes', 'side': 'SELL', 'price': '0.52', 'size': '0'},
+        ],
+    })
+    assert [(event.type, event.market) for event in events] == [(BOOK_UPDATE, 'm1')]
+    book = events[0].data
+    assert book['type'] == 'l2_book' and book['asset_id'] == 'yes'
+    assert book['bids'] == [{'price': '0.49', 'size': '5.0'}, {'price': '0.48', 'size': '10.0'}]
+    assert book['asks'] == []
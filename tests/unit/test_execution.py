@@ -0,0 +1,420 @@
+"""
+Unit tests for order execution.
+"""
+
+import asyncio
+import functools
+import importlib
+import pickle
+from types import SimpleNamespace
+
+import pytest
+from py_clob_client.clob_types import CreateOrderOptions, OrderArgs
+from py_clob_client.order_builder import builder as reference_builder
+from py_clob_client.signer import Signer
+
+from services.execution import risk as risk_checks
+from services.execution.executor import MAX_BATCH_SIZE, ExecutionService, OrderIntent
+from services.execution.ledger import CANCELED, OrderLedger
+from services.execution.risk import RiskEngine, RiskLimits
+from services.execution.router import AccountRouter
+from services.execution.signing import BUY, SELL, OrderSigner, SigningPool
+from services.ingest.book import BookEngine
+
+PRIVATE_KEY = '0x' + '11' * 32
+TOKEN_ID = '71321045679252212594626385532706912750332728571942532289631379312455583992563'
+SALT = 123456789
+
+
+class FakeClient:
+    """Async CLOB client recording submitted orders."""
+
+    def __init__(self, prefix='0x'):
+        self.prefix = prefix
+        self.batches = []
+        self.lookups = []
+        self.cancelled = []
+
+    async def get_server_time(self):
+        return 1700000000
+
+    async def get_tick_size(self, token_id):
+        self.lookups.append(token_id)
+        return '0.01'
+
+    async def get_neg_risk(self, token_id):
+        return False
+
+    async def get_fee_rate_bps(self, token_id):
+        return 0
+
+    async def post_order(self, order, order_type='GTC', post_only=False):
+        self.batches.append([(order, order_type)])
+        return {'success': True, 'orderID': f"{self.prefix}{len(self.batches)}", 'status': 'live'}
+
+    async def post_orders(self, orders, post_only=False):
+        self.batches.append(list(orders))
+        start = sum(len(batch) for batch in self.batches)
+        return [{'success': True, 'orderID': f"{self.prefix}{start + i}", 'status': 'live'} for i in range(len(orders))]
+
+    async def cancel(self, order_id):
+        self.cancelled.append(order_id)
+        return {'canceled': [order_id]}
+
+
+@pytest.mark.parametrize('side,price,size,tick_size,neg_risk', [
+    (BUY, 0.52, 100.0, '0.01', False),
+    (SELL, 0.537, 12.345, '0.001', True),
+])
+def test_signing_matches_reference(monkeypatch, side, price, size, tick_size, neg_risk):
+    """Test template signing produces the same order as py_clob_client."""
+    monkeypatch.setattr(
+        reference_builder,
+        'UtilsOrderBuilder',
+        functools.partial(reference_builder.UtilsOrderBuilder, salt_generator=lambda: SALT)
+    )
+    reference = reference_builder.OrderBuilder(Signer(PRIVATE_KEY, 137)).create_order(
+        OrderArgs(token_id=TOKEN_ID, price=price, size=size, side=side),
+        CreateOrderOptions(tick_size=tick_size, neg_risk=neg_risk)
+    )
+
+    template = OrderSigner(PRIVATE_KEY).template(TOKEN_ID, tick_size=tick_size, neg_risk=neg_risk)
+    assert template.sign(side, price, size, salt=SALT) == reference.dict()
+
+
+@pytest.mark.asyncio
+async def test_batch_submission_uses_prepared_templates():
+    """Test intents are signed from cached templates and sent in batches."""
+    client = FakeClient()
+    service = ExecutionService(client, OrderSigner(PRIVATE_KEY))
+
+    assert await service.prepare([TOKEN_ID, TOKEN_ID]) == 1
+    intents = [OrderIntent(TOKEN_ID, BUY, 0.5, 10) for _ in range(MAX_BATCH_SIZE + 2)]
+    intents.append(OrderIntent(TOKEN_ID, SELL, 0.6, 10, post_only=True))
+
+    reports = await service.submit_batch(intents)
+
+    assert client.lookups == [TOKEN_ID]
+    assert [len(batch) for batch in client.batches] == [MAX_BATCH_SIZE, 2, 1]
+    assert all(report.success for report in reports)
+    assert service.latency_stats()['count'] == len(intents)
+
+
+def test_ledger_tracks_orders_and_fills():
+    """Test user channel events drive orders, positions and exposure."""
+    ledger = OrderLedger(owner='key')
+    ledger.handle({
+        'event_type': 'order', 'type': 'PLACEMENT', 'id': 'o1', 'market': 'm1', 'asset_id': 'yes',
+        'side': BUY, 'price': '0.40', 'original_size': '100', 'size_matched': '0'
+    })
+    assert ledger.exposure('m1').open_buy_notional == pytest.approx(40.0)
+
+    # We are the maker of o1; the event is delivered again once mined
+    trade = {
+        'event_type': 'trade', 'id': 't1', 'market': 'm1', 'asset_id': 'no', 'side': BUY,
+        'size': '25', 'price': '0.60', 'status': 'MATCHED', 'trader_side': 'MAKER', 'match_time': '1700000000',
+        'maker_orders': [
+            {'order_id': 'o1', 'owner': 'key', 'asset_id': 'yes', 'matched_amount': '25', 'price': '0.40'},
+            {'order_id': 'x', 'owner': 'other', 'asset_id': 'yes', 'matched_amount': '5', 'price': '0.40'}
+        ]
+    }
+    ledger.handle(trade)
+    ledger.handle({**trade, 'status': 'MINED'})
+    ledger.handle({
+        'event_type': 'order', 'type': 'UPDATE', 'id': 'o1', 'market': 'm1', 'asset_id': 'yes',
+        'side': BUY, 'price': '0.40', 'original_size': '100', 'size_matched': '25'
+    })
+
+    position = ledger.position('yes')
+    assert position.size == pytest.approx(25.0)
+    assert position.avg_price == pytest.approx(0.40)
+    assert ledger.get_order('o1').remaining == pytest.approx(75.0)
+    assert ledger.exposure('m1').total == pytest.approx(40.0)
+    assert ledger.total_exposure == pytest.approx(40.0)
+    assert ledger.last_trade_time == 1700000000
+
+    # A failed settlement reverses the fill
+    ledger.handle({**trade, 'status': 'FAILED'})
+    assert ledger.position('yes') is None
+
+
+def test_ledger_reconciliation_and_persistence():
+    """Test REST reconciliation closes stale orders and state survives a restart."""
+    ledger = OrderLedger()
+    for order_id in ('o1', 'o2'):
+        ledger.upsert_order(order_id, 'm1', 'yes', BUY, 0.5, 10)
+    ledger.on_trade({
+        'id': 't1', 'market': 'm1', 'asset_id': 'yes', 'side': BUY, 'size': '4', 'price': '0.5',
+        'status': 'MATCHED', 'trader_side': 'TAKER'
+    })
+
+    remote = [{'id': 'o2', 'market': 'm1', 'asset_id': 'yes', 'side': BUY, 'price': '0.5',
+               'original_size': '10', 'size_matched': '0'},
+              {'id': 'o3', 'market': 'm2', 'asset_id': 'no', 'side': SELL, 'price': '0.3',
+               'original_size': '5', 'size_matched': '0'}]
+    assert ledger.reconcile_orders(remote) == 2
+    assert ledger.get_order('o1').status == CANCELED
+    assert [order.order_id for order in ledger.open_orders('m2')] == ['o3']
+
+    restored = OrderLedger()
+    restored.load_dict(ledger.to_dict())
+    assert {order.order_id for order in restored.open_orders()} == {'o2', 'o3'}
+    assert restored.position('yes').size == pytest.approx(4.0)
+    assert restored.total_exposure == pytest.approx(ledger.total_exposure)
+    # Trades already applied are not applied twice
+    assert not restored.on_trade({'id': 't1', 'status': 'MINED'})
+
+
+def test_ledger_remembers_a_bounded_window_of_trades():
+    """Test trade IDs are bounded and fills of confirmed trades are released."""
+    ledger = OrderLedger(max_trades=2)
+    trade = {'market': 'm1', 'asset_id': 'yes', 'side': BUY, 'size': '1', 'price': '0.5',
+             'status': 'MATCHED', 'trader_side': 'TAKER'}
+    for trade_id in ('t1', 't2', 't3'):
+        ledger.on_trade({**trade, 'id': trade_id})
+    assert ledger.to_dict()['trade_ids'] == ['t2', 't3']
+
+    assert not ledger.on_trade({**trade, 'id': 't3', 'status': 'CONFIRMED'})
+    assert ledger._fills['t3'] == []
+    assert ledger.position('yes').size == pytest.approx(3.0)
+
+
+def test_ledger_forgets_the_oldest_closed_orders():
+    """Test filled and cancelled orders are bounded while open orders are kept."""
+    ledger = OrderLedger(max_closed_orders=2)
+    ledger.upsert_order('open', 'm1', 'yes', BUY, 0.5, 10)
+    for order_id in ('o1', 'o2', 'o3'):
+        ledger.upsert_order(order_id, 'm1', 'yes', BUY, 0.5, 10)
+        ledger.close_order(order_id)
+    ledger.upsert_order('o4', 'm1', 'yes', BUY, 0.5, 10, size_matched=10)
+
+    assert [order_id for order_id in ('o1', 'o2', 'o3', 'o4') if ledger.get_order(order_id)] == ['o3', 'o4']
+    assert [order.order_id for order in ledger.open_orders()] == ['open']
+    assert ledger.exposure('m1').open_buy_notional == pytest.approx(5.0)
+
+
+def test_risk_checks():
+    """Test each risk limit rejects with its reason."""
+    ledger = OrderLedger()
+    ledger.upsert_order('o1', 'm1', 'yes', BUY, 0.5, 1000)  # 500 USDC committed
+    engine = RiskEngine(ledger, RiskLimits(max_order_notional=100.0, max_market_notional=600.0),
+                        max_total_notional=1000.0, max_orders_per_second=0.001, order_burst=3)
+    engine.set_market_limits('m2', max_order_size=10.0)
+    engine.update_top('yes', 0.48, 0.52)
+
+    def intent(price, size, market='m1', side=BUY):
+        return OrderIntent('yes', side, price, size, market=market)
+
+    assert engine.check(intent(1.2, 10)) == risk_checks.INVALID_PRICE
+    assert engine.check(intent(0.5, 11, market='m2')) == risk_checks.ORDER_SIZE
+    assert engine.check(intent(0.5, 300)) == risk_checks.ORDER_NOTIONAL
+    assert engine.check(intent(0.60, 10)) == risk_checks.PRICE_BAND
+    assert engine.check(intent(0.40, 10, side=SELL)) == risk_checks.PRICE_BAND
+
+    # Approved orders reserve notional until released
+    assert engine.check(intent(0.5, 150)) is None
+    assert engine.check(intent(0.5, 150)) == risk_checks.MARKET_NOTIONAL
+    engine.release(intent(0.5, 150))
+
+    assert engine.check(intent(0.5, 10)) is None
+    assert engine.check(intent(0.5, 10, side=SELL)) is None
+    assert engine.check(intent(0.5, 10, side=SELL)) == risk_checks.ORDER_RATE
+
+    engine.halt()
+    assert engine.check(intent(0.5, 10)) == risk_checks.KILL_SWITCH
+
+
+def test_risk_resolves_or_rejects_intents_without_market():
+    """Test per-market limits apply to intents that do not name their market."""
+    engine = RiskEngine(OrderLedger(), RiskLimits(max_market_notional=10.0))
+    assert engine.check(OrderIntent('yes', BUY, 0.5, 10)) == risk_checks.UNKNOWN_MARKET
+
+    engine.on_market_update(SimpleNamespace(
+        condition_id='m1', token_ids=['yes', 'no'], best_bid_price=0.48, best_ask_price=0.52
+    ))
+    intent = OrderIntent('no', BUY, 0.5, 15)
+    assert engine.check(intent) is None and intent.market == 'm1'
+    assert engine.check(OrderIntent('yes', BUY, 0.5, 10)) == risk_checks.MARKET_NOTIONAL
+
+
+def test_risk_limits_are_exact_at_the_boundary():
+    """Test fixed-point notionals: 0.1 x 3 is exactly 0.3 USDC, not 0.30000000000000004."""
+    engine = RiskEngine(OrderLedger(), RiskLimits(max_order_notional=0.3))
+    assert engine.check(OrderIntent('yes', BUY, 0.1, 3, market='m1')) is None
+    assert engine.check(OrderIntent('yes', BUY, 0.1, 3.01, market='m1')) == risk_checks.ORDER_NOTIONAL
+
+
+@pytest.mark.asyncio
+async def test_rejected_orders_are_not_sent():
+    """Test the execution service only submits orders passing risk checks."""
+    client = FakeClient()
+    ledger = OrderLedger()
+    engine = RiskEngine(ledger, RiskLimits(max_order_size=50.0))
+    service = ExecutionService(client, OrderSigner(PRIVATE_KEY), ledger=ledger, risk=engine)
+
+    report = await service.submit(OrderIntent(TOKEN_ID, BUY, 0.5, 100, market='m1'))
+    assert not report.success and report.error == risk_checks.ORDER_SIZE
+    assert client.batches == []
+
+    report = await service.submit(OrderIntent(TOKEN_ID, BUY, 0.5, 20, market='m1'))
+    assert report.success
+    assert ledger.exposure('m1').open_buy_notional == pytest.approx(10.0)
+    assert engine._pending_total == 0.0
+
+
+@pytest.mark.asyncio
+async def test_failed_template_lookups_give_failed_reports():
+    """Test orders whose template cannot be built fail alone and release their reservations."""
+    client = FakeClient()
+    get_tick_size = client.get_tick_size
+
+    async def lookup(token_id):
+        if token_id == 'bad':
+            raise RuntimeError('lookup failed')
+        return await get_tick_size(token_id)
+
+    client.get_tick_size = lookup
+    engine = RiskEngine(OrderLedger())
+    service = ExecutionService(client, OrderSigner(PRIVATE_KEY), risk=engine)
+
+    report = await service.submit(OrderIntent('bad', BUY, 0.5, 10, market='m1'))
+    assert not report.success and report.error == 'lookup failed'
+
+    intents = [OrderIntent(TOKEN_ID, BUY, 0.5, 10, market='m1') for _ in range(MAX_BATCH_SIZE + 1)]
+    intents[3] = OrderIntent('bad', BUY, 0.5, 10, market='m1')
+    reports = await service.submit_batch(intents)
+    assert [report.success for report in reports].count(False) == 1
+    assert [len(batch) for batch in client.batches] == [MAX_BATCH_SIZE - 1, 1]
+    assert engine._pending_total == 0
+
+
+@pytest.mark.asyncio
+async def test_account_router_spreads_orders_and_routes_cancels():
+    """Test batches are split over accounts, sells go to the holder and cancels to the placer."""
+    clients = {'a': FakeClient('0xa'), 'b': FakeClient('0xb')}
+    services = {
+        name: ExecutionService(client, OrderSigner('0x' + key * 32), ledger=OrderLedger(), name=name)
+        for (name, client), key in zip(clients.items(), ['11', '22'])
+    }
+    router = AccountRouter(services)
+
+    intents = [OrderIntent(TOKEN_ID, BUY, 0.5, 10 + i) for i in range(2 * MAX_BATCH_SIZE)]
+    intents.append(OrderIntent(TOKEN_ID, BUY, 0.5, 1, account='b'))
+    intents.append(OrderIntent(TOKEN_ID, BUY, 0.5, 1, account='c'))
+    reports = await router.submit_batch(intents)
+
+    assert [report.intent for report in reports] == intents
+    assert reports[-1].error == 'Unknown account: c'
+    # The order sent to 'b' by name is charged to it before the others are spread
+    assert [len(batch) for batch in clients['a'].batches] == [MAX_BATCH_SIZE, 1]
+    assert [len(batch) for batch in clients['b'].batches] == [MAX_BATCH_SIZE]
+    assert router.stats == {'a': MAX_BATCH_SIZE + 1, 'b': MAX_BATCH_SIZE}
+
+    services['b'].ledger._apply_fill(TOKEN_ID, 'm1', BUY, 10.0, 0.5)
+    assert router.route(OrderIntent(TOKEN_ID, SELL, 0.6, 10)) == 'b'
+
+    order_id = next(report.order_id for report in reports if report.intent.account == 'a')
+    await router.cancel(order_id)
+    assert clients['a'].cancelled == [order_id] and clients['b'].cancelled == []
+    with pytest.raises(KeyError):
+        await router.cancel('0xunknown')
+
+
+@pytest.mark.asyncio
+async def test_all_in_one_sink_submits_through_the_router(monkeypatch):
+    """Test strategy intents in the all-in-one runtime are sent by the execution router."""
+    monkeypatch.setenv('BUS_URL', 'memory://')
+    monkeypatch.setenv('INGEST_STORE_EVENTS', 'false')
+    allinone = importlib.import_module('main')
+    from services.execution import main as execution_main
+
+    monkeypatch.setattr(execution_main, 'router', None)
+    await allinone.submit_intent(OrderIntent(TOKEN_ID, BUY, 0.5, 10, strategy='s'))
+
+    client = FakeClient()
+    router = AccountRouter({'default': ExecutionService(client, OrderSigner(PRIVATE_KEY), name='default')})
+    monkeypatch.setattr(execution_main, 'router', router)
+    await allinone.submit_intent(OrderIntent(TOKEN_ID, BUY, 0.5, 10, strategy='s'))
+    assert len(client.batches) == 1 and router.stats == {'default': 1}
+
+
+def test_execution_risk_follows_the_market_stream(monkeypatch):
+    """Test book events on the bus give each account's risk engine the token's market and top."""
+    from services.execution import main as execution_main
+    from shared.interfaces import Message
+
+    services = {
+        name: ExecutionService(FakeClient(), OrderSigner(PRIVATE_KEY), ledger=OrderLedger(),
+                               risk=RiskEngine(OrderLedger()), name=name)
+        for name in ('a', 'b')
+    }
+    monkeypatch.setattr(execution_main, 'router', AccountRouter(services))
+    monkeypatch.setattr(execution_main, 'books', BookEngine())
+
+    execution_main.on_market_message(Message('market.m1', {
+        'type': 'l2_book', 'market': 'm1', 'asset_id': 'yes',
+        'bids': [{'price': '0.48', 'size': '10'}], 'asks': [{'price': '0.52', 'size': '10'}],
+    }))
+    execution_main.on_market_message(Message('market.m1', {
+        'type': 'price_change', 'market': 'm1',
+        'price_changes': [{'asset_id': 'yes', 'side': 'SELL', 'price': '0.50', 'size': '5'}],
+    }))
+    for service in services.values():
+        assert service.risk.check(OrderIntent('yes', BUY, 0.60, 10)) == risk_checks.PRICE_BAND
+        intent = OrderIntent('yes', BUY, 0.50, 10)
+        assert service.risk.check(intent) is None and intent.market == 'm1'
+
+
+@pytest.mark.asyncio
+async def test_execution_prepares_templates_of_active_and_new_tokens(monkeypatch, tmp_path):
+    """Test templates are built for the catalogue's active markets and for tokens seen on the stream."""
+    from services.execution import main as execution_main
+    from services.ingest.catalogue import MarketCatalogue
+    from shared.interfaces import Message
+
+    catalogue = MarketCatalogue(tmp_path / 'markets.json')
+    catalogue.upsert({'condition_id': 'm1', 'tokens': [{'token_id': 'yes'}, {'token_id': 'no'}], 'active': True})
+    catalogue.upsert({'condition_id': 'm2', 'tokens': [{'token_id': 'old'}], 'closed': True})
+    catalogue.save()
+    monkeypatch.setenv('MARKET_CATALOGUE_PATH', str(tmp_path / 'markets.json'))
+
+    client = FakeClient()
+    router = AccountRouter({'default': ExecutionService(client, OrderSigner(PRIVATE_KEY), name='default')})
+    monkeypatch.setattr(execution_main, 'router', router)
+    monkeypatch.setattr(execution_main, 'books', BookEngine())
+    monkeypatch.setattr(execution_main, 'prepared_tokens', set())
+    monkeypatch.setattr(execution_main, 'pending_tokens', set())
+    monkeypatch.setattr(execution_main, 'PREPARE_INTERVAL', 0.01)
+
+    task = asyncio.create_task(execution_main.prepare_templates())
+    try:
+        await asyncio.sleep(0.05)
+        assert sorted(client.lookups) == ['no', 'yes']
+
+        execution_main.on_market_message(Message('market.m3', {
+            'type': 'l2_book', 'market': 'm3', 'asset_id': 'new',
+            'bids': [{'price': '0.48', 'size': '10'}], 'asks': [],
+        }))
+        await asyncio.sleep(0.05)
+        assert sorted(client.lookups) == ['new', 'no', 'yes']
+    finally:
+        task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_signing_pool_signs_in_worker_processes():
+    """Test signers survive pickling and batches signed in workers match in-process orders."""
+    signer = OrderSigner(PRIVATE_KEY, signature_type=2, funder='0x' + '33' * 20)
+    template = signer.template(TOKEN_ID, tick_size='0.001', neg_risk=True)
+    copy = pickle.loads(pickle.dumps(signer)).template(*template.args)
+    assert copy.sign(BUY, 0.537, 12.345, salt=SALT) == template.sign(BUY, 0.537, 12.345, salt=SALT)
+
+    pool = SigningPool({'a': signer}, workers=1)
+    try:
+        orders = await pool.sign('a', [(template, BUY, 0.52, 100.0), (template, SELL, 0.6, 5.0)])
+    finally:
+        pool.shutdown()
+    ignored = ('salt', 'signature')
+    for order, (side, price, size) in zip(orders, [(BUY, 0.52, 100.0), (SELL, 0.6, 5.0)]):
+        expected = template.sign(side, price, size)
+        assert {k: v for k, v in order.items() if k not in ignored} == {k: v for k, v in expected.items() if k not in ignored}
@@ -0,0 +1,375 @@
+"""
+Unit tests for the ingest service components.
+"""
+
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from llm.embeddings import EmbeddingService
+from services.ingest.book import BookEngine
+from services.ingest.bookstore import BookStore, rebuild
+from services.ingest.conflation import Conflator
+from services.ingest.feed import MarketFeed
+from services.ingest.market_data import MarketState
+from services.ingest.news import (
+    FileSource,
+    NewsIngestor,
+    NewsMatcher,
+    RSSSource,
+    SimHashIndex,
+    extract_entities,
+    parse_json_item,
+    simhash,
+)
+from services.ingest.search import InvertedIndex, MarketSearchIndex, SemanticIndex
+
+
+def make_market(condition_id: str, question: str, description: str = '') -> MarketState:
+    """Build a MarketState from catalogue-style raw data."""
+    return MarketState(
+        market_id=condition_id,
+        condition_id=condition_id,
+        token_ids=[f'{condition_id}-yes', f'{condition_id}-no'],
+        raw_data={'question': question, 'description': description}
+    )
+
+
+class BagOfWordsEncoder:
+    """Deterministic stand-in for the sentence-transformers model."""
+
+    def __init__(self, dim=64):
+        self.dim = dim
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[i, sum(map(ord, word.strip('?'))) % self.dim] += 1
+        return vectors
+
+
+def test_inverted_index_ranking():
+    """Test BM25 ranking and document removal."""
+    index = InvertedIndex()
+    index.add('a', 'Will Bitcoin reach 100k by December?')
+    index.add('b', 'Will Ethereum flip Bitcoin in market cap? Bitcoin dominance')
+    index.add('c', 'Who will win the election?')
+
+    results = index.search('bitcoin')
+    assert [doc_id for doc_id, _ in results] == ['b', 'a']
+
+    index.remove('b')
+    assert [doc_id for doc_id, _ in index.search('bitcoin')] == ['a']
+    assert index.search('nothing matches') == []
+
+
+@pytest.mark.asyncio
+async def test_market_search_incremental_updates():
+    """Test the index only re-indexes markets whose text changed."""
+    index = MarketSearchIndex()
+    market = make_market('m1', 'Will the Fed cut rates in March?')
+
+    assert index.update_market(market)
+    assert not index.update_market(make_market('m1', 'Will the Fed cut rates in March?'))
+
+    await index.on_market_update(make_market('m1', 'Will the Fed hike rates in June?'))
+    assert index.search('cut') == []
+    assert [m.condition_id for m in index.search('hike rates')] == ['m1']
+
+
+@pytest.mark.asyncio
+async def test_related_markets_keyword_fallback():
+    """Test related markets fall back to keyword similarity without embeddings."""
+    index = MarketSearchIndex()
+    index.update_market(make_market('m1', 'Will Bitcoin close above 100k?'))
+    index.update_market(make_market('m2', 'Bitcoin above 120k by year end?'))
+    index.update_market(make_market('m3', 'Who wins the Super Bowl?'))
+
+    related = await index.related('m1')
+    assert [m.condition_id for m in related] == ['m2']
+    assert await index.related('unknown') == []
+
+
+def test_book_engine_tracks_top_of_book():
+    """Test snapshots and level changes keep the best prices and dirty set current."""
+    books = BookEngine()
+    # REST books list the best levels last
+    books.apply_snapshot('yes', {
+        'bids': [{'price': '0.40', 'size': '10'}, {'price': '0.45', 'size': '5'}],
+        'asks': [{'price': '0.60', 'size': '8'}, {'price': '0.55', 'size': '3'}]
+    })
+    assert books.book('yes').top() == (0.45, 5.0, 0.55, 3.0)
+    assert books.drain_dirty() == {'yes'}
+
+    books.handle({'event_type': 'price_change', 'market': 'm1', 'price_changes': [
+        {'asset_id': 'yes', 'side': 'SELL', 'price': '0.55', 'size': '0'},
+        {'asset_id': 'yes', 'side': 'BUY', 'price': '0.30', 'size': '50'},
+    ]})
+    book = books.book('yes')
+    assert (book.best_bid, book.best_ask, book.best_ask_size) == (0.45, 0.60, 8.0)
+    assert book.market == 'm1'
+    assert books.drain_dirty() == {'yes'}
+
+    # Changes behind the top do not mark the token dirty
+    books.apply_change('yes', 'BUY', 0.30, 0)
+    assert not books.dirty
+
+    # Levels are fixed point: exact ticks and micro-units, also as int64 columns
+    assert book.top_ticks() == (4500, 5_000_000, 6000, 8_000_000)
+    prices, sizes = book.level_arrays('BUY')
+    assert prices.tolist() == [4500, 4000] and sizes.tolist() == [5_000_000, 10_000_000]
+
+
+def test_market_state_spread_is_exact():
+    """Test spread and midpoint are computed in ticks, without float residue."""
+    market = make_market('m', 'Q?')
+    market.best_bid_price, market.best_ask_price = 0.1, 0.3
+    assert market.spread == 0.2
+    assert market.midpoint == 0.2
+
+
+@pytest.mark.asyncio
+async def test_embedding_micro_batching_and_cache(tmp_path):
+    """Test concurrent embeds share one batch and cached text is never re-encoded."""
+    encoder = BagOfWordsEncoder()
+    service = EmbeddingService(tmp_path, encoder=encoder)
+
+    first, second = await asyncio.gather(
+        service.embed(['bitcoin price', 'fed rates']),
+        service.embed(['fed rates', 'election winner'])
+    )
+    assert encoder.calls == [['bitcoin price', 'fed rates', 'election winner']]
+    assert np.allclose(first[1], second[0])
+    assert np.isclose(np.linalg.norm(first[0]), 1.0)
+
+    # A restarted service reads the vectors back from the mmap cache
+    restarted_encoder = BagOfWordsEncoder()
+    restarted = EmbeddingService(tmp_path, encoder=restarted_encoder)
+    vectors = await restarted.embed(['election winner', 'bitcoin price'])
+    assert restarted_encoder.calls == []
+    assert np.allclose(vectors[1], first[0])
+
+
+@pytest.mark.asyncio
+async def test_related_markets_semantic(tmp_path):
+    """Test related markets and text queries through the embedding service."""
+    service = EmbeddingService(tmp_path, encoder=BagOfWordsEncoder())
+    index = MarketSearchIndex(semantic=SemanticIndex(service))
+    index.update_market(make_market('m1', 'bitcoin above 100k'))
+    index.update_market(make_market('m2', 'bitcoin above 120k'))
+    index.update_market(make_market('m3', 'super bowl winner'))
+    await index.flush_semantic()
+
+    related = await index.related('m1', limit=1)
+    assert [m.condition_id for m in related] == ['m2']
+    matches = await service.query('markets', 'who is the super bowl winner', limit=1)
+    assert matches[0][0] == 'm3'
+
+    index.remove_market('m2')
+    assert [doc_id for doc_id, _ in service.similar('markets', 'm1')] == ['m3']
+
+
+def test_news_near_duplicates_and_entities():
+    """Test SimHash near-duplicate detection and entity extraction."""
+    index = SimHashIndex(capacity=100)
+    assert not index.seen(simhash('Fed cuts interest rates by 25 basis points in surprise move on Wednesday'))
+    assert index.seen(simhash('Fed cuts interest rates by 25 basis points in surprise move on Wednesday afternoon'))
+    assert not index.seen(simhash('Bitcoin rallies to record high as ETF inflows surge'))
+
+    entities = extract_entities('Will Donald Trump win? The Bank of England and NATO respond.')
+    assert entities == ['donald trump', 'bank of england', 'nato']
+
+
+def test_rss_parsing():
+    """Test RSS and Atom feeds parse into news items."""
+    rss = b"""<rss><channel><item><title>Fed &lt;b&gt;cuts&lt;/b&gt; rates</title>
+    <link>https://news.test/1</link><pubDate>Wed, 01 May 2024 18:00:00 GMT</pubDate></item></channel></rss>"""
+    atom = b"""<feed xmlns="http://www.w3.org/2005/Atom"><entry><id>tag:2</id><title>NATO summit</title>
+    <link href="https://news.test/2"/><updated>2024-05-01T18:00:00Z</updated></entry></feed>"""
+
+    items = RSSSource.parse('rss', rss) + RSSSource.parse('atom', atom)
+    assert [(item.id, item.title) for item in items] == [('https://news.test/1', 'Fed cuts rates'), ('tag:2', 'NATO summit')]
+    assert items[0].published == items[1].published == 1714586400.0
+
+
+@pytest.mark.asyncio
+async def test_news_ingestor_matches_and_publishes(tmp_path):
+    """Test news flows from a file source through dedup and matching to publish."""
+    published = []
+
+    async def publish(items):
+        published.extend(items)
+
+    matcher = NewsMatcher(EmbeddingService(tmp_path / 'vectors', encoder=BagOfWordsEncoder()), min_score=0.3)
+    await matcher.add_markets({
+        'fed': 'Will the Federal Reserve cut interest rates in June?',
+        'btc': 'Will Bitcoin reach 100k in 2024?',
+    })
+    feed = tmp_path / 'news.jsonl'
+    feed.write_text('\n'.join([
+        '{"id": "1", "title": "Federal Reserve signals it will cut interest rates in June"}',
+        '{"id": "2", "title": "Federal Reserve signals it will cut interest rates in June meeting"}',
+        '{"id": "1", "title": "Federal Reserve signals it will cut interest rates in June"}',
+        '{"id": "3", "title": "Local bakery wins pastry award"}',
+    ]) + '\n{"id": "4", "title": "partial line')
+
+    source = FileSource(feed)
+    ingestor = NewsIngestor([source], matcher, publish)
+    await ingestor.process(await source.fetch())
+
+    assert [item['id'] for item in published] == ['1']
+    assert published[0]['markets'][0]['id'] == 'fed'
+    assert published[0]['markets'][0]['question'].startswith('Will the Federal Reserve')
+    assert 'federal reserve' in published[0]['entities']
+    assert ingestor.stats == {'received': 4, 'duplicates': 1, 'near_duplicates': 1, 'matched': 1, 'unmatched': 1}
+    # The partial line is left for the next poll
+    assert await source.fetch() == []
+
+    # Unmatched items are not remembered: once their market is indexed they match
+    await matcher.add_markets({'bakery': 'Will the local bakery win the pastry award?'})
+    matched = await ingestor.process([parse_json_item('file', {'id': '3', 'title': 'Local bakery wins pastry award'})])
+    assert [item.markets[0][0] for item in matched] == ['bakery']
+    assert await ingestor.process([parse_json_item('file', {'id': '1', 'title': 'Fed'})]) == []
+
+
+@pytest.mark.asyncio
+async def test_market_feed_snapshot_then_coalesced_deltas():
+    """Test clients get a snapshot, then one delta with only the changed fields."""
+    feed = MarketFeed()
+    sent = []
+
+    async def send(text):
+        sent.append(json.loads(text))
+
+    a, b = make_market('a', 'Will A happen?'), make_market('b', 'Will B happen?')
+    a.best_bid_price, a.best_ask_price = 0.41, 0.43
+    feed.on_market_update(a)
+    feed.on_market_update(b)
+
+    client = feed.connect(send)
+    await client.subscribe(['a'])
+    assert sent == [{'type': 'snapshot', 'markets': {'a': {'q': 'Will A happen?', 'b': 0.41, 'a': 0.43, 'v': 0.0}}}]
+    assert client.delta() is None
+
+    # Several updates between flushes coalesce; the unsubscribed market is not sent
+    for bid in (0.42, 0.44, 0.42):
+        a.best_bid_price = bid
+        feed.on_market_update(a)
+    b.best_bid_price = 0.5
+    feed.on_market_update(b)
+    assert client.delta() == {'type': 'delta', 'markets': {'a': {'b': 0.42}}}
+    assert client.delta() is None
+
+    await client.handle_text('{"op": "set", "markets": ["b"]}')
+    assert client.markets == {'b'}
+    assert sent[-1]['markets'] == {'b': {'q': 'Will B happen?', 'b': 0.5, 'v': 0.0}}
+
+    # Invalid requests are answered with an error and change nothing
+    for text in ('{"op": "set"', '["b"]', '{"op": "drop", "markets": ["b"]}', '{"op": "set", "markets": "a"}'):
+        await client.handle_text(text)
+        assert sent[-1]['type'] == 'error'
+    assert client.markets == {'b'}
+
+
+@pytest.mark.asyncio
+async def test_conflation_keeps_latest_state_per_key():
+    """Test a burst of book updates is emitted once with its final state, trades at once."""
+    emitted = []
+
+    async def emit(event):
+        emitted.append(event)
+
+    conflator = Conflator(emit, window=1.0)
+    for i in range(100):
+        await conflator.add({'type': 'l2_book', 'market': 'a', 'asset_id': 'yes', 'bids': [i], 'timestamp': i})
+        await conflator.add({'type': 'l2_book', 'market': 'a', 'asset_id': 'no', 'bids': [-i]})
+    await conflator.add({'type': 'ticker', 'market': 'b', 'last': 0.4, 'volume': 10})
+    await conflator.add({'type': 'ticker', 'market': 'b', 'last': 0.5})
+    await conflator.add({'type': 'trades', 'market': 'a', 'price': 0.4, 'size': 1})
+    assert [e['type'] for e in emitted] == ['trades']
+
+    await conflator.flush()
+    assert emitted[1:] == [
+        {'type': 'l2_book', 'market': 'a', 'asset_id': 'yes', 'bids': [99], 'timestamp': 99},
+        {'type': 'l2_book', 'market': 'a', 'asset_id': 'no', 'bids': [-99]},
+        {'type': 'ticker', 'market': 'b', 'last': 0.5, 'volume': 10},
+    ]
+    assert conflator.stats == {'received': 203, 'conflated': 199, 'emitted': 4}
+    assert conflator.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_conflation_replaces_snapshots_and_merges_price_changes():
+    """Test snapshots replace pending state, and level changes merge per asset or into a pending snapshot."""
+    emitted = []
+
+    async def emit(event):
+        emitted.append(event)
+
+    def change(asset, side, price, size):
+        return {'asset_id': asset, 'side': side, 'price': price, 'size': size}
+
+    conflator = Conflator(emit, window=1.0)
+    await conflator.add({'type': 'l2_book', 'market': 'm', 'asset_id': 'yes', 'bids': [{'price': '0.40', 'size': '10'}],
+                         'asks': [{'price': '0.45', 'size': '10'}], 'hash': 'h1'})
+    await conflator.add({'type': 'l2_book', 'market': 'm', 'asset_id': 'yes', 'bids': [{'price': '0.41', 'size': '5'}],
+                         'asks': [{'price': '0.46', 'size': '5'}]})
+    await conflator.add({'type': 'price_change', 'market': 'm', 'price_changes': [
+        change('yes', 'BUY', '0.42', '7'), change('yes', 'SELL', '0.46', '0'), change('no', 'BUY', '0.50', '3'),
+    ]})
+    await conflator.add({'type': 'price_change', 'market': 'm', 'price_changes': [
+        change('no', 'BUY', '0.50', '4'), change('no', 'SELL', '0.55', '1'),
+    ]})
+    await conflator.flush()
+
+    yes, no = emitted
+    assert 'hash' not in yes
+    assert yes['bids'] == [{'price': '0.42', 'size': '7'}, {'price': '0.41', 'size': '5'}]
+    assert yes['asks'] == []
+    assert no['type'] == 'price_change' and no['asset_id'] == 'no'
+    assert no['price_changes'] == [change('no', 'BUY', '0.50', '4'), change('no', 'SELL', '0.55', '1')]
+
+    # A snapshot supersedes the changes of its asset pending before it
+    emitted.clear()
+    await conflator.add({'type': 'price_change', 'market': 'm', 'price_changes': [change('no', 'BUY', '0.51', '2')]})
+    await conflator.add({'type': 'l2_book', 'market': 'm', 'asset_id': 'no', 'bids': [], 'asks': []})
+    await conflator.flush()
+    assert [event['type'] for event in emitted] == ['l2_book']
+
+
+def test_book_store_snapshots_deltas_and_rebuild():
+    """Test books are stored as a snapshot plus small deltas and rebuilt at any time."""
+    store = BookStore(None, snapshot_every=3)
+    books = []
+    for i in range(6):
+        bids = [{'price': str(round(0.40 - 0.01 * level, 2)), 'size': str(100 + level)} for level in range(20)]
+        bids[0]['size'] = str(50 + i)  # only the best bid changes
+        asks = [{'price': '0.45', 'size': '30'}] if i < 4 else []
+        event = {'type': 'l2_book', 'market': 'm', 'asset_id': 'yes', 'timestamp': 1000 + i, 'bids': bids, 'asks': asks}
+        books.append(event)
+        store.record(event)
+    store.record(dict(books[-1], timestamp=1006))  # unchanged book, nothing stored
+
+    frames = store._pending
+    assert [key.rsplit(':', 1)[1] for key, _, _ in frames] == ['snapshots', 'deltas', 'deltas', 'deltas', 'snapshots', 'deltas']
+    assert store.stats['unchanged'] == 1
+    assert len(frames[1][2]) < 50 < len(json.dumps(books[1]))
+
+    # Book at t=1003.5s: snapshot at 1000 plus the three deltas up to 1003
+    snapshot = frames[0][2]
+    deltas = [frame for key, ts, frame in frames if key.endswith('deltas') and ts <= 1003500]
+    book = rebuild(snapshot, deltas)
+    assert book['timestamp'] == 1003000
+    assert book['bids'][0] == {'price': 0.4, 'size': 53.0}
+    assert book['bids'][1:] == [{'price': float(b['price']), 'size': float(b['size'])} for b in books[3]['bids'][1:]]
+    assert book['asks'] == [{'price': 0.45, 'size': 30.0}]
+
+    # Later times start from the second snapshot, which has no asks left
+    book = rebuild(frames[4][2], [frames[5][2]])
+    assert book['bids'][0]['size'] == 55.0 and book['asks'] == []
+
@@ -0,0 +1,106 @@
+"""
+Unit tests for the shared message bus.
+"""
+
+import asyncio
+
+import pytest
+
+from shared.interfaces import InProcessBus, UnixSocketBroker, UnixSocketBus, topic
+from shared.interfaces.base import PUBLISH, SUBSCRIBE, decode_frame, encode_frame
+
+
+def test_frame_roundtrip():
+    """Test binary frames carry the topic and payload."""
+    frame = encode_frame('market.0xabc', {'type': 'trades', 'price': 0.42, 'size': 10})
+    assert decode_frame(frame) == (PUBLISH, 'market.0xabc', {'type': 'trades', 'price': 0.42, 'size': 10})
+    assert decode_frame(encode_frame('market.*', frame_type=SUBSCRIBE)) == (SUBSCRIBE, 'market.*', None)
+
+
+async def wait_for(predicate, timeout=1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise TimeoutError
+        await asyncio.sleep(0.005)
+
+
+@pytest.mark.asyncio
+async def test_in_process_topic_routing():
+    """Test subscribers only receive their markets, and wildcards receive all once."""
+    bus = InProcessBus()
+    one, everything = [], []
+    await bus.subscribe([topic('market', 'a')], one.append)
+    await bus.subscribe([topic('market'), topic('market', 'a')], everything.append)
+
+    await bus.publish(topic('market', 'a'), {'n': 1})
+    await bus.publish(topic('market', 'b'), {'n': 2})
+    await bus.publish(topic('news', 'a'), {'n': 3})
+    await wait_for(lambda: len(everything) == 2)
+    await asyncio.sleep(0.01)
+
+    assert [m.payload['n'] for m in one] == [1]
+    assert [(m.market, m.payload['n']) for m in everything] == [('a', 1), ('b', 2)]
+    await bus.close()
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_broker_filters_by_topic(tmp_path):
+    """Test the broker forwards frames only to connections subscribed to them."""
+    path = str(tmp_path / 'bus.sock')
+    broker = UnixSocketBroker(path)
+    await broker.start()
+    publisher, subscriber = UnixSocketBus(path), UnixSocketBus(path)
+    await publisher.start()
+    await subscriber.start()
+    try:
+        received = []
+        subscription = await subscriber.subscribe([topic('market', 'a'), topic('news')], received.append)
+        await asyncio.sleep(0.05)  # let the broker register the subscription
+
+        for market in ('a', 'b', 'a'):
+            await publisher.publish(topic('market', market), {'market': market})
+        await publisher.publish(topic('news', 'b'), {'title': 'headline'})
+        await wait_for(lambda: len(received) == 3)
+
+        assert [m.topic for m in received] == ['market.a', 'market.a', 'news.b']
+        assert received[2].payload == {'title': 'headline'}
+
+        await subscriber.unsubscribe(subscription)
+        await asyncio.sleep(0.05)
+        await publisher.publish(topic('market', 'a'), {'market': 'a'})
+        await asyncio.sleep(0.05)
+        assert len(received) == 3
+    finally:
+        await publisher.close()
+        await subscriber.close()
+        await broker.close()
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_bus_reconnects_to_the_broker(tmp_path):
+    """Test clients start before the broker, and resubscribe after it restarts."""
+    path = str(tmp_path / 'bus.sock')
+    publisher = UnixSocketBus(path, retry_max=0.05)
+    subscriber = UnixSocketBus(path, retry_max=0.05)
+    await publisher.start()
+    await subscriber.start()
+    received = []
+    await subscriber.subscribe([topic('market')], received.append)
+    await publisher.publish(topic('market', 'a'), {'n': 0})
+    assert publisher.dropped == 1
+
+    broker = UnixSocketBroker(path)
+    try:
+        for n in (1, 2):
+            await broker.start()
+            await wait_for(lambda: publisher.connected and subscriber.connected and broker._routes)
+            await publisher.publish(topic('market', 'a'), {'n': n})
+            await wait_for(lambda: len(received) == n)
+            await broker.close()
+            await wait_for(lambda: not publisher.connected and not subscriber.connected)
+        assert [m.payload['n'] for m in received] == [1, 2]
+    finally:
+        await publisher.close()
+        await subscriber.close()
+        await broker.close()